@@ -0,0 +1,126 @@
+# benchmarks/command_latency.py
+import argparse
+import multiprocessing
+import socket
+import time
+from benchmarks.gateway_process import HOST, start_gateway, stop_gateways
+from generated import smart_city_pb2
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_CLIENT, ROLE_DEVICE, connect_secure, seal_datagram
+
+# --- Latência dos comandos sob carga ---
+# Sobe um Gateway no loopback, registra sensores simulados e os faz enviar
+# leituras UDP o mais rápido possível (de vários processos e IPs de origem,
+# 127.2.<processo>.<n>), saturando a ingestão. Enquanto isso, um cliente envia
+# comandos de ligar/desligar em ritmo de operador e mede o tempo até o
+# CommandResult. Compara o Gateway sem filas de prioridade
+# (GATEWAY_CONTROL_PRIORITY=0) com o padrão, e com o Gateway ocioso.
+#
+#   python -m benchmarks.command_latency --devices 3000 --senders 1 --commands 400
+
+BASE_PORT = 22000  # +0 dispositivos, +1 UDP, +3 clientes, +4 streaming.
+
+
+def register_sensors(count):
+    """Registra 'count' sensores simulados; retorna as conexões TCP, por ID."""
+    sensors = {}
+    for index in range(count):
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        info = wrapper_msg.device_info
+        info.id = f"temp_{index:05d}"
+        info.type = smart_city_pb2.TEMP_SENSOR
+        conn = connect_secure((HOST, BASE_PORT), ROLE_DEVICE)
+        send_message(conn, wrapper_msg)
+        sensors[info.id] = conn
+    return sensors
+
+
+def flood(sender, device_ids, stop_at, counter):
+    """Envia leituras dos sensores, em ciclo, até 'stop_at'. Cada 20 sensores usam um IP de origem próprio."""
+    sockets = []
+    for index in range(0, len(device_ids), 20):
+        udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_socket.bind((f"127.2.{sender}.{index // 20 + 1}", 0))
+        sockets.append(udp_socket)
+    datagrams = []
+    for index, device_id in enumerate(device_ids):
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        wrapper_msg.status_update.device_id = device_id
+        wrapper_msg.status_update.temperature = 20.0 + index % 10
+        datagrams.append((sockets[index // 20], wrapper_msg.SerializeToString()))
+    sent = 0
+    while time.time() < stop_at:
+        for udp_socket, data in datagrams:
+            udp_socket.sendto(seal_datagram(data), (HOST, BASE_PORT + 1))
+        sent += len(datagrams)
+    with counter.get_lock():
+        counter.value += sent
+
+
+def measure_commands(sensors, commands, rate):
+    """Envia 'commands' comandos, 'rate' por segundo; retorna as latências (ms) até o CommandResult."""
+    conn = connect_secure((HOST, BASE_PORT + 3), ROLE_CLIENT)
+    targets = list(sensors)
+    latencies = []
+    for index in range(commands):
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        wrapper_msg.command.device_id = targets[index % len(targets)]
+        wrapper_msg.command.toggle = True
+        started = time.perf_counter()
+        send_message(conn, wrapper_msg)
+        response = recv_message(conn)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response is None or not response.command_result.accepted:
+            raise RuntimeError("Comando não aceito pelo Gateway.")
+        time.sleep(max(0.0, 1.0 / rate - latencies[-1] / 1000))
+    conn.close()
+    return latencies
+
+
+def run(label, priority, load, args):
+    gateway = start_gateway(BASE_PORT, GATEWAY_CONTROL_PRIORITY="1" if priority else "0")
+    sensors = {}
+    senders = []
+    try:
+        sensors = register_sensors(args.devices)
+        counter = multiprocessing.Value("q", 0)
+        duration = args.commands / args.rate + 2.0
+        started = time.time()
+        if load:
+            ids = list(sensors)
+            share = len(ids) // args.senders
+            for sender in range(args.senders):
+                process = multiprocessing.Process(target=flood, args=(
+                    sender, ids[sender * share:(sender + 1) * share], started + duration + 1.0, counter))
+                process.start()
+                senders.append(process)
+            time.sleep(1.0)  # Deixa a ingestão saturar antes da primeira medida.
+        latencies = sorted(measure_commands(sensors, args.commands, args.rate))
+        for process in senders:
+            process.join()
+        elapsed = time.time() - started
+    finally:
+        for process in senders:
+            if process.is_alive():
+                process.kill()
+        for conn in sensors.values():
+            conn.close()
+        stop_gateways([gateway])
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:>15} | {counter.value / elapsed:10.0f} | {p50:8.1f} | {p99:8.1f} | {latencies[-1]:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latência dos comandos com a ingestão de telemetria saturada.")
+    parser.add_argument("--devices", type=int, default=3000, help="Sensores simulados registrados.")
+    parser.add_argument("--senders", type=int, default=1, help="Processos enviando leituras.")
+    parser.add_argument("--commands", type=int, default=400, help="Comandos medidos por cenário.")
+    parser.add_argument("--rate", type=float, default=20.0, help="Comandos por segundo (o limite por conexão é 20).")
+    args = parser.parse_args()
+
+    print(f"{args.devices} sensor(es), {args.senders} processo(s) de envio, {args.commands} comando(s) a {args.rate:g}/s")
+    print(f"{'cenário':>15} | {'leituras/s':>10} | {'p50 ms':>8} | {'p99 ms':>8} | {'máx ms':>8}")
+    run("ocioso", True, False, args)
+    run("sem prioridade", False, True, args)
+    run("com prioridade", True, True, args)
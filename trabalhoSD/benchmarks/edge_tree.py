@@ -0,0 +1,176 @@
+# benchmarks/edge_tree.py
+import argparse
+import os
+import socket
+import tempfile
+import time
+from benchmarks.gateway_process import HOST, start_gateway, stop_gateways
+from generated import smart_city_pb2
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_CLIENT, ROLE_DEVICE, connect_secure, seal_datagram
+from src.gateway.capture import CHANNEL_DEVICE, CHANNEL_UDP, INBOUND, read_capture
+
+# --- Árvore de Gateways no loopback ---
+# Sobe, em processos separados, um Gateway central e (no modo "borda") um
+# Gateway de borda por bairro, todos em 127.0.0.1 com portas próprias.
+# Sensores de temperatura e de qualidade do ar simulados se registram (TCP) e
+# enviam leituras (UDP assinado) ao Gateway do seu bairro, ou direto ao
+# central no modo "direto". Os de ar enviam, como src/devices/air_sensor.py,
+# o texto "PPM: ..." em state_info e o valor em metrics["ppm"]. Cada bairro
+# envia de um IP de origem próprio (127.0.<n>.1).
+#
+# No fim, o central é consultado (dispositivos registrados, amostras
+# agregadas), recebe um comando para um sensor de cada bairro (que precisa
+# chegar ao sensor pela borda) e sua captura é lida para contar as mensagens
+# e os bytes que ele recebeu.
+#
+#   python -m benchmarks.edge_tree --neighbourhoods 4 --devices 100 --air-devices 50 --seconds 20
+
+CORE_PORTS = 20000  # Portas do central: +0 dispositivos, +1 UDP, +3 clientes, +4 streaming.
+EDGE_PORTS = 20100  # Portas da borda n: EDGE_PORTS + 10 * n + (0, 1, 3, 4).
+# Prefixo do ID e métrica agregada de cada tipo de sensor simulado.
+SENSOR_KINDS = {
+    smart_city_pb2.TEMP_SENSOR: ("temp", "temperature"),
+    smart_city_pb2.AIR_SENSOR: ("airq", "ppm"),
+}
+
+
+def register_sensors(neighbourhood, count, device_port, device_type):
+    """Registra 'count' sensores simulados do tipo pedido; retorna as conexões TCP, por ID."""
+    sensors = {}
+    prefix = SENSOR_KINDS[device_type][0]
+    for index in range(count):
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        info = wrapper_msg.device_info
+        info.id = f"{prefix}_b{neighbourhood}_{index:04d}"
+        info.type = device_type
+        info.group = f"bairro_{neighbourhood}"
+        conn = connect_secure((HOST, device_port), ROLE_DEVICE)
+        send_message(conn, wrapper_msg)
+        sensors[info.id] = conn
+    return sensors
+
+
+def send_readings(targets, rate, seconds):
+    """Envia, de cada bairro, uma leitura por sensor a cada 1/rate segundo. Retorna os datagramas enviados."""
+    sent = 0
+    period = 1.0 / rate
+    started = time.time()
+    tick = 0
+    while time.time() - started < seconds:
+        for udp_socket, udp_port, sensors in targets:
+            for device_id, device_type in sensors:
+                wrapper_msg = smart_city_pb2.WrapperMessage()
+                status = wrapper_msg.status_update
+                status.device_id = device_id
+                if device_type == smart_city_pb2.AIR_SENSOR:
+                    status.state_info = f"PPM: {80 + tick % 10}"
+                    status.metrics["ppm"] = 80 + tick % 10
+                else:
+                    status.temperature = 20.0 + tick % 10
+                udp_socket.sendto(seal_datagram(wrapper_msg.SerializeToString()), (HOST, udp_port))
+                sent += 1
+        tick += 1
+        time.sleep(max(0.0, started + tick * period - time.time()))
+    return sent
+
+
+def query_core(command_targets):
+    """Consulta o central: dispositivos registrados, amostras agregadas e entrega dos comandos."""
+    conn = connect_secure((HOST, CORE_PORTS + 3), ROLE_CLIENT)
+    request = smart_city_pb2.WrapperMessage()
+    request.list_request.SetInParent()
+    send_message(conn, request)
+    registered = len(recv_message(conn).list_response.devices)
+
+    samples = 0
+    for device_type, (_, metric) in SENSOR_KINDS.items():
+        request = smart_city_pb2.WrapperMessage()
+        request.aggregate_query.device_type = device_type
+        request.aggregate_query.metric = metric
+        request.aggregate_query.window = smart_city_pb2.SLIDING
+        send_message(conn, request)
+        samples += sum(result.count for result in recv_message(conn).aggregate_response.results)
+
+    delivered = 0
+    for device_id, sensor_conn in command_targets:
+        request = smart_city_pb2.WrapperMessage()
+        request.command.device_id = device_id
+        request.command.toggle = True
+        send_message(conn, request)
+        if not recv_message(conn).command_result.accepted:
+            continue
+        sensor_conn.settimeout(5.0)
+        try:
+            received = recv_message(sensor_conn)
+            # A primeira mensagem na conexão é a confirmação do registro.
+            while received is not None and received.HasField("registration_ack"):
+                received = recv_message(sensor_conn)
+        except OSError:
+            received = None
+        delivered += received is not None and received.command.device_id == device_id
+    conn.close()
+    return registered, samples, delivered
+
+
+def core_ingest(capture):
+    """Conta as mensagens e os bytes recebidos pelo central (datagramas UDP e mensagens das conexões de dispositivos)."""
+    messages = size = 0
+    for _, channel, direction, _, payload in read_capture(capture):
+        if direction == INBOUND and channel in (CHANNEL_UDP, CHANNEL_DEVICE):
+            messages += 1
+            size += len(payload)
+    return messages, size
+
+
+def run(mode, args):
+    processes = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        capture = os.path.join(work_dir, "central.bin")
+        try:
+            processes.append(start_gateway(CORE_PORTS, GATEWAY_CAPTURE=capture))
+            targets, command_targets = [], []
+            for neighbourhood in range(args.neighbourhoods):
+                base_port = CORE_PORTS
+                if mode == "borda":
+                    base_port = EDGE_PORTS + 10 * neighbourhood
+                    processes.append(start_gateway(base_port, GATEWAY_UPSTREAM=f"{HOST}:{CORE_PORTS}",
+                                                   GATEWAY_EDGE_ID=f"borda_{neighbourhood}",
+                                                   GATEWAY_EDGE_INTERVAL=str(args.interval)))
+                sensors = register_sensors(neighbourhood, args.devices, base_port, smart_city_pb2.TEMP_SENSOR)
+                air_sensors = register_sensors(neighbourhood, args.air_devices, base_port, smart_city_pb2.AIR_SENSOR)
+                udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                udp_socket.bind((f"127.0.{neighbourhood + 1}.1", 0))
+                targets.append((udp_socket, base_port + 1,
+                                [(device_id, smart_city_pb2.TEMP_SENSOR) for device_id in sensors] +
+                                [(device_id, smart_city_pb2.AIR_SENSOR) for device_id in air_sensors]))
+                command_targets.append(next(iter(sensors.items())))
+            sent = send_readings(targets, args.rate, args.seconds)
+            # Espera o último lote das bordas chegar ao central.
+            time.sleep(args.interval + 1.0 if mode == "borda" else 1.0)
+            registered, samples, delivered = query_core(command_targets)
+        finally:
+            stop_gateways(processes)
+        messages, size = core_ingest(capture)
+    print(f"{mode:>7} | {sent:9d} | {registered:12d} | {samples:9d} | {messages:9d} | {size / 1024:10.1f} | "
+          f"{delivered}/{len(command_targets)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga no Gateway central com e sem Gateways de borda.")
+    parser.add_argument("--neighbourhoods", type=int, default=4, help="Número de bairros (bordas).")
+    parser.add_argument("--devices", type=int, default=100, help="Sensores de temperatura por bairro.")
+    parser.add_argument("--air-devices", type=int, default=50, help="Sensores de qualidade do ar por bairro.")
+    parser.add_argument("--rate", type=float, default=1.0, help="Leituras por segundo de cada sensor.")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Duração do envio de leituras.")
+    parser.add_argument("--interval", type=float, default=5.0, help="Intervalo entre os lotes das bordas.")
+    parser.add_argument("--mode", choices=("direto", "borda"), help="Roda só um dos modos.")
+    args = parser.parse_args()
+
+    print(f"{args.neighbourhoods} bairro(s) x ({args.devices} sensor(es) de temperatura + {args.air_devices} de ar), "
+          f"{args.rate:g} leitura(s)/s, "
+          f"{args.seconds:g} s, lotes a cada {args.interval:g} s")
+    print(f"{'modo':>7} | {'enviadas':>9} | {'no central':>12} | {'amostras':>9} | {'mensagens':>9} | "
+          f"{'KiB':>10} | comandos")
+    for mode in ([args.mode] if args.mode else ["direto", "borda"]):
+        run(mode, args)
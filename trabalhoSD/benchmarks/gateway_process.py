@@ -0,0 +1,62 @@
+# benchmarks/gateway_process.py
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+# --- Gateways em processos próprios, usados pelos benchmarks ---
+# Cada Gateway roda no loopback com as portas a partir de 'base_port':
+# +0 dispositivos, +1 UDP, +3 clientes e +4 streaming. Ele está pronto quando
+# a porta de clientes aceita conexões.
+
+HOST = "127.0.0.1"
+READY_TIMEOUT = 15.0
+
+
+def gateway_environment(base_port, **extra):
+    """Variáveis de ambiente de um Gateway (ou de dispositivos que o usam) com as portas a partir de 'base_port'."""
+    return dict(os.environ, GATEWAY_IP=HOST, GATEWAY_RULES=os.devnull,
+                GATEWAY_DEVICE_PORT=str(base_port), GATEWAY_UDP_PORT=str(base_port + 1),
+                GATEWAY_CLIENT_PORT=str(base_port + 3), GATEWAY_STREAM_PORT=str(base_port + 4), **extra)
+
+
+def wait_for_port(port, process, timeout=READY_TIMEOUT):
+    """Espera a porta aceitar conexões; se o processo terminar ou o prazo acabar, encerra-o e lança RuntimeError."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError(f"Gateway na porta {port} não iniciou.")
+            time.sleep(0.001)
+
+
+def start_gateway(base_port, command=None, timeout=READY_TIMEOUT, **extra):
+    """
+    Lança um Gateway e espera a porta de clientes aceitar conexões. Retorna o processo.
+
+    'command' substitui o comando padrão (python -m src.gateway.gateway --bind
+    HOST); 'extra' acrescenta variáveis de ambiente (ex: GATEWAY_CAPTURE).
+    """
+    if command is None:
+        command = [sys.executable, "-m", "src.gateway.gateway", "--bind", HOST]
+    process = subprocess.Popen(command, env=gateway_environment(base_port, **extra),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(base_port + 3, process, timeout)
+    return process
+
+
+def stop_gateways(processes):
+    """Pede aos Gateways que terminem (SIGINT) e mata os que não terminarem em 10 segundos."""
+    for process in processes:
+        process.send_signal(signal.SIGINT)
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
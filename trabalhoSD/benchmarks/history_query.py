@@ -0,0 +1,146 @@
+# benchmarks/history_query.py
+import argparse
+import csv
+import os
+import random
+import shutil
+import tempfile
+import time
+from src.gateway.history import HOUR_US, HistoryFile, HistoryWriter, partition_files, summarize
+
+# --- Consultas ao histórico colunar ---
+# Gera o histórico de uma frota simulada (sensores de temperatura e de ar em
+# alguns grupos, uma leitura a cada 'interval' segundos) com o HistoryWriter
+# do Gateway, em lotes como os da thread do histórico, e mede:
+#   - o tempo de gravação (incluindo a compactação de cada hora fechada) e o
+#     tamanho em disco por amostra;
+#   - consultas pelo leitor mapeado em memória: a média de uma métrica por
+#     grupo no período inteiro, uma hora de um único dispositivo e o período
+#     inteiro de um tipo agrupado por hora;
+#   - as mesmas consultas sobre um CSV com as mesmas linhas (uma linha por
+#     amostra), que precisa ser lido e filtrado por inteiro a cada consulta.
+#
+#   python -m benchmarks.history_query --devices 2000 --hours 24 --interval 30
+
+GROUPS = ("centro", "norte", "sul", "leste", "oeste")
+
+
+def generate(directory, devices, hours, interval, start):
+    """Grava o histórico simulado e retorna (amostras, segundos gastos na gravação)."""
+    writer = HistoryWriter(directory, flush_seconds=None)
+    sensors = []
+    for index in range(devices):
+        if index % 2:
+            sensors.append((f"air_{index:05d}", "AIR_SENSOR", "ppm", 400.0))
+        else:
+            sensors.append((f"temp_{index:05d}", "TEMP_SENSOR", "temperature", 22.0))
+    random.seed(1)
+    batch_seconds = 10  # Um lote a cada 10 s simulados, como a thread do histórico do Gateway.
+    next_flush = start + batch_seconds
+    started = time.perf_counter()
+    for tick in range(hours * 3600 // interval):
+        for index, (device_id, type_name, metric, base) in enumerate(sensors):
+            # As leituras dos sensores ficam espalhadas dentro de cada intervalo.
+            now = start + tick * interval + index * interval / devices
+            if now >= next_flush:
+                writer.flush()
+                next_flush += batch_seconds
+            writer.add(now, device_id, type_name, GROUPS[index % len(GROUPS)], ((metric, base + random.uniform(-5, 5)),))
+    writer.close()
+    return writer.rows, time.perf_counter() - started
+
+
+def export_csv(directory, path):
+    with open(path, "w", newline="") as csv_file:
+        output = csv.writer(csv_file)
+        for partition in partition_files(directory):
+            with HistoryFile(partition) as history_file:
+                for series_id, timestamps, values in history_file.slices(set(history_file.series)):
+                    device_id, metric, type_name, group = history_file.series[series_id]
+                    for timestamp, value in zip(timestamps, values):
+                        output.writerow((timestamp, device_id, metric, type_name, group, value))
+                    timestamps.release()
+                    values.release()
+
+
+def summarize_csv(path, start_us=None, end_us=None, metric=None, device_id=None, device_type=None, by=None):
+    key_index = {"device": 1, "type": 3, "group": 4}.get(by)
+    results = {}
+    with open(path, newline="") as csv_file:
+        for row in csv.reader(csv_file):
+            timestamp = int(row[0])
+            if (start_us is not None and timestamp < start_us) or (end_us is not None and timestamp >= end_us):
+                continue
+            if (metric and row[2] != metric) or (device_id and row[1] != device_id) or (device_type and row[3] != device_type):
+                continue
+            key = timestamp // HOUR_US if by == "hour" else row[key_index] if key_index else "total"
+            value = float(row[5])
+            summary = results.setdefault(key, [0, 0.0, float("inf"), float("-inf")])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = min(summary[2], value)
+            summary[3] = max(summary[3], value)
+    return results
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def timed(function, repeats):
+    """Executa a consulta 'repeats' vezes; retorna (resultado, mediana em ms)."""
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return result, sorted(durations)[len(durations) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede a gravação e as consultas do histórico colunar.")
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--interval", type=int, default=30, help="Segundos entre as leituras de cada sensor.")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetições de cada consulta (mediana).")
+    parser.add_argument("--no-csv", action="store_true", help="Não mede as consultas sobre o CSV.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="historico_")
+    history_dir = os.path.join(workdir, "historico")
+    start = (int(time.time()) // 86400 - 1) * 86400  # Meia-noite (UTC) de ontem.
+    try:
+        rows, write_seconds = generate(history_dir, args.devices, args.hours, args.interval, start)
+        size = directory_size(history_dir)
+        print(f"{rows} amostras gravadas em {write_seconds:.1f} s ({rows / write_seconds:.0f} amostras/s), "
+              f"{size / 1e6:.1f} MB ({size / rows:.1f} bytes/amostra).")
+
+        start_us = start * 1000000
+        hour_start, hour_end = start_us + 10 * HOUR_US, start_us + 11 * HOUR_US
+        queries = (
+            ("média de temperatura por grupo, período inteiro",
+             lambda: summarize(history_dir, metric="temperature", by="group"),
+             lambda path: summarize_csv(path, metric="temperature", by="group")),
+            ("uma hora de um dispositivo",
+             lambda: summarize(history_dir, hour_start, hour_end, device_id="temp_00000"),
+             lambda path: summarize_csv(path, hour_start, hour_end, device_id="temp_00000")),
+            ("sensores de ar por hora, período inteiro",
+             lambda: summarize(history_dir, device_type="AIR_SENSOR", by="hour"),
+             lambda path: summarize_csv(path, device_type="AIR_SENSOR", by="hour")),
+        )
+        csv_path = os.path.join(workdir, "historico.csv")
+        if not args.no_csv:
+            export_csv(history_dir, csv_path)
+            print(f"CSV equivalente: {os.path.getsize(csv_path) / 1e6:.1f} MB.")
+
+        print(f"\n{'consulta':<50} | {'amostras':>9} | {'colunar (ms)':>12} | {'CSV (ms)':>10}")
+        for name, columnar, baseline in queries:
+            result, columnar_ms = timed(columnar, args.repeats)
+            samples = sum(summary[0] for summary in result.values())
+            csv_ms = "-"
+            if not args.no_csv:
+                _, elapsed = timed(lambda: baseline(csv_path), 1)
+                csv_ms = f"{elapsed:.0f}"
+            print(f"{name:<50} | {samples:9d} | {columnar_ms:12.1f} | {csv_ms:>10}")
+    finally:
+        shutil.rmtree(workdir)
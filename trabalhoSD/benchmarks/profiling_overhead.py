@@ -0,0 +1,99 @@
+# benchmarks/profiling_overhead.py
+import argparse
+import contextlib
+import os
+import time
+from generated import smart_city_pb2
+from src.gateway import gateway
+from src.gateway.profiling import DEFAULT_SAMPLE_HZ
+from src.gateway.registry import DeviceRecord
+
+# --- Custo dos ganchos de perfilamento ---
+# Mede, no próprio processo:
+#   - o custo de um gancho de etapa (clock() + record()) com o perfilamento
+#     desligado e ligado, descontado o custo de um laço vazio;
+#   - a vazão de process_status() do Gateway (o caminho de cada leitura UDP
+#     aceita) sobre uma frota de sensores registrados, com o perfilamento
+#     desligado e ligado (com o amostrador de pilhas rodando em '--hz').
+# Os prints do Gateway vão para /dev/null durante as medições.
+#
+#   python -m benchmarks.profiling_overhead --devices 1000 --statuses 200000
+
+HOOK_CALLS = 1_000_000
+
+
+def hook_cost(profiler, calls):
+    """Retorna os nanossegundos de um par clock()/record(), descontado o laço vazio."""
+    started = time.perf_counter()
+    for _ in range(calls):
+        pass
+    empty = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(calls):
+        stage_started = profiler.clock()
+        profiler.record("medicao", stage_started)
+    return (time.perf_counter() - started - empty) / calls * 1e9
+
+
+def register_sensors(count):
+    device_ids = []
+    for index in range(count):
+        info = smart_city_pb2.DeviceInfo()
+        info.id = f"temp_{index:05d}"
+        info.type = smart_city_pb2.TEMP_SENSOR
+        info.group = ("centro", "norte", "sul")[index % 3]
+        gateway.devices[info.id] = DeviceRecord(info, None, "127.0.0.1")
+        device_ids.append(info.id)
+    return device_ids
+
+
+def ingest_rate(statuses):
+    """Processa as leituras como a thread de ingestão e retorna as leituras por segundo."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        for status in statuses:
+            gateway.process_status(status)
+        return len(statuses) / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o custo dos ganchos de perfilamento do Gateway.")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--statuses", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5, help="Rodadas de cada modo (vale a mediana).")
+    parser.add_argument("--hz", type=int, default=DEFAULT_SAMPLE_HZ, help="Amostras de pilha por segundo com o perfilamento ligado.")
+    args = parser.parse_args()
+
+    profiler = gateway.profiler
+    off_ns = hook_cost(profiler, HOOK_CALLS)
+    profiler.start(args.hz)
+    on_ns = hook_cost(profiler, HOOK_CALLS)
+    profiler.stop()
+    print(f"Gancho de etapa: {off_ns:.0f} ns desligado, {on_ns:.0f} ns ligado.")
+
+    device_ids = register_sensors(args.devices)
+    statuses = []
+    for index in range(args.statuses):
+        status = smart_city_pb2.StatusUpdate()
+        status.device_id = device_ids[index % len(device_ids)]
+        status.temperature = 20.0 + index % 100 / 10
+        statuses.append(status)
+
+    ingest_rate(statuses[:10000])  # Aquecimento.
+    # As rodadas se alternam e cada modo fica com a mediana, já que a vazão varia entre rodadas.
+    rates = {"desligado": [], "ligado": []}
+    for _ in range(args.rounds):
+        for mode in rates:
+            if mode == "ligado":
+                profiler.start(args.hz)
+            rates[mode].append(ingest_rate(statuses))
+            profiler.stop()
+    _, seconds, samples, stages, folded = profiler.report()
+    print(f"Última rodada ligada: {samples} amostra(s) de pilha em {seconds:.1f} s, "
+          f"{len(folded.splitlines())} pilha(s) distinta(s).")
+
+    baseline = sorted(rates["desligado"])[args.rounds // 2]
+    print(f"\n{'perfilamento':<12} | {'leituras/s':>10} | {'custo por leitura (µs)':>22} | {'diferença':>9}")
+    for mode, values in rates.items():
+        rate = sorted(values)[args.rounds // 2]
+        print(f"{mode:<12} | {rate:10.0f} | {1e6 / rate:22.2f} | {(baseline / rate - 1) * 100:+8.1f}%")
@@ -0,0 +1,113 @@
+# benchmarks/registry_memory.py
+import argparse
+import gc
+import subprocess
+import sys
+import threading
+import tracemalloc
+from generated import smart_city_pb2
+from src.devices import camera, lamp_post, traffic_light
+from src.gateway.registry import DeviceRecord
+
+# --- Benchmark de memória do registro de dispositivos ---
+# Registra N dispositivos simulados (postes, câmeras, semáforos e sensores)
+# com uma leitura UDP cada e mede quantos bytes cada um ocupa no Gateway:
+#   - dict: layout anterior, com a DeviceInfo e a última StatusUpdate
+#     completas, mais o socket e o lock em dicionários separados;
+#   - record: DeviceRecord com __slots__ e esquemas compartilhados; a leitura
+#     é decodificada, como no Gateway, mas não fica no registro.
+# Cada layout roda em um processo novo. O protobuf (upb) aloca memória fora
+# do alocador do Python, então além do tracemalloc é medido o RSS.
+#
+#   python -m benchmarks.registry_memory --devices 100000
+
+SCHEMAS = [
+    (smart_city_pb2.LAMP_POST, lamp_post.CONFIG_SCHEMA),
+    (smart_city_pb2.CAMERA, camera.CONFIG_SCHEMA),
+    (smart_city_pb2.TRAFFIC_LIGHT, traffic_light.CONFIG_SCHEMA),
+    (smart_city_pb2.TEMP_SENSOR, smart_city_pb2.ConfigSchema()),
+]
+
+
+def registration_payloads(count):
+    """Gera as mensagens de registro e de status como chegariam pela rede (serializadas)."""
+    for index in range(count):
+        device_type, schema = SCHEMAS[index % len(SCHEMAS)]
+        register_msg = smart_city_pb2.WrapperMessage()
+        info = register_msg.device_info
+        info.id = f"dev_{index:06x}"
+        info.type = device_type
+        info.group = f"zona_{index % 50}"
+        info.config_schema.CopyFrom(schema)
+        status_msg = smart_city_pb2.WrapperMessage()
+        status = status_msg.status_update
+        status.device_id = info.id
+        status.temperature = 20.0 + index % 10
+        status.metrics["temperature"] = status.temperature
+        yield register_msg.SerializeToString(), status_msg.SerializeToString()
+
+
+def parse(data):
+    wrapper_msg = smart_city_pb2.WrapperMessage()
+    wrapper_msg.ParseFromString(data)
+    return wrapper_msg
+
+
+def build_dict_registry(payloads):
+    devices, sockets, send_locks = {}, {}, {}
+    for register_data, status_data in payloads:
+        info = parse(register_data).device_info
+        devices[info.id] = {'info': info, 'status': parse(status_data).status_update}
+        sockets[info.id] = None
+        send_locks[info.id] = threading.Lock()
+    return devices, sockets, send_locks
+
+
+def build_record_registry(payloads):
+    devices = {}
+    for index, (register_data, status_data) in enumerate(payloads):
+        record = DeviceRecord(parse(register_data).device_info, None, f"10.0.{index >> 8 & 255}.{index & 255}")
+        parse(status_data)
+        devices[record.device_id] = record
+    return devices
+
+
+def resident_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4096
+
+
+def measure(layout, count):
+    """Mede, no processo atual, a memória ocupada por 'count' dispositivos no layout pedido."""
+    payloads = list(registration_payloads(count))
+    build = build_dict_registry if layout == "dict" else build_record_registry
+    gc.collect()
+    tracemalloc.start()
+    rss_before = resident_bytes()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    registry = build(payloads)
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] - traced_before
+    rss = resident_bytes() - rss_before
+    print(f"{layout} {rss / count:.1f} {traced / count:.1f} {len(gc.get_objects())}")
+    return registry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memória ocupada por dispositivo no registro do Gateway.")
+    parser.add_argument("--devices", type=int, default=100000, help="Número de dispositivos simulados.")
+    parser.add_argument("--layout", choices=("dict", "record"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.layout:
+        measure(args.layout, args.devices)
+        sys.exit()
+
+    print(f"{args.devices} dispositivos")
+    print(f"{'layout':>8} | {'RSS/disp.':>11} | {'tracemalloc/disp.':>17} | {'objetos no GC':>13}")
+    for layout in ("dict", "record"):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.registry_memory", "--devices",
+                                 str(args.devices), "--layout", layout],
+                                capture_output=True, text=True, check=True).stdout.split()
+        rss, traced, objects = float(output[1]), float(output[2]), int(output[3])
+        print(f"{layout:>8} | {rss:9.0f} B | {traced:15.0f} B | {objects:13d}")
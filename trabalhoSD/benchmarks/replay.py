@@ -0,0 +1,247 @@
+# benchmarks/replay.py
+import argparse
+import collections
+import socket
+import threading
+import time
+from generated import smart_city_pb2
+from src.common.framing import HEADER, recv_message
+from src.common.security import ROLE_CLIENT, ROLE_DEVICE, connect_secure, seal_datagram
+from src.gateway.admission import TokenBucket
+from src.gateway.capture import (CHANNEL_CLIENT, CHANNEL_DEVICE, CHANNEL_NAMES, CHANNEL_UDP, INBOUND, OUTBOUND,
+                                 read_capture)
+# As portas (com as variáveis GATEWAY_*_PORT) e os limites de taxa são os mesmos do Gateway.
+from src.gateway.gateway import (CLIENT_MAX_DELAY_SECONDS, CLIENT_REQUEST_BURST, CLIENT_REQUEST_RATE,
+                                 CLIENT_SOURCE_BURST, CLIENT_SOURCE_RATE, CLIENT_TCP_PORT, DEVICE_TCP_PORT, UDP_PORT)
+
+# --- Reprodução de uma captura do Gateway ---
+# Lê um arquivo gravado com GATEWAY_CAPTURE e reenvia as mensagens de entrada
+# a um Gateway local, na velocidade original (--speed 1) ou o mais rápido
+# possível (--speed 0). Cada conexão gravada vira uma conexão nova:
+# dispositivos se registram com a DeviceInfo gravada e passam a receber os
+# comandos encaminhados; clientes reenviam seus pedidos e a latência de cada
+# resposta é medida. No fim, compara a latência com a da gravação.
+#
+# Cada resposta é pareada com o pedido mais antigo do mesmo tipo (um
+# CommandResult com um Command, ...); pedidos de tipos sem resposta garantida
+# não são medidos. Os pedidos que o Gateway atrasa pelo limite de taxa (a
+# reprodução acompanha os mesmos baldes de fichas) e os perdidos quando ele
+# encerra a conexão são contados à parte, fora da latência reproduzida.
+#
+#   python -m benchmarks.replay captura.bin --host 192.168.0.10 --speed 0
+
+# Tempo máximo de espera pelas respostas pendentes no fim da reprodução: mais que o maior atraso
+# imposto pelo limite de taxa, para que um pedido atrasado não seja contado como sem resposta.
+DRAIN_TIMEOUT = CLIENT_MAX_DELAY_SECONDS + 2.0
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+# Tipo de cada pedido de cliente -> tipo da resposta que o Gateway sempre envia a ele.
+RESPONSE_KINDS = {
+    "command": "command_result",
+    "list_request": "list_response",
+    "aggregate_query": "aggregate_response",
+    "green_wave_request": "green_wave_result",
+    "lamp_schedule": "lamp_schedule_result",
+    "twin_update": "twin_update_result",
+    "profiling_request": "profiling_report",
+}
+
+
+def message_kind(payload):
+    """Tipo (campo do oneof) de uma WrapperMessage serializada; None se ela não puder ser decodificada."""
+    try:
+        return smart_city_pb2.WrapperMessage.FromString(payload).WhichOneof("msg")
+    except Exception:
+        return None
+
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+    return (f"{len(values)} respostas | p50 {percentile(values, 0.5) * 1000:7.2f} ms | "
+            f"p90 {percentile(values, 0.9) * 1000:7.2f} ms | p99 {percentile(values, 0.99) * 1000:7.2f} ms | "
+            f"máx {(values[-1] if values else float('nan')) * 1000:7.2f} ms")
+
+
+def recorded_latencies(records):
+    """Latência gravada de cada pedido de cliente: do pedido até a resposta do mesmo tipo na mesma conexão."""
+    waiting = collections.defaultdict(collections.deque)  # (conexão, tipo da resposta) -> instantes dos pedidos.
+    latencies = []
+    for timestamp_us, channel, direction, connection_id, payload in records:
+        if channel != CHANNEL_CLIENT:
+            continue
+        kind = message_kind(payload)
+        if direction == INBOUND:
+            if kind in RESPONSE_KINDS:
+                waiting[connection_id, RESPONSE_KINDS[kind]].append(timestamp_us)
+        elif waiting[connection_id, kind]:
+            latencies.append((timestamp_us - waiting[connection_id, kind].popleft()) / 1e6)
+    return latencies
+
+
+class ClientSession:
+    """
+    Uma conexão de cliente reproduzida.
+
+    'source_bucket' é o balde de fichas do IP de origem, compartilhado pelas
+    sessões, como o Gateway faz.
+    """
+
+    def __init__(self, host, source_bucket):
+        self.sock = connect_secure((host, CLIENT_TCP_PORT), ROLE_CLIENT)
+        self.bucket = TokenBucket(CLIENT_REQUEST_RATE, CLIENT_REQUEST_BURST, time.monotonic())
+        self.source_bucket = source_bucket
+        self.lock = threading.Lock()
+        self.waiting = collections.defaultdict(collections.deque)  # Tipo da resposta -> [(envio, atrasado)].
+        self.latencies = []          # Pedidos atendidos dentro do limite de taxa.
+        self.limited_latencies = []  # Pedidos que o Gateway atrasou pelo limite de taxa.
+        self.closed = False          # O Gateway encerrou a conexão (por exemplo, limite excedido).
+        self.lost = 0                # Pedidos perdidos com a conexão encerrada.
+        self.thread = threading.Thread(target=self.read_responses, daemon=True)
+        self.thread.start()
+
+    def send(self, payload):
+        now = time.monotonic()
+        limited = max(self.bucket.reserve(now), self.source_bucket.reserve(now)) > 0
+        response_kind = RESPONSE_KINDS.get(message_kind(payload))
+        with self.lock:
+            if self.closed:
+                self.lost += 1
+                return
+            if response_kind is not None:
+                self.waiting[response_kind].append((time.perf_counter(), limited))
+        try:
+            self.sock.sendall(HEADER.pack(len(payload)) + payload)
+        except OSError:
+            self.connection_lost()
+
+    def pending(self):
+        with self.lock:
+            return sum(len(waiting) for waiting in self.waiting.values())
+
+    def read_responses(self):
+        try:
+            while True:
+                wrapper_msg = recv_message(self.sock)
+                if wrapper_msg is None:
+                    break
+                received = time.perf_counter()
+                with self.lock:
+                    waiting = self.waiting.get(wrapper_msg.WhichOneof("msg"))
+                    if not waiting:
+                        continue
+                    sent_at, limited = waiting.popleft()
+                (self.limited_latencies if limited else self.latencies).append(received - sent_at)
+        except OSError:
+            pass
+        self.connection_lost()
+
+    def connection_lost(self):
+        """Os pedidos ainda sem resposta (e os enviados depois) contam como perdidos, não como latência."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.lost += sum(len(waiting) for waiting in self.waiting.values())
+            self.waiting.clear()
+
+
+class DeviceSession:
+    """Uma conexão de dispositivo reproduzida: conta os comandos que o Gateway encaminhar."""
+
+    def __init__(self, host):
+        self.sock = connect_secure((host, DEVICE_TCP_PORT), ROLE_DEVICE)
+        self.commands = 0
+        threading.Thread(target=self.read_commands, daemon=True).start()
+
+    def send(self, payload):
+        self.sock.sendall(HEADER.pack(len(payload)) + payload)
+
+    def read_commands(self):
+        try:
+            while recv_message(self.sock) is not None:
+                self.commands += 1
+        except OSError:
+            pass
+
+
+def replay(records, host, speed):
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    clients = {}
+    devices = {}
+    source_bucket = TokenBucket(CLIENT_SOURCE_RATE, CLIENT_SOURCE_BURST, time.monotonic())
+    sent = collections.Counter()
+    first_timestamp_us = records[0][0]
+    started = time.perf_counter()
+    for timestamp_us, channel, direction, connection_id, payload in records:
+        if direction != INBOUND:
+            continue
+        if speed > 0:
+            # Mantém o espaçamento original entre as mensagens, dividido pela velocidade.
+            delay = (timestamp_us - first_timestamp_us) / 1e6 / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        if channel == CHANNEL_UDP:
+            # Os datagramas são gravados sem assinatura; com certificados, são assinados de novo agora.
+            udp_socket.sendto(seal_datagram(payload), (host, UDP_PORT))
+        elif channel == CHANNEL_DEVICE:
+            if connection_id not in devices:
+                devices[connection_id] = DeviceSession(host)
+            devices[connection_id].send(payload)
+        elif channel == CHANNEL_CLIENT:
+            if connection_id not in clients:
+                clients[connection_id] = ClientSession(host, source_bucket)
+            clients[connection_id].send(payload)
+        sent[channel] += 1
+    send_elapsed = time.perf_counter() - started
+
+    # Aguarda as respostas que ainda estão a caminho.
+    deadline = time.perf_counter() + DRAIN_TIMEOUT
+    while time.perf_counter() < deadline and any(session.pending() for session in clients.values()):
+        time.sleep(0.01)
+    unanswered = sum(session.pending() for session in clients.values())
+    lost = sum(session.lost for session in clients.values())
+    latencies = [latency for session in clients.values() for latency in session.latencies]
+    limited = [latency for session in clients.values() for latency in session.limited_latencies]
+    for session in list(clients.values()) + list(devices.values()):
+        session.sock.close()
+
+    commands = sum(session.commands for session in devices.values())
+    return sent, send_elapsed, latencies, limited, lost, unanswered, commands
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduz uma captura de tráfego contra um Gateway local.")
+    parser.add_argument("capture", help="Arquivo gravado com GATEWAY_CAPTURE.")
+    parser.add_argument("--host", required=True, help="Endereço IP em que o Gateway local está ouvindo.")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Multiplicador da velocidade original; 0 envia o mais rápido possível.")
+    args = parser.parse_args()
+
+    records = list(read_capture(args.capture))
+    if not any(record[2] == INBOUND for record in records):
+        raise SystemExit("A captura não contém mensagens recebidas pelo Gateway.")
+    duration = (records[-1][0] - records[0][0]) / 1e6
+    print(f"Captura: {len(records)} mensagem(ns) em {duration:.2f} s.")
+
+    sent, elapsed, latencies, limited, lost, unanswered, commands = replay(records, args.host, args.speed)
+    total = sum(sent.values())
+    print(f"Reprodução ({'máxima' if args.speed <= 0 else f'{args.speed:g}x'}): "
+          f"{total} mensagem(ns) em {elapsed:.2f} s ({total / elapsed if elapsed else float('inf'):.1f} msg/s)")
+    for channel, count in sorted(sent.items()):
+        print(f"  {CHANNEL_NAMES[channel]:>12}: {count}")
+    print(f"Comandos entregues aos dispositivos: {commands} (gravados: "
+          f"{sum(1 for r in records if r[1] == CHANNEL_DEVICE and r[2] == OUTBOUND)})")
+    print(f"Latência gravada:     {latency_summary(recorded_latencies(records))}")
+    print(f"Latência reproduzida: {latency_summary(latencies)}")
+    if limited:
+        print(f"Atrasados pelo limite de taxa: {latency_summary(limited)}")
+    if lost:
+        print(f"Pedidos perdidos com a conexão encerrada pelo Gateway: {lost}")
+    if unanswered:
+        print(f"Pedidos sem resposta após {DRAIN_TIMEOUT:.0f} s: {unanswered}")
@@ -0,0 +1,117 @@
+# benchmarks/security_overhead.py
+import argparse
+import socket
+import tempfile
+import threading
+import time
+from generated import smart_city_pb2
+from src.common import security
+from src.common.framing import recv_message, send_message
+
+# --- Benchmark do custo da segurança ---
+# Mede, em loopback e com certificados de teste gerados na hora:
+#   - conexões por segundo sem TLS, com handshake TLS completo e com sessão
+#     retomada (o caso de milhares de dispositivos reconectando de uma vez);
+#   - o custo por datagrama UDP de assinar e verificar o HMAC.
+#
+#   python -m benchmarks.security_overhead --connections 10000 --datagrams 200000
+
+
+def start_server():
+    """Servidor no loopback que autentica cada conexão, responde a uma mensagem e a fecha."""
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.bind(("127.0.0.1", 0))
+    server_socket.listen(128)
+
+    def handle(conn):
+        try:
+            conn = security.accept_secure(conn, security.ROLE_DEVICE)
+            wrapper_msg = recv_message(conn)
+            if wrapper_msg is not None:
+                send_message(conn, wrapper_msg)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def accept_loop():
+        while True:
+            conn, addr = server_socket.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return server_socket.getsockname()
+
+
+def connection_rate(address, count, resume):
+    """Abre 'count' conexões sequenciais, cada uma com um registro e sua resposta."""
+    register_msg = smart_city_pb2.WrapperMessage()
+    register_msg.device_info.id = "dev_bench"
+    register_msg.device_info.type = smart_city_pb2.LAMP_POST
+    reused = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        if not resume:
+            security._sessions.clear()
+        sock = security.connect_secure(address, security.ROLE_DEVICE)
+        send_message(sock, register_msg)
+        recv_message(sock)
+        reused += bool(getattr(sock, "session_reused", False))
+        sock.close()
+    elapsed = time.perf_counter() - started
+    return count / elapsed, elapsed / count * 1000, reused
+
+
+def datagram_cost(count):
+    """Custo médio, em microssegundos, de assinar e verificar um datagrama de status típico."""
+    wrapper_msg = smart_city_pb2.WrapperMessage()
+    status = wrapper_msg.status_update
+    status.device_id = "temp_a1b2c3"
+    status.temperature = 23.5
+    status.metrics["temperature"] = 23.5
+    payload = wrapper_msg.SerializeToString()
+
+    started = time.perf_counter()
+    for _ in range(count):
+        wrapper_msg.SerializeToString()
+    serialize_us = (time.perf_counter() - started) / count * 1e6
+
+    started = time.perf_counter()
+    for _ in range(count):
+        security.open_datagram(security.seal_datagram(payload))
+    mac_us = (time.perf_counter() - started) / count * 1e6
+    return len(payload), serialize_us, mac_us
+
+
+def enable(enabled, cert_dir):
+    """Liga ou desliga a segurança no processo, apontando para os certificados de teste."""
+    security.CERT_DIR = cert_dir
+    security._enabled = enabled
+    security._sessions.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Custo do TLS e das assinaturas UDP.")
+    parser.add_argument("--connections", type=int, default=1000, help="Conexões por cenário.")
+    parser.add_argument("--datagrams", type=int, default=100000, help="Datagramas assinados e verificados.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        security.generate_certificates(cert_dir)
+        enable(True, cert_dir)
+        address = start_server()
+
+        print(f"{args.connections} conexões (registro + resposta), em sequência:")
+        for label, enabled, resume in (("sem TLS", False, False),
+                                       ("TLS completo", True, False),
+                                       ("TLS retomado", True, True)):
+            enable(enabled, cert_dir)
+            rate, latency_ms, reused = connection_rate(address, args.connections, resume)
+            print(f"  {label:>13}: {rate:8.0f} conexões/s | {latency_ms:6.2f} ms por conexão | "
+                  f"{reused} sessões retomadas")
+
+        enable(True, cert_dir)
+        size, serialize_us, mac_us = datagram_cost(args.datagrams)
+        print(f"Datagrama de status ({size} bytes): serialização {serialize_us:.2f} µs, "
+              f"assinatura + verificação {mac_us:.2f} µs "
+              f"(+{security.UDP_TRAILER.size + security.UDP_TAG_SIZE} bytes)")
@@ -0,0 +1,98 @@
+# benchmarks/startup_time.py
+import argparse
+import subprocess
+import sys
+import time
+from benchmarks import gateway_process
+from benchmarks.gateway_process import HOST
+from generated import smart_city_pb2
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_CLIENT, connect_secure
+
+# --- Tempo de inicialização ---
+# Mede, em processos novos no loopback:
+#   - o reinício do Gateway: do lançamento do processo até a porta de clientes
+#     aceitar conexões, com a inicialização atual (protobuf e TLS carregados em
+#     segundo plano, IP informado por --bind) e com a antiga, que importava
+#     tudo antes de abrir as portas (simulada importando os módulos antes);
+#   - a subida de uma frota: de lançar N sensores de temperatura (com
+#     GATEWAY_IP, sem esperar anúncios multicast) até o Gateway listar todos.
+#
+#   python -m benchmarks.startup_time --restarts 10 --fleet 200
+
+BASE_PORT = 21000  # +0 dispositivos, +1 UDP, +3 clientes, +4 streaming.
+READY_TIMEOUT = 30.0
+# Importa o que o Gateway carregava antes de abrir as portas e então o executa.
+EAGER = ("import ssl, hmac, hashlib, generated.smart_city_pb2, runpy; "
+         "runpy.run_module('src.gateway.gateway', run_name='__main__')")
+
+
+def start_gateway(eager=False):
+    """Lança o Gateway e retorna (processo, milissegundos até a porta de clientes aceitar)."""
+    if eager:
+        command = [sys.executable, "-c", EAGER]
+    else:
+        command = [sys.executable, "-m", "src.gateway.gateway", "--bind", HOST, "--interface", HOST]
+    started = time.perf_counter()
+    process = gateway_process.start_gateway(BASE_PORT, command, READY_TIMEOUT)
+    return process, (time.perf_counter() - started) * 1000
+
+
+def registered_devices():
+    conn = connect_secure((HOST, BASE_PORT + 3), ROLE_CLIENT)
+    request = smart_city_pb2.WrapperMessage()
+    request.list_request.SetInParent()
+    send_message(conn, request)
+    count = len(recv_message(conn).list_response.devices)
+    conn.close()
+    return count
+
+
+def measure_restarts(restarts):
+    print(f"{'inicialização':>13} | {'mínimo ms':>9} | {'mediana ms':>10} | {'máximo ms':>9}")
+    for eager in (True, False):
+        times = []
+        for _ in range(restarts):
+            process, elapsed = start_gateway(eager)
+            gateway_process.stop_gateways([process])
+            times.append(elapsed)
+        times.sort()
+        label = "antiga" if eager else "atual"
+        print(f"{label:>13} | {times[0]:9.1f} | {times[len(times) // 2]:10.1f} | {times[-1]:9.1f}")
+
+
+def measure_fleet(size):
+    gateway, _ = start_gateway()
+    sensors = []
+    try:
+        env = gateway_process.gateway_environment(BASE_PORT)
+        started = time.perf_counter()
+        for _ in range(size):
+            sensors.append(subprocess.Popen([sys.executable, "-m", "src.devices.temp_sensor"], env=env,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        spawned = (time.perf_counter() - started) * 1000
+        deadline = started + READY_TIMEOUT * 4
+        count = 0
+        while count < size and time.perf_counter() < deadline:
+            time.sleep(0.05)
+            count = registered_devices()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"frota de {size} sensor(es): lançados em {spawned:.0f} ms, {count} registrado(s) em {elapsed:.0f} ms "
+              f"({elapsed / max(count, 1):.1f} ms por sensor)")
+    finally:
+        for sensor in sensors:
+            sensor.kill()
+        for sensor in sensors:
+            sensor.wait()
+        gateway_process.stop_gateways([gateway])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo de inicialização do Gateway e de uma frota de dispositivos.")
+    parser.add_argument("--restarts", type=int, default=10, help="Reinícios do Gateway medidos por variante.")
+    parser.add_argument("--fleet", type=int, default=100, help="Sensores lançados de uma vez (0 para pular).")
+    args = parser.parse_args()
+
+    measure_restarts(args.restarts)
+    if args.fleet:
+        measure_fleet(args.fleet)
@@ -0,0 +1,90 @@
+# benchmarks/stream_throughput.py
+import argparse
+import socket
+import threading
+import time
+from generated import smart_city_pb2
+from src.common.framing import send_message
+from src.common.security import ROLE_CLIENT, ROLE_DEVICE, connect_secure
+from src.common.streaming import FRAME_SIZES, FrameReceiver, send_frame
+from src.gateway.stream_relay import StreamRelay
+
+# --- Benchmark do canal de streaming das câmeras ---
+# Sobe um StreamRelay em loopback, conecta uma câmera simulada e N assinantes
+# e mede a vazão ponta a ponta (câmera -> Gateway -> assinantes) em cada
+# resolução modelada pela câmera.
+#
+#   python -m benchmarks.stream_throughput --frames 60 --subscribers 2
+
+
+def start_relay():
+    """Inicia um StreamRelay em uma porta livre do loopback e retorna a porta."""
+    relay = StreamRelay(lambda device_id: True)
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.bind(("127.0.0.1", 0))
+    server_socket.listen(16)
+
+    def accept_loop():
+        while True:
+            conn, addr = server_socket.accept()
+            threading.Thread(target=relay.handle_connection, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return server_socket.getsockname()[1]
+
+
+def open_stream(port, device_id, role):
+    # Com os certificados instalados, a câmera usa o certificado de dispositivo e os assinantes, o de cliente.
+    sock = connect_secure(("127.0.0.1", port), ROLE_DEVICE if role == smart_city_pb2.PUBLISHER else ROLE_CLIENT)
+    hello_msg = smart_city_pb2.WrapperMessage()
+    hello_msg.stream_hello.device_id = device_id
+    hello_msg.stream_hello.role = role
+    send_message(sock, hello_msg)
+    return sock
+
+
+def run(port, resolution, frames, subscriber_count):
+    device_id = f"cam_bench_{resolution}"
+    subscribers = [open_stream(port, device_id, smart_city_pb2.SUBSCRIBER) for _ in range(subscriber_count)]
+    time.sleep(0.1)  # Garante que os assinantes estejam registrados antes do primeiro quadro.
+    received = [0] * subscriber_count
+
+    def consume(index, sock):
+        receiver = FrameReceiver(sock)
+        while received[index] < frames:
+            if receiver.read_frame() is None:
+                break
+            received[index] += 1
+
+    consumers = [threading.Thread(target=consume, args=(i, sock)) for i, sock in enumerate(subscribers)]
+    for consumer in consumers:
+        consumer.start()
+
+    frame = bytearray(FRAME_SIZES[resolution])
+    publisher = open_stream(port, device_id, smart_city_pb2.PUBLISHER)
+    started = time.perf_counter()
+    for frame_id in range(frames):
+        send_frame(publisher, frame_id, frame, time.time_ns() // 1000)
+    for consumer in consumers:
+        consumer.join()
+    elapsed = time.perf_counter() - started
+    publisher.close()
+    for sock in subscribers:
+        sock.close()
+
+    delivered = sum(received)
+    megabytes = delivered * len(frame) / 1e6
+    print(f"{resolution:>7} | {len(frame) / 1e6:6.2f} MB/quadro | {frames / elapsed:8.1f} qps | "
+          f"{megabytes / elapsed:8.1f} MB/s entregues a {subscriber_count} assinante(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vazão do canal de streaming das câmeras.")
+    parser.add_argument("--frames", type=int, default=60, help="Quadros enviados por resolução.")
+    parser.add_argument("--subscribers", type=int, default=1, help="Número de assinantes simultâneos.")
+    args = parser.parse_args()
+
+    relay_port = start_relay()
+    time.sleep(0.1)
+    for resolution in FRAME_SIZES:
+        run(relay_port, resolution, args.frames, args.subscribers)
@@ -0,0 +1,182 @@
+# benchmarks/twin_reconcile.py
+import argparse
+import selectors
+import socket
+import threading
+import time
+from benchmarks.gateway_process import HOST, start_gateway, stop_gateways
+from generated import smart_city_pb2
+from src.common import config
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_CLIENT, ROLE_DEVICE, connect_secure, seal_datagram
+
+# --- Mudanças em massa: comandos diretos x gêmeos digitais ---
+# Sobe um Gateway no loopback e registra N postes simulados (todos em uma
+# thread), dos quais uma fração já está no estado a ser pedido. Cada poste
+# aplica os comandos recebidos e informa a configuração em vigor via UDP,
+# como os postes reais. Compara duas formas de levar o grupo a um novo
+# brilho:
+#   - comandos diretos: o cliente envia um comando a cada poste (de várias
+#     conexões em paralelo, cada uma de um IP, para não esbarrar nos limites
+#     de taxa por cliente), como faria sem o estado guardado no Gateway;
+#   - gêmeos: o cliente envia uma única TwinUpdate e o reconciliador do
+#     Gateway comanda só os postes fora do estado pedido.
+# Mede os pedidos do cliente, os comandos entregues aos postes e o tempo até
+# todos os postes estarem no estado pedido; por fim, o tempo de uma listagem
+# com o estado de todos os postes, respondida a partir dos gêmeos.
+#
+#   python -m benchmarks.twin_reconcile --devices 1000 --in-sync 0.8
+
+BASE_PORT = 23000  # +0 dispositivos, +1 UDP, +3 clientes, +4 streaming.
+CONVERGE_TIMEOUT = 120.0
+
+
+def build_schema():
+    schema = smart_city_pb2.ConfigSchema()
+    config.add_field(schema, "is_on", smart_city_pb2.CONFIG_BOOL)
+    config.add_field(schema, "brightness", smart_city_pb2.CONFIG_INT, min_value=0, max_value=100)
+    return schema
+
+
+class LampFleet:
+    """Postes simulados: uma thread lê os comandos de todas as conexões e responde com o estado via UDP."""
+
+    def __init__(self, count, in_sync, target):
+        self.states = {}
+        self.conns = {}
+        self.commands = 0
+        self.lock = threading.Lock()
+        self.selector = selectors.DefaultSelector()
+        self.sockets = []
+        schema = build_schema()
+        for index in range(count):
+            device_id = f"lamp_{index:05d}"
+            # Os primeiros 'in_sync' postes já estão no brilho que será pedido.
+            state = {"is_on": True, "brightness": target if index < in_sync else 100}
+            wrapper_msg = smart_city_pb2.WrapperMessage()
+            info = wrapper_msg.device_info
+            info.id = device_id
+            info.type = smart_city_pb2.LAMP_POST
+            info.group = "centro"
+            info.config_schema.CopyFrom(schema)
+            config.fill_update(info.reported_config, state)
+            conn = connect_secure((HOST, BASE_PORT), ROLE_DEVICE)
+            send_message(conn, wrapper_msg)
+            # Um IP de origem a cada 20 postes, como nas ruas (e abaixo do limite por IP do Gateway).
+            if index % 20 == 0:
+                udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                udp_socket.bind((f"127.3.{index // 5000}.{index // 20 % 250 + 1}", 0))
+                self.sockets.append(udp_socket)
+            self.states[device_id] = state
+            self.selector.register(conn, selectors.EVENT_READ, (device_id, self.sockets[-1]))
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            for key, _ in self.selector.select():
+                device_id, udp_socket = key.data
+                wrapper_msg = recv_message(key.fileobj)
+                if wrapper_msg is None:
+                    self.selector.unregister(key.fileobj)
+                    continue
+                if not wrapper_msg.HasField("command"):  # Confirmação do registro.
+                    continue
+                state = self.states[device_id]
+                with self.lock:
+                    state.update(config.to_dict(wrapper_msg.command.config_update))
+                    self.commands += 1
+                report = smart_city_pb2.WrapperMessage()
+                status = report.status_update
+                status.device_id = device_id
+                status.lamp_state.is_on = state["is_on"]
+                status.lamp_state.brightness = state["brightness"]
+                config.fill_update(status.reported_config, state)
+                udp_socket.sendto(seal_datagram(report.SerializeToString()), (HOST, BASE_PORT + 1))
+
+    def wait_for(self, brightness, started):
+        """Espera todos os postes estarem com o brilho pedido; retorna os segundos desde 'started'."""
+        while time.perf_counter() - started < CONVERGE_TIMEOUT:
+            with self.lock:
+                if all(state["brightness"] == brightness for state in self.states.values()):
+                    return time.perf_counter() - started
+            time.sleep(0.01)
+        raise RuntimeError("Os postes não convergiram.")
+
+
+def direct_commands(device_ids, brightness, connections):
+    """Envia um comando a cada poste, de 'connections' clientes em paralelo; retorna os pedidos feitos."""
+    def run(index, chunk):
+        conn = connect_secure((HOST, BASE_PORT + 3), ROLE_CLIENT, source_address=(f"127.4.0.{index + 1}", 0))
+        for device_id in chunk:
+            command_msg = smart_city_pb2.WrapperMessage()
+            command_msg.command.device_id = device_id
+            command_msg.command.config_update.values["brightness"].int_value = brightness
+            send_message(conn, command_msg)
+            recv_message(conn)
+        conn.close()
+    threads = [threading.Thread(target=run, args=(index, device_ids[index::connections]))
+               for index in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(device_ids)
+
+
+def twin_update(conn, brightness):
+    request_msg = smart_city_pb2.WrapperMessage()
+    request_msg.twin_update.device_type = smart_city_pb2.LAMP_POST
+    request_msg.twin_update.group = "centro"
+    request_msg.twin_update.desired.values["brightness"].int_value = brightness
+    send_message(conn, request_msg)
+    return recv_message(conn).twin_update_result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara comandos diretos e gêmeos digitais em uma mudança em massa.")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--in-sync", type=float, default=0.8, help="Fração dos postes já no estado pedido.")
+    parser.add_argument("--connections", type=int, default=20, help="Clientes em paralelo nos comandos diretos.")
+    args = parser.parse_args()
+
+    in_sync = int(args.devices * args.in_sync)
+    rows = []
+    for mode in ("comandos diretos", "gêmeos"):
+        gateway = start_gateway(BASE_PORT)
+        try:
+            fleet = LampFleet(args.devices, in_sync, target=30)
+            time.sleep(1.0)  # Deixa o Gateway terminar os registros.
+            client = connect_secure((HOST, BASE_PORT + 3), ROLE_CLIENT)
+            started = time.perf_counter()
+            if mode == "comandos diretos":
+                requests = direct_commands(sorted(fleet.states), 30, args.connections)
+            else:
+                result = twin_update(client, 30)
+                requests = 1
+                print(f"TwinUpdate: {result.devices} poste(s), {result.out_of_sync} fora do estado pedido.")
+            converged = fleet.wait_for(30, started)
+            rows.append((mode, requests, fleet.commands, converged))
+
+            if mode == "gêmeos":
+                # Pedir de novo o mesmo estado não gera nenhum comando.
+                commands = fleet.commands
+                twin_update(client, 30)
+                time.sleep(1.0)
+                print(f"TwinUpdate repetida: {fleet.commands - commands} comando(s) entregue(s).")
+                list_msg = smart_city_pb2.WrapperMessage()
+                list_msg.list_request.SetInParent()
+                durations = []
+                for _ in range(5):
+                    list_started = time.perf_counter()
+                    send_message(client, list_msg)
+                    response = recv_message(client)
+                    durations.append((time.perf_counter() - list_started) * 1000)
+                reported = sum(1 for device in response.list_response.devices if device.reported_config.values)
+                print(f"Listagem com o estado de {reported} poste(s): {sorted(durations)[2]:.1f} ms (mediana).")
+            client.close()
+        finally:
+            stop_gateways([gateway])
+
+    print(f"\n{'modo':<18} | {'pedidos do cliente':>18} | {'comandos entregues':>18} | {'convergência (s)':>16}")
+    for mode, requests, commands, converged in rows:
+        print(f"{mode:<18} | {requests:18d} | {commands:18d} | {converged:16.2f}")
@@ -0,0 +1,13 @@
+# generated/__init__.py
+from src.common.startup import LazyModule
+
+# O código gerado pelo protobuf é o módulo mais caro de importar. Aqui,
+# "from generated import smart_city_pb2" retorna um substituto que só o
+# importa no primeiro uso (ver src/common/startup.py).
+
+
+def __getattr__(name):
+    if name == "smart_city_pb2":
+        module = globals()[name] = LazyModule(f"{__name__}.{name}")
+        return module
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
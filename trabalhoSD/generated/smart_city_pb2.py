@@ -24,25 +24,91 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10smart_city.proto\"U\n\nDeviceInfo\x12\n\n\x02id\x18\x01 \x01(\t\x12\x19\n\x04type\x18\x02 \x01(\x0e\x32\x0b.DeviceType\x12\x12\n\nip_address\x18\x03 \x01(\t\x12\x0c\n\x04port\x18\x04 \x01(\x05\"i\n\x0cStatusUpdate\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x0f\n\x05is_on\x18\x02 \x01(\x08H\x00\x12\x15\n\x0btemperature\x18\x03 \x01(\x02H\x00\x12\x14\n\nstate_info\x18\x04 \x01(\tH\x00\x42\x08\n\x06status\"N\n\x07\x43ommand\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x10\n\x06toggle\x18\x02 \x01(\x08H\x00\x12\x14\n\nnew_config\x18\x03 \x01(\tH\x00\x42\x08\n\x06\x61\x63tion\"\x14\n\x12ListDevicesRequest\"3\n\x13ListDevicesResponse\x12\x1c\n\x07\x64\x65vices\x18\x01 \x03(\x0b\x32\x0b.DeviceInfo\"\xdc\x01\n\x0eWrapperMessage\x12\"\n\x0b\x64\x65vice_info\x18\x01 \x01(\x0b\x32\x0b.DeviceInfoH\x00\x12&\n\rstatus_update\x18\x02 \x01(\x0b\x32\r.StatusUpdateH\x00\x12\x1b\n\x07\x63ommand\x18\x03 \x01(\x0b\x32\x08.CommandH\x00\x12+\n\x0clist_request\x18\x04 \x01(\x0b\x32\x13.ListDevicesRequestH\x00\x12-\n\rlist_response\x18\x05 \x01(\x0b\x32\x14.ListDevicesResponseH\x00\x42\x05\n\x03msg*h\n\nDeviceType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\r\n\tLAMP_POST\x10\x01\x12\x11\n\rTRAFFIC_LIGHT\x10\x02\x12\x0f\n\x0bTEMP_SENSOR\x10\x03\x12\x0e\n\nAIR_SENSOR\x10\x04\x12\n\n\x06\x43\x41MERA\x10\x05\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10smart_city.proto\"\xd9\x01\n\nDeviceInfo\x12\n\n\x02id\x18\x01 \x01(\t\x12\x19\n\x04type\x18\x02 \x01(\x0e\x32\x0b.DeviceType\x12\x12\n\nip_address\x18\x03 \x01(\t\x12\x0c\n\x04port\x18\x04 \x01(\x05\x12$\n\rconfig_schema\x18\x05 \x01(\x0b\x32\r.ConfigSchema\x12\r\n\x05group\x18\x06 \x01(\t\x12&\n\x0freported_config\x18\x07 \x01(\x0b\x32\r.ConfigUpdate\x12%\n\x0e\x64\x65sired_config\x18\x08 \x01(\x0b\x32\r.ConfigUpdate\"$\n\x0fRegistrationAck\x12\x11\n\tdevice_id\x18\x01 \x01(\t\"l\n\x0bGatewayInfo\x12\x12\n\nip_address\x18\x01 \x01(\t\x12\x17\n\x0f\x64\x65vice_tcp_port\x18\x02 \x01(\x05\x12\x17\n\x0f\x63lient_tcp_port\x18\x03 \x01(\x05\x12\x17\n\x0fstream_tcp_port\x18\x04 \x01(\x05\";\n\x0bStreamHello\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x19\n\x04role\x18\x02 \x01(\x0e\x32\x0b.StreamRole\"p\n\x0b\x43onfigValue\x12\x14\n\nbool_value\x18\x01 \x01(\x08H\x00\x12\x13\n\tint_value\x18\x02 \x01(\x03H\x00\x12\x15\n\x0b\x66loat_value\x18\x03 \x01(\x01H\x00\x12\x16\n\x0cstring_value\x18\x04 \x01(\tH\x00\x42\x07\n\x05value\"\xb3\x01\n\x0b\x43onfigField\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1e\n\x04type\x18\x02 \x01(\x0e\x32\x10.ConfigValueType\x12\x16\n\tmin_value\x18\x03 \x01(\x01H\x00\x88\x01\x01\x12\x16\n\tmax_value\x18\x04 \x01(\x01H\x01\x88\x01\x01\x12\x16\n\x0e\x61llowed_values\x18\x05 \x03(\t\x12\x13\n\x0b\x64\x65scription\x18\x06 \x01(\tB\x0c\n\n_min_valueB\x0c\n\n_max_value\",\n\x0c\x43onfigSchema\x12\x1c\n\x06\x66ields\x18\x01 \x03(\x0b\x32\x0c.ConfigField\"v\n\x0c\x43onfigUpdate\x12)\n\x06values\x18\x01 \x03(\x0b\x32\x19.ConfigUpdate.ValuesEntry\x1a;\n\x0bValuesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1b\n\x05value\x18\x02 \x01(\x0b\x32\x0c.ConfigValue:\x02\x38\x01\"\xb4\x02\n\x0cStatusUpdate\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x0f\n\x05is_on\x18\x02 \x01(\x08H\x00\x12\x15\n\x0btemperature\x18\x03 \x01(\x02H\x00\x12\x14\n\nstate_info\x18\x04 \x01(\tH\x00\x12\"\n\x0blight_phase\x18\x06 \x01(\x0e\x32\x0b.LightPhaseH\x00\x12 \n\nlamp_state\x18\x07 \x01(\x0b\x32\n.LampStateH\x00\x12+\n\x07metrics\x18\x05 \x03(\x0b\x32\x1a.StatusUpdate.MetricsEntry\x12&\n\x0freported_config\x18\x08 \x01(\x0b\x32\r.ConfigUpdate\x1a.\n\x0cMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\x42\x08\n\x06status\"H\n\tLampState\x12\r\n\x05is_on\x18\x01 \x01(\x08\x12\x12\n\nbrightness\x18\x02 \x01(\r\x12\x18\n\x10schedule_version\x18\x03 \x01(\r\"v\n\x07\x43ommand\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x10\n\x06toggle\x18\x02 \x01(\x08H\x00\x12\x14\n\nnew_config\x18\x03 \x01(\tH\x00\x12&\n\rconfig_update\x18\x04 \x01(\x0b\x32\r.ConfigUpdateH\x00\x42\x08\n\x06\x61\x63tion\"D\n\rCommandResult\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x02 \x01(\x08\x12\x0e\n\x06\x65rrors\x18\x03 \x03(\t\"\x14\n\x12ListDevicesRequest\"3\n\x13ListDevicesResponse\x12\x1c\n\x07\x64\x65vices\x18\x01 \x03(\x0b\x32\x0b.DeviceInfo\"{\n\x0e\x41ggregateQuery\x12\"\n\x0b\x64\x65vice_type\x18\x01 \x01(\x0e\x32\x0b.DeviceTypeH\x00\x12\x0f\n\x05group\x18\x02 \x01(\tH\x00\x12\x0e\n\x06metric\x18\x03 \x01(\t\x12\x1b\n\x06window\x18\x04 \x01(\x0e\x32\x0b.WindowKindB\x07\n\x05scope\"\xe2\x01\n\x0f\x41ggregateResult\x12\r\n\x05scope\x18\x01 \x01(\t\x12\x0e\n\x06metric\x18\x02 \x01(\t\x12\x1b\n\x06window\x18\x03 \x01(\x0e\x32\x0b.WindowKind\x12\x14\n\x0cwindow_start\x18\x04 \x01(\x01\x12\x12\n\nwindow_end\x18\x05 \x01(\x01\x12\r\n\x05\x63ount\x18\x06 \x01(\x03\x12\x0b\n\x03sum\x18\x07 \x01(\x01\x12\x0b\n\x03min\x18\x08 \x01(\x01\x12\x0b\n\x03max\x18\t \x01(\x01\x12\x0c\n\x04mean\x18\n \x01(\x01\x12\x0b\n\x03p50\x18\x0b \x01(\x01\x12\x0b\n\x03p90\x18\x0c \x01(\x01\x12\x0b\n\x03p99\x18\r \x01(\x01\"6\n\x11\x41ggregateResponse\x12!\n\x07results\x18\x01 \x03(\x0b\x32\x10.AggregateResult\"\xa1\x01\n\x10GreenWaveRequest\x12\r\n\x05group\x18\x01 \x01(\t\x12\x12\n\ndevice_ids\x18\x02 \x03(\t\x12\x13\n\x0b\x64istances_m\x18\x03 \x03(\x01\x12\x11\n\tspeed_kmh\x18\x04 \x01(\x01\x12\x15\n\rgreen_seconds\x18\x05 \x01(\x05\x12\x16\n\x0eyellow_seconds\x18\x06 \x01(\x05\x12\x13\n\x0bred_seconds\x18\x07 \x01(\x05\"k\n\x0fGreenWaveResult\x12\r\n\x05group\x18\x01 \x01(\t\x12\x14\n\x0c\x63ycle_anchor\x18\x02 \x01(\x01\x12\x12\n\ndevice_ids\x18\x03 \x03(\t\x12\x0f\n\x07offsets\x18\x04 \x03(\x01\x12\x0e\n\x06\x65rrors\x18\x05 \x03(\t\"\x81\x02\n\x0cLampSchedule\x12\r\n\x05group\x18\x01 \x01(\t\x12\x0f\n\x07version\x18\x02 \x01(\r\x12\x10\n\x08latitude\x18\x03 \x01(\x01\x12\x11\n\tlongitude\x18\x04 \x01(\x01\x12\x1d\n\x15sunset_offset_minutes\x18\x05 \x01(\x05\x12\x1e\n\x16sunrise_offset_minutes\x18\x06 \x01(\x05\x12\x13\n\x0bnight_level\x18\x07 \x01(\r\x12\x18\n\x10late_night_level\x18\x08 \x01(\r\x12\x1f\n\x17late_night_start_minute\x18\t \x01(\r\x12\x1d\n\x15late_night_end_minute\x18\n \x01(\r\"U\n\x12LampScheduleResult\x12\r\n\x05group\x18\x01 \x01(\t\x12\x0f\n\x07version\x18\x02 \x01(\r\x12\x0f\n\x07\x64\x65vices\x18\x03 \x01(\r\x12\x0e\n\x06\x65rrors\x18\x04 \x03(\t\"A\n\x10\x45\x64geRegistration\x12\x0f\n\x07\x65\x64ge_id\x18\x01 \x01(\t\x12\x1c\n\x07\x64\x65vices\x18\x02 \x03(\x0b\x32\x0b.DeviceInfo\"T\n\x0eTelemetryBatch\x12\x0f\n\x07\x65\x64ge_id\x18\x01 \x01(\t\x12\x1f\n\x08statuses\x18\x02 \x03(\x0b\x32\r.StatusUpdate\x12\x10\n\x08received\x18\x03 \x01(\r\"q\n\nTwinUpdate\x12\x12\n\ndevice_ids\x18\x01 \x03(\t\x12 \n\x0b\x64\x65vice_type\x18\x02 \x01(\x0e\x32\x0b.DeviceType\x12\r\n\x05group\x18\x03 \x01(\t\x12\x1e\n\x07\x64\x65sired\x18\x04 \x01(\x0b\x32\r.ConfigUpdate\"Z\n\x10TwinUpdateResult\x12\x0f\n\x07\x64\x65vices\x18\x01 \x01(\r\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x02 \x01(\r\x12\x13\n\x0bout_of_sync\x18\x03 \x01(\r\x12\x0e\n\x06\x65rrors\x18\x04 \x03(\t\"G\n\x10ProfilingRequest\x12 \n\x06\x61\x63tion\x18\x01 \x01(\x0e\x32\x10.ProfilingAction\x12\x11\n\tsample_hz\x18\x02 \x01(\r\"\x81\x01\n\x0eStageHistogram\x12\r\n\x05stage\x18\x01 \x01(\t\x12\r\n\x05\x63ount\x18\x02 \x01(\x04\x12\x10\n\x08total_ms\x18\x03 \x01(\x01\x12\x0e\n\x06p50_ms\x18\x04 \x01(\x01\x12\x0e\n\x06p99_ms\x18\x05 \x01(\x01\x12\x0e\n\x06max_ms\x18\x06 \x01(\x01\x12\x0f\n\x07\x62uckets\x18\x07 \x03(\x04\"\x8b\x01\n\x0fProfilingReport\x12\x0e\n\x06\x61\x63tive\x18\x01 \x01(\x08\x12\x0f\n\x07seconds\x18\x02 \x01(\x01\x12\x0f\n\x07samples\x18\x03 \x01(\r\x12\x1f\n\x06stages\x18\x04 \x03(\x0b\x32\x0f.StageHistogram\x12\x15\n\rfolded_stacks\x18\x05 \x01(\t\x12\x0e\n\x06\x65rrors\x18\x06 \x03(\t\"\xb0\x07\n\x0eWrapperMessage\x12\"\n\x0b\x64\x65vice_info\x18\x01 \x01(\x0b\x32\x0b.DeviceInfoH\x00\x12&\n\rstatus_update\x18\x02 \x01(\x0b\x32\r.StatusUpdateH\x00\x12\x1b\n\x07\x63ommand\x18\x03 \x01(\x0b\x32\x08.CommandH\x00\x12+\n\x0clist_request\x18\x04 \x01(\x0b\x32\x13.ListDevicesRequestH\x00\x12-\n\rlist_response\x18\x05 \x01(\x0b\x32\x14.ListDevicesResponseH\x00\x12(\n\x0e\x63ommand_result\x18\x06 \x01(\x0b\x32\x0e.CommandResultH\x00\x12$\n\x0cgateway_info\x18\x07 \x01(\x0b\x32\x0c.GatewayInfoH\x00\x12*\n\x0f\x61ggregate_query\x18\x08 \x01(\x0b\x32\x0f.AggregateQueryH\x00\x12\x30\n\x12\x61ggregate_response\x18\t \x01(\x0b\x32\x12.AggregateResponseH\x00\x12$\n\x0cstream_hello\x18\n \x01(\x0b\x32\x0c.StreamHelloH\x00\x12/\n\x12green_wave_request\x18\x0b \x01(\x0b\x32\x11.GreenWaveRequestH\x00\x12-\n\x11green_wave_result\x18\x0c \x01(\x0b\x32\x10.GreenWaveResultH\x00\x12&\n\rlamp_schedule\x18\r \x01(\x0b\x32\r.LampScheduleH\x00\x12\x33\n\x14lamp_schedule_result\x18\x0e \x01(\x0b\x32\x13.LampScheduleResultH\x00\x12.\n\x11\x65\x64ge_registration\x18\x0f \x01(\x0b\x32\x11.EdgeRegistrationH\x00\x12*\n\x0ftelemetry_batch\x18\x10 \x01(\x0b\x32\x0f.TelemetryBatchH\x00\x12\"\n\x0btwin_update\x18\x12 \x01(\x0b\x32\x0b.TwinUpdateH\x00\x12/\n\x12twin_update_result\x18\x13 \x01(\x0b\x32\x11.TwinUpdateResultH\x00\x12.\n\x11profiling_request\x18\x14 \x01(\x0b\x32\x11.ProfilingRequestH\x00\x12,\n\x10profiling_report\x18\x15 \x01(\x0b\x32\x10.ProfilingReportH\x00\x12,\n\x10registration_ack\x18\x16 \x01(\x0b\x32\x10.RegistrationAckH\x00\x42\x05\n\x03msgJ\x04\x08\x11\x10\x12*h\n\nDeviceType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\r\n\tLAMP_POST\x10\x01\x12\x11\n\rTRAFFIC_LIGHT\x10\x02\x12\x0f\n\x0bTEMP_SENSOR\x10\x03\x12\x0e\n\nAIR_SENSOR\x10\x04\x12\n\n\x06\x43\x41MERA\x10\x05*+\n\nStreamRole\x12\r\n\tPUBLISHER\x10\x00\x12\x0e\n\nSUBSCRIBER\x10\x01*o\n\x0f\x43onfigValueType\x12\x16\n\x12\x43ONFIG_UNSPECIFIED\x10\x00\x12\x0f\n\x0b\x43ONFIG_BOOL\x10\x01\x12\x0e\n\nCONFIG_INT\x10\x02\x12\x10\n\x0c\x43ONFIG_FLOAT\x10\x03\x12\x11\n\rCONFIG_STRING\x10\x04*;\n\nLightPhase\x12\r\n\tPHASE_OFF\x10\x00\x12\t\n\x05GREEN\x10\x01\x12\n\n\x06YELLOW\x10\x02\x12\x07\n\x03RED\x10\x03*\'\n\nWindowKind\x12\x0c\n\x08TUMBLING\x10\x00\x12\x0b\n\x07SLIDING\x10\x01*P\n\x0fProfilingAction\x12\x14\n\x10PROFILING_STATUS\x10\x00\x12\x13\n\x0fPROFILING_START\x10\x01\x12\x12\n\x0ePROFILING_STOP\x10\x02*I\n\x08Priority\x12\x14\n\x10PRIORITY_DEFAULT\x10\x00\x12\x14\n\x10PRIORITY_CONTROL\x10\x01\x12\x11\n\rPRIORITY_BULK\x10\x02\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'smart_city_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_DEVICETYPE']._serialized_start=592
-  _globals['_DEVICETYPE']._serialized_end=696
-  _globals['_DEVICEINFO']._serialized_start=20
-  _globals['_DEVICEINFO']._serialized_end=105
-  _globals['_STATUSUPDATE']._serialized_start=107
-  _globals['_STATUSUPDATE']._serialized_end=212
-  _globals['_COMMAND']._serialized_start=214
-  _globals['_COMMAND']._serialized_end=292
-  _globals['_LISTDEVICESREQUEST']._serialized_start=294
-  _globals['_LISTDEVICESREQUEST']._serialized_end=314
-  _globals['_LISTDEVICESRESPONSE']._serialized_start=316
-  _globals['_LISTDEVICESRESPONSE']._serialized_end=367
-  _globals['_WRAPPERMESSAGE']._serialized_start=370
-  _globals['_WRAPPERMESSAGE']._serialized_end=590
+  _globals['_CONFIGUPDATE_VALUESENTRY']._loaded_options = None
+  _globals['_CONFIGUPDATE_VALUESENTRY']._serialized_options = b'8\001'
+  _globals['_STATUSUPDATE_METRICSENTRY']._loaded_options = None
+  _globals['_STATUSUPDATE_METRICSENTRY']._serialized_options = b'8\001'
+  _globals['_DEVICETYPE']._serialized_start=4245
+  _globals['_DEVICETYPE']._serialized_end=4349
+  _globals['_STREAMROLE']._serialized_start=4351
+  _globals['_STREAMROLE']._serialized_end=4394
+  _globals['_CONFIGVALUETYPE']._serialized_start=4396
+  _globals['_CONFIGVALUETYPE']._serialized_end=4507
+  _globals['_LIGHTPHASE']._serialized_start=4509
+  _globals['_LIGHTPHASE']._serialized_end=4568
+  _globals['_WINDOWKIND']._serialized_start=4570
+  _globals['_WINDOWKIND']._serialized_end=4609
+  _globals['_PROFILINGACTION']._serialized_start=4611
+  _globals['_PROFILINGACTION']._serialized_end=4691
+  _globals['_PRIORITY']._serialized_start=4693
+  _globals['_PRIORITY']._serialized_end=4766
+  _globals['_DEVICEINFO']._serialized_start=21
+  _globals['_DEVICEINFO']._serialized_end=238
+  _globals['_REGISTRATIONACK']._serialized_start=240
+  _globals['_REGISTRATIONACK']._serialized_end=276
+  _globals['_GATEWAYINFO']._serialized_start=278
+  _globals['_GATEWAYINFO']._serialized_end=386
+  _globals['_STREAMHELLO']._serialized_start=388
+  _globals['_STREAMHELLO']._serialized_end=447
+  _globals['_CONFIGVALUE']._serialized_start=449
+  _globals['_CONFIGVALUE']._serialized_end=561
+  _globals['_CONFIGFIELD']._serialized_start=564
+  _globals['_CONFIGFIELD']._serialized_end=743
+  _globals['_CONFIGSCHEMA']._serialized_start=745
+  _globals['_CONFIGSCHEMA']._serialized_end=789
+  _globals['_CONFIGUPDATE']._serialized_start=791
+  _globals['_CONFIGUPDATE']._serialized_end=909
+  _globals['_CONFIGUPDATE_VALUESENTRY']._serialized_start=850
+  _globals['_CONFIGUPDATE_VALUESENTRY']._serialized_end=909
+  _globals['_STATUSUPDATE']._serialized_start=912
+  _globals['_STATUSUPDATE']._serialized_end=1220
+  _globals['_STATUSUPDATE_METRICSENTRY']._serialized_start=1164
+  _globals['_STATUSUPDATE_METRICSENTRY']._serialized_end=1210
+  _globals['_LAMPSTATE']._serialized_start=1222
+  _globals['_LAMPSTATE']._serialized_end=1294
+  _globals['_COMMAND']._serialized_start=1296
+  _globals['_COMMAND']._serialized_end=1414
+  _globals['_COMMANDRESULT']._serialized_start=1416
+  _globals['_COMMANDRESULT']._serialized_end=1484
+  _globals['_LISTDEVICESREQUEST']._serialized_start=1486
+  _globals['_LISTDEVICESREQUEST']._serialized_end=1506
+  _globals['_LISTDEVICESRESPONSE']._serialized_start=1508
+  _globals['_LISTDEVICESRESPONSE']._serialized_end=1559
+  _globals['_AGGREGATEQUERY']._serialized_start=1561
+  _globals['_AGGREGATEQUERY']._serialized_end=1684
+  _globals['_AGGREGATERESULT']._serialized_start=1687
+  _globals['_AGGREGATERESULT']._serialized_end=1913
+  _globals['_AGGREGATERESPONSE']._serialized_start=1915
+  _globals['_AGGREGATERESPONSE']._serialized_end=1969
+  _globals['_GREENWAVEREQUEST']._serialized_start=1972
+  _globals['_GREENWAVEREQUEST']._serialized_end=2133
+  _globals['_GREENWAVERESULT']._serialized_start=2135
+  _globals['_GREENWAVERESULT']._serialized_end=2242
+  _globals['_LAMPSCHEDULE']._serialized_start=2245
+  _globals['_LAMPSCHEDULE']._serialized_end=2502
+  _globals['_LAMPSCHEDULERESULT']._serialized_start=2504
+  _globals['_LAMPSCHEDULERESULT']._serialized_end=2589
+  _globals['_EDGEREGISTRATION']._serialized_start=2591
+  _globals['_EDGEREGISTRATION']._serialized_end=2656
+  _globals['_TELEMETRYBATCH']._serialized_start=2658
+  _globals['_TELEMETRYBATCH']._serialized_end=2742
+  _globals['_TWINUPDATE']._serialized_start=2744
+  _globals['_TWINUPDATE']._serialized_end=2857
+  _globals['_TWINUPDATERESULT']._serialized_start=2859
+  _globals['_TWINUPDATERESULT']._serialized_end=2949
+  _globals['_PROFILINGREQUEST']._serialized_start=2951
+  _globals['_PROFILINGREQUEST']._serialized_end=3022
+  _globals['_STAGEHISTOGRAM']._serialized_start=3025
+  _globals['_STAGEHISTOGRAM']._serialized_end=3154
+  _globals['_PROFILINGREPORT']._serialized_start=3157
+  _globals['_PROFILINGREPORT']._serialized_end=3296
+  _globals['_WRAPPERMESSAGE']._serialized_start=3299
+  _globals['_WRAPPERMESSAGE']._serialized_end=4243
 # @@protoc_insertion_point(module_scope)
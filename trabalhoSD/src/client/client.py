@@ -1,12 +1,15 @@
 import socket
 import time
 from generated import smart_city_pb2
+from src.common import config, startup
+from src.common.discovery import gateway_announcements
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_CLIENT, connect_secure
+from src.common.streaming import FrameReceiver
 
 # --- Configurações ---
-# O IP e a Porta do Gateway foram removidos, pois serão descobertos automaticamente.
-# As únicas constantes necessárias são as de multicast.
-MULTICAST_GROUP = "224.1.1.1"
-MULTICAST_PORT = 5007
+# O IP e a Porta do Gateway são descobertos automaticamente (veja src/common/discovery.py).
+WATCH_SECONDS = 10 # Tempo durante o qual o cliente assiste a uma câmera.
 
 def print_device_list(response_msg):
     """
@@ -26,50 +29,164 @@ def print_device_list(response_msg):
     # Itera sobre cada dispositivo na resposta e imprime suas informações.
     for device in response_msg.list_response.devices:
         device_type_name = smart_city_pb2.DeviceType.Name(device.type)
-        print(f"  ID: {device.id} | Tipo: {device_type_name}")
+        config_keys = ", ".join(field.key for field in device.config_schema.fields)
+        print(f"  ID: {device.id} | Tipo: {device_type_name}" + (f" | Configurações: {config_keys}" if config_keys else ""))
+        # Estado guardado pelo Gateway (gêmeo digital): o informado pelo dispositivo e o pedido ainda não confirmado.
+        if device.reported_config.values:
+            print(f"      Estado: {format_config(device.reported_config)}")
+        if device.desired_config.values:
+            print(f"      Pendente: {format_config(device.desired_config)}")
     print("---------------------------------")
 
+def format_config(config_update):
+    """Formata uma ConfigUpdate como "chave=valor, chave=valor", em ordem de chave."""
+    values = config.to_dict(config_update)
+    return ", ".join(f"{key}={values[key]}" for key in sorted(values))
+
+def request_device_list(client_socket):
+    """Pede a lista de dispositivos ao Gateway e retorna a resposta recebida."""
+    request_msg = smart_city_pb2.WrapperMessage()
+    request_msg.list_request.SetInParent()
+    send_message(client_socket, request_msg)
+    return recv_message(client_socket)
+
+def send_command(client_socket, command_msg):
+    """
+    Envia um comando ao Gateway e imprime o resultado da validação.
+
+    O Gateway responde a todo comando com um CommandResult, informando se ele
+    foi aceito e encaminhado ou os motivos da rejeição.
+    """
+    # O Gateway atende os comandos à frente da telemetria (pelo tipo da mensagem).
+    send_message(client_socket, command_msg)
+    response_msg = recv_message(client_socket)
+    if response_msg is None or not response_msg.HasField("command_result"):
+        print("[ERRO] Resposta inesperada do Gateway.")
+        return
+    result = response_msg.command_result
+    if result.accepted:
+        print(f"Comando aceito e enviado para o dispositivo {result.device_id}.")
+    else:
+        print(f"Comando para {result.device_id} rejeitado pelo Gateway:")
+        for error in result.errors:
+            print(f"  - {error}")
+
+def parse_config_input(schema, text):
+    """
+    Converte a entrada "chave=valor, chave=valor" em uma ConfigUpdate.
+
+    Os valores são convertidos de acordo com o esquema declarado pelo
+    dispositivo; a validação dos limites fica a cargo do Gateway.
+    """
+    config_update = smart_city_pb2.ConfigUpdate()
+    for pair in text.split(','):
+        if not pair.strip():
+            continue
+        key, value = pair.split('=')
+        config_update.MergeFrom(config.parse_legacy_config(schema, f"{key.strip()}:{value.strip()}"))
+    return config_update
+
+def print_aggregates(response_msg):
+    """Imprime as estatísticas recebidas em resposta a uma AggregateQuery."""
+    if not response_msg.HasField("aggregate_response"):
+        print("[ERRO] Resposta inesperada do Gateway.")
+        return
+
+    print("\n--- Agregados ---")
+    if not response_msg.aggregate_response.results:
+        print("Nenhuma leitura encontrada.")
+    for result in response_msg.aggregate_response.results:
+        window_name = smart_city_pb2.WindowKind.Name(result.window)
+        start = time.strftime("%H:%M:%S", time.localtime(result.window_start))
+        end = time.strftime("%H:%M:%S", time.localtime(result.window_end))
+        print(f"  {result.scope} | {result.metric} | {window_name} {start}-{end} | n={result.count}")
+        if result.count:
+            print(f"    média={result.mean:.2f} mín={result.min:.2f} máx={result.max:.2f} "
+                  f"p50={result.p50:.2f} p90={result.p90:.2f} p99={result.p99:.2f}")
+    print("-----------------")
+
+def watch_camera(gateway_ip, stream_port, device_id):
+    """
+    Assina o streaming de uma câmera por WATCH_SECONDS segundos e imprime a
+    taxa de quadros, a vazão e a latência média observadas.
+    """
+    stream_socket = connect_secure((gateway_ip, stream_port), ROLE_CLIENT)
+    try:
+        hello_msg = smart_city_pb2.WrapperMessage()
+        hello_msg.stream_hello.device_id = device_id
+        hello_msg.stream_hello.role = smart_city_pb2.SUBSCRIBER
+        send_message(stream_socket, hello_msg)
+        stream_socket.settimeout(WATCH_SECONDS)
+
+        receiver = FrameReceiver(stream_socket)
+        frames = 0
+        total_bytes = 0
+        total_latency = 0.0
+        started = time.perf_counter()
+        print(f"Assistindo a câmera {device_id} por {WATCH_SECONDS}s...")
+        while time.perf_counter() - started < WATCH_SECONDS:
+            try:
+                frame = receiver.read_frame()
+            except socket.timeout:
+                break
+            if frame is None:
+                print("O Gateway encerrou o streaming (câmera desligada ou não registrada).")
+                break
+            frame_id, timestamp_us, data = frame
+            frames += 1
+            total_bytes += len(data)
+            total_latency += time.time() - timestamp_us / 1e6
+        elapsed = time.perf_counter() - started
+        print(f"Quadros recebidos: {frames} ({frames / elapsed:.1f} qps), "
+              f"{total_bytes / elapsed / 1e6:.1f} MB/s"
+              + (f", latência média {total_latency / frames * 1000:.1f} ms." if frames else "."))
+    finally:
+        stream_socket.close()
+
+def print_green_wave_result(response_msg):
+    """Imprime o plano de onda verde calculado pelo Gateway."""
+    if not response_msg.HasField("green_wave_result"):
+        print("[ERRO] Resposta inesperada do Gateway.")
+        return
+    result = response_msg.green_wave_result
+    if result.device_ids:
+        start = time.strftime("%H:%M:%S", time.localtime(result.cycle_anchor))
+        print(f"\n--- Onda verde do grupo '{result.group}' (início às {start}) ---")
+        for device_id, offset in zip(result.device_ids, result.offsets):
+            print(f"  {device_id}: verde abre {offset:.1f}s após o primeiro")
+    for error in result.errors:
+        print(f"  [ERRO] {error}")
+
+def parse_clock_minutes(text):
+    """Converte um horário 'HH:MM' em minutos após a meia-noite."""
+    hours, minutes = text.split(':')
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total < 24 * 60:
+        raise ValueError(text)
+    return total
+
 def discover_gateway():
     """
     Escuta por anúncios do Gateway via multicast para descobrir seu IP e a porta do cliente.
-    Retorna o IP e a Porta do cliente descobertos.
+    Retorna o IP, a Porta do cliente e a Porta de streaming descobertos.
     """
-    # Configura o socket para escutar por mensagens multicast.
-    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    multicast_socket.bind(("", MULTICAST_PORT))
-    group = socket.inet_aton(MULTICAST_GROUP)
-    mreq = group + socket.inet_aton("0.0.0.0")
-    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
-    
     print("Procurando pelo Gateway na rede...")
     
-    # Loop para aguardar o anúncio do Gateway.
-    while True:
-        # Fica bloqueado aqui até receber uma mensagem multicast.
-        data, address = multicast_socket.recvfrom(1024)
+    # Aguarda o primeiro anúncio do Gateway (ou usa o Gateway definido em GATEWAY_IP).
+    for gateway_info in gateway_announcements():
+        discovered_ip = gateway_info.ip_address
+        # O cliente usa a porta específica para clientes, anunciada pelo Gateway.
+        discovered_port = gateway_info.client_tcp_port
         
-        # Decodifica a mensagem recebida.
-        wrapper_msg = smart_city_pb2.WrapperMessage()
-        wrapper_msg.ParseFromString(data)
-        
-        # Se a mensagem for um anúncio do Gateway, extrai as informações.
-        if wrapper_msg.HasField("gateway_info"):
-            gateway_info = wrapper_msg.gateway_info
-            discovered_ip = gateway_info.ip_address
-            # O cliente usa a porta específica para clientes, anunciada pelo Gateway.
-            discovered_port = gateway_info.client_tcp_port
-            
-            print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}.")
-            multicast_socket.close() # Fecha o socket de descoberta.
-            return discovered_ip, discovered_port # Retorna os dados encontrados.
+        print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}.")
+        return discovered_ip, discovered_port, gateway_info.stream_tcp_port # Retorna os dados encontrados.
 
 def main():
     """Função principal que executa o cliente, desde a descoberta até a interação."""
     
     # --- ETAPA 1: DESCOBERTA ---
     # Primeiro, descobre o gateway na rede antes de qualquer outra coisa.
-    gateway_ip, gateway_port = discover_gateway()
+    gateway_ip, gateway_port, stream_port = discover_gateway()
     
     # Se não encontrar o Gateway, encerra o programa.
     if not gateway_ip:
@@ -77,11 +194,12 @@ def main():
         return
 
     # --- ETAPA 2: CONEXÃO ---
-    # Tenta estabelecer a conexão TCP com os dados descobertos.
+    # Tenta estabelecer a conexão TCP (protegida por TLS, se houver certificados) com os dados descobertos.
     try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect((gateway_ip, gateway_port))
+        client_socket = connect_secure((gateway_ip, gateway_port), ROLE_CLIENT)
         print("Conectado ao Gateway. Bem-vindo ao Controle da Cidade Inteligente!")
+        startup.mark("conexão")
+        startup.report("Cliente")
     except Exception as e:
         print(f"Não foi possível conectar ao Gateway: {e}")
         return
@@ -90,13 +208,7 @@ def main():
     # Após conectar, busca e exibe a lista inicial de dispositivos.
     try:
         print("\nBuscando lista inicial de dispositivos...")
-        request_msg = smart_city_pb2.WrapperMessage()
-        request_msg.list_request.SetInParent()
-        client_socket.send(request_msg.SerializeToString())
-        
-        response_data = client_socket.recv(4096)
-        response_msg = smart_city_pb2.WrapperMessage()
-        response_msg.ParseFromString(response_data)
+        response_msg = request_device_list(client_socket)
         print_device_list(response_msg)
     except Exception as e:
         print(f"Erro ao buscar lista inicial: {e}")
@@ -112,20 +224,20 @@ def main():
         print("2. Ligar/Desligar um dispositivo (toggle)")
         print("3. Configurar resolução da Câmera")
         print("4. Configurar duração do Semáforo")
-        print("5. Sair")
+        print("5. Configurar dispositivo (várias chaves de uma vez)")
+        print("6. Consultar agregados dos sensores")
+        print("7. Assistir câmera (streaming)")
+        print("8. Coordenar semáforos (onda verde)")
+        print("9. Programar os postes de um grupo")
+        print("10. Definir o estado de vários dispositivos")
+        print("11. Sair")
         choice = input("Escolha uma opção: ")
 
         try:
             # Lógica para tratar a escolha do usuário.
             if choice == '1':
                 # Envia um pedido para atualizar a lista de dispositivos.
-                request_msg = smart_city_pb2.WrapperMessage()
-                request_msg.list_request.SetInParent()
-                client_socket.send(request_msg.SerializeToString())
-                
-                response_data = client_socket.recv(4096)
-                response_msg = smart_city_pb2.WrapperMessage()
-                response_msg.ParseFromString(response_data)
+                response_msg = request_device_list(client_socket)
                 print_device_list(response_msg)
 
             elif choice == '2':
@@ -135,8 +247,7 @@ def main():
                 cmd = command_msg.command
                 cmd.device_id = device_id
                 cmd.toggle = True
-                client_socket.send(command_msg.SerializeToString())
-                print(f"Comando de toggle enviado para o dispositivo {device_id}.")
+                send_command(client_socket, command_msg)
 
             elif choice == '3':
                 # Envia um comando de configuração para a câmera.
@@ -145,22 +256,146 @@ def main():
                 command_msg = smart_city_pb2.WrapperMessage()
                 cmd = command_msg.command
                 cmd.device_id = device_id
-                cmd.new_config = f"resolution:{resolution}"
-                client_socket.send(command_msg.SerializeToString())
-                print(f"Comando de configuração enviado para a câmera {device_id}.")
+                config.set_value(cmd.config_update.values["resolution"], resolution)
+                send_command(client_socket, command_msg)
 
             elif choice == '4':
                 # Envia um comando de configuração para o semáforo.
                 device_id = input("Digite o ID do Semáforo: ")
                 duration = input("Digite a nova duração para o sinal vermelho (em segundos): ")
+                if not duration.strip().isdigit():
+                    print("Duração inválida: informe um número inteiro de segundos.")
+                    continue
                 command_msg = smart_city_pb2.WrapperMessage()
                 cmd = command_msg.command
                 cmd.device_id = device_id
-                cmd.new_config = f"duration:{duration}"
-                client_socket.send(command_msg.SerializeToString())
-                print(f"Comando de configuração enviado para o semáforo {device_id}.")
+                config.set_value(cmd.config_update.values["red_light_duration"], int(duration))
+                send_command(client_socket, command_msg)
 
             elif choice == '5':
+                # Envia várias configurações em uma única mensagem, aplicadas de forma atômica.
+                device_id = input("Digite o ID do dispositivo: ")
+                devices = {device.id: device for device in request_device_list(client_socket).list_response.devices}
+                if device_id not in devices:
+                    print(f"Dispositivo {device_id} não encontrado.")
+                    continue
+                schema = devices[device_id].config_schema
+                for field in schema.fields:
+                    type_name = smart_city_pb2.ConfigValueType.Name(field.type)
+                    print(f"  {field.key} ({type_name}): {field.description}")
+                pairs = input("Digite as configurações (ex: chave=valor, chave=valor): ")
+                command_msg = smart_city_pb2.WrapperMessage()
+                cmd = command_msg.command
+                cmd.device_id = device_id
+                try:
+                    cmd.config_update.CopyFrom(parse_config_input(schema, pairs))
+                except ValueError:
+                    print("Formato inválido. Use chave=valor separados por vírgula.")
+                    continue
+                send_command(client_socket, command_msg)
+
+            elif choice == '6':
+                # Consulta as estatísticas calculadas pelo Gateway (ex: temperatura média da cidade).
+                scope = input("Filtrar por tipo (ex: TEMP_SENSOR), grupo (ex: group:centro) ou Enter para todos: ").strip()
+                metric = input("Métrica (ex: temperature, ppm) ou Enter para todas: ").strip()
+                window = input("Janela [f]ixa ou [d]eslizante: ").strip().lower()
+                query_msg = smart_city_pb2.WrapperMessage()
+                query = query_msg.aggregate_query
+                if scope.startswith("group:"):
+                    query.group = scope[len("group:"):]
+                elif scope:
+                    if scope.upper() not in smart_city_pb2.DeviceType.keys():
+                        print(f"Tipo de dispositivo desconhecido: {scope}")
+                        continue
+                    query.device_type = smart_city_pb2.DeviceType.Value(scope.upper())
+                query.metric = metric
+                query.window = smart_city_pb2.SLIDING if window.startswith("d") else smart_city_pb2.TUMBLING
+                send_message(client_socket, query_msg)
+                print_aggregates(recv_message(client_socket))
+
+            elif choice == '7':
+                # Assina o streaming de quadros de uma câmera por alguns segundos.
+                device_id = input("Digite o ID da Câmera: ")
+                watch_camera(gateway_ip, stream_port, device_id)
+
+            elif choice == '8':
+                # Pede ao Gateway um plano de onda verde para um grupo de semáforos.
+                group = input("Grupo dos semáforos: ").strip()
+                ids = input("IDs na ordem do trajeto, separados por vírgula (Enter = todos do grupo): ").strip()
+                distances = input("Distância de cada semáforo até o primeiro, em metros (ex: 0, 250, 500): ")
+                speed = input("Velocidade da onda verde (km/h): ")
+                request_msg = smart_city_pb2.WrapperMessage()
+                request = request_msg.green_wave_request
+                request.group = group
+                try:
+                    request.device_ids.extend(device_id.strip() for device_id in ids.split(',') if device_id.strip())
+                    request.distances_m.extend(float(distance) for distance in distances.split(',') if distance.strip())
+                    request.speed_kmh = float(speed)
+                except ValueError:
+                    print("Distâncias e velocidade devem ser números.")
+                    continue
+                send_message(client_socket, request_msg)
+                print_green_wave_result(recv_message(client_socket))
+
+            elif choice == '9':
+                # Envia ao Gateway a programação de um grupo de postes (repassada em uma única mensagem).
+                request_msg = smart_city_pb2.WrapperMessage()
+                schedule = request_msg.lamp_schedule
+                schedule.group = input("Grupo dos postes: ").strip()
+                try:
+                    schedule.latitude = float(input("Latitude (ex: -23.55): "))
+                    schedule.longitude = float(input("Longitude (ex: -46.63): "))
+                    schedule.night_level = int(input("Luminosidade à noite (0 a 100%): "))
+                    late_night = input("Madrugada com luz reduzida (ex: 00:00-05:00, Enter = sem redução): ").strip()
+                    if late_night:
+                        start, end = late_night.split('-')
+                        schedule.late_night_start_minute = parse_clock_minutes(start.strip())
+                        schedule.late_night_end_minute = parse_clock_minutes(end.strip())
+                        schedule.late_night_level = int(input("Luminosidade na madrugada (0 a 100%): "))
+                except ValueError:
+                    print("Valores inválidos.")
+                    continue
+                send_message(client_socket, request_msg)
+                response_msg = recv_message(client_socket)
+                result = response_msg.lamp_schedule_result
+                if result.errors:
+                    for error in result.errors:
+                        print(f"[ERRO] {error}")
+                else:
+                    print(f"Programação v{result.version} enviada ao grupo '{result.group}' ({result.devices} poste(s) registrado(s)).")
+
+            elif choice == '10':
+                # Pede um estado para todos os dispositivos de um tipo/grupo; o Gateway só comanda os que estão fora dele.
+                type_name = input("Tipo dos dispositivos (ex: LAMP_POST): ").strip().upper()
+                group = input("Grupo (Enter = todos): ").strip()
+                matching = [device for device in request_device_list(client_socket).list_response.devices
+                            if smart_city_pb2.DeviceType.Name(device.type) == type_name
+                            and (not group or device.group == group)]
+                if not matching:
+                    print("Nenhum dispositivo encontrado.")
+                    continue
+                # O esquema do primeiro dispositivo define os tipos dos valores; o Gateway valida o de cada um.
+                schema = matching[0].config_schema
+                for field in schema.fields:
+                    print(f"  {field.key} ({smart_city_pb2.ConfigValueType.Name(field.type)}): {field.description}")
+                pairs = input("Digite o estado desejado (ex: chave=valor, chave=valor): ")
+                request_msg = smart_city_pb2.WrapperMessage()
+                update = request_msg.twin_update
+                update.device_type = smart_city_pb2.DeviceType.Value(type_name)
+                update.group = group
+                try:
+                    update.desired.CopyFrom(parse_config_input(schema, pairs))
+                except ValueError:
+                    print("Formato inválido. Use chave=valor separados por vírgula.")
+                    continue
+                send_message(client_socket, request_msg)
+                result = recv_message(client_socket).twin_update_result
+                for error in result.errors:
+                    print(f"[ERRO] {error}")
+                print(f"Estado aceito por {result.accepted} de {result.devices} dispositivo(s); "
+                      f"{result.out_of_sync} receberão comandos, os demais já estão nele.")
+
+            elif choice == '11':
                 # Encerra o loop e o programa.
                 break
             else:
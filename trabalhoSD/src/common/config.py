@@ -0,0 +1,127 @@
+# src/common/config.py
+from generated import smart_city_pb2
+
+# --- Configuração tipada dos dispositivos ---
+# Cada dispositivo declara no registro um ConfigSchema com as chaves que aceita.
+# O Gateway valida toda ConfigUpdate contra esse esquema antes de encaminhá-la,
+# e o próprio dispositivo repete a validação antes de aplicar os valores.
+
+# Campo do oneof de ConfigValue usado por cada tipo declarado no esquema. As chaves são
+# os nomes dos tipos, para que o módulo gerado só seja carregado no primeiro uso.
+VALUE_FIELDS = {
+    "CONFIG_BOOL": "bool_value",
+    "CONFIG_INT": "int_value",
+    "CONFIG_FLOAT": "float_value",
+    "CONFIG_STRING": "string_value",
+}
+
+
+def add_field(schema, key, value_type, min_value=None, max_value=None, allowed_values=(), description=""):
+    """Acrescenta a declaração de uma chave de configuração ao esquema."""
+    field = schema.fields.add()
+    field.key = key
+    field.type = value_type
+    if min_value is not None:
+        field.min_value = min_value
+    if max_value is not None:
+        field.max_value = max_value
+    field.allowed_values.extend(allowed_values)
+    field.description = description
+    return field
+
+
+def set_value(config_value, value):
+    """Preenche um ConfigValue a partir de um valor Python."""
+    # 'bool' precisa ser testado antes de 'int', pois bool é subclasse de int.
+    if isinstance(value, bool):
+        config_value.bool_value = value
+    elif isinstance(value, int):
+        config_value.int_value = value
+    elif isinstance(value, float):
+        config_value.float_value = value
+    else:
+        config_value.string_value = str(value)
+
+
+def get_value(config_value):
+    """Converte um ConfigValue para o valor Python correspondente."""
+    kind = config_value.WhichOneof("value")
+    return getattr(config_value, kind) if kind else None
+
+
+def to_dict(config_update):
+    """Converte uma ConfigUpdate em um dicionário {chave: valor Python}."""
+    return {key: get_value(value) for key, value in config_update.values.items()}
+
+
+def fill_update(config_update, values):
+    """Preenche uma ConfigUpdate a partir de um dicionário {chave: valor Python}."""
+    for key, value in values.items():
+        set_value(config_update.values[key], value)
+    return config_update
+
+
+def validate_update(schema, config_update):
+    """
+    Valida uma ConfigUpdate contra o esquema declarado pelo dispositivo.
+
+    Retorna a lista de erros encontrados; uma lista vazia significa que a
+    atualização inteira pode ser aplicada.
+    """
+    if not config_update.values:
+        return ["Nenhuma configuração informada."]
+
+    fields = {field.key: field for field in schema.fields}
+    errors = []
+    for key, config_value in config_update.values.items():
+        field = fields.get(key)
+        if field is None:
+            errors.append(f"Configuração desconhecida: {key}")
+            continue
+
+        kind = config_value.WhichOneof("value")
+        type_name = smart_city_pb2.ConfigValueType.Name(field.type)
+        expected = VALUE_FIELDS.get(type_name)
+        # Um inteiro é aceito onde se espera um número real.
+        if kind != expected and not (expected == "float_value" and kind == "int_value"):
+            errors.append(f"{key}: tipo inválido (esperado {type_name}).")
+            continue
+
+        value = getattr(config_value, kind)
+        if field.HasField("min_value") and value < field.min_value:
+            errors.append(f"{key}: {value} abaixo do mínimo {field.min_value:g}.")
+        if field.HasField("max_value") and value > field.max_value:
+            errors.append(f"{key}: {value} acima do máximo {field.max_value:g}.")
+        if field.allowed_values and str(value) not in field.allowed_values:
+            errors.append(f"{key}: '{value}' não está entre {list(field.allowed_values)}.")
+    return errors
+
+
+def parse_legacy_config(schema, text):
+    """
+    Converte o formato legado "chave:valor" em uma ConfigUpdate tipada.
+
+    O valor textual é convertido para o tipo declarado no esquema. Lança
+    ValueError se a string não estiver no formato esperado ou não puder ser
+    convertida.
+    """
+    key, value = text.split(':')
+    fields = {field.key: field for field in schema.fields}
+    field = fields.get(key.strip())
+    config_update = smart_city_pb2.ConfigUpdate()
+    if field is None:
+        # A chave desconhecida é mantida como texto para que a validação a rejeite.
+        config_update.values[key.strip()].string_value = value
+        return config_update
+
+    value = value.strip()
+    if field.type == smart_city_pb2.CONFIG_BOOL:
+        parsed = value.lower() in ("1", "true", "on", "sim")
+    elif field.type == smart_city_pb2.CONFIG_INT:
+        parsed = int(value)
+    elif field.type == smart_city_pb2.CONFIG_FLOAT:
+        parsed = float(value)
+    else:
+        parsed = value
+    set_value(config_update.values[field.key], parsed)
+    return config_update
@@ -0,0 +1,66 @@
+# src/common/discovery.py
+import os
+import socket
+from generated import smart_city_pb2
+from src.common import startup
+
+# --- Descoberta do Gateway ---
+# Dispositivos e clientes encontram o Gateway pelos anúncios multicast, que
+# ele envia a cada 10 segundos. Com GATEWAY_IP definido, a descoberta é pulada
+# e esse Gateway é usado direto, nas portas padrão ou nas definidas por
+# GATEWAY_DEVICE_PORT, GATEWAY_CLIENT_PORT e GATEWAY_STREAM_PORT (as mesmas
+# variáveis do Gateway); assim, uma frota simulada sobe sem esperar anúncios.
+# MULTICAST_INTERFACE escolhe o IP da interface em que os anúncios são ouvidos.
+
+MULTICAST_GROUP = "224.1.1.1"
+MULTICAST_PORT = 5007
+
+
+def configured_gateway():
+    """Retorna a GatewayInfo do Gateway definido pelas variáveis de ambiente, ou None."""
+    gateway_ip = os.environ.get("GATEWAY_IP")
+    if not gateway_ip:
+        return None
+    info = smart_city_pb2.GatewayInfo()
+    info.ip_address = gateway_ip
+    info.device_tcp_port = int(os.environ.get("GATEWAY_DEVICE_PORT", 10000))
+    info.client_tcp_port = int(os.environ.get("GATEWAY_CLIENT_PORT", 10003))
+    info.stream_tcp_port = int(os.environ.get("GATEWAY_STREAM_PORT", 10004))
+    return info
+
+
+def gateway_announcements():
+    """
+    Gera a GatewayInfo de cada anúncio do Gateway recebido via multicast.
+
+    Com GATEWAY_IP definido, gera a GatewayInfo configurada imediatamente (e
+    de novo a cada nova tentativa), sem abrir o socket multicast.
+    """
+    info = configured_gateway()
+    if info is not None:
+        startup.mark("descoberta")
+        while True:
+            yield info
+
+    # Configura um socket para escutar por mensagens multicast na rede.
+    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    multicast_socket.bind(("", MULTICAST_PORT))
+    interface = os.environ.get("MULTICAST_INTERFACE", "0.0.0.0")
+    mreq = socket.inet_aton(MULTICAST_GROUP) + socket.inet_aton(interface)
+    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+    try:
+        announced = False
+        while True:
+            # Fica bloqueado aqui até receber uma mensagem multicast.
+            data, address = multicast_socket.recvfrom(1024)
+            wrapper_msg = smart_city_pb2.WrapperMessage()
+            wrapper_msg.ParseFromString(data)
+            # Só os anúncios do Gateway interessam.
+            if wrapper_msg.HasField("gateway_info"):
+                if not announced:
+                    startup.mark("descoberta")
+                    announced = True
+                yield wrapper_msg.gateway_info
+    finally:
+        multicast_socket.close()
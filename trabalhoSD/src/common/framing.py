@@ -0,0 +1,64 @@
+# src/common/framing.py
+import struct
+from generated import smart_city_pb2
+
+# --- Enquadramento de mensagens TCP ---
+# O TCP é um fluxo de bytes: duas mensagens podem chegar juntas em um único
+# recv() ou uma mensagem grande pode chegar dividida. Cada WrapperMessage é
+# precedida por um cabeçalho de 4 bytes (big-endian) com o seu tamanho.
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024  # Limite de segurança para uma única mensagem.
+
+
+def recv_exact_into(sock, view):
+    """
+    Preenche completamente o buffer 'view' (um memoryview) com dados do socket.
+
+    Retorna False se a conexão for fechada antes de completar a leitura.
+    """
+    size = len(view)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            return False
+        received += count
+    return True
+
+
+def recv_exact(sock, size):
+    """
+    Lê exatamente 'size' bytes do socket.
+
+    Retorna None se a conexão for fechada antes de completar a leitura.
+    """
+    buffer = bytearray(size)
+    if not recv_exact_into(sock, memoryview(buffer)):
+        return None
+    return buffer
+
+
+def send_message(sock, wrapper_msg):
+    """Serializa uma WrapperMessage e a envia com o cabeçalho de tamanho."""
+    payload = wrapper_msg.SerializeToString()
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def recv_message(sock):
+    """
+    Recebe a próxima WrapperMessage enquadrada do socket.
+
+    Retorna None quando o outro lado encerra a conexão.
+    """
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Mensagem de {size} bytes excede o limite de {MAX_MESSAGE_SIZE} bytes.")
+    payload = recv_exact(sock, size)
+    if payload is None:
+        return None
+    wrapper_msg = smart_city_pb2.WrapperMessage()
+    wrapper_msg.ParseFromString(bytes(payload))
+    return wrapper_msg
@@ -0,0 +1,102 @@
+# src/common/lighting.py
+import math
+import time
+
+# --- Programação dos postes de luz ---
+# Cada poste calcula sozinho o nascer e o pôr do sol a partir da latitude e
+# da longitude da LampSchedule do seu grupo, e decide o nível de luz a cada
+# instante. Assim o Gateway não precisa enviar comandos no anoitecer: uma
+# programação vale até ser substituída.
+
+ZENITH = 90.833  # Ângulo zenital do nascer/pôr do sol oficial (inclui a refração atmosférica).
+
+
+def sun_times(day_of_year, latitude, longitude):
+    """
+    Calcula o nascer e o pôr do sol de um dia do ano, em horas do dia solar
+    local (hora UTC deslocada pela longitude), de 0 a 24.
+
+    Usa o algoritmo simplificado do Almanac for Computers (erro de cerca de um
+    minuto). Nas regiões polares, retorna (None, None) em dias em que o sol não
+    nasce e (0.0, 24.0) em dias em que ele não se põe.
+    """
+    longitude_hours = longitude / 15
+    times = []
+    for rising in (True, False):
+        # Instante aproximado do evento, em dias.
+        t = day_of_year + ((6 if rising else 18) - longitude_hours) / 24
+        mean_anomaly = 0.9856 * t - 3.289
+        true_longitude = (mean_anomaly + 1.916 * math.sin(math.radians(mean_anomaly))
+                          + 0.020 * math.sin(math.radians(2 * mean_anomaly)) + 282.634) % 360
+        right_ascension = math.degrees(math.atan(0.91764 * math.tan(math.radians(true_longitude)))) % 360
+        # A ascensão reta fica no mesmo quadrante da longitude verdadeira.
+        right_ascension += (true_longitude // 90) * 90 - (right_ascension // 90) * 90
+        right_ascension /= 15
+        sin_declination = 0.39782 * math.sin(math.radians(true_longitude))
+        cos_declination = math.cos(math.asin(sin_declination))
+        cos_hour_angle = ((math.cos(math.radians(ZENITH)) - sin_declination * math.sin(math.radians(latitude)))
+                          / (cos_declination * math.cos(math.radians(latitude))))
+        if cos_hour_angle > 1:
+            return None, None
+        if cos_hour_angle < -1:
+            return 0.0, 24.0
+        hour_angle = math.degrees(math.acos(cos_hour_angle))
+        if rising:
+            hour_angle = 360 - hour_angle
+        local_time = hour_angle / 15 + right_ascension - 0.06571 * t - 6.622
+        times.append(local_time % 24)
+    return times[0], times[1]
+
+
+def scheduled_level(schedule, now=None):
+    """
+    Retorna o nível de luz (0 a 100) que a programação determina no instante 'now'.
+
+    O dia considerado é o dia solar do local (hora UTC deslocada pela
+    longitude), para que o nascer sempre venha antes do pôr do sol.
+    """
+    if now is None:
+        now = time.time()
+    solar_offset = schedule.longitude / 15 * 3600
+    solar_time = time.gmtime(now + solar_offset)
+    sunrise, sunset = sun_times(solar_time.tm_yday, schedule.latitude, schedule.longitude)
+    if sunrise is None:
+        is_night = True  # Noite polar.
+    else:
+        hours = solar_time.tm_hour + solar_time.tm_min / 60 + solar_time.tm_sec / 3600
+        sunrise += schedule.sunrise_offset_minutes / 60
+        sunset += schedule.sunset_offset_minutes / 60
+        is_night = hours < sunrise or hours >= sunset
+    if not is_night:
+        return 0
+
+    # Redução na madrugada, em hora local do relógio.
+    start, end = schedule.late_night_start_minute, schedule.late_night_end_minute
+    if start != end:
+        local_time = time.localtime(now)
+        minute = local_time.tm_hour * 60 + local_time.tm_min
+        in_late_night = start <= minute < end if start < end else minute >= start or minute < end
+        if in_late_night:
+            return schedule.late_night_level
+    return schedule.night_level
+
+
+def validate_schedule(schedule):
+    """Confere os campos de uma LampSchedule. Retorna a lista de erros."""
+    errors = []
+    if not schedule.group:
+        errors.append("O grupo é obrigatório.")
+    if not -90 <= schedule.latitude <= 90:
+        errors.append("A latitude deve estar entre -90 e 90.")
+    if not -180 <= schedule.longitude <= 180:
+        errors.append("A longitude deve estar entre -180 e 180.")
+    for name in ("sunset_offset_minutes", "sunrise_offset_minutes"):
+        if not -180 <= getattr(schedule, name) <= 180:
+            errors.append(f"{name} deve estar entre -180 e 180 minutos.")
+    for name in ("night_level", "late_night_level"):
+        if getattr(schedule, name) > 100:
+            errors.append(f"{name} deve estar entre 0 e 100.")
+    for name in ("late_night_start_minute", "late_night_end_minute"):
+        if getattr(schedule, name) >= 24 * 60:
+            errors.append(f"{name} deve ser menor que 1440.")
+    return errors
@@ -0,0 +1,334 @@
+# src/common/security.py
+import itertools
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from src.common.startup import LazyModule
+
+# --- Autenticação e criptografia dos canais ---
+# As conexões TCP de dispositivos (10000), de clientes (10003) e de streaming (10004) usam TLS com
+# autenticação mútua: o Gateway e cada lado apresentam um certificado emitido
+# pela mesma autoridade local (CA). O campo OU do certificado indica o papel
+# ("gateway", "device", "client" ou "admin"), e cada porta só aceita o papel
+# esperado. A porta de clientes aceita também administradores, os únicos que
+# podem controlar o perfilamento do Gateway.
+# O ID com que um dispositivo (ou uma borda) se registra precisa constar do seu
+# certificado: no CN ou em um nome DNS do subjectAltName, que pode usar
+# curingas ("lamp_*"); assim, um certificado não serve para se passar por
+# qualquer outro dispositivo.
+# Os datagramas UDP de status levam um instante e uma assinatura HMAC-SHA256
+# (truncada em 16 bytes) calculada com uma chave compartilhada. Como a chave é
+# a mesma para todos, cada processo assina também um ID de remetente sorteado
+# e um contador crescente: quem recebe lembra os contadores recentes de cada
+# remetente e descarta o datagrama repetido, mesmo dentro da janela de idade.
+# A assinatura não identifica o dispositivo: quem tem a chave pode assinar
+# leituras com qualquer device_id.
+#
+# Os certificados de teste (autoassinados) são gerados com:
+#   python -m src.common.security certs
+#
+# Sem o diretório de certificados, tudo funciona como antes, sem proteção.
+#
+# O ssl e o hmac (que carregam o OpenSSL) só são importados no primeiro uso.
+
+ssl = LazyModule("ssl")
+fnmatch = LazyModule("fnmatch")
+hmac = LazyModule("hmac")
+hashlib = LazyModule("hashlib")
+subprocess = LazyModule("subprocess")
+
+CERT_DIR = os.environ.get("SMARTCITY_CERTS", "certs")  # Diretório com a CA, os certificados e a chave UDP.
+
+ROLE_GATEWAY = "gateway"
+ROLE_DEVICE = "device"
+ROLE_CLIENT = "client"
+ROLE_ADMIN = "admin"
+# IDs autorizados pelo certificado de dispositivo de teste: um curinga por tipo de dispositivo e as bordas.
+TEST_DEVICE_NAMES = ("lamp_*", "cam_*", "sema_*", "temp_*", "airq_*", "borda_*")
+
+HANDSHAKE_TIMEOUT = 10.0  # Conexão que não completa o handshake nesse tempo é descartada.
+# ID do remetente, contador e instante do envio (milissegundos desde a época), cobertos pela assinatura.
+UDP_TRAILER = struct.Struct("!8sQQ")
+UDP_TAG_SIZE = 16
+UDP_MAX_AGE_SECONDS = 30  # Datagramas mais antigos (ou adiantados) que isso são rejeitados.
+UDP_REPLAY_WINDOW = 256   # Contadores lembrados por remetente; até essa distância, datagramas fora de ordem ainda valem.
+
+_contexts = {}  # Papel -> SSLContext (a retomada de sessão exige o mesmo contexto).
+_sessions = {}  # (endereço, papel) -> última SSLSession com ticket, usada para retomar a sessão (só neste processo).
+_udp_mac = None
+_enabled = None
+_socket_class = None
+_sender_id = None   # ID de remetente deste processo (8 bytes aleatórios).
+_counter = None     # Contador dos datagramas assinados por este processo.
+_replay = {}        # ID de remetente -> [maior contador visto, bitmap dos contadores recentes, última recepção].
+_replay_lock = threading.Lock()
+_replay_pruned = 0.0
+
+
+def cert_path(name):
+    return os.path.join(CERT_DIR, name)
+
+
+def security_enabled():
+    """Indica se os certificados foram instalados (e, portanto, se os canais são protegidos). Verificado uma vez."""
+    global _enabled
+    if _enabled is None:
+        _enabled = os.path.exists(cert_path("ca.crt"))
+    return _enabled
+
+
+def _resumable_socket_class():
+    """Cria (no primeiro uso, para não carregar o ssl antes) a classe de socket TLS dos dispositivos e clientes."""
+    global _socket_class
+    if _socket_class is None:
+        class ResumableSSLSocket(ssl.SSLSocket):
+            """SSLSocket que guarda a sessão TLS ao ser fechado, para retomá-la na próxima conexão."""
+
+            session_key = None
+
+            def close(self):
+                try:
+                    session = self.session
+                    if self.session_key is not None and session is not None and session.has_ticket:
+                        _sessions[self.session_key] = session
+                except (OSError, ValueError):
+                    pass
+                super().close()
+
+        _socket_class = ResumableSSLSocket
+    return _socket_class
+
+
+def _context(role):
+    context = _contexts.get(role)
+    if context is None:
+        if role == ROLE_GATEWAY:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.verify_mode = ssl.CERT_REQUIRED
+        else:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            # O IP do Gateway é dinâmico; a identidade é garantida pela CA, não pelo nome.
+            context.check_hostname = False
+            context.sslsocket_class = _resumable_socket_class()
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        context.load_verify_locations(cert_path("ca.crt"))
+        context.load_cert_chain(cert_path(f"{role}.crt"), cert_path(f"{role}.key"))
+        _contexts[role] = context
+    return context
+
+
+def prepare(role):
+    """Carrega o TLS, os certificados do papel e a chave UDP antes da primeira conexão (se houver certificados)."""
+    if security_enabled():
+        _context(role)
+        _mac()
+
+
+def peer_role(tls_sock):
+    """Retorna o papel (campo OU) do certificado apresentado pelo outro lado."""
+    certificate = tls_sock.getpeercert() or {}
+    for rdn in certificate.get("subject", ()):
+        for key, value in rdn:
+            if key == "organizationalUnitName":
+                return value
+    return None
+
+
+def peer_names(tls_sock):
+    """Retorna os nomes do certificado apresentado pelo outro lado: o CN e os nomes DNS do subjectAltName."""
+    certificate = tls_sock.getpeercert() or {}
+    names = [value for rdn in certificate.get("subject", ()) for key, value in rdn if key == "commonName"]
+    names += [value for kind, value in certificate.get("subjectAltName", ()) if kind == "DNS"]
+    return names
+
+
+def name_matches(names, device_id):
+    """Indica se o ID corresponde a um dos nomes (com curingas no estilo do shell, como "lamp_*")."""
+    return any(fnmatch.fnmatchcase(device_id, name) for name in names)
+
+
+def peer_owns_id(conn, device_id):
+    """Indica se o certificado do outro lado autoriza o ID declarado. Sem certificados, qualquer ID vale."""
+    if not security_enabled():
+        return True
+    return bool(device_id) and name_matches(peer_names(conn), device_id)
+
+
+def connect_secure(address, role, source_address=None):
+    """
+    Abre uma conexão TCP com o Gateway, protegida por TLS se os certificados existirem.
+
+    Se houver uma sessão anterior com o mesmo Gateway, ela é retomada, o que
+    evita a troca de chaves e a verificação de certificados completas.
+    'source_address' escolhe o endereço local (por exemplo, nos benchmarks).
+    """
+    sock = socket.create_connection(address, source_address=source_address)
+    if not security_enabled():
+        return sock
+    session_key = (address, role)
+    try:
+        tls_sock = _context(role).wrap_socket(sock, session=_sessions.get(session_key))
+    except Exception:
+        sock.close()
+        raise
+    tls_sock.session_key = session_key
+    if peer_role(tls_sock) != ROLE_GATEWAY:
+        tls_sock.close()
+        raise ssl.SSLError("O servidor não apresentou um certificado de Gateway.")
+    return tls_sock
+
+
+def accept_secure(conn, expected_role):
+    """
+    Completa o handshake TLS de uma conexão aceita pelo Gateway e confere o papel do outro lado
+    ('expected_role' é um papel ou uma tupla com os papéis aceitos na porta).
+
+    Retorna a conexão protegida (ou a própria conexão, sem certificados).
+    Lança ssl.SSLError ou PermissionError se a conexão não puder ser autenticada.
+    """
+    if not security_enabled():
+        return conn
+    conn.settimeout(HANDSHAKE_TIMEOUT)
+    tls_conn = _context(ROLE_GATEWAY).wrap_socket(conn, server_side=True)
+    tls_conn.settimeout(None)
+    role = peer_role(tls_conn)
+    allowed = (expected_role,) if isinstance(expected_role, str) else expected_role
+    if role not in allowed:
+        tls_conn.close()
+        raise PermissionError(f"certificado com papel '{role}' na porta de '{'/'.join(allowed)}'")
+    return tls_conn
+
+
+def _mac():
+    """Retorna o HMAC já inicializado com a chave UDP; cada datagrama usa uma cópia dele."""
+    global _udp_mac
+    if _udp_mac is None:
+        with open(cert_path("udp.key")) as key_file:
+            key = bytes.fromhex(key_file.read().strip())
+        _udp_mac = hmac.new(key, digestmod=hashlib.sha256)
+    return _udp_mac
+
+
+def _new_sender():
+    """Sorteia o ID de remetente e recomeça o contador; roda na importação e em cada processo filho (fork)."""
+    global _sender_id, _counter
+    _sender_id = os.urandom(8)
+    _counter = itertools.count(1)
+
+
+_new_sender()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_new_sender)
+
+
+def _accept_counter(sender, counter, now):
+    """
+    Registra o contador de um remetente, como a janela antirrepetição do IPsec.
+
+    Retorna False se o contador já foi visto ou ficou para trás da janela.
+    """
+    global _replay_pruned
+    with _replay_lock:
+        if now - _replay_pruned > UDP_MAX_AGE_SECONDS:
+            # Um remetente sem datagramas há duas idades máximas não pode ter datagramas reenviados
+            # aceitos (nem com o relógio adiantado): o instante assinado já os rejeita.
+            for stale in [key for key, state in _replay.items() if now - state[2] > 2 * UDP_MAX_AGE_SECONDS]:
+                del _replay[stale]
+            _replay_pruned = now
+        state = _replay.get(sender)
+        if state is None:
+            _replay[sender] = [counter, 1, now]
+            return True
+        highest, seen = state[0], state[1]
+        if counter > highest:
+            shift = counter - highest
+            state[0] = counter
+            state[1] = 1 if shift >= UDP_REPLAY_WINDOW else (seen << shift | 1) & ((1 << UDP_REPLAY_WINDOW) - 1)
+        else:
+            offset = highest - counter
+            if offset >= UDP_REPLAY_WINDOW or seen >> offset & 1:
+                return False
+            state[1] = seen | 1 << offset
+        state[2] = now
+        return True
+
+
+def seal_datagram(payload):
+    """Acrescenta remetente, contador, instante e assinatura a um datagrama UDP (sem certificados, não altera nada)."""
+    if not security_enabled():
+        return payload
+    data = payload + UDP_TRAILER.pack(_sender_id, next(_counter), time.time_ns() // 1_000_000)
+    mac = _mac().copy()
+    mac.update(data)
+    return data + mac.digest()[:UDP_TAG_SIZE]
+
+
+def open_datagram(data):
+    """
+    Confere a assinatura, o instante e o contador de um datagrama UDP.
+
+    Retorna o payload original, ou None se o datagrama for inválido, antigo, forjado ou repetido.
+    """
+    if not security_enabled():
+        return data
+    if len(data) < UDP_TRAILER.size + UDP_TAG_SIZE:
+        return None
+    signed, tag = data[:-UDP_TAG_SIZE], data[-UDP_TAG_SIZE:]
+    mac = _mac().copy()
+    mac.update(signed)
+    if not hmac.compare_digest(mac.digest()[:UDP_TAG_SIZE], tag):
+        return None
+    sender, counter, sent_ms = UDP_TRAILER.unpack_from(signed, len(signed) - UDP_TRAILER.size)
+    now = time.time()
+    if abs(now - sent_ms / 1000) > UDP_MAX_AGE_SECONDS or not _accept_counter(sender, counter, now):
+        return None
+    return signed[:-UDP_TRAILER.size]
+
+
+def generate_certificates(cert_dir):
+    """
+    Gera, com o utilitário openssl, uma CA local e certificados ECDSA P-256 para
+    o Gateway, os dispositivos, os clientes e os administradores, além da chave UDP.
+    Apenas para testes.
+
+    O certificado de dispositivo, compartilhado pelos simuladores, autoriza os
+    IDs de TEST_DEVICE_NAMES; em produção, cada dispositivo tem o seu, com o
+    próprio ID no CN.
+    """
+    os.makedirs(cert_dir, exist_ok=True)
+
+    def openssl(*args):
+        subprocess.run(["openssl", *args], check=True, capture_output=True)
+
+    def path(name):
+        return os.path.join(cert_dir, name)
+
+    openssl("ecparam", "-name", "prime256v1", "-genkey", "-noout", "-out", path("ca.key"))
+    openssl("req", "-x509", "-new", "-key", path("ca.key"), "-subj", "/O=CidadeInteligente/CN=CA local",
+            "-days", "3650", "-out", path("ca.crt"))
+    for role in (ROLE_GATEWAY, ROLE_DEVICE, ROLE_CLIENT, ROLE_ADMIN):
+        openssl("ecparam", "-name", "prime256v1", "-genkey", "-noout", "-out", path(f"{role}.key"))
+        openssl("req", "-new", "-key", path(f"{role}.key"), "-subj", f"/O=CidadeInteligente/OU={role}/CN={role}",
+                "-out", path(f"{role}.csr"))
+        extensions = []
+        if role == ROLE_DEVICE:
+            with open(path("device.ext"), "w") as ext_file:
+                ext_file.write("subjectAltName = " + ", ".join(f"DNS:{name}" for name in TEST_DEVICE_NAMES) + "\n")
+            extensions = ["-extfile", path("device.ext")]
+        openssl("x509", "-req", "-in", path(f"{role}.csr"), "-CA", path("ca.crt"), "-CAkey", path("ca.key"),
+                "-CAcreateserial", "-days", "3650", "-out", path(f"{role}.crt"), *extensions)
+        os.remove(path(f"{role}.csr"))
+        if extensions:
+            os.remove(path("device.ext"))
+    with open(path("udp.key"), "w") as key_file:
+        key_file.write(os.urandom(32).hex())
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["certs"]:
+        sys.exit("Uso: python -m src.common.security certs")
+    generate_certificates(CERT_DIR)
+    print(f"Certificados de teste gerados em {CERT_DIR}/.")
@@ -0,0 +1,83 @@
+# src/common/startup.py
+import importlib
+import threading
+import time
+
+# --- Inicialização rápida ---
+# Mede as fases da inicialização de cada programa (Gateway, dispositivos,
+# cliente) e permite adiar módulos pesados, como o código gerado pelo
+# protobuf (dezenas de milissegundos), até o primeiro uso. O Gateway abre as
+# portas antes de carregá-los e os carrega em segundo plano em seguida.
+#
+# Os tempos são contados a partir da importação deste módulo, que acontece
+# junto com as primeiras importações de cada programa.
+
+_started = time.perf_counter()
+_last = _started
+_phases = []       # (fase, milissegundos) na ordem em que terminaram.
+_reported = False
+_lock = threading.Lock()
+
+
+def mark(phase):
+    """Registra o fim de uma fase da inicialização."""
+    global _last
+    with _lock:
+        now = time.perf_counter()
+        _phases.append((phase, (now - _last) * 1000))
+        _last = now
+
+
+def elapsed_ms():
+    return (time.perf_counter() - _started) * 1000
+
+
+def report(program):
+    """Mostra o tempo total até o programa ficar pronto e o tempo de cada fase."""
+    global _reported
+    with _lock:
+        phases = ", ".join(f"{phase} {ms:.1f} ms" for phase, ms in _phases)
+        _reported = True
+    print(f"[INÍCIO] {program} pronto em {elapsed_ms():.1f} ms ({phases}).")
+
+
+class LazyModule:
+    """
+    Substituto de um módulo que só é importado no primeiro acesso a um atributo.
+
+    Depois de carregado, os atributos do módulo são copiados para o substituto,
+    e os acessos seguintes custam o mesmo que em um módulo comum.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_load_lock"] = threading.Lock()
+
+    def load(self):
+        """Importa o módulo agora (por exemplo, em segundo plano, antes do primeiro uso)."""
+        with self._load_lock:
+            if "__name__" in self.__dict__:
+                return
+            started = time.perf_counter()
+            module = importlib.import_module(self._name)
+            self.__dict__.update(module.__dict__)
+            load_ms = (time.perf_counter() - started) * 1000
+        if _reported:
+            print(f"[INÍCIO] {self._name} carregado em {load_ms:.1f} ms (em segundo plano).")
+        else:
+            mark(self._name)
+
+    def __getattr__(self, name):
+        # Só é chamado enquanto o módulo não foi carregado (ou para atributos inexistentes).
+        if "__name__" not in self.__dict__:
+            self.load()
+            return getattr(self, name)
+        raise AttributeError(f"module '{self._name}' has no attribute '{name}'")
+
+
+def prewarm(*tasks):
+    """Executa as tarefas (carregar módulos, preparar o TLS) em uma thread, sem atrasar a inicialização."""
+    def run():
+        for task in tasks:
+            task()
+    threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,131 @@
+# src/common/streaming.py
+import socket
+import struct
+from src.common.framing import recv_exact_into
+
+# --- Canal de streaming de quadros das câmeras ---
+# Depois da StreamHello, a conexão transporta apenas blocos binários. Cada
+# quadro é dividido em blocos de até CHUNK_SIZE bytes, e cada bloco é precedido
+# por um cabeçalho fixo:
+#   frame_id (uint32) | timestamp_us (uint64) | chunk_index (uint16) |
+#   chunk_count (uint16) | payload_length (uint32)
+CHUNK_HEADER = struct.Struct("!IQHHI")
+CHUNK_SIZE = 64 * 1024
+
+# Tamanho de um quadro bruto YUV 4:2:0 (1,5 byte por pixel) em cada resolução da câmera.
+FRAME_SIZES = {
+    "HD": 1280 * 720 * 3 // 2,
+    "FullHD": 1920 * 1080 * 3 // 2,
+    "4K": 3840 * 2160 * 3 // 2,
+}
+
+# O sendmsg() envia cabeçalho e dados em uma única chamada sem concatená-los,
+# mas não existe no Windows nem nas conexões TLS (ssl.SSLSocket); nesses casos,
+# os dois trechos são enviados em sequência.
+HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+
+def send_chunk(sock, header, payload):
+    """Envia um cabeçalho já empacotado seguido do payload (ambos buffers), sem copiá-los."""
+    if not HAS_SENDMSG or type(sock).sendmsg is not socket.socket.sendmsg:
+        sock.sendall(header)
+        sock.sendall(payload)
+        return
+    total = len(header) + len(payload)
+    sent = sock.sendmsg([header, payload])
+    if sent < total:
+        # Envio parcial: completa o restante com sendall a partir do ponto em que parou.
+        if sent < len(header):
+            sock.sendall(memoryview(header)[sent:])
+            sock.sendall(payload)
+        else:
+            sock.sendall(memoryview(payload)[sent - len(header):])
+
+
+def send_frame(sock, frame_id, frame, timestamp_us):
+    """Divide um quadro (bytes, bytearray ou memoryview) em blocos e os envia."""
+    view = memoryview(frame)
+    chunk_count = max(1, (len(view) + CHUNK_SIZE - 1) // CHUNK_SIZE)
+    header = bytearray(CHUNK_HEADER.size)
+    for chunk_index in range(chunk_count):
+        payload = view[chunk_index * CHUNK_SIZE:(chunk_index + 1) * CHUNK_SIZE]
+        CHUNK_HEADER.pack_into(header, 0, frame_id, timestamp_us, chunk_index, chunk_count, len(payload))
+        send_chunk(sock, header, payload)
+
+
+class ChunkReader:
+    """
+    Lê blocos de um socket reaproveitando sempre os mesmos buffers.
+
+    O payload retornado por read() é um memoryview sobre um buffer interno,
+    válido apenas até a próxima leitura; é assim que o Gateway repassa os
+    blocos aos assinantes sem copiar os dados.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.header = bytearray(CHUNK_HEADER.size)
+        self.header_view = memoryview(self.header)
+        self.payload = bytearray(CHUNK_SIZE)
+        self.payload_view = memoryview(self.payload)
+
+    def read(self):
+        """Retorna (frame_id, timestamp_us, chunk_index, chunk_count, payload) ou None se a conexão fechar."""
+        if not recv_exact_into(self.sock, self.header_view):
+            return None
+        frame_id, timestamp_us, chunk_index, chunk_count, length = CHUNK_HEADER.unpack_from(self.header)
+        if length > CHUNK_SIZE:
+            raise ValueError(f"Bloco de {length} bytes excede o limite de {CHUNK_SIZE} bytes.")
+        payload = self.payload_view[:length]
+        if not recv_exact_into(self.sock, payload):
+            return None
+        return frame_id, timestamp_us, chunk_index, chunk_count, payload
+
+
+class FrameReceiver:
+    """
+    Remonta quadros completos no lado do assinante.
+
+    Cada bloco é lido diretamente para a sua posição em um único buffer de
+    quadro, que só cresce quando chega um quadro maior que os anteriores.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.header = bytearray(CHUNK_HEADER.size)
+        self.header_view = memoryview(self.header)
+        self.frame = bytearray()
+        self.frame_view = memoryview(self.frame)
+
+    def read_frame(self):
+        """Retorna (frame_id, timestamp_us, quadro como memoryview) ou None se a conexão fechar."""
+        size = 0
+        expected_index = 0
+        expected_count = None
+        while True:
+            if not recv_exact_into(self.sock, self.header_view):
+                return None
+            frame_id, timestamp_us, chunk_index, chunk_count, length = CHUNK_HEADER.unpack_from(self.header)
+            # O cabeçalho vem da rede: ele não pode fazer o buffer crescer além do quadro anunciado.
+            if length > CHUNK_SIZE:
+                raise ValueError(f"Bloco de {length} bytes excede o limite de {CHUNK_SIZE} bytes.")
+            if chunk_count == 0:
+                raise ValueError(f"Quadro {frame_id} anunciado sem blocos.")
+            if expected_count is None:
+                expected_count = chunk_count
+            elif chunk_count != expected_count:
+                raise ValueError(f"Bloco {chunk_index} do quadro {frame_id} anuncia {chunk_count} blocos, e não {expected_count}.")
+            if chunk_index != expected_index:
+                raise ValueError(f"Bloco {chunk_index} fora de ordem no quadro {frame_id}.")
+            needed = chunk_count * CHUNK_SIZE
+            if len(self.frame) < needed:
+                # Um buffer novo é alocado (em vez de redimensionar o atual) porque
+                # o quadro anterior ainda pode estar em uso por quem chamou.
+                self.frame = bytearray(needed)
+                self.frame_view = memoryview(self.frame)
+            if not recv_exact_into(self.sock, self.frame_view[size:size + length]):
+                return None
+            size += length
+            expected_index += 1
+            if expected_index == chunk_count:
+                return frame_id, timestamp_us, self.frame_view[:size]
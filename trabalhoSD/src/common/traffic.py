@@ -0,0 +1,38 @@
+# src/common/traffic.py
+from generated import smart_city_pb2
+
+# --- Ciclo de fases dos semáforos ---
+# O ciclo é VERDE -> AMARELO -> VERMELHO. A fase de um semáforo é função
+# apenas do relógio, de um instante de referência ('anchor', em segundos
+# desde a época) e do deslocamento ('offset') do semáforo; assim o Gateway
+# coordena vários cruzamentos enviando só esses parâmetros, e consegue
+# calcular a fase esperada de cada semáforo sem consultá-lo.
+
+
+def cycle_length(green, yellow, red):
+    return green + yellow + red
+
+
+def phase_at(now, anchor, offset, green, yellow, red):
+    """
+    Retorna (fase, segundos até a próxima troca) no instante 'now'.
+
+    No instante anchor + offset o semáforo começa uma fase verde.
+    """
+    position = (now - anchor - offset) % cycle_length(green, yellow, red)
+    if position < green:
+        return smart_city_pb2.GREEN, green - position
+    if position < green + yellow:
+        return smart_city_pb2.YELLOW, green + yellow - position
+    return smart_city_pb2.RED, cycle_length(green, yellow, red) - position
+
+
+def green_wave_offsets(distances_m, speed_kmh, cycle):
+    """
+    Calcula o deslocamento de cada semáforo para formar uma onda verde.
+
+    Cada semáforo abre quando um veículo que passou pelo primeiro no início do
+    verde chega até ele, andando na velocidade informada.
+    """
+    speed_ms = speed_kmh / 3.6
+    return [(distance / speed_ms) % cycle for distance in distances_m]
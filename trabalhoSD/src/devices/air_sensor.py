@@ -2,20 +2,24 @@
 import socket
 import threading
 import time
+import os
 import uuid
 import random
 from generated import smart_city_pb2
+from src.common import startup
+from src.common.discovery import gateway_announcements
+from src.common.framing import send_message
+from src.common.security import ROLE_DEVICE, connect_secure, seal_datagram
 
 # --- Configurações ---
 # Gera um ID único para este dispositivo.
 DEVICE_ID = f"airq_{uuid.uuid4().hex[:6]}"
 # Define o tipo do dispositivo a partir do enum do Protocol Buffers.
 DEVICE_TYPE = smart_city_pb2.DeviceType.Value('AIR_SENSOR')
+# Grupo (zona) do dispositivo, usado pelo Gateway para agregar as leituras.
+DEVICE_GROUP = os.environ.get("DEVICE_GROUP", "default")
 # A porta UDP do Gateway para onde os status serão enviados.
-GATEWAY_UDP_PORT = 10001
-# Constantes para a comunicação multicast de descoberta.
-MULTICAST_GROUP = "224.1.1.1"
-MULTICAST_PORT = 5007
+GATEWAY_UDP_PORT = int(os.environ.get("GATEWAY_UDP_PORT", 10001))
 
 # A função de envio de status agora precisa receber o IP do Gateway, pois ele é descoberto dinamicamente.
 def send_status_updates(udp_socket, gateway_ip):
@@ -34,10 +38,12 @@ def send_status_updates(udp_socket, gateway_ip):
         status = wrapper_msg.status_update
         status.device_id = DEVICE_ID
         status.state_info = f"PPM: {air_quality_ppm}"
+        # Envia também o valor numérico para que o Gateway possa agregá-lo.
+        status.metrics["ppm"] = air_quality_ppm
         
         # Usa o IP do Gateway (descoberto dinamicamente) para enviar os dados via UDP.
         # UDP é "sem conexão", então cada envio especifica o destino.
-        udp_socket.sendto(wrapper_msg.SerializeToString(), (gateway_ip, GATEWAY_UDP_PORT))
+        udp_socket.sendto(seal_datagram(wrapper_msg.SerializeToString()), (gateway_ip, GATEWAY_UDP_PORT))
         print(f"Enviado status: Qualidade do Ar = {air_quality_ppm:.2f} PPM para {gateway_ip}")
         # Pausa de 15 segundos antes de enviar o próximo status.
         time.sleep(15)
@@ -48,57 +54,42 @@ def discover_gateway_and_connect():
     Escuta por anúncios do Gateway na rede para se registrar e, em seguida,
     inicia o envio periódico de status via UDP.
     """
-    # Configura um socket para escutar por mensagens multicast na rede.
-    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    multicast_socket.bind(("", MULTICAST_PORT))
-    group = socket.inet_aton(MULTICAST_GROUP)
-    mreq = group + socket.inet_aton("0.0.0.0")
-    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
-    
     print(f"Sensor de Qualidade do Ar ({DEVICE_ID}) aguardando anúncio do Gateway...")
     
     # Loop infinito para aguardar o anúncio do Gateway.
-    while True:
-        # Fica bloqueado aqui até receber uma mensagem multicast.
-        data, address = multicast_socket.recvfrom(1024)
-        
-        # Decodifica a mensagem recebida.
-        wrapper_msg = smart_city_pb2.WrapperMessage()
-        wrapper_msg.ParseFromString(data)
-        
-        # Verifica se a mensagem é um anúncio do Gateway.
-        if wrapper_msg.HasField("gateway_info"):
-            gateway_info = wrapper_msg.gateway_info
-            discovered_ip = gateway_info.ip_address
-            discovered_port = gateway_info.device_tcp_port
-            print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Registrando...")
+    for gateway_info in gateway_announcements():
+        discovered_ip = gateway_info.ip_address
+        discovered_port = gateway_info.device_tcp_port
+        print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Registrando...")
 
-            try:
-                # Inicia uma CONEXÃO TCP TEMPORÁRIA apenas para se registrar.
-                tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                tcp_socket.connect((discovered_ip, discovered_port))
-                
-                # Monta e envia a mensagem de registro (DeviceInfo).
-                register_msg = smart_city_pb2.WrapperMessage()
-                info = register_msg.device_info
-                info.id = DEVICE_ID
-                info.type = DEVICE_TYPE
-                tcp_socket.send(register_msg.SerializeToString())
-                print("--> SUCESSO: Registrado no Gateway.")
-                # Fecha a conexão TCP, pois o sensor não precisa receber comandos.
-                tcp_socket.close() 
-                
-                # Após o registro, inicia a thread que enviará os dados de status via UDP.
-                # Passa o IP descoberto do Gateway para a função de envio.
-                update_thread = threading.Thread(target=send_status_updates, args=(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), discovered_ip), daemon=True)
-                update_thread.start()
-                # Sai do loop de descoberta, pois o registro foi bem-sucedido.
-                break
-            except Exception as e:
-                # Se o registro falhar, imprime o erro e aguarda o próximo anúncio.
-                print(f"Falha ao registrar no Gateway: {e}")
-                time.sleep(5)
+        try:
+            # Inicia uma CONEXÃO TCP TEMPORÁRIA apenas para se registrar.
+            # A conexão é protegida por TLS (com certificado de dispositivo) quando os certificados existem.
+            tcp_socket = connect_secure((discovered_ip, discovered_port), ROLE_DEVICE)
+            
+            # Monta e envia a mensagem de registro (DeviceInfo).
+            register_msg = smart_city_pb2.WrapperMessage()
+            info = register_msg.device_info
+            info.id = DEVICE_ID
+            info.type = DEVICE_TYPE
+            info.group = DEVICE_GROUP
+            send_message(tcp_socket, register_msg)
+            print("--> SUCESSO: Registrado no Gateway.")
+            startup.mark("registro")
+            startup.report(DEVICE_ID)
+            # Fecha a conexão TCP, pois o sensor não precisa receber comandos.
+            tcp_socket.close() 
+            
+            # Após o registro, inicia a thread que enviará os dados de status via UDP.
+            # Passa o IP descoberto do Gateway para a função de envio.
+            update_thread = threading.Thread(target=send_status_updates, args=(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), discovered_ip), daemon=True)
+            update_thread.start()
+            # Sai do loop de descoberta, pois o registro foi bem-sucedido.
+            break
+        except Exception as e:
+            # Se o registro falhar, imprime o erro e aguarda o próximo anúncio.
+            print(f"Falha ao registrar no Gateway: {e}")
+            time.sleep(5)
 
 # Ponto de entrada do script.
 if __name__ == "__main__":
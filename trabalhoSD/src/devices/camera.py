@@ -1,43 +1,93 @@
 # src/devices/camera.py
 import socket
 import threading
+import os
 import time
 import uuid
 from generated import smart_city_pb2
+from src.common import config, startup
+from src.common.discovery import gateway_announcements
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_DEVICE, connect_secure, seal_datagram
+from src.common.streaming import FRAME_SIZES, send_frame
 
 # --- Configurações ---
 # Define um ID e tipo únicos para o dispositivo.
 DEVICE_ID = f"cam_{uuid.uuid4().hex[:6]}"
 DEVICE_TYPE = smart_city_pb2.DeviceType.Value('CAMERA')
-# Constantes para a comunicação multicast de descoberta.
-MULTICAST_GROUP = "224.1.1.1"
-MULTICAST_PORT = 5007
+# Grupo (zona) do dispositivo, usado pelo Gateway para agregar as leituras.
+DEVICE_GROUP = os.environ.get("DEVICE_GROUP", "default")
+GATEWAY_UDP_PORT = int(os.environ.get("GATEWAY_UDP_PORT", 10001))
+CAMERA_FPS = 5 # Quadros por segundo enviados enquanto a câmera está ligada.
+REGISTRATION_TIMEOUT = 10 # Segundos de espera pela confirmação do registro.
+STREAM_RETRY_SECONDS = 1 # Espera inicial antes de reabrir o canal de streaming; dobra a cada falha...
+STREAM_MAX_RETRY_SECONDS = 30 # ...até este limite.
 
 # --- Estado do Dispositivo ---
 # Variáveis que armazenam o estado atual da câmera.
 is_on = False
 resolution = "HD" # Estado inicial da resolução.
+RESOLUTIONS = tuple(FRAME_SIZES) # Resoluções suportadas pela câmera.
+
+def build_config_schema():
+    """Declara as configurações aceitas pela câmera, enviadas ao Gateway no registro."""
+    schema = smart_city_pb2.ConfigSchema()
+    config.add_field(schema, "is_on", smart_city_pb2.CONFIG_BOOL, description="Liga ou desliga a câmera")
+    config.add_field(schema, "resolution", smart_city_pb2.CONFIG_STRING,
+                     allowed_values=RESOLUTIONS, description="Resolução de captura")
+    return schema
+
+CONFIG_SCHEMA = build_config_schema()
+
+def current_config():
+    """Retorna as configurações em vigor, informadas ao Gateway no registro e depois de cada comando."""
+    return {"is_on": is_on, "resolution": resolution}
+
+def report_state(udp_socket, gateway_ip):
+    """Envia o estado atual da câmera ao Gateway via UDP, para que ele confirme o comando recebido."""
+    wrapper_msg = smart_city_pb2.WrapperMessage()
+    status = wrapper_msg.status_update
+    status.device_id = DEVICE_ID
+    status.is_on = is_on
+    config.fill_update(status.reported_config, current_config())
+    udp_socket.sendto(seal_datagram(wrapper_msg.SerializeToString()), (gateway_ip, GATEWAY_UDP_PORT))
+
+def apply_config(config_update):
+    """
+    Aplica uma ConfigUpdate de forma atômica.
+
+    O Gateway já valida a atualização, mas a câmera valida novamente: se
+    qualquer valor for inválido, nenhuma configuração é alterada.
+    """
+    global is_on, resolution
+    errors = config.validate_update(CONFIG_SCHEMA, config_update)
+    if errors:
+        print(f"Configuração rejeitada: {'; '.join(errors)}")
+        return
+    values = config.to_dict(config_update)
+    is_on = values.get("is_on", is_on)
+    resolution = values.get("resolution", resolution)
+    print(f"--> Comando 'config' recebido! Câmera {'LIGADA' if is_on else 'DESLIGADA'}, resolução {resolution}.")
 
 def listen_for_commands(tcp_socket):
     """
     Escuta por comandos do Gateway na conexão TCP persistente.
 
     Esta função roda em uma thread dedicada após a conexão ser estabelecida.
-    Ela processa os comandos recebidos para alterar o estado da câmera.
+    Ela processa os comandos recebidos para alterar o estado da câmera e,
+    depois de cada um, informa ao Gateway o estado resultante.
     """
-    global is_on, resolution
+    global is_on
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    gateway_ip = tcp_socket.getpeername()[0]
     try:
         # Loop infinito para continuar recebendo comandos.
         while True:
-            # Fica bloqueado aqui, aguardando dados do Gateway.
-            data = tcp_socket.recv(1024)
-            if not data:
+            # Fica bloqueado aqui, aguardando a próxima mensagem do Gateway.
+            wrapper_msg = recv_message(tcp_socket)
+            if wrapper_msg is None:
                 print("Conexão com o Gateway perdida.")
                 break
-                
-            # Decodifica a mensagem recebida com Protocol Buffers.
-            wrapper_msg = smart_city_pb2.WrapperMessage()
-            wrapper_msg.ParseFromString(data)
             
             # Verifica se a mensagem é um comando e se é para este dispositivo.
             if wrapper_msg.HasField("command"):
@@ -48,81 +98,125 @@ def listen_for_commands(tcp_socket):
                         is_on = not is_on
                         print(f"--> Comando 'toggle' recebido! Câmera agora está {'LIGADA' if is_on else 'DESLIGADA'}.")
                     
-                    # Lida com o comando 'new_config' para alterar outras configurações.
-                    if cmd.HasField("new_config"):
-                        # Tenta processar a string de configuração (ex: "resolution:FullHD").
-                        try:
-                            # Divide a string em chave e valor.
-                            key, value = cmd.new_config.split(':')
-                            if key.lower() == "resolution":
-                                resolution = value
-                                print(f"--> Comando 'config' recebido! Resolução alterada para {resolution}.")
-                            else:
-                                print(f"Configuração desconhecida: {key}")
-                        except ValueError:
-                            # Erro caso a string não esteja no formato esperado.
-                            print(f"Formato de configuração inválido recebido: {cmd.new_config}")
+                    # Lida com o comando 'config_update' para alterar as configurações.
+                    if cmd.HasField("config_update"):
+                        apply_config(cmd.config_update)
+                    report_state(udp_socket, gateway_ip)
 
     except ConnectionResetError:
         print("Conexão com o Gateway foi resetada.")
     except Exception as e:
         print(f"Erro ao receber comando: {e}")
     finally:
-        # Garante que o socket seja fechado ao final.
+        # Garante que os sockets sejam fechados ao final.
         tcp_socket.close()
+        udp_socket.close()
+
+def stream_frames(gateway_ip, stream_port):
+    """
+    Transmite quadros ao Gateway pelo canal de streaming enquanto a câmera está ligada.
+
+    Há um único buffer por resolução, criado na primeira vez que é usado e
+    reaproveitado em todos os quadros seguintes; o envio em blocos lê
+    diretamente desse buffer. Se o canal cair (ou o Gateway recusá-lo), ele é
+    reaberto, com uma espera que dobra a cada falha seguida.
+    """
+    frame_buffers = {}
+    frame_id = 0
+    retry = STREAM_RETRY_SECONDS
+    while True:
+        stream_socket = None
+        try:
+            stream_socket = connect_secure((gateway_ip, stream_port), ROLE_DEVICE)
+            hello_msg = smart_city_pb2.WrapperMessage()
+            hello_msg.stream_hello.device_id = DEVICE_ID
+            hello_msg.stream_hello.role = smart_city_pb2.PUBLISHER
+            send_message(stream_socket, hello_msg)
+            print(f"--> Canal de streaming aberto na porta {stream_port}.")
+
+            while True:
+                if not is_on:
+                    time.sleep(0.5)
+                    continue
+                started = time.perf_counter()
+                current_resolution = resolution
+                frame = frame_buffers.get(current_resolution)
+                if frame is None:
+                    frame = bytearray(FRAME_SIZES[current_resolution])
+                    frame_buffers[current_resolution] = frame
+                # Simula o conteúdo do quadro gravando o seu número no início do buffer.
+                frame[:4] = frame_id.to_bytes(4, "big")
+                send_frame(stream_socket, frame_id, frame, time.time_ns() // 1000)
+                frame_id = (frame_id + 1) % 2**32
+                # O canal está funcionando: a próxima falha volta a esperar o mínimo.
+                retry = STREAM_RETRY_SECONDS
+                time.sleep(max(0.0, 1 / CAMERA_FPS - (time.perf_counter() - started)))
+        except Exception as e:
+            print(f"Canal de streaming encerrado: {e}. Nova tentativa em {retry} s.")
+        finally:
+            if stream_socket is not None:
+                stream_socket.close()
+        time.sleep(retry)
+        retry = min(retry * 2, STREAM_MAX_RETRY_SECONDS)
+
+def wait_for_registration_ack(tcp_socket):
+    """Aguarda o Gateway confirmar o registro; levanta ConnectionError se a confirmação não chegar."""
+    tcp_socket.settimeout(REGISTRATION_TIMEOUT)
+    try:
+        wrapper_msg = recv_message(tcp_socket)
+    finally:
+        tcp_socket.settimeout(None)
+    if wrapper_msg is None or wrapper_msg.registration_ack.device_id != DEVICE_ID:
+        raise ConnectionError("o Gateway não confirmou o registro")
 
 def discover_gateway_and_connect():
     """
     Escuta por anúncios do Gateway na rede para se registrar e, em seguida,
     mantém a conexão para receber comandos.
     """
-    # Configura o socket para escutar por mensagens multicast.
-    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    multicast_socket.bind(("", MULTICAST_PORT))
-    group = socket.inet_aton(MULTICAST_GROUP)
-    mreq = group + socket.inet_aton("0.0.0.0")
-    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
-    
     print(f"Câmera ({DEVICE_ID}) aguardando anúncio do Gateway...")
     
     # Loop de descoberta.
-    while True:
-        data, address = multicast_socket.recvfrom(1024)
-        wrapper_msg = smart_city_pb2.WrapperMessage()
-        wrapper_msg.ParseFromString(data)
+    for gateway_info in gateway_announcements():
+        discovered_ip = gateway_info.ip_address
+        # Um atuador se conecta à porta de dispositivos.
+        discovered_port = gateway_info.device_tcp_port
+        print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Conectando...")
         
-        # Se receber um anúncio válido do Gateway...
-        if wrapper_msg.HasField("gateway_info"):
-            gateway_info = wrapper_msg.gateway_info
-            discovered_ip = gateway_info.ip_address
-            # Um atuador se conecta à porta de dispositivos.
-            discovered_port = gateway_info.device_tcp_port
-            print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Conectando...")
+        try:
+            # Inicia a CONEXÃO TCP PERSISTENTE para o registro e recebimento de comandos.
+            # A conexão é protegida por TLS (com certificado de dispositivo) quando os certificados existem.
+            tcp_socket = connect_secure((discovered_ip, discovered_port), ROLE_DEVICE)
             
-            try:
-                # Inicia a CONEXÃO TCP PERSISTENTE para o registro e recebimento de comandos.
-                tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                tcp_socket.connect((discovered_ip, discovered_port))
-                
-                # Envia sua mensagem de identificação.
-                register_msg = smart_city_pb2.WrapperMessage()
-                info = register_msg.device_info
-                info.id = DEVICE_ID
-                info.type = DEVICE_TYPE
-                tcp_socket.send(register_msg.SerializeToString())
-                
-                print(f"--> SUCESSO: Registrado no Gateway. Aguardando comandos.")
-                
-                # Inicia a thread que ficará escutando por comandos.
-                command_thread = threading.Thread(target=listen_for_commands, args=(tcp_socket,), daemon=True)
-                command_thread.start()
-                # Sai do loop de descoberta após o sucesso.
-                break
-            except Exception as e:
-                # Se falhar, aguarda para tentar novamente no próximo anúncio.
-                print(f"Falha ao conectar no Gateway descoberto: {e}")
-                time.sleep(5)
+            # Envia sua mensagem de identificação.
+            register_msg = smart_city_pb2.WrapperMessage()
+            info = register_msg.device_info
+            info.id = DEVICE_ID
+            info.type = DEVICE_TYPE
+            info.group = DEVICE_GROUP
+            info.config_schema.CopyFrom(CONFIG_SCHEMA)
+            config.fill_update(info.reported_config, current_config())
+            send_message(tcp_socket, register_msg)
+            # Só segue depois que o Gateway gravar o registro: antes disso, o canal de streaming seria recusado.
+            wait_for_registration_ack(tcp_socket)
+            
+            print(f"--> SUCESSO: Registrado no Gateway. Aguardando comandos.")
+            startup.mark("registro")
+            startup.report(DEVICE_ID)
+            
+            # Inicia a thread que ficará escutando por comandos.
+            command_thread = threading.Thread(target=listen_for_commands, args=(tcp_socket,), daemon=True)
+            command_thread.start()
+            # Inicia a thread que transmite os quadros, se o Gateway anunciar o canal de streaming.
+            if gateway_info.stream_tcp_port:
+                stream_thread = threading.Thread(target=stream_frames, args=(discovered_ip, gateway_info.stream_tcp_port), daemon=True)
+                stream_thread.start()
+            # Sai do loop de descoberta após o sucesso.
+            break
+        except Exception as e:
+            # Se falhar, aguarda para tentar novamente no próximo anúncio.
+            print(f"Falha ao conectar no Gateway descoberto: {e}")
+            time.sleep(5)
 
 # Ponto de entrada do script.
 if __name__ == "__main__":
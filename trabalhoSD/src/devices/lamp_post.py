@@ -1,21 +1,143 @@
 # src/devices/lamp_post.py
 import socket
 import threading
+import os
 import time
 import uuid
 from generated import smart_city_pb2
+from src.common import config, startup
+from src.common.discovery import gateway_announcements
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_DEVICE, connect_secure, open_datagram, seal_datagram
+from src.common.lighting import scheduled_level
 
 # --- Configurações ---
 # Define um ID e tipo únicos para este dispositivo.
 DEVICE_ID = f"lamp_{uuid.uuid4().hex[:6]}"
 DEVICE_TYPE = smart_city_pb2.DeviceType.Value('LAMP_POST')
+# Grupo (zona) do dispositivo, usado pelo Gateway para agregar as leituras.
+DEVICE_GROUP = os.environ.get("DEVICE_GROUP", "default")
 # As configurações do Gateway (IP, Porta TCP) foram removidas pois serão descobertas automaticamente.
 MULTICAST_GROUP = "224.1.1.1"
-MULTICAST_PORT = 5007
+LAMP_SCHEDULE_PORT = 5008  # Porta multicast em que o Gateway publica as programações dos grupos.
+GATEWAY_UDP_PORT = int(os.environ.get("GATEWAY_UDP_PORT", 10001))
+SCHEDULE_CHECK_SECONDS = 30  # Intervalo entre as avaliações da programação.
 
 # --- Estado do Dispositivo ---
 # Variável global para armazenar o estado atual do poste (ligado ou desligado).
 is_on = False
+brightness = 100  # Nível de luz quando ligado (0 a 100%).
+# Programação do grupo (LampSchedule) recebida do Gateway; None enquanto não houver nenhuma.
+schedule = None
+# Último nível determinado pela programação. Um comando manual vale até o próximo
+# nível programado ser diferente deste (por exemplo, no anoitecer seguinte).
+last_scheduled_level = None
+# Acorda a thread de controle quando o estado ou a programação mudam.
+state_changed = threading.Event()
+# Pede um relatório do estado mesmo sem mudança (depois de todo comando, para o Gateway confirmá-lo).
+report_requested = False
+
+def build_config_schema():
+    """Declara as configurações aceitas pelo poste, enviadas ao Gateway no registro."""
+    schema = smart_city_pb2.ConfigSchema()
+    config.add_field(schema, "is_on", smart_city_pb2.CONFIG_BOOL, description="Liga ou desliga o poste")
+    config.add_field(schema, "brightness", smart_city_pb2.CONFIG_INT,
+                     min_value=0, max_value=100, description="Nível de luz quando ligado (%)")
+    return schema
+
+CONFIG_SCHEMA = build_config_schema()
+
+def current_config():
+    """Retorna as configurações em vigor, informadas ao Gateway no registro e em cada relatório."""
+    return {"is_on": is_on, "brightness": brightness}
+
+def apply_config(config_update):
+    """Aplica uma ConfigUpdate de forma atômica, validando-a novamente antes."""
+    global is_on, brightness
+    errors = config.validate_update(CONFIG_SCHEMA, config_update)
+    if errors:
+        print(f"Configuração rejeitada: {'; '.join(errors)}")
+        return
+    values = config.to_dict(config_update)
+    is_on = values.get("is_on", is_on)
+    brightness = values.get("brightness", brightness)
+    state_changed.set()
+    print(f"--> Comando 'config' recebido! Poste de Luz ({DEVICE_ID}) agora está "
+          f"{'LIGADO' if is_on else 'DESLIGADO'} ({brightness}%).")
+
+def apply_schedule(new_schedule):
+    """Adota a programação do grupo recebida do Gateway (por multicast ou pela conexão TCP)."""
+    global schedule, last_scheduled_level
+    if new_schedule.group != DEVICE_GROUP:
+        return
+    if schedule is not None and schedule.version == new_schedule.version:
+        return
+    schedule = new_schedule
+    # Força a aplicação imediata do nível da nova programação.
+    last_scheduled_level = None
+    state_changed.set()
+    print(f"--> Programação v{schedule.version} do grupo {DEVICE_GROUP} recebida: noite {schedule.night_level}%, "
+          f"madrugada {schedule.late_night_level}%.")
+
+def report_state(udp_socket, gateway_ip):
+    """Envia o estado atual do poste ao Gateway via UDP."""
+    wrapper_msg = smart_city_pb2.WrapperMessage()
+    status = wrapper_msg.status_update
+    status.device_id = DEVICE_ID
+    status.lamp_state.is_on = is_on
+    status.lamp_state.brightness = brightness
+    status.lamp_state.schedule_version = schedule.version if schedule is not None else 0
+    status.metrics["brightness"] = brightness if is_on else 0
+    config.fill_update(status.reported_config, current_config())
+    udp_socket.sendto(seal_datagram(wrapper_msg.SerializeToString()), (gateway_ip, GATEWAY_UDP_PORT))
+
+def run_lamp_control(udp_socket, gateway_ip):
+    """
+    Avalia a programação localmente e reporta o estado ao Gateway sempre que ele muda.
+
+    Acorda a cada SCHEDULE_CHECK_SECONDS ou quando um comando ou uma nova
+    programação chegam. Sem mudanças de estado, nada é enviado ao Gateway.
+    """
+    global is_on, brightness, last_scheduled_level, report_requested
+    last_reported = None
+    while True:
+        if schedule is not None:
+            level = scheduled_level(schedule)
+            if level != last_scheduled_level:
+                is_on = level > 0
+                if level > 0:
+                    brightness = level
+                last_scheduled_level = level
+                print(f"--> Programação: Poste de Luz ({DEVICE_ID}) agora está "
+                      f"{'LIGADO' if is_on else 'DESLIGADO'} ({brightness}%).")
+        state = (is_on, brightness, schedule.version if schedule is not None else 0)
+        if state != last_reported or report_requested:
+            report_requested = False
+            report_state(udp_socket, gateway_ip)
+            last_reported = state
+        state_changed.wait(SCHEDULE_CHECK_SECONDS)
+        state_changed.clear()
+
+def listen_for_schedules():
+    """Recebe as programações publicadas pelo Gateway por multicast (uma mensagem por grupo)."""
+    schedule_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    schedule_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    schedule_socket.bind(("", LAMP_SCHEDULE_PORT))
+    mreq = socket.inet_aton(MULTICAST_GROUP) + socket.inet_aton("0.0.0.0")
+    schedule_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+    while True:
+        data, address = schedule_socket.recvfrom(1024)
+        # Só vale a programação assinada com a chave UDP (com os certificados instalados).
+        data = open_datagram(data)
+        if data is None:
+            continue
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        try:
+            wrapper_msg.ParseFromString(data)
+        except Exception:
+            continue
+        if wrapper_msg.HasField("lamp_schedule"):
+            apply_schedule(wrapper_msg.lamp_schedule)
 
 def listen_for_commands(tcp_socket):
     """
@@ -24,28 +146,32 @@ def listen_for_commands(tcp_socket):
     Esta função roda em uma thread dedicada e fica aguardando comandos para
     alterar o estado do poste de luz.
     """
-    global is_on
+    global is_on, report_requested
     try:
         # Loop infinito para continuar recebendo comandos enquanto a conexão estiver ativa.
         while True:
-            # Fica bloqueado aqui, esperando por dados do Gateway.
-            data = tcp_socket.recv(1024)
+            # Fica bloqueado aqui, esperando pela próxima mensagem do Gateway.
+            wrapper_msg = recv_message(tcp_socket)
             # Se não receber dados, significa que a conexão foi fechada pelo Gateway.
-            if not data:
+            if wrapper_msg is None:
                 print("Conexão com o Gateway perdida.")
                 break
             
-            # Decodifica a mensagem recebida usando Protocol Buffers.
-            wrapper_msg = smart_city_pb2.WrapperMessage()
-            wrapper_msg.ParseFromString(data)
-            
             # Verifica se a mensagem é um comando e se é para este dispositivo específico.
             if wrapper_msg.HasField("command"):
                 cmd = wrapper_msg.command
                 if cmd.device_id == DEVICE_ID and cmd.HasField("toggle"):
                     # Inverte o estado booleano 'is_on'.
                     is_on = not is_on
+                    report_requested = True
+                    state_changed.set()
                     print(f"--> Comando recebido! Poste de Luz ({DEVICE_ID}) agora está {'LIGADO' if is_on else 'DESLIGADO'}.")
+                elif cmd.device_id == DEVICE_ID and cmd.HasField("config_update"):
+                    report_requested = True
+                    apply_config(cmd.config_update)
+            # Programação do grupo enviada diretamente (no registro ou para corrigir uma versão antiga).
+            elif wrapper_msg.HasField("lamp_schedule"):
+                apply_schedule(wrapper_msg.lamp_schedule)
     except ConnectionResetError:
         # Erro comum que ocorre quando o outro lado da conexão fecha abruptamente.
         print("Conexão com o Gateway foi resetada.")
@@ -60,58 +186,52 @@ def discover_gateway_and_connect():
     Escuta por anúncios do Gateway via multicast para descobrir seu IP e porta,
     e então estabelece uma conexão TCP para se registrar e receber comandos.
     """
-    # Configura o socket para escutar por mensagens multicast.
-    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    multicast_socket.bind(("", MULTICAST_PORT))
-    group = socket.inet_aton(MULTICAST_GROUP)
-    mreq = group + socket.inet_aton("0.0.0.0")
-    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
-    
     print(f"Poste de Luz ({DEVICE_ID}) aguardando anúncio do Gateway...")
     
     # Loop de descoberta.
-    while True:
-        data, address = multicast_socket.recvfrom(1024)
+    for gateway_info in gateway_announcements():
+        discovered_ip = gateway_info.ip_address
+        discovered_port = gateway_info.device_tcp_port
         
-        wrapper_msg = smart_city_pb2.WrapperMessage()
-        wrapper_msg.ParseFromString(data)
+        print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Conectando...")
         
-        # Se a mensagem recebida for um anúncio do Gateway...
-        if wrapper_msg.HasField("gateway_info"):
-            gateway_info = wrapper_msg.gateway_info
-            discovered_ip = gateway_info.ip_address
-            discovered_port = gateway_info.device_tcp_port
+        try:
+            # Inicia a CONEXÃO TCP PERSISTENTE com o Gateway.
+            # A conexão é protegida por TLS (com certificado de dispositivo) quando os certificados existem.
+            tcp_socket = connect_secure((discovered_ip, discovered_port), ROLE_DEVICE)
             
-            print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Conectando...")
+            # Envia a mensagem de registro com suas informações.
+            register_msg = smart_city_pb2.WrapperMessage()
+            info = register_msg.device_info
+            info.id = DEVICE_ID
+            info.type = DEVICE_TYPE
+            info.group = DEVICE_GROUP
+            info.config_schema.CopyFrom(CONFIG_SCHEMA)
+            config.fill_update(info.reported_config, current_config())
+            send_message(tcp_socket, register_msg)
             
-            try:
-                # Inicia a CONEXÃO TCP PERSISTENTE com o Gateway.
-                tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                tcp_socket.connect((discovered_ip, discovered_port))
-                
-                # Envia a mensagem de registro com suas informações.
-                register_msg = smart_city_pb2.WrapperMessage()
-                info = register_msg.device_info
-                info.id = DEVICE_ID
-                info.type = DEVICE_TYPE
-                tcp_socket.send(register_msg.SerializeToString())
-                
-                print(f"--> SUCESSO: Registrado no Gateway. Aguardando comandos.")
-                
-                # Inicia a thread que ficará escutando por comandos na conexão estabelecida.
-                command_thread = threading.Thread(target=listen_for_commands, args=(tcp_socket,), daemon=True)
-                command_thread.start()
-                # Sai do loop de descoberta, pois a conexão foi bem-sucedida.
-                break
+            print(f"--> SUCESSO: Registrado no Gateway. Aguardando comandos.")
+            startup.mark("registro")
+            startup.report(DEVICE_ID)
+            
+            # Inicia a thread que ficará escutando por comandos na conexão estabelecida.
+            command_thread = threading.Thread(target=listen_for_commands, args=(tcp_socket,), daemon=True)
+            command_thread.start()
+            # Inicia a thread que avalia a programação e reporta o estado ao Gateway.
+            control_thread = threading.Thread(target=run_lamp_control, args=(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), discovered_ip), daemon=True)
+            control_thread.start()
+            # Sai do loop de descoberta, pois a conexão foi bem-sucedida.
+            break
 
-            except Exception as e:
-                # Em caso de falha na conexão, aguarda 5 segundos antes de tentar novamente no próximo anúncio.
-                print(f"Falha ao conectar no Gateway descoberto: {e}")
-                time.sleep(5)
+        except Exception as e:
+            # Em caso de falha na conexão, aguarda 5 segundos antes de tentar novamente no próximo anúncio.
+            print(f"Falha ao conectar no Gateway descoberto: {e}")
+            time.sleep(5)
 
 # Ponto de entrada do script.
 if __name__ == "__main__":
+    # Escuta as programações dos grupos desde o início, para não perder nenhum anúncio.
+    threading.Thread(target=listen_for_schedules, daemon=True).start()
     # Inicia o processo de descoberta e conexão.
     discover_gateway_and_connect()
     # Mantém a thread principal viva para que a thread de comandos em daemon possa continuar rodando.
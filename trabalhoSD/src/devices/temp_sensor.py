@@ -1,133 +1,101 @@
-# src/devices/traffic_light.py
+# src/devices/temp_sensor.py
 import socket
 import threading
 import time
+import os
 import uuid
+import random
 from generated import smart_city_pb2
+from src.common import startup
+from src.common.discovery import gateway_announcements
+from src.common.framing import send_message
+from src.common.security import ROLE_DEVICE, connect_secure, seal_datagram
 
 # --- Configurações ---
-# Define um ID e tipo únicos para este dispositivo.
-DEVICE_ID = f"sema_{uuid.uuid4().hex[:6]}"
-DEVICE_TYPE = smart_city_pb2.DeviceType.Value('TRAFFIC_LIGHT')
-# Constantes para a comunicação multicast de descoberta.
-MULTICAST_GROUP = "224.1.1.1"
-MULTICAST_PORT = 5007
+# Gera um ID único para este dispositivo.
+DEVICE_ID = f"temp_{uuid.uuid4().hex[:6]}"
+# Define o tipo do dispositivo a partir do enum do Protocol Buffers.
+DEVICE_TYPE = smart_city_pb2.DeviceType.Value('TEMP_SENSOR')
+# Grupo (zona) do dispositivo, usado pelo Gateway para agregar as leituras.
+DEVICE_GROUP = os.environ.get("DEVICE_GROUP", "default")
+# A porta UDP do Gateway para onde os status serão enviados.
+GATEWAY_UDP_PORT = int(os.environ.get("GATEWAY_UDP_PORT", 10001))
 
-# --- Estado do Dispositivo ---
-# Variáveis que armazenam o estado atual do semáforo.
-is_on = False
-red_light_duration = 15 # Valor padrão em segundos.
-
-def listen_for_commands(tcp_socket):
+# A função de envio de status agora precisa receber o IP do Gateway, pois ele é descoberto dinamicamente.
+def send_status_updates(udp_socket, gateway_ip):
     """
-    Escuta por comandos do Gateway na conexão TCP persistente.
-
-    Esta função roda em uma thread dedicada, processando comandos para ligar/desligar
-    o semáforo ou para alterar suas configurações, como a duração do sinal.
+    Envia periodicamente a temperatura medida via UDP para o Gateway.
+    
+    Esta função roda em uma thread e, a cada 15 segundos, gera uma nova
+    leitura e a envia. Este é o comportamento principal de um sensor.
     """
-    global is_on, red_light_duration
-    try:
-        # Loop infinito para continuar recebendo comandos.
-        while True:
-            # Fica bloqueado aqui, aguardando dados do Gateway.
-            data = tcp_socket.recv(1024)
-            if not data:
-                print("Conexão com o Gateway perdida.")
-                break
-                
-            # Decodifica a mensagem recebida com Protocol Buffers.
-            wrapper_msg = smart_city_pb2.WrapperMessage()
-            wrapper_msg.ParseFromString(data)
-            
-            # Verifica se é um comando e se o ID corresponde ao deste dispositivo.
-            if wrapper_msg.HasField("command"):
-                cmd = wrapper_msg.command
-                if cmd.device_id == DEVICE_ID:
-                    # Lida com o comando 'toggle' para ligar/desligar.
-                    if cmd.HasField("toggle"):
-                        is_on = not is_on
-                        print(f"--> Comando 'toggle' recebido! Semáforo agora está {'LIGADO' if is_on else 'DESLIGADO'}.")
-                    
-                    # Lida com o comando 'new_config' para alterar outras configurações.
-                    if cmd.HasField("new_config"):
-                        # Tenta processar a string de configuração (ex: "duration:20").
-                        try:
-                            # Divide a string em chave e valor.
-                            key, value = cmd.new_config.split(':')
-                            if key.lower() == "duration":
-                                # Converte o valor para inteiro e atualiza o estado.
-                                new_duration = int(value)
-                                red_light_duration = new_duration
-                                print(f"--> Comando 'config' recebido! Duração do sinal vermelho alterada para {red_light_duration}s.")
-                            else:
-                                print(f"Configuração desconhecida: {key}")
-                        except (ValueError, TypeError):
-                            # Erro caso a string não esteja no formato ou tipo corretos.
-                            print(f"Formato de configuração inválido recebido: {cmd.new_config}")
-
-    except ConnectionResetError:
-        print("Conexão com o Gateway foi resetada.")
-    except Exception as e:
-        print(f"Erro ao receber comando: {e}")
-    finally:
-        # Garante que o socket seja fechado ao final.
-        tcp_socket.close()
+    temperature = random.uniform(18.0, 30.0)
+    while True:
+        # Simula uma leitura de temperatura que varia pouco a cada medição.
+        temperature = min(40.0, max(5.0, temperature + random.uniform(-0.5, 0.5)))
+        
+        # Constrói a mensagem de status usando Protocol Buffers.
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        status = wrapper_msg.status_update
+        status.device_id = DEVICE_ID
+        status.temperature = temperature
+        # Envia também a leitura como métrica nomeada para que o Gateway possa agregá-la.
+        status.metrics["temperature"] = temperature
+        
+        # Usa o IP do Gateway (descoberto dinamicamente) para enviar os dados via UDP.
+        # UDP é "sem conexão", então cada envio especifica o destino.
+        udp_socket.sendto(seal_datagram(wrapper_msg.SerializeToString()), (gateway_ip, GATEWAY_UDP_PORT))
+        print(f"Enviado status: Temperatura = {temperature:.2f}°C para {gateway_ip}")
+        # Pausa de 15 segundos antes de enviar o próximo status.
+        time.sleep(15)
 
+# --- NOVA FUNÇÃO DE DESCOBERTA E CONEXÃO ---
 def discover_gateway_and_connect():
     """
     Escuta por anúncios do Gateway na rede para se registrar e, em seguida,
-    mantém a conexão para receber comandos.
+    inicia o envio periódico de status via UDP.
     """
-    # Configura o socket para escutar por mensagens multicast.
-    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    multicast_socket.bind(("", MULTICAST_PORT))
-    group = socket.inet_aton(MULTICAST_GROUP)
-    mreq = group + socket.inet_aton("0.0.0.0")
-    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
-    
-    print(f"Semáforo ({DEVICE_ID}) aguardando anúncio do Gateway...")
+    print(f"Sensor de Temperatura ({DEVICE_ID}) aguardando anúncio do Gateway...")
     
-    # Loop de descoberta.
-    while True:
-        data, address = multicast_socket.recvfrom(1024)
-        wrapper_msg = smart_city_pb2.WrapperMessage()
-        wrapper_msg.ParseFromString(data)
-        
-        # Se receber um anúncio válido do Gateway...
-        if wrapper_msg.HasField("gateway_info"):
-            gateway_info = wrapper_msg.gateway_info
-            discovered_ip = gateway_info.ip_address
-            discovered_port = gateway_info.device_tcp_port
-            print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Conectando...")
+    # Loop infinito para aguardar o anúncio do Gateway.
+    for gateway_info in gateway_announcements():
+        discovered_ip = gateway_info.ip_address
+        discovered_port = gateway_info.device_tcp_port
+        print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Registrando...")
+
+        try:
+            # Inicia uma CONEXÃO TCP TEMPORÁRIA apenas para se registrar.
+            # A conexão é protegida por TLS (com certificado de dispositivo) quando os certificados existem.
+            tcp_socket = connect_secure((discovered_ip, discovered_port), ROLE_DEVICE)
+            
+            # Monta e envia a mensagem de registro (DeviceInfo).
+            register_msg = smart_city_pb2.WrapperMessage()
+            info = register_msg.device_info
+            info.id = DEVICE_ID
+            info.type = DEVICE_TYPE
+            info.group = DEVICE_GROUP
+            send_message(tcp_socket, register_msg)
+            print("--> SUCESSO: Registrado no Gateway.")
+            startup.mark("registro")
+            startup.report(DEVICE_ID)
+            # Fecha a conexão TCP, pois o sensor não precisa receber comandos.
+            tcp_socket.close() 
             
-            try:
-                # Inicia a CONEXÃO TCP PERSISTENTE.
-                tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                tcp_socket.connect((discovered_ip, discovered_port))
-                
-                # Envia sua mensagem de identificação.
-                register_msg = smart_city_pb2.WrapperMessage()
-                info = register_msg.device_info
-                info.id = DEVICE_ID
-                info.type = DEVICE_TYPE
-                tcp_socket.send(register_msg.SerializeToString())
-                
-                print(f"--> SUCESSO: Registrado no Gateway. Aguardando comandos.")
-                
-                # Inicia a thread que ficará escutando por comandos.
-                command_thread = threading.Thread(target=listen_for_commands, args=(tcp_socket,), daemon=True)
-                command_thread.start()
-                # Sai do loop de descoberta.
-                break
-            except Exception as e:
-                # Em caso de falha, aguarda para tentar novamente no próximo anúncio.
-                print(f"Falha ao conectar no Gateway descoberto: {e}")
-                time.sleep(5)
+            # Após o registro, inicia a thread que enviará os dados de status via UDP.
+            # Passa o IP descoberto do Gateway para a função de envio.
+            update_thread = threading.Thread(target=send_status_updates, args=(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), discovered_ip), daemon=True)
+            update_thread.start()
+            # Sai do loop de descoberta, pois o registro foi bem-sucedido.
+            break
+        except Exception as e:
+            # Se o registro falhar, imprime o erro e aguarda o próximo anúncio.
+            print(f"Falha ao registrar no Gateway: {e}")
+            time.sleep(5)
 
 # Ponto de entrada do script.
 if __name__ == "__main__":
+    # Inicia o processo de descoberta e conexão.
     discover_gateway_and_connect()
-    # Mantém a thread principal viva indefinidamente para que a thread de comandos possa rodar.
+    # Mantém o processo principal vivo para que a thread em daemon possa continuar rodando.
     while True:
         time.sleep(3600)
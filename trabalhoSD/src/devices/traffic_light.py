@@ -1,48 +1,138 @@
 # src/devices/traffic_light.py
 import socket
 import threading
+import os
 import time
 import uuid
 from generated import smart_city_pb2
+from src.common import config, startup
+from src.common.discovery import gateway_announcements
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_DEVICE, connect_secure, seal_datagram
+from src.common.traffic import phase_at
 
 # --- Configurações ---
 DEVICE_ID = f"sema_{uuid.uuid4().hex[:6]}"
 DEVICE_TYPE = smart_city_pb2.DeviceType.Value('TRAFFIC_LIGHT')
-MULTICAST_GROUP = "224.1.1.1"
-MULTICAST_PORT = 5007
+# Grupo (zona) do dispositivo, usado pelo Gateway para agregar as leituras.
+DEVICE_GROUP = os.environ.get("DEVICE_GROUP", "default")
+GATEWAY_UDP_PORT = int(os.environ.get("GATEWAY_UDP_PORT", 10001))
 
 # --- Estado do Dispositivo ---
 is_on = False
+green_light_duration = 20
+yellow_light_duration = 3
 red_light_duration = 15
+# A fase é calculada a partir do relógio: o ciclo começa (verde) em cycle_anchor + cycle_offset.
+# O Gateway ajusta esses dois valores para coordenar vários cruzamentos (onda verde).
+cycle_anchor = time.time()
+cycle_offset = 0.0
+# Acorda a thread do ciclo quando o estado ou a configuração mudam.
+state_changed = threading.Event()
+# Pede um relatório mesmo sem troca de fase (depois de todo comando, para o Gateway confirmá-lo).
+report_requested = False
+
+def build_config_schema():
+    """Declara as configurações aceitas pelo semáforo, enviadas ao Gateway no registro."""
+    schema = smart_city_pb2.ConfigSchema()
+    config.add_field(schema, "green_light_duration", smart_city_pb2.CONFIG_INT,
+                     min_value=1, max_value=300, description="Duração do sinal verde (s)")
+    config.add_field(schema, "yellow_light_duration", smart_city_pb2.CONFIG_INT,
+                     min_value=1, max_value=10, description="Duração do sinal amarelo (s)")
+    config.add_field(schema, "red_light_duration", smart_city_pb2.CONFIG_INT,
+                     min_value=1, max_value=300, description="Duração do sinal vermelho (s)")
+    config.add_field(schema, "cycle_anchor", smart_city_pb2.CONFIG_FLOAT,
+                     min_value=0, description="Início de referência do ciclo (segundos desde a época)")
+    config.add_field(schema, "cycle_offset", smart_city_pb2.CONFIG_FLOAT,
+                     min_value=0, max_value=610, description="Deslocamento do início do verde (s)")
+    return schema
+
+CONFIG_SCHEMA = build_config_schema()
+
+def current_config():
+    """Retorna as configurações em vigor, informadas ao Gateway no registro e em cada relatório de fase."""
+    return {
+        "green_light_duration": green_light_duration,
+        "yellow_light_duration": yellow_light_duration,
+        "red_light_duration": red_light_duration,
+        "cycle_anchor": cycle_anchor,
+        "cycle_offset": cycle_offset,
+    }
+
+def apply_config(config_update):
+    """
+    Aplica uma ConfigUpdate de forma atômica.
+
+    O Gateway já valida a atualização, mas o semáforo valida novamente: se
+    qualquer valor for inválido, nenhuma configuração é alterada.
+    """
+    global green_light_duration, yellow_light_duration, red_light_duration, cycle_anchor, cycle_offset
+    errors = config.validate_update(CONFIG_SCHEMA, config_update)
+    if errors:
+        print(f"Configuração rejeitada: {'; '.join(errors)}")
+        return
+    values = config.to_dict(config_update)
+    green_light_duration = values.get("green_light_duration", green_light_duration)
+    yellow_light_duration = values.get("yellow_light_duration", yellow_light_duration)
+    red_light_duration = values.get("red_light_duration", red_light_duration)
+    cycle_anchor = values.get("cycle_anchor", cycle_anchor)
+    cycle_offset = values.get("cycle_offset", cycle_offset)
+    state_changed.set()
+    print(f"--> Comando 'config' recebido! Ciclo: verde {green_light_duration}s, amarelo {yellow_light_duration}s, "
+          f"vermelho {red_light_duration}s, deslocamento {cycle_offset:.1f}s.")
+
+def report_phase(udp_socket, gateway_ip, phase):
+    """Envia a fase atual ao Gateway via UDP."""
+    wrapper_msg = smart_city_pb2.WrapperMessage()
+    status = wrapper_msg.status_update
+    status.device_id = DEVICE_ID
+    status.light_phase = phase
+    config.fill_update(status.reported_config, current_config())
+    udp_socket.sendto(seal_datagram(wrapper_msg.SerializeToString()), (gateway_ip, GATEWAY_UDP_PORT))
+    print(f"Fase: {smart_city_pb2.LightPhase.Name(phase)}")
+
+def run_phase_cycle(udp_socket, gateway_ip):
+    """
+    Máquina de estados das fases do semáforo.
+
+    Dorme até a próxima troca de fase (ou até uma mudança de estado/configuração)
+    e reporta cada troca ao Gateway.
+    """
+    global report_requested
+    last_phase = None
+    while True:
+        if is_on:
+            phase, remaining = phase_at(time.time(), cycle_anchor, cycle_offset,
+                                        green_light_duration, yellow_light_duration, red_light_duration)
+            # Uma pequena folga garante que, ao acordar, a troca de fase já tenha ocorrido.
+            remaining += 0.001
+        else:
+            phase, remaining = smart_city_pb2.PHASE_OFF, None
+        if phase != last_phase or report_requested:
+            report_requested = False
+            report_phase(udp_socket, gateway_ip, phase)
+            last_phase = phase
+        state_changed.wait(remaining)
+        state_changed.clear()
 
-# A função listen_for_commands permanece a mesma.
 def listen_for_commands(tcp_socket):
-    global is_on, red_light_duration
+    global is_on, report_requested
     try:
         while True:
-            data = tcp_socket.recv(1024)
-            if not data:
+            wrapper_msg = recv_message(tcp_socket)
+            if wrapper_msg is None:
                 print("Conexão com o Gateway perdida.")
                 break
-            wrapper_msg = smart_city_pb2.WrapperMessage()
-            wrapper_msg.ParseFromString(data)
             if wrapper_msg.HasField("command"):
                 cmd = wrapper_msg.command
                 if cmd.device_id == DEVICE_ID:
+                    report_requested = True
                     if cmd.HasField("toggle"):
                         is_on = not is_on
+                        state_changed.set()
                         print(f"--> Comando 'toggle' recebido! Semáforo agora está {'LIGADO' if is_on else 'DESLIGADO'}.")
-                    if cmd.HasField("new_config"):
-                        try:
-                            key, value = cmd.new_config.split(':')
-                            if key.lower() == "duration":
-                                new_duration = int(value)
-                                red_light_duration = new_duration
-                                print(f"--> Comando 'config' recebido! Duração do sinal vermelho alterada para {red_light_duration}s.")
-                            else:
-                                print(f"Configuração desconhecida: {key}")
-                        except (ValueError, TypeError):
-                            print(f"Formato de configuração inválido recebido: {cmd.new_config}")
+                    if cmd.HasField("config_update"):
+                        apply_config(cmd.config_update)
     except ConnectionResetError:
         print("Conexão com o Gateway foi resetada.")
     except Exception as e:
@@ -53,46 +143,40 @@ def listen_for_commands(tcp_socket):
 # --- NOVA FUNÇÃO DE DESCOBERTA E CONEXÃO ---
 def discover_gateway_and_connect():
     """Escuta e conecta ao Gateway descoberto automaticamente."""
-    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    multicast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    multicast_socket.bind(("", MULTICAST_PORT))
-    group = socket.inet_aton(MULTICAST_GROUP)
-    mreq = group + socket.inet_aton("0.0.0.0")
-    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
-    
     print(f"Semáforo ({DEVICE_ID}) aguardando anúncio do Gateway...")
     
-    while True:
-        data, address = multicast_socket.recvfrom(1024)
-        wrapper_msg = smart_city_pb2.WrapperMessage()
-        wrapper_msg.ParseFromString(data)
+    for gateway_info in gateway_announcements():
+        discovered_ip = gateway_info.ip_address
+        discovered_port = gateway_info.device_tcp_port
+        print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Conectando...")
         
-        if wrapper_msg.HasField("gateway_info"):
-            gateway_info = wrapper_msg.gateway_info
-            discovered_ip = gateway_info.ip_address
-            discovered_port = gateway_info.device_tcp_port
-            print(f"--> Gateway encontrado em {discovered_ip}:{discovered_port}. Conectando...")
+        try:
+            # A conexão é protegida por TLS (com certificado de dispositivo) quando os certificados existem.
+            tcp_socket = connect_secure((discovered_ip, discovered_port), ROLE_DEVICE)
             
-            try:
-                tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                tcp_socket.connect((discovered_ip, discovered_port))
-                
-                register_msg = smart_city_pb2.WrapperMessage()
-                info = register_msg.device_info
-                info.id = DEVICE_ID
-                info.type = DEVICE_TYPE
-                tcp_socket.send(register_msg.SerializeToString())
-                
-                print(f"--> SUCESSO: Registrado no Gateway. Aguardando comandos.")
-                
-                command_thread = threading.Thread(target=listen_for_commands, args=(tcp_socket,), daemon=True)
-                command_thread.start()
-                break
-            except Exception as e:
-                print(f"Falha ao conectar no Gateway descoberto: {e}")
-                time.sleep(5)
+            register_msg = smart_city_pb2.WrapperMessage()
+            info = register_msg.device_info
+            info.id = DEVICE_ID
+            info.type = DEVICE_TYPE
+            info.group = DEVICE_GROUP
+            info.config_schema.CopyFrom(CONFIG_SCHEMA)
+            config.fill_update(info.reported_config, current_config())
+            send_message(tcp_socket, register_msg)
+            
+            print(f"--> SUCESSO: Registrado no Gateway. Aguardando comandos.")
+            startup.mark("registro")
+            startup.report(DEVICE_ID)
+            
+            command_thread = threading.Thread(target=listen_for_commands, args=(tcp_socket,), daemon=True)
+            command_thread.start()
+            phase_thread = threading.Thread(target=run_phase_cycle, args=(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), discovered_ip), daemon=True)
+            phase_thread.start()
+            break
+        except Exception as e:
+            print(f"Falha ao conectar no Gateway descoberto: {e}")
+            time.sleep(5)
 
 if __name__ == "__main__":
     discover_gateway_and_connect()
     while True:
-        time.sleep(3600)
\ No newline at end of file
+        time.sleep(3600)
\ No newline at end of file
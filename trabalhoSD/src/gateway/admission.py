@@ -0,0 +1,108 @@
+# src/gateway/admission.py
+import threading
+from collections import OrderedDict
+
+# --- Controle de admissão ---
+# Limites de taxa por balde de fichas (token bucket): cada chave (ID do
+# dispositivo, IP de origem, conexão de cliente) ganha 'rate' fichas por
+# segundo, até 'burst', e cada mensagem gasta uma. Verificar uma mensagem custa
+# O(1) e não exige nenhuma thread ou temporizador.
+
+# Campos de StatusUpdate.status que representam mudanças de estado. Os demais
+# (temperatura, o texto "PPM: ..." dos sensores de ar) são telemetria periódica.
+STATE_CHANGE_FIELDS = ("is_on", "light_phase", "lamp_state")
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def allow(self, now):
+        """Gasta uma ficha, se houver. Retorna False se a mensagem deve ser descartada."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def reserve(self, now):
+        """Gasta uma ficha mesmo sem saldo e retorna quantos segundos esperar até que ela exista."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Um balde de fichas por chave. Seguro para várias threads.
+
+    Para que chaves forjadas (IPs ou IDs inventados) não esgotem a memória,
+    os baldes ficam em ordem de uso, e o usado há mais tempo é descartado
+    quando o número de chaves chega a 'max_keys' (O(1) por chave nova).
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # Do usado há mais tempo ao usado mais recentemente.
+        self.lock = threading.Lock()
+
+    def _bucket(self, key, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.buckets.popitem(last=False)
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst, now)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def allow(self, key, now):
+        with self.lock:
+            return self._bucket(key, now).allow(now)
+
+    def reserve(self, key, now):
+        with self.lock:
+            return self._bucket(key, now).reserve(now)
+
+
+class AdmissionStats:
+    """Contadores do que foi descartado ou atrasado, por motivo."""
+
+    def __init__(self):
+        self.counts = {}
+        self.reported = {}
+        self.lock = threading.Lock()
+
+    def count(self, reason):
+        with self.lock:
+            self.counts[reason] = self.counts.get(reason, 0) + 1
+
+    def delta(self):
+        """Retorna o que mudou desde a última chamada e o total acumulado, por motivo."""
+        with self.lock:
+            changes = {reason: total - self.reported.get(reason, 0)
+                       for reason, total in self.counts.items() if total != self.reported.get(reason, 0)}
+            self.reported = dict(self.counts)
+            return changes, dict(self.counts)
+
+
+def is_low_priority(status):
+    """
+    Indica se uma StatusUpdate é telemetria periódica, a primeira a ser descartada sob carga.
+
+    Leituras (temperatura, métricas, o texto de state_info) chegam de novo em
+    poucos segundos; mudanças de estado (liga/desliga, fase de semáforo,
+    estado de poste, configuração em vigor depois de um comando) não.
+    """
+    return status.WhichOneof("status") not in STATE_CHANGE_FIELDS and not status.HasField("reported_config")
@@ -0,0 +1,239 @@
+# src/gateway/aggregation.py
+import math
+import threading
+import time
+
+# --- Motor de agregação de leituras dos sensores ---
+# Cada leitura recebida pelo Gateway é somada, em O(1), a janelas deslizantes
+# e fixas (tumbling) por tipo de dispositivo e por grupo. As consultas apenas
+# combinam os resumos já calculados, sem reprocessar as leituras.
+
+
+class QuantileSketch:
+    """
+    Estimador aproximado de quantis com erro relativo limitado.
+
+    Os valores são contados em baldes de escala logarítmica (a mesma ideia do
+    DDSketch): inserir custa O(1), dois resumos podem ser somados e qualquer
+    quantil é estimado com erro relativo de no máximo 'relative_accuracy'.
+    """
+    __slots__ = ("gamma", "log_gamma", "positive", "negative", "zero_count", "count")
+
+    def __init__(self, relative_accuracy=0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, index):
+        # Ponto do balde que minimiza o erro relativo.
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value):
+        self.count += 1
+        if value > 0:
+            index = self._index(value)
+            self.positive[index] = self.positive.get(index, 0) + 1
+        elif value < 0:
+            index = self._index(-value)
+            self.negative[index] = self.negative.get(index, 0) + 1
+        else:
+            self.zero_count += 1
+
+    def merge(self, other):
+        for index, count in other.positive.items():
+            self.positive[index] = self.positive.get(index, 0) + count
+        for index, count in other.negative.items():
+            self.negative[index] = self.negative.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        """Retorna o valor aproximado do quantil 'q' (entre 0 e 1), ou NaN se vazio."""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        # Percorre do menor para o maior: negativos (do maior módulo ao menor), zero e positivos.
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+
+class WindowStats:
+    """Resumo incremental (contagem, soma, mínimo, máximo e quantis) de um conjunto de leituras."""
+    __slots__ = ("count", "total", "minimum", "maximum", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.sketch.merge(other.sketch)
+
+    def summary(self):
+        """Retorna um dicionário com as estatísticas do resumo (NaN quando vazio)."""
+        if self.count == 0:
+            return {"count": 0, "sum": 0.0, "min": math.nan, "max": math.nan, "mean": math.nan,
+                    "p50": math.nan, "p90": math.nan, "p99": math.nan}
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": self.total / self.count,
+            "p50": self.sketch.quantile(0.50),
+            "p90": self.sketch.quantile(0.90),
+            "p99": self.sketch.quantile(0.99),
+        }
+
+
+class TumblingWindow:
+    """Janela fixa: as leituras são agrupadas em intervalos consecutivos de 'length' segundos."""
+
+    def __init__(self, length):
+        self.length = length
+        self.start = None
+        self.stats = WindowStats()
+
+    def add(self, value, timestamp):
+        start = math.floor(timestamp / self.length) * self.length
+        if start != self.start:
+            # Começou um novo intervalo: o anterior é descartado.
+            self.start = start
+            self.stats = WindowStats()
+        self.stats.add(value)
+
+    def snapshot(self, now):
+        """Retorna (início, fim, WindowStats) do intervalo em andamento."""
+        start = math.floor(now / self.length) * self.length
+        if start != self.start:
+            return start, start + self.length, WindowStats()
+        return start, start + self.length, self.stats
+
+
+class SlidingWindow:
+    """
+    Janela deslizante dos últimos 'length' segundos.
+
+    A janela é dividida em 'panes' fatias; cada leitura atualiza apenas a fatia
+    corrente (O(1)) e a consulta combina as fatias ainda dentro da janela.
+    """
+
+    def __init__(self, length, panes):
+        self.pane_length = length / panes
+        self.panes = panes
+        self.pane_ids = [None] * panes
+        self.pane_stats = [None] * panes
+
+    def add(self, value, timestamp):
+        pane_id = math.floor(timestamp / self.pane_length)
+        slot = pane_id % self.panes
+        if self.pane_ids[slot] != pane_id:
+            # A fatia pertencia a uma volta anterior do anel: é reaproveitada.
+            self.pane_ids[slot] = pane_id
+            self.pane_stats[slot] = WindowStats()
+        self.pane_stats[slot].add(value)
+
+    def snapshot(self, now):
+        """Retorna (início, fim, WindowStats) combinando as fatias dos últimos 'length' segundos."""
+        current_id = math.floor(now / self.pane_length)
+        oldest_id = current_id - self.panes + 1
+        merged = WindowStats()
+        for pane_id, stats in zip(self.pane_ids, self.pane_stats):
+            if pane_id is not None and oldest_id <= pane_id <= current_id:
+                merged.merge(stats)
+        return oldest_id * self.pane_length, (current_id + 1) * self.pane_length, merged
+
+
+class Aggregator:
+    """
+    Mantém as janelas de cada métrica por escopo.
+
+    Os escopos são "type:<DeviceType>" e "group:<grupo>"; cada par
+    (escopo, métrica) tem uma janela fixa e uma deslizante.
+    """
+
+    def __init__(self, tumbling_length, sliding_length, sliding_panes):
+        self.tumbling_length = tumbling_length
+        self.sliding_length = sliding_length
+        self.sliding_panes = sliding_panes
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def add(self, scopes, metric, value, timestamp):
+        """Acrescenta uma leitura às janelas de todos os escopos informados."""
+        with self.lock:
+            for scope in scopes:
+                key = (scope, metric)
+                windows = self.windows.get(key)
+                if windows is None:
+                    windows = (TumblingWindow(self.tumbling_length),
+                               SlidingWindow(self.sliding_length, self.sliding_panes))
+                    self.windows[key] = windows
+                windows[0].add(value, timestamp)
+                windows[1].add(value, timestamp)
+
+    def query(self, scope=None, metric=None, sliding=False, now=None):
+        """
+        Retorna uma lista de (escopo, métrica, início, fim, estatísticas), em que
+        as estatísticas são o dicionário produzido por WindowStats.summary().
+
+        'scope' e 'metric' iguais a None funcionam como curinga; sem 'now',
+        vale o instante atual.
+        """
+        now = time.time() if now is None else now
+        results = []
+        with self.lock:
+            for (key_scope, key_metric), windows in sorted(self.windows.items()):
+                if scope and key_scope != scope:
+                    continue
+                if metric and key_metric != metric:
+                    continue
+                window = windows[1] if sliding else windows[0]
+                start, end, stats = window.snapshot(now)
+                results.append((key_scope, key_metric, start, end, stats.summary()))
+        return results
+
+
+def extract_metrics(status):
+    """
+    Retorna os pares (métrica, valor) numéricos presentes em uma StatusUpdate.
+
+    Valores não finitos (inf, NaN) são descartados: não têm lugar nos
+    baldes logarítmicos do QuantileSketch, nas somas nem no histórico.
+    """
+    metrics = {metric: value for metric, value in status.metrics.items() if math.isfinite(value)}
+    if status.HasField("temperature") and math.isfinite(status.temperature):
+        metrics.setdefault("temperature", status.temperature)
+    return metrics.items()
@@ -0,0 +1,91 @@
+# src/gateway/capture.py
+import struct
+import threading
+import time
+import weakref
+
+# --- Gravação do tráfego do Gateway ---
+# Com a captura ativada, cada WrapperMessage que entra ou sai pelas portas de
+# dispositivos (TCP), de sensores (UDP) e de clientes (TCP) é gravada em um
+# arquivo binário compacto, com o instante em que passou pelo Gateway, o
+# sentido, o canal e a conexão de origem. O arquivo pode ser reproduzido
+# depois contra um Gateway local (benchmarks/replay.py).
+#
+# Formato: FILE_MAGIC seguido de registros RECORD_HEADER + payload, onde o
+# payload é a WrapperMessage serializada (sem o cabeçalho de enquadramento).
+
+FILE_MAGIC = b"SCGWCAP1"
+RECORD_HEADER = struct.Struct("!QBBII")  # timestamp_us, canal, sentido, conexão, tamanho.
+
+# Canais do Gateway.
+CHANNEL_DEVICE = 0  # Porta TCP de dispositivos (10000).
+CHANNEL_UDP = 1     # Porta UDP de status dos sensores (10001).
+CHANNEL_CLIENT = 2  # Porta TCP de clientes (10003).
+CHANNEL_NAMES = {CHANNEL_DEVICE: "dispositivos", CHANNEL_UDP: "udp", CHANNEL_CLIENT: "clientes"}
+
+# Sentido da mensagem em relação ao Gateway.
+INBOUND = 0
+OUTBOUND = 1
+
+
+class CaptureLog:
+    """Grava as mensagens do Gateway em um arquivo de captura. Seguro para várias threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(FILE_MAGIC)
+        self.lock = threading.Lock()
+        # Cada conexão TCP recebe um número sequencial; os datagramas UDP usam a conexão 0.
+        self.connection_ids = weakref.WeakKeyDictionary()
+        self.next_connection_id = 1
+        self.records = 0
+
+    def record(self, channel, direction, conn, payload):
+        """Grava uma mensagem serializada. 'conn' é o socket TCP da conexão, ou None para UDP."""
+        timestamp_us = time.time_ns() // 1000
+        with self.lock:
+            if self.file is None:
+                return
+            connection_id = 0
+            if conn is not None:
+                connection_id = self.connection_ids.get(conn)
+                if connection_id is None:
+                    connection_id = self.next_connection_id
+                    self.next_connection_id += 1
+                    self.connection_ids[conn] = connection_id
+            self.file.write(RECORD_HEADER.pack(timestamp_us, channel, direction, connection_id, len(payload)))
+            self.file.write(payload)
+            self.records += 1
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_capture(path):
+    """
+    Lê um arquivo de captura, registro a registro.
+
+    Gera tuplas (timestamp_us, canal, sentido, conexão, payload). Um registro
+    incompleto no fim do arquivo (Gateway encerrado durante a gravação) é ignorado.
+    """
+    with open(path, "rb") as capture_file:
+        if capture_file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} não é um arquivo de captura do Gateway.")
+        while True:
+            header = capture_file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            timestamp_us, channel, direction, connection_id, size = RECORD_HEADER.unpack(header)
+            payload = capture_file.read(size)
+            if len(payload) < size:
+                return
+            yield timestamp_us, channel, direction, connection_id, payload
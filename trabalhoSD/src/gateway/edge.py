@@ -0,0 +1,179 @@
+# src/gateway/edge.py
+import threading
+import time
+from generated import smart_city_pb2
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_DEVICE, connect_secure
+from src.gateway.admission import is_low_priority
+
+# --- Modo de borda (Gateway de borda) ---
+# Um Gateway de borda atende os dispositivos de um bairro como um Gateway
+# comum e mantém uma única conexão TCP com o Gateway central, na porta de
+# dispositivos (autenticando-se com um certificado de dispositivo). Por ela:
+#   - sobem os registros dos dispositivos locais, em lote (EdgeRegistration);
+#   - sobe a telemetria (TelemetryBatch): a periódica resumida na última
+#     leitura de cada dispositivo por intervalo, e as mudanças de estado
+#     (fase de semáforo, estado de poste) em até URGENT_DELAY_SECONDS, as que
+#     chegarem juntas no mesmo lote;
+#   - descem os comandos e as programações de postes do central, que a borda
+#     valida e entrega aos seus dispositivos.
+# Com dispositivos que reportam a cada segundo e um intervalo de 5 s, o
+# central recebe uma mensagem por bairro a cada 5 s em vez de milhares.
+#
+# A rede só é usada nas threads do temporizador e da conexão: add_status()
+# apenas acumula a leitura, e os lotes são enviados fora de self.lock.
+
+RECONNECT_SECONDS = 5.0      # Espera antes de tentar reconectar ao Gateway central.
+URGENT_DELAY_SECONDS = 0.05  # Atraso máximo de uma mudança de estado antes de subir ao central.
+
+
+class EdgeUplink:
+    """
+    Conexão de um Gateway de borda com o Gateway central.
+
+    'on_message(wrapper_msg)' é chamado, na thread da conexão, para cada
+    mensagem recebida do central.
+    """
+
+    def __init__(self, upstream, edge_id, interval, timers, on_message):
+        self.upstream = upstream
+        self.edge_id = edge_id
+        self.interval = interval
+        self.timers = timers
+        self.on_message = on_message
+        self.conn = None
+        self.devices = {}        # ID -> DeviceInfo de cada dispositivo local.
+        self.new_devices = []    # Registrados desde o último envio ao central.
+        self.announce = False    # A borda acabou de conectar e ainda não se identificou.
+        self.latest = {}         # ID -> última leitura periódica ainda não enviada.
+        self.urgent = []         # Mudanças de estado ainda não enviadas.
+        self.urgent_scheduled = False
+        self.received = 0        # Leituras recebidas desde o último lote.
+        self.total_received = 0
+        self.total_forwarded = 0
+        self.lock = threading.Lock()       # Protege o estado acima; nunca é mantido durante um envio.
+        self.send_lock = threading.Lock()  # Um envio por vez, na ordem em que os lotes foram montados.
+
+    def add_device(self, device_info):
+        """Registra um dispositivo local; ele sobe ao central no próximo envio, antes das suas leituras."""
+        with self.lock:
+            self.devices[device_info.id] = device_info
+            self.new_devices.append(device_info)
+
+    def add_status(self, status):
+        """
+        Acumula uma leitura local, sem esperar pela rede.
+
+        Da telemetria periódica fica só a última leitura de cada dispositivo,
+        enviada no próximo intervalo; as mudanças de estado sobem em até
+        URGENT_DELAY_SECONDS.
+        """
+        with self.lock:
+            self.received += 1
+            if is_low_priority(status):
+                self.latest[status.device_id] = status
+                return
+            self.urgent.append(status)
+            if self.urgent_scheduled:
+                return
+            self.urgent_scheduled = True
+        self.timers.schedule(URGENT_DELAY_SECONDS, self.send_urgent)
+
+    def send_urgent(self):
+        with self.lock:
+            self.urgent_scheduled = False
+        self.send_pending(periodic=False)
+
+    def send_pending(self, periodic=True):
+        """
+        Envia ao central os registros novos e as mudanças de estado e, com
+        'periodic', também as leituras periódicas acumuladas.
+
+        O lote é montado sob self.lock e enviado fora dele; send_lock mantém a
+        ordem entre envios, para que um registro chegue antes das leituras do
+        dispositivo.
+        """
+        with self.send_lock:
+            with self.lock:
+                conn = self.conn
+                if conn is None:
+                    # Sem conexão com o central, as mudanças de estado são descartadas.
+                    self.urgent = []
+                    return
+                messages = []
+                if self.new_devices or self.announce:
+                    wrapper_msg = smart_city_pb2.WrapperMessage()
+                    wrapper_msg.edge_registration.edge_id = self.edge_id
+                    wrapper_msg.edge_registration.devices.extend(self.new_devices)
+                    messages.append(wrapper_msg)
+                    self.new_devices = []
+                    self.announce = False
+                statuses = self.urgent
+                self.urgent = []
+                if periodic:
+                    statuses.extend(self.latest.values())
+                    self.latest = {}
+                if statuses:
+                    wrapper_msg = smart_city_pb2.WrapperMessage()
+                    batch = wrapper_msg.telemetry_batch
+                    batch.edge_id = self.edge_id
+                    batch.statuses.extend(statuses)
+                    batch.received = self.received
+                    self.total_received += self.received
+                    self.total_forwarded += len(statuses)
+                    messages.append(wrapper_msg)
+                    self.received = 0
+            try:
+                for wrapper_msg in messages:
+                    send_message(conn, wrapper_msg)
+            except OSError as e:
+                print(f"[BORDA] Falha ao enviar ao Gateway central: {e}")
+                with self.lock:
+                    if self.conn is conn:
+                        self.conn = None
+                conn.close()
+
+    def flush_periodically(self):
+        self.send_pending()
+        self.timers.schedule(self.interval, self.flush_periodically)
+
+    def stats(self):
+        """Retorna (leituras recebidas, leituras encaminhadas) desde o início."""
+        with self.lock:
+            return self.total_received + self.received, self.total_forwarded
+
+    def run(self):
+        """Mantém a conexão com o central: registra todos os dispositivos locais e trata o que chega dele."""
+        while True:
+            try:
+                conn = connect_secure(self.upstream, ROLE_DEVICE)
+            except OSError as e:
+                print(f"[BORDA] Gateway central {self.upstream[0]}:{self.upstream[1]} indisponível: {e}")
+                time.sleep(RECONNECT_SECONDS)
+                continue
+            with self.lock:
+                self.conn = conn
+                # A primeira mensagem identifica a borda, mesmo que ainda não haja dispositivos.
+                self.new_devices = list(self.devices.values())
+                self.announce = True
+            print(f"[BORDA] Conectado ao Gateway central {self.upstream[0]}:{self.upstream[1]} como {self.edge_id}.")
+            self.send_pending()
+            try:
+                while True:
+                    wrapper_msg = recv_message(conn)
+                    if wrapper_msg is None:
+                        break
+                    self.on_message(wrapper_msg)
+            except Exception as e:
+                # Quadro grande demais, mensagem inválida ou falha ao tratá-la: a conexão é refeita.
+                print(f"[BORDA] Conexão com o Gateway central perdida: {e}")
+            with self.lock:
+                if self.conn is conn:
+                    self.conn = None
+            conn.close()
+            print(f"[BORDA] Desconectado do Gateway central; nova tentativa em {RECONNECT_SECONDS:.0f} s.")
+            time.sleep(RECONNECT_SECONDS)
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        self.timers.schedule(self.interval, self.flush_periodically)
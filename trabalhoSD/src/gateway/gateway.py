@@ -1,7 +1,30 @@
+import argparse
+import os
+import queue
 import socket
+import sys
 import threading
 import time
 from generated import smart_city_pb2
+from src.common import config, startup
+from src.common.framing import recv_message, send_message
+from src.common.security import (ROLE_ADMIN, ROLE_CLIENT, ROLE_DEVICE, ROLE_GATEWAY, accept_secure, open_datagram,
+                                 peer_owns_id, peer_role, prepare, seal_datagram, security_enabled)
+from google.protobuf.message import DecodeError
+from src.gateway.admission import AdmissionStats, RateLimiter, TokenBucket, is_low_priority
+from src.gateway.aggregation import Aggregator, extract_metrics
+from src.gateway.capture import CHANNEL_CLIENT, CHANNEL_DEVICE, CHANNEL_UDP, INBOUND, OUTBOUND, CaptureLog
+from src.gateway.edge import EdgeUplink
+from src.gateway.history import HistoryWriter
+from src.gateway.lamp_scheduler import LampScheduler
+from src.gateway.lanes import ControlLane, message_priority
+from src.gateway.profiling import DEFAULT_SAMPLE_HZ, Profiler
+from src.gateway.registry import DeviceRecord
+from src.gateway.rules import RulesEngine
+from src.gateway.stream_relay import StreamRelay
+from src.gateway.timers import TimerService
+from src.gateway.traffic_scheduler import TrafficScheduler
+from src.gateway.twins import TwinStore
 
 # --- NOVA FUNÇÃO para detectar o IP local ---
 def get_local_ip():
@@ -27,19 +50,164 @@ def get_local_ip():
     return IP
 
 # --- Configurações ---
-# A variável GATEWAY_IP agora é preenchida dinamicamente pela função get_local_ip().
-GATEWAY_IP = get_local_ip()
-DEVICE_TCP_PORT = 10000  # Porta para Dispositivos se conectarem via TCP.
-CLIENT_TCP_PORT = 10003  # Porta para Clientes se conectarem via TCP.
-UDP_PORT = 10001         # Porta para receber status de sensores via UDP.
+# O IP do Gateway (anunciado aos dispositivos e usado no multicast) pode ser definido por GATEWAY_IP ou
+# --interface; senão, é detectado por get_local_ip() apenas quando for preciso (ver gateway_ip()).
+# As portas são abertas em GATEWAY_BIND (ou --bind), se definido, e no IP do Gateway, caso contrário.
+# As portas também podem ser trocadas, para rodar vários Gateways (central e bordas) na mesma máquina.
+GATEWAY_IP = os.environ.get("GATEWAY_IP")
+BIND_IP = os.environ.get("GATEWAY_BIND")
+DEVICE_TCP_PORT = int(os.environ.get("GATEWAY_DEVICE_PORT", 10000))  # Porta para Dispositivos se conectarem via TCP.
+CLIENT_TCP_PORT = int(os.environ.get("GATEWAY_CLIENT_PORT", 10003))  # Porta para Clientes se conectarem via TCP.
+UDP_PORT = int(os.environ.get("GATEWAY_UDP_PORT", 10001))            # Porta para receber status de sensores via UDP.
+STREAM_TCP_PORT = int(os.environ.get("GATEWAY_STREAM_PORT", 10004))  # Porta do canal de streaming das câmeras.
+LISTEN_BACKLOG = 128          # Conexões TCP aguardando accept() em cada porta.
 MULTICAST_GROUP = "224.1.1.1" # Endereço do grupo multicast para descoberta.
 MULTICAST_PORT = 5007         # Porta para a comunicação multicast.
+LAMP_SCHEDULE_PORT = 5008     # Porta multicast das programações dos postes de luz.
+TUMBLING_WINDOW_SECONDS = 60  # Duração de cada janela fixa de agregação.
+SLIDING_WINDOW_SECONDS = 300  # Duração da janela deslizante de agregação.
+SLIDING_WINDOW_PANES = 30     # Número de fatias em que a janela deslizante é dividida.
+RULES_FILE = os.environ.get("GATEWAY_RULES", "rules.json")  # Arquivo JSON com as regras de limiar.
+CAPTURE_FILE = os.environ.get("GATEWAY_CAPTURE")  # Se definido, grava todo o tráfego do Gateway neste arquivo.
+CAPTURE_FLUSH_SECONDS = 1.0  # Intervalo entre as descargas do arquivo de captura em disco.
+HISTORY_DIR = os.environ.get("GATEWAY_HISTORY")  # Se definido, grava o histórico da telemetria (colunar) neste diretório.
+HISTORY_FLUSH_SECONDS = 10.0  # Intervalo entre as gravações em lote do histórico.
+# Limites de taxa (mensagens por segundo e rajada máxima).
+UDP_DEVICE_RATE, UDP_DEVICE_BURST = 10, 20           # Por ID de dispositivo.
+UDP_SOURCE_RATE, UDP_SOURCE_BURST = 500, 1000        # Por IP de origem (vários simuladores podem dividir um IP).
+CLIENT_REQUEST_RATE, CLIENT_REQUEST_BURST = 20, 40   # Por conexão de cliente.
+CLIENT_SOURCE_RATE, CLIENT_SOURCE_BURST = 50, 100    # Por IP de cliente, somando todas as conexões.
+CLIENT_MAX_DELAY_SECONDS = 5.0  # Cliente que precisaria esperar mais que isso é desconectado.
+# Fila entre a recepção UDP e o processamento das leituras.
+INGEST_QUEUE_SIZE = 10000       # Acima disso, tudo é descartado.
+INGEST_SHED_THRESHOLD = 2000    # Acima disso, a telemetria periódica é descartada (as mudanças de estado não).
+ADMISSION_REPORT_SECONDS = 60   # Intervalo entre os relatórios do que foi descartado.
+# Filas de prioridade: a telemetria pausa enquanto há pedidos de controle (comandos, listagens); 0 desativa.
+CONTROL_PRIORITY = os.environ.get("GATEWAY_CONTROL_PRIORITY", "1") != "0"
+CONTROL_MAX_PAUSE_SECONDS = 0.05  # Pausa máxima da telemetria a cada leitura enquanto há pedidos de controle.
+CONTROL_SWITCH_INTERVAL = 0.001   # Intervalo de troca de threads do interpretador (o padrão do Python é 5 ms).
+DEVICE_SEND_TIMEOUT = 2.0  # Envio a um dispositivo que não lê nesse tempo falha, e o dispositivo é removido do registro.
+# Gêmeos digitais: o reconciliador envia comandos só aos dispositivos fora do estado desejado.
+TWIN_RECONCILE_SECONDS = 0.5                    # Intervalo entre as rodadas do reconciliador.
+TWIN_COMMAND_RATE, TWIN_COMMAND_BURST = 200, 100  # Comandos de reconciliação por segundo e rajada máxima.
+TWIN_BATCH_SIZE = 100       # Comandos por rodada, no máximo.
+TWIN_RETRY_SECONDS = 5.0    # Comando não confirmado pelo dispositivo é reenviado após este intervalo...
+TWIN_MAX_ATTEMPTS = 3       # ...até este número de envios.
+# Modo de borda: com GATEWAY_UPSTREAM ("ip:porta" da porta de dispositivos do Gateway central), este
+# Gateway atende os dispositivos locais e encaminha ao central os registros e a telemetria resumida.
+UPSTREAM_GATEWAY = os.environ.get("GATEWAY_UPSTREAM")
+EDGE_ID = os.environ.get("GATEWAY_EDGE_ID")  # Padrão: borda_<ip>_<porta de dispositivos>.
+EDGE_FORWARD_SECONDS = float(os.environ.get("GATEWAY_EDGE_INTERVAL", 5.0))  # Intervalo entre os lotes enviados ao central.
+PROFILING_MAX_SAMPLE_HZ = 1000  # Limite das amostras de pilha por segundo pedidas pela porta de clientes.
+
+def gateway_ip():
+    """Retorna o IP do Gateway, detectando-o na primeira chamada se não tiver sido definido."""
+    global GATEWAY_IP
+    if GATEWAY_IP is None:
+        GATEWAY_IP = get_local_ip()
+    return GATEWAY_IP
+
+def bind_ip():
+    """Retorna o endereço em que as portas TCP são abertas."""
+    return BIND_IP or gateway_ip()
 
 # --- Estado do Gateway ---
 # Dicionários globais para armazenar o estado do sistema.
-devices = {}              # Armazena informações e o último status de cada dispositivo.
-device_tcp_sockets = {}   # Armazena os objetos de socket TCP ativos para cada dispositivo.
+devices = {}              # ID -> DeviceRecord com as informações, a conexão TCP e o último valor de cada dispositivo.
 lock = threading.Lock()   # Um "cadeado" (lock) para garantir acesso seguro aos dicionários por múltiplas threads.
+# Agregados por tipo de dispositivo e por grupo, atualizados a cada leitura recebida via UDP.
+aggregator = Aggregator(TUMBLING_WINDOW_SECONDS, SLIDING_WINDOW_SECONDS, SLIDING_WINDOW_PANES)
+# Regras avaliadas a cada leitura; as ações disparadas são executadas por uma thread própria.
+rules_engine = RulesEngine()
+rule_actions = queue.Queue()
+
+def is_registered_camera(device_id):
+    """Indica se o ID pertence a uma câmera registrada; usado para aceitar conexões de streaming."""
+    with lock:
+        record = devices.get(device_id)
+        return record is not None and record.device_type == smart_city_pb2.CAMERA
+
+# Repasse dos quadros das câmeras para os clientes assinantes.
+stream_relay = StreamRelay(is_registered_camera)
+
+# Temporizadores do Gateway (um único heap) e coordenação dos semáforos.
+timers = TimerService()
+traffic_scheduler = TrafficScheduler(timers, lambda device_id, values: send_command_to_device(device_id, values=values))
+# Programações dos grupos de postes, enviadas por multicast (uma mensagem por grupo).
+lamp_scheduler = LampScheduler(timers, lambda wrapper_msg: multicast_lamp_schedule(wrapper_msg),
+                               lambda device_id, wrapper_msg: forward_to_device(device_id, wrapper_msg))
+# Gêmeos digitais (estado desejado e reportado) de cada dispositivo e o reconciliador.
+twin_store = TwinStore(lambda device_id, values: send_command_to_device(device_id, values=values, record=False),
+                       TWIN_COMMAND_RATE, TWIN_COMMAND_BURST, TWIN_BATCH_SIZE, TWIN_RETRY_SECONDS, TWIN_MAX_ATTEMPTS)
+# Rodadas do reconciliador à espera da thread de envio (no máximo uma além da que está sendo enviada).
+twin_batches = queue.Queue(1)
+
+# Controle de admissão: limites de taxa, fila de ingestão e contadores do que foi descartado.
+udp_device_limiter = RateLimiter(UDP_DEVICE_RATE, UDP_DEVICE_BURST)
+udp_source_limiter = RateLimiter(UDP_SOURCE_RATE, UDP_SOURCE_BURST)
+client_source_limiter = RateLimiter(CLIENT_SOURCE_RATE, CLIENT_SOURCE_BURST)
+ingest_queue = queue.Queue(INGEST_QUEUE_SIZE)
+admission_stats = AdmissionStats()
+# Pedidos de controle, atendidos à frente da telemetria.
+control_lane = ControlLane(CONTROL_PRIORITY, CONTROL_MAX_PAUSE_SECONDS)
+
+# Hierarquia de Gateways: bordas conectadas a este Gateway (no central) e a conexão com o central (na borda).
+edges = {}     # ID da borda -> (conexão, lock de envio).
+uplink = None  # EdgeUplink, criado apenas no modo de borda.
+
+# Gravação do tráfego (desativada, a menos que GATEWAY_CAPTURE seja definido).
+capture_log = None
+# Histórico da telemetria (desativado, a menos que GATEWAY_HISTORY seja definido).
+history_log = None
+# Perfilamento das etapas principais e amostragem de pilhas (desligado até um ProfilingRequest).
+profiler = Profiler()
+
+def capture_message(channel, direction, conn, wrapper_msg):
+    """Grava a mensagem no arquivo de captura, se a captura estiver ativa."""
+    if capture_log is not None:
+        capture_log.record(channel, direction, conn, wrapper_msg.SerializeToString())
+
+def report_admission_periodically():
+    """Mostra o que foi descartado ou atrasado desde o último relatório e se reagenda."""
+    changes, totals = admission_stats.delta()
+    if changes:
+        summary = ", ".join(f"{reason}: +{count} ({totals[reason]} no total)" for reason, count in sorted(changes.items()))
+        print(f"[ADMISSÃO] {summary} | fila de ingestão: {ingest_queue.qsize()}")
+    control = control_lane.summary()
+    if control is not None:
+        count, p50, p99, pauses = control
+        print(f"[PRIORIDADE] Pedidos de controle (últimos {count}): p50 {p50:.1f} ms, p99 {p99:.1f} ms; "
+              f"telemetria pausada {pauses} vez(es).")
+    out_of_sync, sent, abandoned = twin_store.summary()
+    if out_of_sync or sent:
+        print(f"[GÊMEO] {out_of_sync} dispositivo(s) fora do estado desejado; {sent} comando(s) de reconciliação "
+              f"enviado(s), {abandoned} dispositivo(s) sem confirmação.")
+    timers.schedule(ADMISSION_REPORT_SECONDS, report_admission_periodically)
+
+def report_edge_periodically():
+    """Mostra quantas leituras a borda recebeu e quantas encaminhou ao central, e se reagenda."""
+    received, forwarded = uplink.stats()
+    print(f"[BORDA] {received} leitura(s) recebida(s), {forwarded} encaminhada(s) ao Gateway central.")
+    timers.schedule(ADMISSION_REPORT_SECONDS, report_edge_periodically)
+
+def reconcile_twins_periodically():
+    """
+    Escolhe uma rodada do reconciliador dos gêmeos digitais e se reagenda (mesmo se a escolha falhar).
+    Os envios ficam com send_twin_batches, fora da thread dos temporizadores.
+    """
+    try:
+        # Enquanto a thread de envio está atrasada, nenhuma rodada nova é escolhida.
+        if not twin_batches.full():
+            batch = twin_store.pick_batch(time.time())
+            if batch:
+                twin_batches.put_nowait(batch)
+    finally:
+        timers.schedule(TWIN_RECONCILE_SECONDS, reconcile_twins_periodically)
+
+def flush_capture_periodically():
+    """Descarrega o arquivo de captura e se reagenda no serviço de temporizadores."""
+    capture_log.flush()
+    timers.schedule(CAPTURE_FLUSH_SECONDS, flush_capture_periodically)
 
 def discover_devices_periodically():
     """
@@ -51,49 +219,175 @@ def discover_devices_periodically():
     # Define o Time-To-Live (TTL) do pacote, permitindo que ele passe por roteadores se necessário.
     multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
     # Associa o socket à interface de rede do IP do gateway.
-    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(GATEWAY_IP))
+    multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(gateway_ip()))
     
     # Constrói a mensagem estruturada com as informações de conexão do Gateway.
     # Esta mensagem será o "cartão de visita" do Gateway na rede.
     wrapper_msg = smart_city_pb2.WrapperMessage()
     info = wrapper_msg.gateway_info
-    info.ip_address = GATEWAY_IP
+    info.ip_address = gateway_ip()
     info.device_tcp_port = DEVICE_TCP_PORT
     info.client_tcp_port = CLIENT_TCP_PORT
+    info.stream_tcp_port = STREAM_TCP_PORT
     
     # Serializa a mensagem para um formato de bytes para ser enviada pela rede.
     message = wrapper_msg.SerializeToString()
     
     # Loop infinito para enviar o anúncio a cada 10 segundos.
     while True:
-        print(f"[DISCOVERY] Anunciando presença do Gateway ({GATEWAY_IP}) na rede...")
+        print(f"[DISCOVERY] Anunciando presença do Gateway ({gateway_ip()}) na rede...")
         multicast_socket.sendto(message, (MULTICAST_GROUP, MULTICAST_PORT))
         time.sleep(10)
 
+def multicast_lamp_schedule(wrapper_msg):
+    """Envia uma programação de postes em um único datagrama multicast (e às bordas, que a repassam)."""
+    send_to_edges(wrapper_msg)
+    multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(gateway_ip()))
+        # Assinada como os datagramas de status: os postes descartam programações forjadas ou repetidas.
+        multicast_socket.sendto(seal_datagram(wrapper_msg.SerializeToString()), (MULTICAST_GROUP, LAMP_SCHEDULE_PORT))
+    except OSError as e:
+        print(f"[POSTES] Falha ao enviar programação por multicast: {e}")
+    finally:
+        multicast_socket.close()
+
+def send_to_edges(wrapper_msg):
+    """Envia uma mensagem a todas as bordas conectadas a este Gateway."""
+    with lock:
+        links = list(edges.values())
+    for conn, send_lock in links:
+        try:
+            with send_lock:
+                send_message(conn, wrapper_msg)
+        except OSError as e:
+            print(f"[BORDA] Falha ao enviar a uma borda: {e}")
+
+def register_edge_devices(edge_id, conn, send_lock, registration):
+    """
+    Registra os dispositivos de uma borda; os comandos para eles seguem pela conexão da borda.
+
+    Cada ID precisa constar do certificado da borda, e um dispositivo registrado
+    por outra conexão ainda aberta não é tomado por ela.
+    """
+    accepted = []
+    with lock:
+        for info in registration.devices:
+            if not peer_owns_id(conn, info.id):
+                print(f"[SEGURANÇA] Borda {edge_id}: registro de '{info.id}' recusado: o ID não corresponde ao certificado.")
+                continue
+            current = devices.get(info.id)
+            if current is not None and current.conn is not conn and connection_is_open(current.conn):
+                print(f"[SEGURANÇA] Borda {edge_id}: '{info.id}' já está registrado por outra conexão; registro ignorado.")
+                continue
+            devices[info.id] = DeviceRecord(info, conn, info.ip_address, send_lock)
+            accepted.append((devices[info.id], info))
+    records = [record for record, _ in accepted]
+    for record, info in accepted:
+        twin_store.report(record.device_id, config.to_dict(info.reported_config), registered=True)
+    if records:
+        print(f"--> SUCESSO: {len(records)} dispositivo(s) registrado(s) pela borda {edge_id}.")
+    # Uma programação por grupo de postes basta: a borda a repassa a todos os postes do grupo.
+    lamp_groups = {record.group: record.device_id for record in records
+                   if record.device_type == smart_city_pb2.LAMP_POST}
+    for group, device_id in lamp_groups.items():
+        lamp_scheduler.on_register(device_id, group)
+
+def handle_edge_connection(conn, wrapper_msg):
+    """
+    Atende a conexão de um Gateway de borda, que começa com uma EdgeRegistration.
+    Executada na thread da conexão enquanto a borda estiver conectada.
+    """
+    edge_id = wrapper_msg.edge_registration.edge_id
+    send_lock = threading.Lock()
+    with lock:
+        edges[edge_id] = (conn, send_lock)
+    print(f"[BORDA] Gateway de borda {edge_id} conectado.")
+    try:
+        while wrapper_msg is not None:
+            if wrapper_msg.HasField("edge_registration"):
+                register_edge_devices(edge_id, conn, send_lock, wrapper_msg.edge_registration)
+            elif wrapper_msg.HasField("telemetry_batch"):
+                for status in wrapper_msg.telemetry_batch.statuses:
+                    admit_status(status)
+            wrapper_msg = recv_message(conn)
+            if wrapper_msg is not None:
+                capture_message(CHANNEL_DEVICE, INBOUND, conn, wrapper_msg)
+    except OSError as e:
+        print(f"[BORDA] Conexão com a borda {edge_id} perdida: {e}")
+    finally:
+        with lock:
+            if edges.get(edge_id, (None,))[0] is conn:
+                del edges[edge_id]
+            # Os dispositivos da borda só eram alcançáveis pela conexão dela.
+            orphaned = [device_id for device_id, record in devices.items() if record.conn is conn]
+            for device_id in orphaned:
+                del devices[device_id]
+        print(f"[BORDA] Gateway de borda {edge_id} desconectado ({len(orphaned)} dispositivo(s) removido(s) do registro).")
+        conn.close()
+
+def handle_upstream_message(wrapper_msg):
+    """Trata uma mensagem recebida do Gateway central (modo de borda)."""
+    if wrapper_msg.HasField("command"):
+        cmd = wrapper_msg.command
+        # O central já validou o comando, mas o esquema local é o que vale para o dispositivo.
+        errors = validate_command(cmd)
+        if not errors and not forward_to_device(cmd.device_id, wrapper_msg):
+            errors = [f"Dispositivo {cmd.device_id} não está conectado."]
+        for error in errors:
+            print(f"[BORDA] Comando do Gateway central para {cmd.device_id} rejeitado: {error}")
+    elif wrapper_msg.HasField("lamp_schedule"):
+        lamp_scheduler.adopt(wrapper_msg)
+
 def handle_device_connection(conn):
     """
     Lida com a conexão inicial de um novo dispositivo. Executada em uma thread.
     """
     try:
-        # Recebe a mensagem de registro do dispositivo.
-        data = conn.recv(1024)
-        if not data:
+        # Autentica o dispositivo (TLS com certificado de dispositivo) antes de qualquer mensagem.
+        conn = accept_secure(conn, ROLE_DEVICE)
+        # Recebe e decodifica a mensagem de registro do dispositivo.
+        wrapper_msg = recv_message(conn)
+        if wrapper_msg is None:
             conn.close()
             return
+        capture_message(CHANNEL_DEVICE, INBOUND, conn, wrapper_msg)
 
-        # Decodifica a mensagem usando Protocol Buffers.
-        wrapper_msg = smart_city_pb2.WrapperMessage()
-        wrapper_msg.ParseFromString(data)
+        # O ID declarado (do dispositivo ou da borda) precisa constar do certificado apresentado.
+        claimed_id = wrapper_msg.edge_registration.edge_id or wrapper_msg.device_info.id
+        if not peer_owns_id(conn, claimed_id):
+            print(f"[SEGURANÇA] Registro de '{claimed_id}' recusado: o ID não corresponde ao certificado.")
+            conn.close()
+            return
 
+        # Um Gateway de borda se identifica com a lista dos seus dispositivos.
+        if wrapper_msg.HasField("edge_registration"):
+            handle_edge_connection(conn, wrapper_msg)
         # Se for uma mensagem de identificação, registra o dispositivo.
-        if wrapper_msg.HasField("device_info"):
-            info = wrapper_msg.device_info
-            # Usa o lock para garantir que a escrita nos dicionários seja segura.
+        elif wrapper_msg.HasField("device_info"):
+            # Guarda apenas um registro compacto; a mensagem protobuf recebida é descartada.
+            record = DeviceRecord(wrapper_msg.device_info, conn, conn.getpeername()[0])
+            # O Gateway só escreve nesta conexão: o timeout limita quanto um dispositivo travado
+            # segura as threads dos clientes (e o send_lock do registro) em forward_to_device.
+            conn.settimeout(DEVICE_SEND_TIMEOUT)
+            # Usa o lock para garantir que a escrita no registro seja segura.
             with lock:
-                devices[info.id] = {'info': info, 'status': None}
-                device_tcp_sockets[info.id] = conn
-            device_type_name = smart_city_pb2.DeviceType.Name(info.type)
-            print(f"--> SUCESSO: Dispositivo {info.id} ({device_type_name}) conectado.")
+                devices[record.device_id] = record
+            # O estado informado no registro vira o estado reportado do gêmeo digital.
+            twin_store.report(record.device_id, config.to_dict(wrapper_msg.device_info.reported_config), registered=True)
+            config_keys = ", ".join(field.key for field in record.config_schema.fields) or "nenhuma"
+            print(f"--> SUCESSO: Dispositivo {record.device_id} ({record.type_name}, grupo {record.group}) conectado. Configurações: {config_keys}.")
+            send_registration_ack(record)
+            # Postes recebem a programação do seu grupo logo após o registro.
+            if record.device_type == smart_city_pb2.LAMP_POST:
+                lamp_scheduler.on_register(record.device_id, record.group)
+            # No modo de borda, o dispositivo também é registrado no Gateway central.
+            if uplink is not None:
+                device_info = smart_city_pb2.DeviceInfo()
+                record.fill_device_info(device_info)
+                device_info.reported_config.CopyFrom(wrapper_msg.device_info.reported_config)
+                uplink.add_device(device_info)
         else:
             # Se a mensagem não for de identificação, fecha a conexão.
             print("[ERRO] Conexão na porta de dispositivos não se identificou.")
@@ -103,109 +397,672 @@ def handle_device_connection(conn):
         conn.close()
 
 
+def send_registration_ack(record):
+    """
+    Confirma ao dispositivo que o registro foi gravado.
+
+    A câmera, por exemplo, só abre o canal de streaming depois da confirmação.
+    Sensores fecham a conexão logo após o registro e não a esperam, então uma
+    falha no envio é ignorada (sem remover o dispositivo do registro).
+    """
+    ack_msg = smart_city_pb2.WrapperMessage()
+    ack_msg.registration_ack.device_id = record.device_id
+    try:
+        with record.send_lock:
+            send_message(record.conn, ack_msg)
+    except OSError:
+        return
+    capture_message(CHANNEL_DEVICE, OUTBOUND, record.conn, ack_msg)
+
+
+def validate_command(cmd):
+    """
+    Valida um comando antes de encaminhá-lo ao dispositivo.
+
+    Comandos no formato legado "chave:valor" são convertidos para ConfigUpdate,
+    e toda ConfigUpdate é validada contra o esquema declarado pelo dispositivo.
+    Retorna a lista de erros; uma lista vazia significa que o comando é válido.
+    """
+    with lock:
+        record = devices.get(cmd.device_id)
+    if record is None:
+        return [f"Dispositivo {cmd.device_id} não encontrado."]
+
+    schema = record.config_schema
+    if cmd.HasField("new_config"):
+        try:
+            cmd.config_update.CopyFrom(config.parse_legacy_config(schema, cmd.new_config))
+        except ValueError:
+            return [f"Formato de configuração inválido: {cmd.new_config}"]
+    if cmd.HasField("config_update"):
+        return config.validate_update(schema, cmd.config_update)
+    return []
+
+
+def forward_to_device(device_id, wrapper_msg):
+    """Envia uma mensagem enquadrada pela conexão TCP do dispositivo. Retorna False se ele não estiver conectado."""
+    with lock:
+        record = devices.get(device_id)
+    if record is None:
+        return False
+    started = profiler.clock()
+    try:
+        with record.send_lock:
+            send_message(record.conn, wrapper_msg)
+    except OSError as e:
+        # A conexão caiu (dispositivo desligado, rede fora): o dispositivo só volta a receber comandos ao se registrar de novo.
+        drop_device(record, e)
+        return False
+    profiler.record("encaminhamento_comando", started)
+    capture_message(CHANNEL_DEVICE, OUTBOUND, record.conn, wrapper_msg)
+    return True
+
+
+def connection_is_open(conn):
+    """Indica se a conexão ainda não foi fechada deste lado."""
+    try:
+        return conn.fileno() != -1
+    except OSError:
+        return False
+
+
+def drop_device(record, error):
+    """
+    Remove do registro um dispositivo cuja conexão falhou (se ele não tiver se
+    registrado de novo) e a fecha. A conexão de uma borda é compartilhada pelos
+    seus dispositivos e fica a cargo de handle_edge_connection.
+    """
+    with lock:
+        if devices.get(record.device_id) is record:
+            del devices[record.device_id]
+        shared = any(edge_conn is record.conn for edge_conn, _ in edges.values())
+    print(f"[TCP-DEVICE] Conexão com {record.device_id} perdida ({error}); dispositivo removido do registro.")
+    if shared:
+        return
+    try:
+        record.conn.close()
+    except OSError:
+        pass
+
+
+def send_to_client(conn, response_msg):
+    """Envia uma resposta ao cliente, gravando-a se a captura estiver ativa."""
+    started = profiler.clock()
+    send_message(conn, response_msg)
+    profiler.record("envio_cliente", started)
+    capture_message(CHANNEL_CLIENT, OUTBOUND, conn, response_msg)
+
+
+def build_aggregate_response(query):
+    """Monta a resposta a uma AggregateQuery a partir das janelas mantidas pelo agregador."""
+    scope_kind = query.WhichOneof("scope")
+    if scope_kind == "device_type":
+        scope = f"type:{smart_city_pb2.DeviceType.Name(query.device_type)}"
+    elif scope_kind == "group":
+        scope = f"group:{query.group}"
+    else:
+        scope = None
+    sliding = query.window == smart_city_pb2.SLIDING
+
+    response_msg = smart_city_pb2.WrapperMessage()
+    aggregate_response = response_msg.aggregate_response
+    aggregate_response.SetInParent()
+    for key_scope, metric, start, end, stats in aggregator.query(scope, query.metric or None, sliding, time.time()):
+        result = aggregate_response.results.add()
+        result.scope = key_scope
+        result.metric = metric
+        result.window = query.window
+        result.window_start = start
+        result.window_end = end
+        result.count = stats["count"]
+        result.sum = stats["sum"]
+        result.min = stats["min"]
+        result.max = stats["max"]
+        result.mean = stats["mean"]
+        result.p50 = stats["p50"]
+        result.p90 = stats["p90"]
+        result.p99 = stats["p99"]
+    return response_msg
+
+
+def send_command_to_device(device_id, toggle=False, values=None, record=True):
+    """
+    Monta, valida e encaminha um comando gerado pelo próprio Gateway.
+
+    Os comandos internos (regras, planos de semáforos) passam pela mesma
+    validação dos comandos de clientes. Com 'record', as configurações
+    enviadas viram o estado desejado do gêmeo digital (os comandos do próprio
+    reconciliador não o alteram). Retorna a lista de erros.
+    """
+    command_msg = smart_city_pb2.WrapperMessage()
+    cmd = command_msg.command
+    cmd.device_id = device_id
+    if toggle:
+        cmd.toggle = True
+    else:
+        for key, config_value in (values or {}).items():
+            config.set_value(cmd.config_update.values[key], config_value)
+    errors = validate_command(cmd)
+    if not errors and not forward_to_device(device_id, command_msg):
+        errors = [f"Dispositivo {device_id} não está conectado."]
+    if not errors and record and not toggle:
+        twin_store.desire(device_id, values, time.time(), sent=True)
+    return errors
+
+
+def select_devices(device_ids, device_type, group):
+    """Retorna os IDs registrados que atendem ao seletor (IDs explícitos ou tipo/grupo)."""
+    with lock:
+        if device_ids:
+            return [device_id for device_id in device_ids if device_id in devices]
+        return [
+            device_id for device_id, record in devices.items()
+            if (device_type is None or record.type_name == device_type)
+            and (group is None or record.group == group)
+        ]
+
+
+def send_twin_batches():
+    """Envia as rodadas escolhidas pelo reconciliador dos gêmeos digitais. Roda em uma thread própria."""
+    while True:
+        batch = twin_batches.get()
+        try:
+            twin_store.send_batch(batch)
+        except Exception as e:
+            print(f"[GÊMEO] Erro ao enviar uma rodada de reconciliação: {e}")
+
+
+def execute_rule_actions():
+    """
+    Executa as ações disparadas pelo motor de regras. Roda em uma thread própria
+    para que o envio de comandos não atrase a ingestão de dados via UDP.
+    """
+    while True:
+        rule, action, device_id, group, value = rule_actions.get()
+        # Uma ação com erro não pode parar a thread: as regras seguintes continuam sendo executadas.
+        try:
+            execute_rule_action(rule, action, device_id, group, value)
+        except Exception as e:
+            print(f"[REGRA] {rule.rule_id}: erro ao executar a ação: {e}")
+
+
+def execute_rule_action(rule, action, device_id, group, value):
+    """Executa uma ação disparada: a notificação e o comando para cada dispositivo selecionado."""
+    if action.notify:
+        try:
+            text = action.notify.format(rule=rule.rule_id, device_id=device_id, group=group, value=value)
+        except (KeyError, IndexError, ValueError):
+            text = action.notify
+        print(f"[REGRA] {rule.rule_id}: {text}")
+    if not action.has_command:
+        return
+
+    # O grupo "$group" seleciona os dispositivos do mesmo grupo da leitura que disparou a regra.
+    target_group = group if action.group == "$group" else action.group
+    for target_id in select_devices(action.device_ids, action.device_type, target_group):
+        # A falha no envio a um dispositivo não impede os comandos aos demais.
+        try:
+            errors = send_command_to_device(target_id, toggle=action.toggle, values=action.config)
+        except Exception as e:
+            errors = [str(e)]
+        if errors:
+            print(f"[REGRA] {rule.rule_id}: comando para {target_id} rejeitado: {'; '.join(errors)}")
+        else:
+            print(f"[REGRA] {rule.rule_id}: comando enviado para {target_id}.")
+
+
+def build_green_wave_result(request):
+    """Calcula e envia, em um único lote, o plano de onda verde pedido pelo cliente."""
+    device_ids = list(request.device_ids)
+    if not device_ids:
+        device_ids = sorted(select_devices(None, "TRAFFIC_LIGHT", request.group or None))
+    response_msg = smart_city_pb2.WrapperMessage()
+    result = response_msg.green_wave_result
+    result.SetInParent()
+    result.group = request.group
+    if not device_ids:
+        result.errors.append(f"Nenhum semáforo encontrado no grupo {request.group}.")
+        return response_msg
+
+    anchor, offsets, errors = traffic_scheduler.apply_green_wave(
+        request.group, device_ids, list(request.distances_m), request.speed_kmh,
+        request.green_seconds or 20, request.yellow_seconds or 3, request.red_seconds or 15)
+    result.cycle_anchor = anchor or 0.0
+    result.device_ids.extend(device_ids if anchor is not None else [])
+    result.offsets.extend(offsets)
+    result.errors.extend(errors)
+    print(f"[SEMÁFORO] Onda verde do grupo {request.group}: {len(offsets)} semáforo(s), {len(errors)} erro(s).")
+    return response_msg
+
+
+def build_twin_update_result(update):
+    """Guarda o estado pedido no gêmeo de cada dispositivo selecionado; os comandos ficam com o reconciliador."""
+    device_type = smart_city_pb2.DeviceType.Name(update.device_type) if update.device_type else None
+    device_ids = select_devices(list(update.device_ids), device_type, update.group or None)
+    with lock:
+        records = [devices[device_id] for device_id in device_ids if device_id in devices]
+    response_msg = smart_city_pb2.WrapperMessage()
+    result = response_msg.twin_update_result
+    result.SetInParent()
+    result.devices = len(records)
+    values = config.to_dict(update.desired)
+    now = time.time()
+    # Os esquemas são compartilhados entre dispositivos iguais: cada esquema é validado uma vez.
+    checked = {}
+    for record in records:
+        errors = checked.get(id(record.config_schema))
+        if errors is None:
+            errors = checked[id(record.config_schema)] = config.validate_update(record.config_schema, update.desired)
+            result.errors.extend(f"{record.type_name}: {error}" for error in errors)
+        if errors:
+            continue
+        result.accepted += 1
+        if twin_store.desire(record.device_id, values, now):
+            result.out_of_sync += 1
+    print(f"[GÊMEO] Estado desejado {values} para {result.accepted} dispositivo(s); {result.out_of_sync} fora dele.")
+    return response_msg
+
+
+def build_profiling_report(request, role=None):
+    """
+    Liga ou desliga o perfilamento, conforme o pedido, e responde com os dados coletados.
+
+    Com os certificados instalados, só administradores ('role' é o papel do
+    certificado do cliente) controlam ou consultam o perfilamento.
+    """
+    response_msg = smart_city_pb2.WrapperMessage()
+    report = response_msg.profiling_report
+    report.SetInParent()
+    if security_enabled() and role != ROLE_ADMIN:
+        print(f"[SEGURANÇA] Pedido de perfilamento de um certificado '{role}' recusado.")
+        report.errors.append("O perfilamento exige um certificado de administrador.")
+        return response_msg
+    if request.action == smart_city_pb2.PROFILING_START:
+        sample_hz = min(request.sample_hz or DEFAULT_SAMPLE_HZ, PROFILING_MAX_SAMPLE_HZ)
+        profiler.start(sample_hz)
+        print(f"[PERFIL] Perfilamento ligado ({sample_hz} amostra(s) de pilha por segundo).")
+    elif request.action == smart_city_pb2.PROFILING_STOP:
+        profiler.stop()
+        print("[PERFIL] Perfilamento desligado.")
+    report.active, report.seconds, report.samples, stages, report.folded_stacks = profiler.report()
+    for stage, count, total, p50, p99, maximum, buckets in stages:
+        histogram = report.stages.add()
+        histogram.stage = stage
+        histogram.count = count
+        histogram.total_ms = total * 1000
+        histogram.p50_ms = p50 * 1000
+        histogram.p99_ms = p99 * 1000
+        histogram.max_ms = maximum * 1000
+        histogram.buckets.extend(buckets)
+    return response_msg
+
+
+def handle_client_request(wrapper_msg, role=None):
+    """
+    Atende um pedido de cliente e retorna a resposta (ou None, se o pedido não tiver resposta).
+
+    'role' é o papel do certificado do cliente (None sem certificados).
+    """
+    # Se a requisição for para listar dispositivos...
+    if wrapper_msg.HasField("list_request"):
+        print("[GATEWAY] Recebido pedido de listagem do cliente.")
+        started = profiler.clock()
+        response_msg = smart_city_pb2.WrapperMessage()
+        list_response = response_msg.list_response
+        # Uma resposta sem campos preenchidos (lista vazia) também precisa dizer de que tipo ela é.
+        list_response.SetInParent()
+        # Acessa a lista de dispositivos de forma segura.
+        with lock:
+            for record in devices.values():
+                # As DeviceInfo são montadas a partir do registro só no momento do envio.
+                record.fill_device_info(list_response.devices.add())
+        # O estado de cada dispositivo vem do seu gêmeo digital, sem consultá-lo.
+        twin_store.fill_device_infos(list_response.devices)
+        profiler.record("montagem_lista", started)
+        print("[GATEWAY] Resposta da lista enviada.")
+        return response_msg
+
+    # Se a requisição for uma consulta de agregados...
+    elif wrapper_msg.HasField("aggregate_query"):
+        return build_aggregate_response(wrapper_msg.aggregate_query)
+
+    # Se a requisição for um estado desejado para vários dispositivos...
+    elif wrapper_msg.HasField("twin_update"):
+        return build_twin_update_result(wrapper_msg.twin_update)
+
+    # Se a requisição for o controle do perfilamento...
+    elif wrapper_msg.HasField("profiling_request"):
+        return build_profiling_report(wrapper_msg.profiling_request, role)
+
+    # Se a requisição for um plano de onda verde para semáforos...
+    elif wrapper_msg.HasField("green_wave_request"):
+        return build_green_wave_result(wrapper_msg.green_wave_request)
+
+    # Se a requisição for uma programação para um grupo de postes...
+    elif wrapper_msg.HasField("lamp_schedule"):
+        schedule = wrapper_msg.lamp_schedule
+        response_msg = smart_city_pb2.WrapperMessage()
+        result = response_msg.lamp_schedule_result
+        result.SetInParent()
+        result.group = schedule.group
+        result.version, errors = lamp_scheduler.set_schedule(schedule)
+        result.errors.extend(errors)
+        result.devices = len(select_devices(None, "LAMP_POST", schedule.group))
+        return response_msg
+
+    # Se a requisição for um comando...
+    elif wrapper_msg.HasField("command"):
+        cmd = wrapper_msg.command
+        print(f"[GATEWAY] Recebido comando para {cmd.device_id}.")
+        response_msg = smart_city_pb2.WrapperMessage()
+        result = response_msg.command_result
+        result.SetInParent()
+        result.device_id = cmd.device_id
+        # Valida o comando antes que ele atravesse a rede até o dispositivo.
+        errors = validate_command(cmd)
+        if not errors and not forward_to_device(cmd.device_id, wrapper_msg):
+            errors = [f"Dispositivo {cmd.device_id} não está conectado."]
+        # As configurações enviadas viram o estado desejado; sem confirmação, o reconciliador as reenvia.
+        if not errors and cmd.HasField("config_update"):
+            twin_store.desire(cmd.device_id, config.to_dict(cmd.config_update), time.time(), sent=True)
+        result.accepted = not errors
+        result.errors.extend(errors)
+        for error in errors:
+            print(f"[ERRO] Comando para {cmd.device_id} rejeitado: {error}")
+        return response_msg
+    return None
+
+
 def handle_client_connection(conn):
     """
     Lida com a conexão e os pedidos de um cliente. Executada em uma thread.
     """
-    print(f"[TCP-CLIENT] Cliente conectado de {conn.getpeername()}.")
+    # O endereço é guardado antes do handshake: depois de fechada, a conexão TLS não o informa mais.
+    peer = conn.getpeername()
+    print(f"[TCP-CLIENT] Cliente conectado de {peer}.")
+    try:
+        # Só clientes e administradores (com os certificados desses papéis) podem consultar e enviar comandos.
+        conn = accept_secure(conn, (ROLE_CLIENT, ROLE_ADMIN))
+    except OSError as e:
+        print(f"[SEGURANÇA] Conexão de cliente {peer} recusada: {e}")
+        conn.close()
+        return
+    role = peer_role(conn) if security_enabled() else None
+    # Balde de fichas desta conexão; o IP de origem tem um limite próprio, somando todas as conexões.
+    connection_bucket = TokenBucket(CLIENT_REQUEST_RATE, CLIENT_REQUEST_BURST, time.monotonic())
     try:
         # Loop para processar múltiplos pedidos do mesmo cliente.
         while True:
-            data = conn.recv(1024)
-            if not data:
+            wrapper_msg = recv_message(conn)
+            if wrapper_msg is None:
                 break # Cliente desconectou
+            # Acima do limite, o pedido é atrasado: o cliente só recebe a resposta (e envia o próximo)
+            # quando houver ficha. Se o atraso for grande demais, a conexão é encerrada.
+            now = time.monotonic()
+            delay = max(connection_bucket.reserve(now), client_source_limiter.reserve(peer[0], now))
+            if delay > CLIENT_MAX_DELAY_SECONDS:
+                admission_stats.count("cliente_desconectado")
+                print(f"[ADMISSÃO] Cliente {peer} excedeu o limite de pedidos e foi desconectado.")
+                break
+            if delay > 0:
+                admission_stats.count("cliente_atrasado")
+                time.sleep(delay)
+            capture_message(CHANNEL_CLIENT, INBOUND, conn, wrapper_msg)
 
-            wrapper_msg = smart_city_pb2.WrapperMessage()
-            wrapper_msg.ParseFromString(data)
-            
-            # Se a requisição for para listar dispositivos...
-            if wrapper_msg.HasField("list_request"):
-                print("[GATEWAY] Recebido pedido de listagem do cliente.")
-                response_msg = smart_city_pb2.WrapperMessage()
-                list_response = response_msg.list_response
-                # Acessa a lista de dispositivos de forma segura.
-                with lock:
-                    for device_id, device_data in devices.items():
-                        device_info = list_response.devices.add()
-                        device_info.id = device_id
-                        device_info.type = device_data['info'].type
-                # Envia a resposta para o cliente.
-                conn.send(response_msg.SerializeToString())
-                print("[GATEWAY] Resposta da lista enviada.")
-
-            # Se a requisição for um comando...
-            elif wrapper_msg.HasField("command"):
-                cmd = wrapper_msg.command
-                print(f"[GATEWAY] Recebido comando para {cmd.device_id}.")
-                # Encontra o socket do dispositivo alvo para encaminhar o comando.
-                target_socket = device_tcp_sockets.get(cmd.device_id)
-                if target_socket:
-                    target_socket.send(wrapper_msg.SerializeToString())
-                else:
-                    print(f"[ERRO] Dispositivo {cmd.device_id} não encontrado.")
+            # Os pedidos de controle rodam nesta thread, com a telemetria pausada.
+            if message_priority(wrapper_msg) == smart_city_pb2.PRIORITY_CONTROL:
+                response_msg = control_lane.run(handle_client_request, wrapper_msg, role)
+            else:
+                response_msg = handle_client_request(wrapper_msg, role)
+            if response_msg is not None:
+                send_to_client(conn, response_msg)
 
     except Exception as e:
-        print(f"Erro com cliente {conn.getpeername()}: {e}")
+        print(f"Erro com cliente {peer}: {e}")
     finally:
         # Garante que a conexão seja fechada ao final.
-        print(f"[TCP-CLIENT] Cliente {conn.getpeername()} desconectado.")
+        print(f"[TCP-CLIENT] Cliente {peer} desconectado.")
         conn.close()
 
 
-def device_tcp_server():
-    """Cria um servidor TCP que escuta APENAS por conexões de dispositivos."""
+def open_tcp_server(port):
+    """Abre uma porta TCP de escuta no endereço de bind do Gateway."""
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.bind((GATEWAY_IP, DEVICE_TCP_PORT))
-    server_socket.listen(5)
+    # Permite reiniciar o Gateway sem esperar o fim das conexões antigas (TIME_WAIT).
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((bind_ip(), port))
+    # Fila de conexões grande o bastante para uma rajada de registros sem que o SYN seja reenviado (1 s, 3 s...).
+    server_socket.listen(LISTEN_BACKLOG)
+    return server_socket
+
+def open_udp_socket():
+    """Abre a porta UDP dos sensores."""
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # O bind em "" (ou "0.0.0.0") permite aceitar pacotes de qualquer interface de rede.
+    udp_socket.bind((BIND_IP or "", UDP_PORT))
+    return udp_socket
+
+def device_tcp_server(server_socket=None):
+    """Atende um servidor TCP que escuta APENAS por conexões de dispositivos."""
+    server_socket = server_socket or open_tcp_server(DEVICE_TCP_PORT)
     print(f"[TCP-DEVICE] Gateway ouvindo por Dispositivos na porta {DEVICE_TCP_PORT}")
     while True:
         conn, addr = server_socket.accept()
         # Cria uma nova thread para cada dispositivo que se conecta.
         threading.Thread(target=handle_device_connection, args=(conn,), daemon=True).start()
 
-def client_tcp_server():
-    """Cria um servidor TCP que escuta APENAS por conexões de clientes."""
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.bind((GATEWAY_IP, CLIENT_TCP_PORT))
-    server_socket.listen(5)
+def client_tcp_server(server_socket=None):
+    """Atende um servidor TCP que escuta APENAS por conexões de clientes."""
+    server_socket = server_socket or open_tcp_server(CLIENT_TCP_PORT)
     print(f"[TCP-CLIENT] Gateway ouvindo por Clientes na porta {CLIENT_TCP_PORT}")
     while True:
         conn, addr = server_socket.accept()
         # Cria uma nova thread para cada cliente que se conecta.
         threading.Thread(target=handle_client_connection, args=(conn,), daemon=True).start()
 
-def listen_for_udp_data():
-    """Cria um socket UDP para receber dados de status enviados pelos sensores."""
-    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    # O bind em "" (ou "0.0.0.0") permite aceitar pacotes de qualquer interface de rede.
-    udp_socket.bind(("", UDP_PORT))
+def stream_tcp_server(server_socket=None):
+    """Atende o servidor TCP do canal de streaming das câmeras (publicadores e assinantes)."""
+    server_socket = server_socket or open_tcp_server(STREAM_TCP_PORT)
+    print(f"[STREAM] Gateway ouvindo por streaming de câmeras na porta {STREAM_TCP_PORT}")
+    while True:
+        conn, addr = server_socket.accept()
+        # Cada câmera ou assinante é atendido por uma thread própria.
+        threading.Thread(target=stream_relay.handle_connection, args=(conn,), daemon=True).start()
+
+def listen_for_udp_data(udp_socket=None):
+    """
+    Recebe, pela porta UDP, os dados de status enviados pelos sensores.
+
+    Esta thread faz só o trabalho barato (limites de taxa, assinatura e
+    decodificação) e entrega as leituras aceitas à fila de ingestão, que é
+    processada por process_ingest_queue().
+    """
+    udp_socket = udp_socket or open_udp_socket()
     print(f"[UDP] Gateway ouvindo por dados de sensores na porta {UDP_PORT}")
+    rejected = 0
     while True:
+        # Um pedido de controle pendente passa à frente; enquanto isso, os datagramas esperam no buffer do socket.
+        control_lane.wait_for_control()
         data, addr = udp_socket.recvfrom(1024)
-        wrapper_msg = smart_city_pb2.WrapperMessage(); wrapper_msg.ParseFromString(data)
-        if wrapper_msg.HasField("status_update"):
-            status = wrapper_msg.status_update
-            # Usa o lock para atualizar o status do dispositivo de forma segura.
-            with lock:
-                if status.device_id in devices:
-                    devices[status.device_id]['status'] = status
-                    # Imprime o status recebido para fins de log.
-                    if status.HasField("temperature"):
-                        print(f"[UDP] Status recebido de {status.device_id}: Temperatura {status.temperature:.2f}°C")
-                    elif status.HasField("state_info"):
-                         print(f"[UDP] Status recebido de {status.device_id}: {status.state_info}")
+        now = time.monotonic()
+        # O limite por IP vem antes de qualquer outro trabalho.
+        if not udp_source_limiter.allow(addr[0], now):
+            admission_stats.count("udp_limite_ip")
+            continue
+        # Descarta datagramas sem assinatura válida (forjados, alterados ou reenviados muito tempo depois).
+        data = open_datagram(data)
+        if data is None:
+            admission_stats.count("udp_invalido")
+            rejected += 1
+            if rejected % 100 == 1:
+                print(f"[SEGURANÇA] Datagrama UDP inválido de {addr[0]} ({rejected} rejeitado(s) até agora).")
+            continue
+        if capture_log is not None:
+            capture_log.record(CHANNEL_UDP, INBOUND, None, data)
+        started = profiler.clock()
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        try:
+            wrapper_msg.ParseFromString(data)
+        except DecodeError:
+            admission_stats.count("udp_invalido")
+            continue
+        profiler.record("decodificacao_udp", started)
+        if not wrapper_msg.HasField("status_update"):
+            continue
+        status = wrapper_msg.status_update
+        if not udp_device_limiter.allow(status.device_id, now):
+            admission_stats.count("udp_limite_dispositivo")
+            continue
+        admit_status(status)
+
+def admit_status(status):
+    """Coloca uma leitura na fila de ingestão, descartando-a se o Gateway estiver sobrecarregado."""
+    # Sob carga, a telemetria periódica é descartada primeiro; as mudanças de estado continuam entrando.
+    if ingest_queue.qsize() >= INGEST_SHED_THRESHOLD and is_low_priority(status):
+        admission_stats.count("telemetria_descartada")
+        return
+    try:
+        ingest_queue.put_nowait(status)
+    except queue.Full:
+        admission_stats.count("fila_cheia")
+
+def process_ingest_queue():
+    """Processa as leituras aceitas pela thread UDP. Executada em uma thread própria."""
+    while True:
+        status = ingest_queue.get()
+        control_lane.wait_for_control()
+        # Uma leitura que não pode ser processada é descartada; a thread (a única de ingestão) continua.
+        try:
+            process_status(status)
+        except Exception as e:
+            admission_stats.count("leitura_com_erro")
+            print(f"[ERRO] Falha ao processar leitura de {status.device_id}: {e}")
+
+def process_status(status):
+    """Atualiza o registro, os agregados, as regras e os planejadores com uma leitura recebida."""
+    now = time.time()
+    started = profiler.clock()
+    # Usa o lock para consultar o registro de forma segura; a leitura em si não é guardada nele.
+    with lock:
+        record = devices.get(status.device_id)
+        if record is None:
+            return
+        type_name = record.type_name
+        group = record.group
+    profiler.record("atualizacao_registro", started)
+    # Configuração em vigor informada pelo atuador (depois de um comando ou de uma mudança de estado).
+    if status.HasField("reported_config"):
+        twin_store.report(status.device_id, config.to_dict(status.reported_config))
+    # Imprime o status recebido para fins de log (fora do lock, que os comandos também usam).
+    if status.HasField("temperature"):
+        print(f"[UDP] Status recebido de {status.device_id}: Temperatura {status.temperature:.2f}°C")
+    elif status.HasField("state_info"):
+         print(f"[UDP] Status recebido de {status.device_id}: {status.state_info}")
+    elif status.HasField("light_phase"):
+        print(f"[UDP] Status recebido de {status.device_id}: Fase {smart_city_pb2.LightPhase.Name(status.light_phase)}")
+    elif status.HasField("lamp_state"):
+        lamp_state = status.lamp_state
+        print(f"[UDP] Status recebido de {status.device_id}: "
+              f"{'LIGADO' if lamp_state.is_on else 'DESLIGADO'} em {lamp_state.brightness}%")
+    # Alimenta as janelas de agregação e as regras fora do lock do registro.
+    metrics = list(extract_metrics(status))
+    scopes = (f"type:{type_name}", f"group:{group}")
+    for metric, value in metrics:
+        aggregator.add(scopes, metric, value, now)
+    if history_log is not None:
+        history_log.add(now, status.device_id, type_name, group, metrics)
+    for rule, action, value in rules_engine.evaluate(status.device_id, type_name, group, metrics):
+        rule_actions.put((rule, action, status.device_id, group, value))
+    if status.HasField("light_phase"):
+        traffic_scheduler.on_phase_report(status.device_id, status.light_phase, now)
+    elif status.HasField("lamp_state"):
+        lamp_scheduler.on_state_report(status.device_id, group, status.lamp_state.schedule_version)
+    # No modo de borda, a leitura segue (resumida) para o Gateway central.
+    if uplink is not None:
+        uplink.add_status(status)
 
 
 if __name__ == "__main__":
     # Ponto de entrada do programa.
-    print(f"--- Gateway iniciando com IP dinâmico: {GATEWAY_IP} ---")
+    parser = argparse.ArgumentParser(description="Gateway da Cidade Inteligente.")
+    parser.add_argument("--bind", help="Endereço em que as portas são abertas (ex: 0.0.0.0). Padrão: o IP do Gateway.")
+    parser.add_argument("--interface", help="IP do Gateway, anunciado aos dispositivos e usado no multicast. "
+                                            "Padrão: detectado automaticamente.")
+    args = parser.parse_args()
+    GATEWAY_IP = args.interface or GATEWAY_IP
+    BIND_IP = args.bind or BIND_IP
+    startup.mark("módulos")
+
+    print(f"--- Gateway iniciando em {bind_ip()} ---")
+    if security_enabled():
+        print("[SEGURANÇA] TLS com autenticação mútua nas portas de dispositivos e clientes; UDP assinado.")
+    else:
+        print("[SEGURANÇA] Certificados não encontrados: canais SEM autenticação (gere-os com 'python -m src.common.security certs').")
+
+    # Carrega as regras de limiar, se o arquivo existir.
+    if os.path.exists(RULES_FILE):
+        try:
+            print(f"[REGRA] {rules_engine.load_file(RULES_FILE)} regra(s) carregada(s) de {RULES_FILE}.")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERRO] Falha ao carregar regras de {RULES_FILE}: {e}")
+
+    # Ativa a gravação do tráfego, se pedida.
+    if CAPTURE_FILE:
+        capture_log = CaptureLog(CAPTURE_FILE)
+        print(f"[CAPTURA] Gravando o tráfego do Gateway em {CAPTURE_FILE}.")
+    # Ativa o histórico da telemetria, se pedido.
+    if HISTORY_DIR:
+        history_log = HistoryWriter(HISTORY_DIR, HISTORY_FLUSH_SECONDS).start()
+        print(f"[HISTÓRICO] Gravando a telemetria em {HISTORY_DIR} a cada {HISTORY_FLUSH_SECONDS:g} s.")
+
+    # Abre as portas antes de tudo: a partir daqui, as conexões já ficam na fila do sistema operacional.
+    device_server = open_tcp_server(DEVICE_TCP_PORT)
+    client_server = open_tcp_server(CLIENT_TCP_PORT)
+    stream_server = open_tcp_server(STREAM_TCP_PORT)
+    udp_socket = open_udp_socket()
+    startup.mark("portas")
     
     # Inicia as funções principais em threads separadas para que rodem em paralelo.
     # 'daemon=True' garante que as threads sejam encerradas quando o programa principal terminar.
     threading.Thread(target=discover_devices_periodically, daemon=True).start()
-    threading.Thread(target=listen_for_udp_data, daemon=True).start()
-    threading.Thread(target=device_tcp_server, daemon=True).start()
+    threading.Thread(target=listen_for_udp_data, args=(udp_socket,), daemon=True).start()
+    threading.Thread(target=process_ingest_queue, daemon=True).start()
+    threading.Thread(target=execute_rule_actions, daemon=True).start()
+    threading.Thread(target=send_twin_batches, daemon=True).start()
+    if CONTROL_PRIORITY:
+        # Uma thread que acorda com um pedido de controle espera o GIL por no máximo este intervalo.
+        sys.setswitchinterval(CONTROL_SWITCH_INTERVAL)
+    timers.start()
+    lamp_scheduler.start()
+    timers.schedule(ADMISSION_REPORT_SECONDS, report_admission_periodically)
+    timers.schedule(TWIN_RECONCILE_SECONDS, reconcile_twins_periodically)
+    if capture_log is not None:
+        timers.schedule(CAPTURE_FLUSH_SECONDS, flush_capture_periodically)
+    # No modo de borda, conecta-se ao Gateway central.
+    if UPSTREAM_GATEWAY:
+        upstream_ip, upstream_port = UPSTREAM_GATEWAY.rsplit(":", 1)
+        edge_id = EDGE_ID or f"borda_{gateway_ip()}_{DEVICE_TCP_PORT}"
+        # Comandos e programações do central são pedidos de controle, como os dos clientes.
+        uplink = EdgeUplink((upstream_ip, int(upstream_port)), edge_id, EDGE_FORWARD_SECONDS, timers,
+                            lambda wrapper_msg: control_lane.run(handle_upstream_message, wrapper_msg))
+        uplink.start()
+        timers.schedule(ADMISSION_REPORT_SECONDS, report_edge_periodically)
+        print(f"[BORDA] Modo de borda: {edge_id} encaminha a telemetria a {UPSTREAM_GATEWAY} a cada {EDGE_FORWARD_SECONDS:g} s.")
+    threading.Thread(target=device_tcp_server, args=(device_server,), daemon=True).start()
+    threading.Thread(target=stream_tcp_server, args=(stream_server,), daemon=True).start()
+    startup.mark("threads")
+    startup.report("Gateway")
+    # O protobuf e o TLS são carregados em segundo plano, enquanto as primeiras conexões chegam.
+    startup.prewarm(smart_city_pb2.load, lambda: prepare(ROLE_GATEWAY))
     
     # Executa o servidor de clientes na thread principal.
     # Isso impede que o programa termine, mantendo todos os outros processos em daemon rodando.
-    client_tcp_server()
+    try:
+        client_tcp_server(client_server)
+    finally:
+        if capture_log is not None:
+            capture_log.close()
+            print(f"[CAPTURA] {capture_log.records} mensagem(ns) gravada(s) em {CAPTURE_FILE}.")
+        if history_log is not None:
+            history_log.close()
+            print(f"[HISTÓRICO] {history_log.rows} amostra(s) gravada(s) em {HISTORY_DIR}.")
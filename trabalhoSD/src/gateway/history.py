@@ -0,0 +1,495 @@
+# src/gateway/history.py
+import argparse
+import array
+import bisect
+import datetime
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+# --- Histórico da telemetria em arquivos colunares ---
+# Com o histórico ativado (GATEWAY_HISTORY), cada valor numérico recebido
+# (temperatura, ppm, ...) é guardado em memória e gravado em lote, por uma
+# thread própria, em arquivos particionados por hora (UTC):
+#   <diretório>/<AAAA-MM-DD>/<HH>.col
+#
+# Cada arquivo é uma sequência de blocos, um por gravação. Dentro do bloco as
+# linhas ficam ordenadas por série (dispositivo, métrica, tipo, grupo) e
+# instante, e os dados ficam em colunas: todos os instantes (int64, em
+# microssegundos) seguidos de todos os valores (float64), little-endian e
+# alinhados em 8 bytes. O cabeçalho do bloco traz as séries novas e um índice
+# com o trecho de linhas de cada série e o seu intervalo de tempo.
+#
+# Assim, o leitor (HistoryFile) mapeia o arquivo em memória e responde a
+# consultas sobre milhões de amostras lendo só os trechos das séries pedidas:
+# os instantes são buscados por bisseção e os valores somados direto do mapa,
+# sem copiar nem decodificar linha a linha.
+#
+#   python -m src.gateway.history historico/ --metric temperature --by group --from 2026-10-19T08:00
+
+FILE_MAGIC = b"SCHIST01"
+BLOCK_MAGIC = b"SCHB"
+BLOCK_HEADER = struct.Struct("<4sIII")  # magia, linhas, séries novas, trechos.
+SERIES_ENTRY = struct.Struct("<IH")     # id da série no arquivo, tamanho da chave.
+RUN = struct.Struct("<IIIqq")           # série, primeira linha, linhas, menor e maior instante (us).
+KEY_SEPARATOR = "\x1f"                  # Separa dispositivo, métrica, tipo e grupo na chave da série.
+HOUR_US = 3600 * 1000000
+MAX_PENDING_ROWS = 1000000              # Acima disso (disco parado ou lento), leituras novas são descartadas.
+
+
+def partition_path(directory, hour):
+    """Caminho do arquivo da hora 'hour' (horas desde a época, UTC)."""
+    day = time.strftime("%Y-%m-%d", time.gmtime(hour * 3600))
+    return os.path.join(directory, day, f"{hour % 24:02d}.col")
+
+
+def _padding(offset):
+    return -offset % 8
+
+
+def encode_block(offset, new_series, runs, timestamps, values):
+    """
+    Monta um bloco que começará na posição 'offset' do arquivo.
+
+    new_series: [(id, chave)] das séries que aparecem pela primeira vez;
+    runs: [(série, primeira linha, linhas, menor instante, maior instante)];
+    timestamps e values: array('q') e array('d') com as colunas.
+    """
+    header = [BLOCK_HEADER.pack(BLOCK_MAGIC, len(values), len(new_series), len(runs))]
+    for series_id, key in new_series:
+        encoded = KEY_SEPARATOR.join(key).encode("utf-8")
+        header.append(SERIES_ENTRY.pack(series_id, len(encoded)))
+        header.append(encoded)
+    header.extend(RUN.pack(*run) for run in runs)
+    header = b"".join(header)
+    header += b"\0" * _padding(offset + len(header))
+    if sys.byteorder == "big":
+        timestamps.byteswap()
+        values.byteswap()
+    return header + timestamps.tobytes() + values.tobytes()
+
+
+def compact(path):
+    """
+    Reescreve o arquivo da partição com um único bloco, com um trecho por série.
+
+    Cada gravação do Gateway vira um bloco; a partição de uma hora fechada é
+    compactada para que as consultas leiam um trecho contíguo por série em
+    vez de centenas de trechos pequenos.
+    """
+    with HistoryFile(path) as history_file:
+        if len(history_file.blocks) <= 1:
+            return False
+        pieces = {}   # série -> [(bloco, primeira linha, linhas)].
+        unsorted = set()
+        last_us = {}
+        for block_index, (runs, _, _) in enumerate(history_file.blocks):
+            for series_id, first, count, min_us, max_us in runs:
+                pieces.setdefault(series_id, []).append((block_index, first, count))
+                if min_us < last_us.get(series_id, min_us):
+                    unsorted.add(series_id)  # Leituras atrasadas: a série precisa ser reordenada.
+                last_us[series_id] = max(max_us, last_us.get(series_id, max_us))
+        timestamps = array.array("q")
+        values = array.array("d")
+        runs = []
+        for series_id in sorted(pieces):
+            first = len(values)
+            for block_index, start, count in pieces[series_id]:
+                _, block_timestamps, block_values = history_file.blocks[block_index]
+                timestamps.frombytes(block_timestamps[start:start + count].cast("B"))
+                values.frombytes(block_values[start:start + count].cast("B"))
+            if series_id in unsorted:
+                rows = sorted(zip(timestamps[first:], values[first:]))
+                timestamps[first:] = array.array("q", [row[0] for row in rows])
+                values[first:] = array.array("d", [row[1] for row in rows])
+            runs.append((series_id, first, len(values) - first, timestamps[first], timestamps[-1]))
+        new_series = sorted(history_file.series.items())
+    with open(path + ".tmp", "wb") as compacted:
+        compacted.write(FILE_MAGIC)
+        compacted.write(encode_block(len(FILE_MAGIC), new_series, runs, timestamps, values))
+    os.replace(path + ".tmp", path)
+    return True
+
+
+class HistoryWriter:
+    """
+    Acumula as leituras e as grava em lote nos arquivos de partição.
+
+    add() só guarda a leitura em uma lista (O(1)); a ordenação, a montagem das
+    colunas e a escrita acontecem em flush(), chamado pela thread do histórico.
+    """
+
+    def __init__(self, directory, flush_seconds):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.pending = []        # (instante em us, chave da série, valor).
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.partitions = {}     # hora -> (arquivo, {chave: id da série}).
+        self.rows = 0            # Linhas gravadas desde o início.
+        self.dropped = 0         # Linhas descartadas com a fila cheia, ainda não avisadas no log.
+        self.closed = False
+
+    def add(self, timestamp, device_id, type_name, group, metrics):
+        """Guarda os pares (métrica, valor) de uma leitura recebida em 'timestamp' (segundos)."""
+        timestamp_us = int(timestamp * 1000000)
+        rows = [(timestamp_us, (device_id, metric, type_name, group), float(value)) for metric, value in metrics]
+        with self.lock:
+            if len(self.pending) + len(rows) > MAX_PENDING_ROWS:
+                self.dropped += len(rows)
+                return
+            self.pending.extend(rows)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        while not self.closed:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                # Um erro (disco cheio, leitura inválida...) perde só o lote; a thread continua.
+                print(f"[HISTÓRICO] Falha ao gravar o histórico: {e!r}")
+            with self.lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                print(f"[HISTÓRICO] {dropped} leitura(s) descartada(s): mais de {MAX_PENDING_ROWS} aguardando gravação.")
+
+    def flush(self):
+        """Grava as leituras acumuladas, um bloco por partição."""
+        with self.lock:
+            rows, self.pending = self.pending, []
+        if not rows:
+            return
+        by_hour = {}
+        for row in rows:
+            by_hour.setdefault(row[0] // HOUR_US, []).append(row)
+        with self.write_lock:
+            for hour in sorted(by_hour):
+                try:
+                    self._write_block(hour, by_hour[hour])
+                except Exception:
+                    # O arquivo pode ter ficado com um bloco pela metade e o mapa de séries com ids
+                    # que não chegaram ao disco: ele é reaberto (e o bloco descartado) na próxima gravação.
+                    self._forget_partition(hour)
+                    raise
+            # Só a hora atual e a anterior (leituras atrasadas) ficam com o arquivo aberto;
+            # as mais antigas são fechadas e compactadas.
+            newest = max(self.partitions)
+            for hour in [hour for hour in self.partitions if hour < newest - 1]:
+                self._close_partition(hour)
+
+    def _close_partition(self, hour):
+        self.partitions.pop(hour)[0].close()
+        compact(partition_path(self.directory, hour))
+
+    def _forget_partition(self, hour):
+        partition = self.partitions.pop(hour, None)
+        if partition is not None:
+            try:
+                partition[0].close()
+            except OSError:
+                pass
+
+    def _open(self, hour):
+        partition = self.partitions.get(hour)
+        if partition is None:
+            path = partition_path(self.directory, hour)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            series_ids = {}
+            if os.path.exists(path) and os.path.getsize(path) >= len(FILE_MAGIC):
+                # Gateway reiniciado na mesma hora: continua o arquivo com as séries já definidas.
+                with HistoryFile(path) as existing:
+                    series_ids = {key: series_id for series_id, key in existing.series.items()}
+                    valid_size = existing.valid_size
+                history_file = open(path, "r+b")
+                history_file.truncate(valid_size)  # Descarta um bloco incompleto no fim.
+                history_file.seek(valid_size)
+            else:
+                # A assinatura do arquivo só é gravada junto com o primeiro bloco (ver _write_block).
+                history_file = open(path, "wb")
+            partition = self.partitions[hour] = (history_file, series_ids)
+        return partition
+
+    def _write_block(self, hour, rows):
+        history_file, series_ids = self._open(hour)
+        new_series = []
+        for _, key, _ in rows:
+            if key not in series_ids:
+                series_ids[key] = len(series_ids)
+                new_series.append((series_ids[key], key))
+        rows.sort(key=lambda row: (series_ids[row[1]], row[0]))
+
+        timestamps = array.array("q", [row[0] for row in rows])
+        values = array.array("d", [row[2] for row in rows])
+        runs = []
+        start = 0
+        for index in range(1, len(rows) + 1):
+            if index == len(rows) or rows[index][1] != rows[start][1]:
+                runs.append((series_ids[rows[start][1]], start, index - start, timestamps[start], timestamps[index - 1]))
+                start = index
+        # Arquivo novo: a assinatura vai na mesma gravação do primeiro bloco, para que uma falha
+        # não deixe no disco um arquivo só com ela (ou vazio) que as consultas teriam de abrir.
+        prefix = FILE_MAGIC if history_file.tell() == 0 else b""
+        history_file.write(prefix + encode_block(history_file.tell() + len(prefix), new_series, runs, timestamps, values))
+        history_file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        """Grava o que falta, fecha e compacta os arquivos."""
+        self.closed = True
+        self.flush()
+        with self.write_lock:
+            for hour in list(self.partitions):
+                self._close_partition(hour)
+
+
+class HistoryFile:
+    """
+    Um arquivo de partição mapeado em memória.
+
+    Só os cabeçalhos dos blocos são lidos na abertura; as colunas são
+    acessadas como memoryview sobre o mapa, e o sistema operacional carrega
+    apenas as páginas tocadas pelas consultas.
+    """
+
+    def __init__(self, path):
+        if sys.byteorder == "big":
+            raise RuntimeError("O leitor do histórico supõe uma máquina little-endian.")
+        self.path = path
+        self.file = open(path, "rb")
+        # Um arquivo vazio não pode ser mapeado, e um menor que a assinatura não é do Gateway.
+        if os.fstat(self.file.fileno()).st_size < len(FILE_MAGIC):
+            self.file.close()
+            raise ValueError(f"{path} não é um arquivo de histórico do Gateway (vazio ou incompleto).")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.series = {}     # id -> (dispositivo, métrica, tipo, grupo).
+        self.blocks = []     # (trechos, instantes, valores) de cada bloco.
+        if self.view[:len(FILE_MAGIC)] != FILE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} não é um arquivo de histórico do Gateway.")
+        self.rows = 0
+        self.valid_size = self._read_blocks()
+
+    def _read_blocks(self):
+        """Lê os cabeçalhos dos blocos. Retorna o tamanho da parte válida (sem um bloco incompleto no fim)."""
+        view = self.view
+        offset = len(FILE_MAGIC)
+        while offset + BLOCK_HEADER.size <= len(view):
+            magic, rows, series_count, run_count = BLOCK_HEADER.unpack_from(view, offset)
+            if magic != BLOCK_MAGIC:
+                break
+            position = offset + BLOCK_HEADER.size
+            new_series = {}
+            try:
+                for _ in range(series_count):
+                    series_id, size = SERIES_ENTRY.unpack_from(view, position)
+                    position += SERIES_ENTRY.size
+                    new_series[series_id] = tuple(bytes(view[position:position + size]).decode("utf-8").split(KEY_SEPARATOR))
+                    position += size
+                runs = [RUN.unpack_from(view, position + index * RUN.size) for index in range(run_count)]
+            except struct.error:
+                break
+            position += run_count * RUN.size
+            position += _padding(position)
+            end = position + rows * 16
+            if end > len(view):
+                break
+            timestamps = view[position:position + rows * 8].cast("q")
+            values = view[position + rows * 8:end].cast("d")
+            self.series.update(new_series)
+            self.blocks.append((runs, timestamps, values))
+            self.rows += rows
+            offset = end
+        return offset
+
+    def select(self, metric=None, device_id=None, device_type=None, group=None):
+        """Retorna os ids das séries que atendem ao filtro (campos None são curingas)."""
+        return {
+            series_id for series_id, (key_device, key_metric, key_type, key_group) in self.series.items()
+            if (metric is None or key_metric == metric) and (device_id is None or key_device == device_id)
+            and (device_type is None or key_type == device_type) and (group is None or key_group == group)
+        }
+
+    def slices(self, series_ids, start_us=None, end_us=None):
+        """
+        Gera (id da série, instantes, valores) dos trechos das séries dentro de [start_us, end_us).
+
+        Os trechos são memoryviews sobre o mapa: quem os usa deve liberá-los
+        (release()) antes de fechar o arquivo.
+        """
+        for runs, timestamps, values in self.blocks:
+            for series_id, first, count, min_us, max_us in runs:
+                if series_id not in series_ids:
+                    continue
+                if (start_us is not None and max_us < start_us) or (end_us is not None and min_us >= end_us):
+                    continue
+                low, high = first, first + count
+                # Trechos cortados pelo intervalo são delimitados por bisseção nos instantes (ordenados).
+                if start_us is not None and min_us < start_us:
+                    low = bisect.bisect_left(timestamps, start_us, low, high)
+                if end_us is not None and max_us >= end_us:
+                    high = bisect.bisect_left(timestamps, end_us, low, high)
+                if low < high:
+                    yield series_id, timestamps[low:high], values[low:high]
+
+    def close(self):
+        # As memoryviews precisam ser liberadas antes do mapa.
+        for _, timestamps, values in self.blocks:
+            timestamps.release()
+            values.release()
+        self.blocks = []
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def partition_files(directory, start_us=None, end_us=None):
+    """Lista, em ordem, os arquivos de partição que podem ter linhas em [start_us, end_us)."""
+    paths = []
+    for day in sorted(os.listdir(directory)):
+        day_path = os.path.join(directory, day)
+        if not os.path.isdir(day_path):
+            continue
+        for name in sorted(os.listdir(day_path)):
+            if not name.endswith(".col"):
+                continue
+            try:
+                hour = int(datetime.datetime.strptime(f"{day} {name[:-4]}", "%Y-%m-%d %H")
+                           .replace(tzinfo=datetime.timezone.utc).timestamp()) // 3600
+            except ValueError:
+                continue
+            if start_us is not None and (hour + 1) * HOUR_US <= start_us:
+                continue
+            if end_us is not None and hour * HOUR_US >= end_us:
+                continue
+            paths.append(os.path.join(day_path, name))
+    return paths
+
+
+def open_partitions(directory, start_us=None, end_us=None):
+    """
+    Gera (caminho, HistoryFile) de cada partição de [start_us, end_us), fechando-a em seguida.
+    Arquivos vazios ou de outro formato são pulados com um aviso, sem interromper a consulta.
+    """
+    for path in partition_files(directory, start_us, end_us):
+        try:
+            history_file = HistoryFile(path)
+        except ValueError as e:
+            print(f"[HISTÓRICO] Partição ignorada: {e}", file=sys.stderr)
+            continue
+        with history_file:
+            yield path, history_file
+
+
+def summarize(directory, start_us=None, end_us=None, metric=None, device_id=None, device_type=None,
+              group=None, by=None):
+    """
+    Agrega as amostras do histórico que atendem ao filtro.
+
+    'by' agrupa o resultado por "device", "metric", "type", "group" ou "hour";
+    sem ele, tudo vira uma linha. Retorna {chave: [amostras, soma, mínimo, máximo]}.
+    """
+    key_index = {"device": 0, "metric": 1, "type": 2, "group": 3}.get(by)
+    results = {}
+    for path, history_file in open_partitions(directory, start_us, end_us):
+        series_ids = history_file.select(metric, device_id, device_type, group)
+        if not series_ids:
+            continue
+        hour_key = os.path.relpath(path, directory)[:-4].replace(os.sep, " ") + "h"
+        for series_id, timestamps, values in history_file.slices(series_ids, start_us, end_us):
+            if by == "hour":
+                key = hour_key
+            elif key_index is not None:
+                key = history_file.series[series_id][key_index]
+            else:
+                key = "total"
+            summary = results.get(key)
+            if summary is None:
+                summary = results[key] = [0, 0.0, float("inf"), float("-inf")]
+            summary[0] += len(values)
+            summary[1] += sum(values)
+            summary[2] = min(summary[2], min(values))
+            summary[3] = max(summary[3], max(values))
+            timestamps.release()
+            values.release()
+    return results
+
+
+def export_parquet(directory, output, start_us=None, end_us=None, **filters):
+    """Exporta as amostras selecionadas para um arquivo Parquet (requer o pacote opcional pyarrow)."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("A exportação para Parquet requer o pacote pyarrow (pip install pyarrow).")
+    columns = {"timestamp_us": array.array("q"), "value": array.array("d")}
+    keys = {"device_id": [], "metric": [], "device_type": [], "group": []}
+    for _, history_file in open_partitions(directory, start_us, end_us):
+        for series_id, timestamps, values in history_file.slices(history_file.select(**filters), start_us, end_us):
+            columns["timestamp_us"].frombytes(timestamps.cast("B"))
+            columns["value"].frombytes(values.cast("B"))
+            for name, part in zip(keys, history_file.series[series_id]):
+                keys[name].extend([part] * len(values))
+            timestamps.release()
+            values.release()
+    rows = len(columns["value"])
+    table = pyarrow.table({
+        "timestamp_us": pyarrow.Array.from_buffers(pyarrow.int64(), rows, [None, pyarrow.py_buffer(columns["timestamp_us"])]),
+        "value": pyarrow.Array.from_buffers(pyarrow.float64(), rows, [None, pyarrow.py_buffer(columns["value"])]),
+        **{name: pyarrow.array(values).dictionary_encode() for name, values in keys.items()},
+    })
+    pyarrow.parquet.write_table(table, output)
+    return rows
+
+
+def parse_time(text):
+    """Converte uma data/hora ISO (hora local, se não tiver fuso) em microssegundos desde a época."""
+    if text is None:
+        return None
+    return int(datetime.datetime.fromisoformat(text).timestamp() * 1000000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta o histórico de telemetria gravado pelo Gateway.")
+    parser.add_argument("directory", help="Diretório do histórico (GATEWAY_HISTORY).")
+    parser.add_argument("--from", dest="start", help="Início (ISO, ex: 2026-10-19T08:00). Padrão: tudo.")
+    parser.add_argument("--to", dest="end", help="Fim, exclusivo (ISO). Padrão: tudo.")
+    parser.add_argument("--metric", help="Métrica (ex: temperature, ppm).")
+    parser.add_argument("--device", help="ID do dispositivo.")
+    parser.add_argument("--type", help="Tipo do dispositivo (ex: TEMP_SENSOR).")
+    parser.add_argument("--group", help="Grupo do dispositivo.")
+    parser.add_argument("--by", choices=("device", "metric", "type", "group", "hour"), help="Agrupa o resultado.")
+    parser.add_argument("--parquet", help="Em vez de agregar, exporta as amostras para este arquivo Parquet.")
+    args = parser.parse_args()
+
+    start_us, end_us = parse_time(args.start), parse_time(args.end)
+    filters = dict(metric=args.metric, device_id=args.device, device_type=args.type, group=args.group)
+    started = time.perf_counter()
+    if args.parquet:
+        try:
+            rows = export_parquet(args.directory, args.parquet, start_us, end_us, **filters)
+        except RuntimeError as e:
+            sys.exit(str(e))
+        print(f"{rows} amostra(s) exportada(s) para {args.parquet} em {time.perf_counter() - started:.2f} s.")
+        sys.exit(0)
+
+    results = summarize(args.directory, start_us, end_us, by=args.by, **filters)
+    elapsed = time.perf_counter() - started
+    print(f"{'chave':<30} | {'amostras':>10} | {'média':>10} | {'mínimo':>10} | {'máximo':>10}")
+    for key in sorted(results):
+        count, total, low, high = results[key]
+        print(f"{key:<30} | {count:10d} | {total / count:10.2f} | {low:10.2f} | {high:10.2f}")
+    print(f"{sum(summary[0] for summary in results.values())} amostra(s) em {elapsed * 1000:.1f} ms.")
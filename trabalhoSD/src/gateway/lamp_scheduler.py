@@ -0,0 +1,90 @@
+# src/gateway/lamp_scheduler.py
+import threading
+from generated import smart_city_pb2
+from src.common.lighting import validate_schedule
+
+# --- Programação dos postes por grupo ---
+# O Gateway guarda uma LampSchedule por grupo e a envia em um único datagrama
+# multicast, que todos os postes do grupo recebem. Como cada poste avalia a
+# programação sozinho, nenhum comando é necessário ao anoitecer.
+#
+# O multicast não garante a entrega, então a programação também é:
+#   - enviada diretamente (TCP) a cada poste que se registra;
+#   - reanunciada periodicamente por multicast;
+#   - reenviada diretamente ao poste cujo relatório de estado indicar uma versão antiga.
+
+REANNOUNCE_SECONDS = 300.0  # Intervalo entre os reanúncios multicast das programações.
+
+
+class LampScheduler:
+    """
+    Mantém as programações dos grupos de postes.
+
+    'send_multicast(wrapper_msg)' envia a mensagem a todos os postes;
+    'send_to_device(device_id, wrapper_msg)' a envia pela conexão TCP de um
+    poste e retorna False se ele não estiver conectado.
+    """
+
+    def __init__(self, timers, send_multicast, send_to_device):
+        self.timers = timers
+        self.send_multicast = send_multicast
+        self.send_to_device = send_to_device
+        self.schedules = {}  # grupo -> WrapperMessage com a LampSchedule em vigor.
+        self.next_version = 1
+        self.lock = threading.Lock()
+
+    def set_schedule(self, schedule):
+        """Valida, guarda e envia por multicast a programação de um grupo. Retorna (versão, erros)."""
+        errors = validate_schedule(schedule)
+        if errors:
+            return 0, errors
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        wrapper_msg.lamp_schedule.CopyFrom(schedule)
+        with self.lock:
+            wrapper_msg.lamp_schedule.version = self.next_version
+            self.next_version += 1
+            self.schedules[schedule.group] = wrapper_msg
+        self.send_multicast(wrapper_msg)
+        print(f"[POSTES] Programação v{wrapper_msg.lamp_schedule.version} do grupo {schedule.group} enviada.")
+        return wrapper_msg.lamp_schedule.version, []
+
+    def adopt(self, wrapper_msg):
+        """Guarda e envia por multicast uma programação recebida do Gateway central, mantendo a versão."""
+        schedule = wrapper_msg.lamp_schedule
+        with self.lock:
+            current = self.schedules.get(schedule.group)
+            if current is not None and current.lamp_schedule.version == schedule.version:
+                return
+            self.schedules[schedule.group] = wrapper_msg
+            self.next_version = max(self.next_version, schedule.version + 1)
+        self.send_multicast(wrapper_msg)
+        print(f"[POSTES] Programação v{schedule.version} do grupo {schedule.group} recebida do Gateway central.")
+
+    def on_register(self, device_id, group):
+        """Envia a programação do grupo ao poste que acabou de se registrar."""
+        with self.lock:
+            wrapper_msg = self.schedules.get(group)
+        if wrapper_msg is not None:
+            self.send_to_device(device_id, wrapper_msg)
+
+    def on_state_report(self, device_id, group, schedule_version):
+        """Reenvia a programação ao poste que reportar uma versão diferente da do seu grupo."""
+        with self.lock:
+            wrapper_msg = self.schedules.get(group)
+        if wrapper_msg is not None and wrapper_msg.lamp_schedule.version != schedule_version:
+            print(f"[POSTES] {device_id} usa a programação v{schedule_version}; "
+                  f"reenviando a v{wrapper_msg.lamp_schedule.version}.")
+            self.send_to_device(device_id, wrapper_msg)
+
+    def reannounce(self):
+        """Reenvia todas as programações por multicast e se reagenda (mesmo se um envio falhar)."""
+        try:
+            with self.lock:
+                messages = list(self.schedules.values())
+            for wrapper_msg in messages:
+                self.send_multicast(wrapper_msg)
+        finally:
+            self.timers.schedule(REANNOUNCE_SECONDS, self.reannounce)
+
+    def start(self):
+        self.timers.schedule(REANNOUNCE_SECONDS, self.reannounce)
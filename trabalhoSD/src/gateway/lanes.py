@@ -0,0 +1,99 @@
+# src/gateway/lanes.py
+import threading
+import time
+from generated import smart_city_pb2
+
+# --- Filas de prioridade ---
+# O Gateway separa as mensagens em duas classes:
+#   - controle: comandos, listagens, ondas verdes, programações de postes e
+#     estados desejados, executados na thread de cada cliente (ControlLane);
+#   - volume: a telemetria (e as consultas de agregados), processada pela
+#     thread UDP e pela fila de ingestão.
+# A classe vem só do tipo da mensagem: o campo 'priority' enviado pelo
+# cliente é ignorado, para que ninguém passe consultas pesadas à frente.
+#
+# Enquanto houver um pedido de controle em execução, as threads de volume param
+# entre uma leitura e outra (wait_for_control), no máximo por 'max_pause'
+# segundos. Assim o pedido não disputa o lock do registro nem o GIL com
+# milhares de leituras. Depois de cada pausa, a telemetria segue por pelo
+# menos outros 'max_pause' segundos apenas cedendo o GIL (sem esperar), de
+# modo que ela roda ao menos metade do tempo, mesmo com pedidos sem fim.
+
+CONTROL_MESSAGES = ("command", "list_request", "green_wave_request", "lamp_schedule", "twin_update",
+                    "profiling_request")
+LATENCY_SAMPLES = 1000  # Últimos pedidos de controle usados nos percentis do relatório.
+
+
+def message_priority(wrapper_msg):
+    """Retorna a classe da mensagem, decidida pelo seu tipo."""
+    if wrapper_msg.WhichOneof("msg") in CONTROL_MESSAGES:
+        return smart_city_pb2.PRIORITY_CONTROL
+    return smart_city_pb2.PRIORITY_BULK
+
+
+class ControlLane:
+    """
+    Pausa a telemetria enquanto houver pedidos de controle em execução.
+
+    Os pedidos rodam na própria thread que os chama (a do cliente), então um
+    comando lento não atrasa os dos outros clientes. Com 'enabled' falso, a
+    telemetria nunca é pausada (sem prioridade).
+    """
+
+    def __init__(self, enabled, max_pause):
+        self.enabled = enabled
+        self.max_pause = max_pause
+        self.pending = 0          # Pedidos em execução.
+        self.condition = threading.Condition()
+        self.latencies = []       # Segundos da chegada ao fim de cada pedido (circular).
+        self.next_sample = 0
+        self.pauses = 0
+        self.pause_allowed_at = 0.0  # Antes deste instante, a telemetria só cede o GIL, sem pausar.
+
+    def run(self, function, *args):
+        """Executa function(*args) na thread atual, com a telemetria pausada, e retorna o seu resultado."""
+        if not self.enabled:
+            return function(*args)
+        started = time.perf_counter()
+        with self.condition:
+            self.pending += 1
+        try:
+            return function(*args)
+        finally:
+            with self.condition:
+                self.pending -= 1
+                self._record(time.perf_counter() - started)
+                if not self.pending:
+                    self.condition.notify_all()
+
+    def _record(self, latency):
+        if len(self.latencies) < LATENCY_SAMPLES:
+            self.latencies.append(latency)
+        else:
+            self.latencies[self.next_sample] = latency
+        self.next_sample = (self.next_sample + 1) % LATENCY_SAMPLES
+
+    def wait_for_control(self):
+        """Chamado pelas threads de volume entre uma mensagem e outra: espera os pedidos de controle pendentes."""
+        # Leitura sem lock: no caso comum (nada pendente) a verificação não custa quase nada.
+        if not self.pending:
+            return
+        if time.perf_counter() < self.pause_allowed_at:
+            time.sleep(0)
+            return
+        with self.condition:
+            if self.pending:
+                self.pauses += 1
+                self.condition.wait_for(lambda: not self.pending, timeout=self.max_pause)
+        self.pause_allowed_at = time.perf_counter() + self.max_pause
+
+    def summary(self):
+        """Retorna (pedidos medidos, p50 em ms, p99 em ms, pausas da telemetria), ou None se não houve pedidos."""
+        with self.condition:
+            latencies = sorted(self.latencies)
+            pauses = self.pauses
+        if not latencies:
+            return None
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        return len(latencies), p50, p99, pauses
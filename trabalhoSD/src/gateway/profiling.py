@@ -0,0 +1,202 @@
+# src/gateway/profiling.py
+import argparse
+import os
+import sys
+import threading
+import time
+from generated import smart_city_pb2
+from src.common.discovery import gateway_announcements
+from src.common.framing import recv_message, send_message
+from src.common.security import ROLE_ADMIN, connect_secure
+
+# --- Perfilamento do Gateway em tempo de execução ---
+# Desligado por padrão. Um administrador (com o certificado "admin", se houver
+# certificados) o liga e desliga pela porta de clientes (ProfilingRequest),
+# sem reiniciar o Gateway. Ligado, ele:
+#   - mede a duração das etapas principais do Gateway (decodificação UDP,
+#     atualização do registro, montagem da lista, encaminhamento de comandos,
+#     envio ao cliente) em histogramas com faixas em potências de 2 (µs);
+#   - amostra, 'sample_hz' vezes por segundo, a pilha de todas as threads
+#     (tempo de parede: threads esperando em recv() também aparecem) e conta
+#     as pilhas no formato "folded", aceito por flamegraph.pl e speedscope.
+#     Como as amostras dependem do GIL, uma thread ocupada aparece no ponto em
+#     que o cede (chamadas e E/S), não em uma linha qualquer do seu código.
+#
+# Desligado, cada etapa custa só clock() (uma leitura de atributo) e um
+# record() que retorna na primeira linha; nenhuma thread extra roda.
+#
+#   python -m src.gateway.profiling start --hz 200
+#   python -m src.gateway.profiling stop --out gateway.folded
+
+DEFAULT_SAMPLE_HZ = 100
+HISTOGRAM_BUCKETS = 32               # Faixa i: durações com i bits em µs (até ~35 minutos).
+MAX_FOLDED_BYTES = 3 * 1024 * 1024   # Abaixo do limite de uma mensagem enquadrada (src/common/framing.py).
+
+
+class StageStats:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def percentile(self, fraction):
+        """Retorna o limite superior (em segundos) da faixa que contém o percentil pedido, limitado ao máximo."""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min((1 << index) / 1e6, self.max)
+        return self.max
+
+
+class Profiler:
+    """Histogramas por etapa e amostrador de pilhas, ligados e desligados em tempo de execução."""
+
+    def __init__(self):
+        self.active = False
+        self.lock = threading.Lock()
+        self.generation = 0  # Muda a cada início, para que um amostrador antigo termine.
+        self._reset()
+
+    def _reset(self):
+        self.stages = {}     # Etapa -> StageStats.
+        self.stacks = {}     # Pilha "folded" -> amostras.
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.stopped = None
+
+    def clock(self):
+        """Início de uma etapa: o instante atual com o perfilamento ligado, ou None com ele desligado."""
+        return time.perf_counter() if self.active else None
+
+    def record(self, stage, started):
+        """Registra a duração da etapa iniciada em 'started' (retornado por clock())."""
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        index = min(int(elapsed * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        with self.lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.buckets[index] += 1
+            if elapsed > stats.max:
+                stats.max = elapsed
+
+    def start(self, sample_hz=DEFAULT_SAMPLE_HZ):
+        """Zera os dados e liga o perfilamento (ou o reinicia, se já estiver ligado)."""
+        with self.lock:
+            self._reset()
+            self.generation += 1
+            generation = self.generation
+            self.active = True
+        threading.Thread(target=self._sample, args=(generation, 1 / sample_hz), daemon=True).start()
+
+    def stop(self):
+        """Desliga o perfilamento; os dados ficam disponíveis em report() até o próximo início."""
+        with self.lock:
+            if self.active:
+                self.active = False
+                self.stopped = time.perf_counter()
+
+    def _sample(self, generation, interval):
+        own = threading.get_ident()
+        labels = {}  # Objeto de código -> rótulo do quadro ("função (arquivo)").
+        while True:
+            time.sleep(interval)
+            if not self.active or generation != self.generation:
+                return
+            names = {thread.ident: thread.name.replace(";", ",") for thread in threading.enumerate()}
+            folded = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)})"
+                    parts.append(label)
+                    frame = frame.f_back
+                parts.append(names.get(ident, "thread"))
+                parts.reverse()
+                folded.append(";".join(parts))
+            with self.lock:
+                if generation != self.generation:
+                    return
+                for stack in folded:
+                    self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                self.samples += 1
+
+    def report(self):
+        """
+        Retorna (ligado, segundos, amostras, etapas, pilhas "folded").
+
+        'etapas' é uma lista de (etapa, contagem, total, p50, p99, máximo,
+        faixas), com os tempos em segundos.
+        """
+        with self.lock:
+            seconds = (self.stopped or time.perf_counter()) - self.started
+            stages = [
+                (stage, stats.count, stats.total, stats.percentile(0.5), stats.percentile(0.99), stats.max,
+                 list(stats.buckets))
+                for stage, stats in sorted(self.stages.items())
+            ]
+            stacks = sorted(self.stacks.items(), key=lambda item: -item[1])
+            active, samples = self.active, self.samples
+        # As pilhas mais frequentes vêm primeiro; as raras são cortadas se o texto passar do limite.
+        lines = []
+        size = 0
+        for stack, count in stacks:
+            line = f"{stack} {count}"
+            size += len(line.encode("utf-8")) + 1
+            if size > MAX_FOLDED_BYTES:
+                break
+            lines.append(line)
+        return active, seconds, samples, stages, "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Liga, desliga e consulta o perfilamento de um Gateway em execução.")
+    parser.add_argument("action", choices=("start", "stop", "status"))
+    parser.add_argument("--hz", type=int, default=0, help=f"Amostras de pilha por segundo (padrão: {DEFAULT_SAMPLE_HZ}).")
+    parser.add_argument("--out", help="Arquivo em que as pilhas \"folded\" são gravadas (ex: gateway.folded).")
+    args = parser.parse_args()
+
+    # O Gateway é encontrado como pelo cliente: GATEWAY_IP ou o anúncio multicast.
+    gateway_info = next(gateway_announcements())
+    conn = connect_secure((gateway_info.ip_address, gateway_info.client_tcp_port), ROLE_ADMIN)
+    request_msg = smart_city_pb2.WrapperMessage()
+    request_msg.profiling_request.action = {
+        "start": smart_city_pb2.PROFILING_START,
+        "stop": smart_city_pb2.PROFILING_STOP,
+        "status": smart_city_pb2.PROFILING_STATUS,
+    }[args.action]
+    request_msg.profiling_request.sample_hz = args.hz
+    send_message(conn, request_msg)
+    response_msg = recv_message(conn)
+    conn.close()
+    if response_msg is None or not response_msg.HasField("profiling_report"):
+        sys.exit("Resposta inesperada do Gateway.")
+
+    report = response_msg.profiling_report
+    if report.errors:
+        sys.exit(f"Pedido recusado pelo Gateway: {'; '.join(report.errors)}")
+    print(f"Perfilamento {'LIGADO' if report.active else 'DESLIGADO'}: {report.seconds:.1f} s, "
+          f"{report.samples} amostra(s) de pilha.")
+    if report.stages:
+        print(f"{'etapa':<24} | {'contagem':>9} | {'média (ms)':>10} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'máx (ms)':>9}")
+        for stage in report.stages:
+            print(f"{stage.stage:<24} | {stage.count:9d} | {stage.total_ms / stage.count:10.3f} | "
+                  f"{stage.p50_ms:9.3f} | {stage.p99_ms:9.3f} | {stage.max_ms:9.3f}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as folded_file:
+            folded_file.write(report.folded_stacks + "\n")
+        print(f"Pilhas gravadas em {args.out} (ex: flamegraph.pl {args.out} > gateway.svg).")
@@ -0,0 +1,54 @@
+# src/gateway/registry.py
+import sys
+import threading
+from generated import smart_city_pb2
+
+# --- Registro compacto de dispositivos ---
+# Cada dispositivo registrado ocupa um DeviceRecord com __slots__ em vez de um
+# dicionário com as mensagens protobuf completas (DeviceInfo e a última
+# StatusUpdate). Os campos repetidos entre dispositivos são compartilhados: os
+# nomes de grupo e endereços são internados e os esquemas de configuração
+# idênticos (todos os postes, todas as câmeras...) apontam para o mesmo objeto.
+# As mensagens protobuf só são montadas quando precisam ser enviadas.
+
+_schema_cache = {}  # Esquema serializado -> ConfigSchema compartilhado.
+_schema_lock = threading.Lock()
+
+
+def intern_schema(schema):
+    """Retorna uma instância compartilhada de um ConfigSchema igual a 'schema'."""
+    key = schema.SerializeToString(deterministic=True)
+    with _schema_lock:
+        shared = _schema_cache.get(key)
+        if shared is None:
+            shared = smart_city_pb2.ConfigSchema()
+            shared.CopyFrom(schema)
+            _schema_cache[key] = shared
+        return shared
+
+
+class DeviceRecord:
+    """Entrada do registro de dispositivos do Gateway."""
+    __slots__ = ("device_id", "device_type", "group", "address", "config_schema", "conn", "send_lock")
+
+    def __init__(self, info, conn, address, send_lock=None):
+        self.device_id = info.id
+        self.device_type = info.type
+        self.group = sys.intern(info.group or "default")
+        self.address = sys.intern(address)
+        self.config_schema = intern_schema(info.config_schema)
+        self.conn = conn                       # Conexão TCP persistente do dispositivo.
+        # Impede que mensagens enquadradas se misturem no envio (compartilhado pelos dispositivos de uma borda).
+        self.send_lock = send_lock or threading.Lock()
+
+    @property
+    def type_name(self):
+        return smart_city_pb2.DeviceType.Name(self.device_type)
+
+    def fill_device_info(self, device_info):
+        """Preenche uma DeviceInfo (por exemplo, de uma ListDevicesResponse) com os dados do registro."""
+        device_info.id = self.device_id
+        device_info.type = self.device_type
+        device_info.group = self.group
+        device_info.ip_address = self.address
+        device_info.config_schema.CopyFrom(self.config_schema)
@@ -0,0 +1,136 @@
+# src/gateway/rules.py
+import json
+import operator
+import threading
+
+# --- Motor de regras de limiar ---
+# As regras são declarativas (carregadas de um arquivo JSON) e ficam indexadas
+# por (tipo de dispositivo, métrica). Cada StatusUpdate recebida é comparada
+# apenas com as regras do seu tipo e das métricas que ela traz, de modo que o
+# custo por leitura não cresce com o número total de regras.
+
+COMPARISONS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class RuleAction:
+    """
+    Ação disparada por uma regra: um comando para um conjunto de dispositivos
+    e/ou uma notificação.
+
+    O alvo do comando é selecionado por 'device_ids' ou por 'device_type' e
+    'group' (o valor "$group" indica o grupo do dispositivo que disparou a
+    regra); o comando é um 'toggle' ou um dicionário 'config' aplicado como
+    ConfigUpdate.
+    """
+
+    def __init__(self, spec):
+        self.notify = spec.get("notify")
+        command = spec.get("command")
+        self.has_command = command is not None
+        command = command or {}
+        self.device_ids = list(command.get("device_ids", ()))
+        self.device_type = command.get("device_type")
+        self.group = command.get("group")
+        self.toggle = bool(command.get("toggle", False))
+        self.config = dict(command.get("config", {}))
+        if self.has_command and not (self.toggle or self.config):
+            raise ValueError("O comando de uma regra precisa de 'toggle' ou 'config'.")
+
+
+class Rule:
+    """
+    Regra de limiar sobre uma métrica.
+
+    A regra dispara quando a comparação passa a ser verdadeira e só volta a
+    ficar inativa quando o valor se afasta do limiar pela 'hysteresis', o que
+    evita disparos repetidos com leituras oscilando em torno do limite.
+    """
+
+    def __init__(self, spec):
+        self.rule_id = spec["id"]
+        self.device_type = spec.get("device_type")
+        self.group = spec.get("group")
+        self.device_id = spec.get("device_id")
+        self.field = spec["field"]
+        self.op = spec.get("op", ">")
+        if self.op not in COMPARISONS:
+            raise ValueError(f"Regra {self.rule_id}: comparação desconhecida '{self.op}'.")
+        self.compare = COMPARISONS[self.op]
+        self.threshold = float(spec["threshold"])
+        self.hysteresis = abs(float(spec.get("hysteresis", 0.0)))
+        self.on_trigger = RuleAction(spec.get("on_trigger", {}))
+        self.on_clear = RuleAction(spec["on_clear"]) if "on_clear" in spec else None
+
+    def matches(self, device_id, group):
+        """Verifica os filtros que não fazem parte do índice (grupo e ID)."""
+        if self.group is not None and self.group != group:
+            return False
+        return self.device_id is None or self.device_id == device_id
+
+    def is_cleared(self, value):
+        """Indica se o valor voltou para além da faixa de histerese."""
+        if self.op in (">", ">="):
+            return not self.compare(value, self.threshold - self.hysteresis)
+        if self.op in ("<", "<="):
+            return not self.compare(value, self.threshold + self.hysteresis)
+        return not self.compare(value, self.threshold)
+
+
+class RulesEngine:
+    """
+    Avalia as leituras recebidas contra as regras indexadas.
+
+    O estado de histerese é mantido por (regra, dispositivo). O método
+    evaluate() apenas decide quais ações disparar; quem chama é responsável
+    por executá-las fora do caminho de ingestão.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.active = set()
+        self.lock = threading.Lock()
+
+    def add_rule(self, rule):
+        # Regras sem tipo de dispositivo ficam na chave None e valem para todos os tipos.
+        with self.lock:
+            self.index.setdefault((rule.device_type, rule.field), []).append(rule)
+
+    def load_file(self, path):
+        """Carrega uma lista de regras de um arquivo JSON. Retorna a quantidade carregada."""
+        with open(path, encoding="utf-8") as rules_file:
+            specs = json.load(rules_file)
+        for spec in specs:
+            self.add_rule(Rule(spec))
+        return len(specs)
+
+    def evaluate(self, device_id, device_type, group, metrics):
+        """
+        Compara as métricas de uma leitura com as regras aplicáveis.
+
+        Retorna uma lista de (regra, ação, valor) a executar; a ação é
+        'on_trigger' quando a regra dispara e 'on_clear' quando ela se desfaz.
+        """
+        fired = []
+        with self.lock:
+            for field, value in metrics:
+                for key in ((device_type, field), (None, field)):
+                    for rule in self.index.get(key, ()):
+                        if not rule.matches(device_id, group):
+                            continue
+                        state_key = (rule.rule_id, device_id)
+                        if state_key not in self.active:
+                            if rule.compare(value, rule.threshold):
+                                self.active.add(state_key)
+                                fired.append((rule, rule.on_trigger, value))
+                        elif rule.is_cleared(value):
+                            self.active.discard(state_key)
+                            if rule.on_clear is not None:
+                                fired.append((rule, rule.on_clear, value))
+        return fired
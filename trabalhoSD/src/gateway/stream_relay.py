@@ -0,0 +1,115 @@
+# src/gateway/stream_relay.py
+import socket
+import threading
+from generated import smart_city_pb2
+from src.common.framing import recv_message
+from src.common.security import ROLE_CLIENT, ROLE_DEVICE, accept_secure, peer_owns_id, peer_role, security_enabled
+from src.common.streaming import CHUNK_HEADER, ChunkReader, send_chunk
+
+# --- Repasse de streaming das câmeras ---
+# Cada câmera abre uma conexão dedicada (PUBLISHER) e os clientes interessados
+# abrem conexões de assinatura (SUBSCRIBER). O Gateway lê cada bloco para um
+# buffer reaproveitado e o repassa a todos os assinantes da câmera usando o
+# mesmo memoryview, sem copiar o payload.
+#
+# Com os certificados instalados, a porta exige TLS como as demais: só a
+# própria câmera (certificado de dispositivo com o ID dela) publica, e só
+# clientes assinam.
+
+SUBSCRIBER_SEND_TIMEOUT = 2.0  # Assinante que não consome os dados nesse tempo é desconectado.
+
+
+def hello_allowed(conn, hello):
+    """Confere o papel pedido na StreamHello contra o certificado da conexão (sem certificados, tudo vale)."""
+    if not security_enabled():
+        return True
+    if hello.role == smart_city_pb2.PUBLISHER:
+        return peer_role(conn) == ROLE_DEVICE and peer_owns_id(conn, hello.device_id)
+    return peer_role(conn) == ROLE_CLIENT
+
+
+class StreamRelay:
+    """Mantém os assinantes de cada câmera e repassa os blocos recebidos."""
+
+    def __init__(self, is_registered_camera):
+        # Função que confirma se um ID pertence a uma câmera registrada no Gateway.
+        self.is_registered_camera = is_registered_camera
+        self.subscribers = {}  # device_id -> lista de sockets que já recebem quadros completos.
+        self.pending = {}      # device_id -> sockets aguardando o início do próximo quadro.
+        self.lock = threading.Lock()
+        self.frames_relayed = 0
+        self.bytes_relayed = 0
+
+    def handle_connection(self, conn):
+        """Identifica o papel da conexão pela StreamHello. Executada em uma thread."""
+        try:
+            conn = accept_secure(conn, (ROLE_DEVICE, ROLE_CLIENT))
+            wrapper_msg = recv_message(conn)
+            if wrapper_msg is None or not wrapper_msg.HasField("stream_hello"):
+                print("[STREAM] Conexão não se identificou.")
+                conn.close()
+                return
+            hello = wrapper_msg.stream_hello
+            if not self.is_registered_camera(hello.device_id):
+                print(f"[STREAM] Câmera {hello.device_id} não está registrada.")
+                conn.close()
+                return
+            if not hello_allowed(conn, hello):
+                print(f"[STREAM] Conexão com a câmera {hello.device_id} recusada: o certificado não autoriza o papel pedido.")
+                conn.close()
+                return
+            if hello.role == smart_city_pb2.PUBLISHER:
+                self.relay_from_publisher(hello.device_id, conn)
+            else:
+                self.add_subscriber(hello.device_id, conn)
+        except Exception as e:
+            print(f"[STREAM] Erro na conexão de streaming: {e}")
+            conn.close()
+
+    def add_subscriber(self, device_id, conn):
+        conn.settimeout(SUBSCRIBER_SEND_TIMEOUT)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        with self.lock:
+            # O assinante só passa a receber dados no início do próximo quadro.
+            self.pending.setdefault(device_id, []).append(conn)
+        print(f"[STREAM] Novo assinante da câmera {device_id}.")
+
+    def remove_subscriber(self, device_id, conn):
+        with self.lock:
+            for table in (self.subscribers, self.pending):
+                if conn in table.get(device_id, ()):
+                    table[device_id].remove(conn)
+        conn.close()
+
+    def relay_from_publisher(self, device_id, conn):
+        """Lê os blocos da câmera e os repassa aos assinantes até a conexão fechar."""
+        print(f"[STREAM] Câmera {device_id} começou a transmitir.")
+        reader = ChunkReader(conn)
+        try:
+            while True:
+                chunk = reader.read()
+                if chunk is None:
+                    break
+                chunk_index, chunk_count, payload = chunk[2], chunk[3], chunk[4]
+                with self.lock:
+                    if chunk_index == 0 and self.pending.get(device_id):
+                        self.subscribers.setdefault(device_id, []).extend(self.pending.pop(device_id))
+                    targets = list(self.subscribers.get(device_id, ()))
+                for target in targets:
+                    try:
+                        # O cabeçalho e o payload são enviados direto dos buffers de leitura.
+                        send_chunk(target, reader.header, payload)
+                    except OSError:
+                        print(f"[STREAM] Assinante da câmera {device_id} removido.")
+                        self.remove_subscriber(device_id, target)
+                self.bytes_relayed += CHUNK_HEADER.size + len(payload)
+                if chunk_index + 1 == chunk_count:
+                    self.frames_relayed += 1
+        finally:
+            print(f"[STREAM] Câmera {device_id} encerrou a transmissão.")
+            with self.lock:
+                # Sem a câmera, os assinantes não receberão mais nada.
+                closing = self.subscribers.pop(device_id, []) + self.pending.pop(device_id, [])
+            for target in closing:
+                target.close()
+            conn.close()
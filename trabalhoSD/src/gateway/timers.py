@@ -0,0 +1,77 @@
+# src/gateway/timers.py
+import heapq
+import itertools
+import threading
+import time
+
+# --- Serviço de temporizadores ---
+# Uma única thread atende todos os temporizadores do Gateway a partir de um
+# heap ordenado pelo instante de disparo. Agendar e cancelar custam O(log n),
+# então milhares de semáforos (ou qualquer outra tarefa periódica) não exigem
+# uma thread por dispositivo.
+
+
+class TimerService:
+    """Executa funções em instantes futuros usando uma única thread e um heap."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.heap = []
+        self.live = set()       # Temporizadores agendados que ainda não dispararam.
+        self.cancelled = set()  # Cancelados que ainda estão no heap.
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        """Inicia a thread do serviço (uma única vez)."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def schedule(self, delay, callback, *args):
+        """Agenda callback(*args) para daqui a 'delay' segundos e retorna um identificador."""
+        timer_id = next(self.counter)
+        with self.condition:
+            heapq.heappush(self.heap, (self.clock() + delay, timer_id, callback, args))
+            self.live.add(timer_id)
+            # Acorda a thread caso este seja o novo temporizador mais próximo.
+            if self.heap[0][1] == timer_id:
+                self.condition.notify()
+        return timer_id
+
+    def cancel(self, timer_id):
+        """Cancela um temporizador; a entrada é descartada quando chegar ao topo do heap."""
+        with self.condition:
+            if timer_id in self.live:
+                self.live.discard(timer_id)
+                self.cancelled.add(timer_id)
+
+    def pending(self):
+        with self.condition:
+            return len(self.live)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.heap:
+                        self.condition.wait()
+                        continue
+                    due, timer_id, callback, args = self.heap[0]
+                    if timer_id in self.cancelled:
+                        heapq.heappop(self.heap)
+                        self.cancelled.discard(timer_id)
+                        continue
+                    remaining = due - self.clock()
+                    if remaining <= 0:
+                        heapq.heappop(self.heap)
+                        self.live.discard(timer_id)
+                        break
+                    self.condition.wait(remaining)
+            # O callback roda fora do lock para poder agendar novos temporizadores.
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"[TIMER] Erro ao executar temporizador: {e}")
@@ -0,0 +1,162 @@
+# src/gateway/traffic_scheduler.py
+import threading
+import time
+from generated import smart_city_pb2
+from src.common.traffic import cycle_length, green_wave_offsets, phase_at
+
+# --- Coordenação dos semáforos (onda verde) ---
+# O Gateway calcula o deslocamento de cada semáforo de um grupo e envia todos
+# os parâmetros de uma vez. Depois disso, acompanha as trocas de fase
+# reportadas: cada semáforo coordenado tem um temporizador no TimerService
+# (um único heap para todos), rearmado a cada troca. Se a troca esperada não
+# for reportada a tempo, ou a fase reportada divergir do plano, o Gateway
+# reenvia a configuração daquele semáforo. Um semáforo que não recebe o plano
+# (desconectado ou removido do registro) deixa de ser supervisionado depois
+# de MAX_RESYNC_FAILURES reenvios seguidos com falha, até uma nova onda verde.
+
+START_DELAY_SECONDS = 5.0  # Antecedência do início do plano, para que todos os semáforos o recebam antes.
+REPORT_GRACE_SECONDS = 2.0  # Tolerância para o atraso de um relatório de troca de fase.
+MAX_RESYNC_FAILURES = 3     # Reenvios seguidos com falha antes de desistir do semáforo.
+
+
+class LightPlan:
+    """Parâmetros de ciclo enviados a um semáforo coordenado."""
+    __slots__ = ("group", "anchor", "offset", "green", "yellow", "red", "timer_id", "failures")
+
+    def __init__(self, group, anchor, offset, green, yellow, red):
+        self.group = group
+        self.anchor = anchor
+        self.offset = offset
+        self.green = green
+        self.yellow = yellow
+        self.red = red
+        self.timer_id = None
+        self.failures = 0  # Reenvios seguidos com falha.
+
+    def config_values(self):
+        return {
+            "green_light_duration": self.green,
+            "yellow_light_duration": self.yellow,
+            "red_light_duration": self.red,
+            "cycle_anchor": self.anchor,
+            "cycle_offset": self.offset,
+        }
+
+    def expected_phase(self, now):
+        return phase_at(now, self.anchor, self.offset, self.green, self.yellow, self.red)
+
+
+class TrafficScheduler:
+    """
+    Calcula, envia e supervisiona os planos de onda verde.
+
+    'send_config(device_id, values)' envia uma ConfigUpdate ao semáforo e
+    retorna a lista de erros (vazia em caso de sucesso).
+    """
+
+    def __init__(self, timers, send_config):
+        self.timers = timers
+        self.send_config = send_config
+        self.plans = {}
+        self.lock = threading.Lock()
+
+    def apply_green_wave(self, group, device_ids, distances_m, speed_kmh, green, yellow, red):
+        """
+        Calcula os deslocamentos de um grupo e envia o plano a todos os semáforos.
+
+        Retorna (anchor, offsets, erros).
+        """
+        if len(device_ids) != len(distances_m):
+            return None, [], ["É preciso informar uma distância para cada semáforo."]
+        if speed_kmh <= 0:
+            return None, [], ["A velocidade deve ser positiva."]
+
+        # O início do ciclo é alinhado ao segundo e marcado um pouco no futuro.
+        anchor = float(int(time.time() + START_DELAY_SECONDS))
+        offsets = green_wave_offsets(distances_m, speed_kmh, cycle_length(green, yellow, red))
+        errors = []
+        with self.lock:
+            for device_id, offset in zip(device_ids, offsets):
+                previous = self.plans.get(device_id)
+                if previous is not None and previous.timer_id is not None:
+                    self.timers.cancel(previous.timer_id)
+                self.plans[device_id] = LightPlan(group, anchor, offset, green, yellow, red)
+        # Todas as configurações são enviadas em sequência, em um único lote.
+        for device_id in device_ids:
+            with self.lock:
+                plan = self.plans[device_id]
+            device_errors = self.send_config(device_id, plan.config_values())
+            errors.extend(f"{device_id}: {error}" for error in device_errors)
+            if device_errors:
+                # Sem o plano, o semáforo não tem o que seguir: ele não fica na supervisão.
+                self._forget(device_id, plan)
+            else:
+                # A primeira troca supervisionada é a primeira após o início do plano.
+                self.arm_watchdog(device_id, plan, anchor + plan.expected_phase(anchor)[1] - time.time())
+        return anchor, offsets, errors
+
+    def arm_watchdog(self, device_id, plan, seconds_until_change):
+        """(Re)agenda a verificação da próxima troca de fase do semáforo."""
+        with self.lock:
+            if plan.timer_id is not None:
+                self.timers.cancel(plan.timer_id)
+            plan.timer_id = self.timers.schedule(max(0.0, seconds_until_change) + REPORT_GRACE_SECONDS,
+                                                 self.on_missed_change, device_id, plan)
+
+    def on_phase_report(self, device_id, phase, now):
+        """Confere uma troca de fase reportada pelo semáforo com o plano em vigor."""
+        with self.lock:
+            plan = self.plans.get(device_id)
+        if plan is None or now < plan.anchor:
+            return
+        if phase == smart_city_pb2.PHASE_OFF:
+            # Semáforo desligado pelo operador: a supervisão fica suspensa até ele voltar a operar.
+            with self.lock:
+                if plan.timer_id is not None:
+                    self.timers.cancel(plan.timer_id)
+                    plan.timer_id = None
+            return
+        expected, remaining = plan.expected_phase(now)
+        # Perto de uma troca, o relatório pode refletir a fase vizinha.
+        tolerated = {
+            expected,
+            plan.expected_phase(now - REPORT_GRACE_SECONDS)[0],
+            plan.expected_phase(now + REPORT_GRACE_SECONDS)[0],
+        }
+        if phase not in tolerated:
+            print(f"[SEMÁFORO] {device_id} reportou {smart_city_pb2.LightPhase.Name(phase)}, "
+                  f"esperado {smart_city_pb2.LightPhase.Name(expected)}. Reenviando plano.")
+            self.timers.schedule(0, self.resync, device_id, plan)
+            return
+        plan.failures = 0
+        self.arm_watchdog(device_id, plan, remaining)
+
+    def on_missed_change(self, device_id, plan):
+        with self.lock:
+            if self.plans.get(device_id) is not plan:
+                return
+        print(f"[SEMÁFORO] {device_id} não reportou a troca de fase esperada. Reenviando plano.")
+        self.resync(device_id, plan)
+
+    def resync(self, device_id, plan):
+        errors = self.send_config(device_id, plan.config_values())
+        if errors:
+            plan.failures += 1
+            print(f"[SEMÁFORO] Falha ao reenviar plano para {device_id}: {'; '.join(errors)}")
+            if plan.failures >= MAX_RESYNC_FAILURES:
+                print(f"[SEMÁFORO] {device_id} não recebeu o plano após {plan.failures} tentativa(s); supervisão encerrada.")
+                self._forget(device_id, plan)
+                return
+        else:
+            plan.failures = 0
+        # Depois de uma falha, continua supervisionando: o semáforo pode voltar a se conectar.
+        self.arm_watchdog(device_id, plan, plan.expected_phase(time.time())[1])
+
+    def _forget(self, device_id, plan):
+        """Remove o plano do semáforo (se ainda for o vigente) e cancela a sua supervisão."""
+        with self.lock:
+            if self.plans.get(device_id) is plan:
+                del self.plans[device_id]
+            if plan.timer_id is not None:
+                self.timers.cancel(plan.timer_id)
+                plan.timer_id = None
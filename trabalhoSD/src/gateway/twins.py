@@ -0,0 +1,178 @@
+# src/gateway/twins.py
+import threading
+from src.common import config
+from src.gateway.admission import TokenBucket
+
+# --- Gêmeos digitais dos dispositivos ---
+# Para cada atuador, o Gateway guarda dois conjuntos de configurações:
+#   - o estado reportado: o que o dispositivo informou no registro e depois de
+#     cada comando ou mudança de estado (StatusUpdate.reported_config);
+#   - o estado desejado: o que os comandos e as TwinUpdate pediram e o
+#     dispositivo ainda não confirmou.
+# As listagens são respondidas a partir dos gêmeos, sem consultar os
+# dispositivos. Um reconciliador envia comandos só aos dispositivos cujo
+# estado reportado difere do desejado: em lotes de até 'batch_size' por rodada
+# e no máximo 'rate' comandos por segundo. O lote é escolhido pelo serviço de
+# temporizadores (pick_batch) e enviado por outra thread (send_batch), para que
+# um dispositivo lento não atrase os outros temporizadores. Pedidos repetidos para o mesmo dispositivo viram um único comando
+# com as chaves que ainda diferem, e um comando sem confirmação é reenviado
+# depois de 'retry_seconds', até 'max_attempts' vezes.
+#
+# Um valor desejado deixa de valer assim que o dispositivo o confirma: depois
+# disso, o dispositivo volta a ser dono do seu estado (por exemplo, a
+# programação dos postes pode apagá-los de manhã sem que o Gateway os religue).
+
+_MISSING = object()
+
+
+class DeviceTwin:
+    __slots__ = ("desired", "reported", "sent_at", "attempts")
+
+    def __init__(self):
+        self.desired = {}       # Chave -> valor pedido e ainda não confirmado.
+        self.reported = {}      # Chave -> valor em vigor, informado pelo dispositivo.
+        self.sent_at = None     # Instante do último comando sem confirmação (None = nenhum).
+        self.attempts = 0       # Comandos enviados desde o último pedido.
+
+    def delta(self):
+        """Retorna as chaves desejadas que diferem do estado reportado."""
+        return {key: value for key, value in self.desired.items() if self.reported.get(key, _MISSING) != value}
+
+    def settle(self):
+        """Descarta os valores desejados já confirmados. Retorna True se o gêmeo está em dia."""
+        for key in [key for key, value in self.desired.items() if self.reported.get(key, _MISSING) == value]:
+            del self.desired[key]
+        if not self.desired:
+            self.sent_at = None
+            self.attempts = 0
+            return True
+        return False
+
+
+class TwinStore:
+    """
+    Gêmeos digitais de todos os dispositivos e o reconciliador. Seguro para várias threads.
+
+    'send(device_id, values)' envia ao dispositivo um comando com as
+    configurações em 'values' e retorna a lista de erros.
+    """
+
+    def __init__(self, send, rate, burst, batch_size, retry_seconds, max_attempts):
+        self.send = send
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.bucket = TokenBucket(rate, burst, 0.0)  # Limite de comandos de reconciliação por segundo.
+        self.twins = {}        # ID -> DeviceTwin.
+        self.out_of_sync = {}  # IDs com valores desejados pendentes, na ordem de atendimento (dict como fila).
+        self.lock = threading.Lock()
+        self.sent = 0          # Comandos de reconciliação enviados.
+        self.abandoned = 0     # Dispositivos que não confirmaram após 'max_attempts' comandos.
+
+    def _twin(self, device_id):
+        twin = self.twins.get(device_id)
+        if twin is None:
+            twin = self.twins[device_id] = DeviceTwin()
+        return twin
+
+    def report(self, device_id, values, registered=False):
+        """
+        Atualiza o estado reportado com as configurações informadas pelo dispositivo.
+
+        No registro ('registered'), o estado reportado é substituído e os
+        valores desejados pendentes são reenviados na próxima rodada.
+        """
+        with self.lock:
+            twin = self._twin(device_id)
+            if registered:
+                twin.reported = dict(values)
+                twin.sent_at = None
+                twin.attempts = 0
+            else:
+                twin.reported.update(values)
+            if twin.desired and not twin.settle():
+                self.out_of_sync[device_id] = None
+            else:
+                self.out_of_sync.pop(device_id, None)
+
+    def desire(self, device_id, values, now, sent=False):
+        """
+        Registra os valores desejados para o dispositivo.
+
+        Com 'sent', o comando correspondente já foi enviado (por exemplo, um
+        comando de cliente) e só é reenviado se não for confirmado a tempo.
+        Retorna True se o dispositivo está fora do estado pedido.
+        """
+        with self.lock:
+            twin = self._twin(device_id)
+            twin.desired.update(values)
+            if twin.settle():
+                self.out_of_sync.pop(device_id, None)
+                return False
+            twin.attempts = 1 if sent else 0
+            twin.sent_at = now if sent else None
+            self.out_of_sync[device_id] = None
+            return True
+
+    def reconcile(self, now):
+        """Escolhe e envia uma rodada de comandos aos dispositivos fora do estado desejado. Retorna quantos foram enviados."""
+        return self.send_batch(self.pick_batch(now))
+
+    def pick_batch(self, now):
+        """
+        Escolhe os comandos da próxima rodada e os marca como enviados em 'now'.
+        Retorna a lista de (ID, configurações) a enviar com send_batch.
+        """
+        batch = []
+        with self.lock:
+            for device_id in list(self.out_of_sync):
+                if len(batch) >= self.batch_size:
+                    break
+                twin = self.twins[device_id]
+                # Comando enviado há pouco: aguarda a confirmação.
+                if twin.sent_at is not None and now - twin.sent_at < self.retry_seconds:
+                    continue
+                if twin.attempts >= self.max_attempts:
+                    del self.out_of_sync[device_id]
+                    self.abandoned += 1
+                    print(f"[GÊMEO] {device_id} não confirmou {sorted(twin.desired)} após {twin.attempts} comando(s); desistindo.")
+                    continue
+                if not self.bucket.allow(now):
+                    break
+                twin.sent_at = now
+                twin.attempts += 1
+                batch.append((device_id, twin.delta()))
+                # Vai para o fim da fila, para que os outros dispositivos sejam atendidos antes de uma nova tentativa.
+                del self.out_of_sync[device_id]
+                self.out_of_sync[device_id] = None
+        return batch
+
+    def send_batch(self, batch):
+        """Envia os comandos escolhidos por pick_batch. Retorna quantos foram enviados."""
+        # Os envios acontecem fora do lock, que os relatórios dos dispositivos também usam.
+        for device_id, values in batch:
+            try:
+                errors = self.send(device_id, values)
+            except OSError as e:
+                # Um dispositivo com a conexão quebrada não interrompe o resto do lote; ele é tentado de novo depois.
+                print(f"[GÊMEO] Falha ao enviar o comando de reconciliação para {device_id}: {e}")
+                continue
+            if errors:
+                print(f"[GÊMEO] Comando de reconciliação para {device_id} rejeitado: {'; '.join(errors)}")
+        with self.lock:
+            self.sent += len(batch)
+        return len(batch)
+
+    def fill_device_infos(self, device_infos):
+        """Preenche o estado reportado e o desejado de cada DeviceInfo (por exemplo, de uma listagem)."""
+        with self.lock:
+            for device_info in device_infos:
+                twin = self.twins.get(device_info.id)
+                if twin is not None:
+                    config.fill_update(device_info.reported_config, twin.reported)
+                    config.fill_update(device_info.desired_config, twin.desired)
+
+    def summary(self):
+        """Retorna (dispositivos fora do estado desejado, comandos enviados, dispositivos abandonados)."""
+        with self.lock:
+            return len(self.out_of_sync), self.sent, self.abandoned
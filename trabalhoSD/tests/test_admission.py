@@ -0,0 +1,85 @@
+# tests/test_admission.py
+import unittest
+from generated import smart_city_pb2
+from src.gateway.admission import AdmissionStats, RateLimiter, TokenBucket, is_low_priority
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=2, burst=3, now=0.0)
+        self.assertEqual([bucket.allow(0.0) for _ in range(4)], [True, True, True, False])
+        self.assertTrue(bucket.allow(0.5))
+        self.assertFalse(bucket.allow(0.5))
+
+    def test_reserve_returns_the_wait(self):
+        bucket = TokenBucket(rate=10, burst=1, now=0.0)
+        self.assertEqual(bucket.reserve(0.0), 0.0)
+        self.assertAlmostEqual(bucket.reserve(0.0), 0.1)
+        self.assertAlmostEqual(bucket.reserve(0.0), 0.2)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_keys_are_limited_separately(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        self.assertTrue(limiter.allow("10.0.0.1", 0.0))
+        self.assertFalse(limiter.allow("10.0.0.1", 0.0))
+        self.assertTrue(limiter.allow("10.0.0.2", 0.0))
+
+    def test_least_recently_used_key_is_evicted(self):
+        limiter = RateLimiter(rate=1, burst=1, max_keys=3)
+        for key in ("a", "b", "c"):
+            limiter.allow(key, 0.0)
+        limiter.allow("a", 0.0)  # "a" passa a ser a usada mais recentemente.
+        limiter.allow("d", 0.0)
+        self.assertEqual(list(limiter.buckets), ["c", "a", "d"])
+        # "a" continua limitada; "b" foi esquecida e recomeça com o balde cheio.
+        self.assertFalse(limiter.allow("a", 0.0))
+        self.assertTrue(limiter.allow("b", 0.0))
+
+    def test_flood_of_new_keys_stays_bounded(self):
+        limiter = RateLimiter(rate=1, burst=1, max_keys=100)
+        for index in range(10000):
+            limiter.allow(f"forjado_{index}", 0.0)
+        self.assertEqual(len(limiter.buckets), 100)
+
+
+class AdmissionStatsTest(unittest.TestCase):
+    def test_delta_reports_only_changes(self):
+        stats = AdmissionStats()
+        stats.count("udp_limite_ip")
+        stats.count("udp_limite_ip")
+        self.assertEqual(stats.delta(), ({"udp_limite_ip": 2}, {"udp_limite_ip": 2}))
+        stats.count("telemetria_descartada")
+        self.assertEqual(stats.delta(), ({"telemetria_descartada": 1},
+                                         {"udp_limite_ip": 2, "telemetria_descartada": 1}))
+        self.assertEqual(stats.delta()[0], {})
+
+
+class LowPriorityTest(unittest.TestCase):
+    def test_periodic_readings_are_low_priority(self):
+        temperature = smart_city_pb2.StatusUpdate(device_id="temp_1", temperature=22.5)
+        temperature.metrics["temperature"] = 22.5
+        # O sensor de ar informa o valor em state_info e em metrics["ppm"].
+        air = smart_city_pb2.StatusUpdate(device_id="airq_1", state_info="PPM: 80")
+        air.metrics["ppm"] = 80
+        metrics_only = smart_city_pb2.StatusUpdate(device_id="dev_1")
+        metrics_only.metrics["ppm"] = 80
+        for status in (temperature, air, metrics_only):
+            self.assertTrue(is_low_priority(status), status.device_id)
+
+    def test_state_changes_are_kept(self):
+        camera = smart_city_pb2.StatusUpdate(device_id="cam_1", is_on=True)
+        traffic_light = smart_city_pb2.StatusUpdate(device_id="sema_1", light_phase=smart_city_pb2.GREEN)
+        lamp = smart_city_pb2.StatusUpdate(device_id="lamp_1")
+        lamp.lamp_state.is_on = True
+        for status in (camera, traffic_light, lamp):
+            self.assertFalse(is_low_priority(status), status.device_id)
+
+    def test_report_after_a_command_is_kept(self):
+        status = smart_city_pb2.StatusUpdate(device_id="airq_1", state_info="PPM: 80")
+        status.reported_config.values["is_on"].bool_value = True
+        self.assertFalse(is_low_priority(status))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# tests/test_aggregation.py
+import math
+import unittest
+from generated import smart_city_pb2
+from src.gateway.aggregation import (Aggregator, QuantileSketch, SlidingWindow, TumblingWindow, WindowStats,
+                                     extract_metrics)
+
+
+class QuantileSketchTest(unittest.TestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in range(1, 1001):
+            sketch.add(float(value))
+        for q, expected in ((0.5, 500), (0.9, 900), (0.99, 990)):
+            self.assertAlmostEqual(sketch.quantile(q), expected, delta=expected * 0.02)
+
+    def test_negative_zero_and_positive_values(self):
+        sketch = QuantileSketch()
+        for value in (-10.0, -1.0, 0.0, 0.0, 5.0):
+            sketch.add(value)
+        self.assertLess(sketch.quantile(0.0), -9.0)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertGreater(sketch.quantile(1.0), 4.9)
+
+    def test_empty_sketch_is_nan(self):
+        self.assertTrue(math.isnan(QuantileSketch().quantile(0.5)))
+
+    def test_merge_matches_single_sketch(self):
+        merged, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in range(1, 101):
+            merged.add(float(value))
+            (left if value % 2 else right).add(float(value))
+        left.merge(right)
+        self.assertEqual(left.count, merged.count)
+        self.assertEqual(left.quantile(0.9), merged.quantile(0.9))
+
+
+class WindowTest(unittest.TestCase):
+    def test_window_stats_summary(self):
+        stats = WindowStats()
+        for value in (1.0, 2.0, 3.0):
+            stats.add(value)
+        summary = stats.summary()
+        self.assertEqual((summary["count"], summary["sum"], summary["min"], summary["max"]), (3, 6.0, 1.0, 3.0))
+        self.assertEqual(summary["mean"], 2.0)
+        self.assertTrue(math.isnan(WindowStats().summary()["mean"]))
+
+    def test_tumbling_window_starts_over_each_interval(self):
+        window = TumblingWindow(60)
+        window.add(10.0, 100.0)
+        window.add(20.0, 110.0)
+        start, end, stats = window.snapshot(115.0)
+        self.assertEqual((start, end, stats.count), (60, 120, 2))
+        window.add(30.0, 125.0)
+        self.assertEqual(window.snapshot(125.0)[2].count, 1)
+        # Sem leituras no intervalo corrente, a janela está vazia.
+        self.assertEqual(window.snapshot(200.0)[2].count, 0)
+
+    def test_sliding_window_drops_old_panes(self):
+        window = SlidingWindow(60, 6)
+        window.add(1.0, 0.0)
+        window.add(2.0, 30.0)
+        self.assertEqual(window.snapshot(59.0)[2].count, 2)
+        self.assertEqual(window.snapshot(75.0)[2].count, 1)
+        self.assertEqual(window.snapshot(200.0)[2].count, 0)
+
+
+class AggregatorTest(unittest.TestCase):
+    def test_query_filters_by_scope_and_metric(self):
+        aggregator = Aggregator(60, 300, 30)
+        aggregator.add(("type:TEMP_SENSOR", "group:centro"), "temperature", 20.0, 1000.0)
+        aggregator.add(("type:AIR_SENSOR", "group:centro"), "ppm", 80.0, 1000.0)
+        results = aggregator.query("group:centro", None, False, 1000.0)
+        self.assertEqual(sorted(metric for _, metric, _, _, _ in results), ["ppm", "temperature"])
+        results = aggregator.query(None, "ppm", True, 1000.0)
+        self.assertEqual([scope for scope, _, _, _, _ in results], ["group:centro", "type:AIR_SENSOR"])
+
+    def test_query_without_now_uses_current_time(self):
+        aggregator = Aggregator(60, 300, 30)
+        aggregator.add(("group:centro",), "ppm", 80.0, 1000.0)
+        ((scope, metric, start, end, stats),) = aggregator.query()
+        self.assertEqual((scope, metric), ("group:centro", "ppm"))
+        self.assertGreater(end, 1000.0)
+
+
+class ExtractMetricsTest(unittest.TestCase):
+    def test_temperature_and_named_metrics(self):
+        status = smart_city_pb2.StatusUpdate()
+        status.temperature = 21.5
+        status.metrics["ppm"] = 80.0
+        self.assertEqual(dict(extract_metrics(status)), {"temperature": 21.5, "ppm": 80.0})
+
+    def test_non_finite_values_are_dropped(self):
+        status = smart_city_pb2.StatusUpdate()
+        status.temperature = math.inf
+        status.metrics["ppm"] = math.nan
+        status.metrics["pm25"] = -math.inf
+        status.metrics["co2"] = 400.0
+        self.assertEqual(dict(extract_metrics(status)), {"co2": 400.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
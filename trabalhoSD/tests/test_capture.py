@@ -0,0 +1,59 @@
+# tests/test_capture.py
+import os
+import socket
+import tempfile
+import unittest
+from src.gateway.capture import (CHANNEL_CLIENT, CHANNEL_DEVICE, CHANNEL_UDP, FILE_MAGIC, INBOUND, OUTBOUND,
+                                 CaptureLog, read_capture)
+
+
+class CaptureTest(unittest.TestCase):
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = os.path.join(directory, "captura.bin")
+
+    def test_records_round_trip_with_connection_ids(self):
+        capture = CaptureLog(self.path)
+        first, second = socket.socketpair()
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        capture.record(CHANNEL_DEVICE, INBOUND, first, b"registro")
+        capture.record(CHANNEL_UDP, INBOUND, None, b"status")
+        capture.record(CHANNEL_CLIENT, OUTBOUND, second, b"lista")
+        capture.record(CHANNEL_DEVICE, OUTBOUND, first, b"comando")
+        capture.close()
+        records = [(channel, direction, connection_id, payload)
+                   for _, channel, direction, connection_id, payload in read_capture(self.path)]
+        self.assertEqual(records, [
+            (CHANNEL_DEVICE, INBOUND, 1, b"registro"),
+            (CHANNEL_UDP, INBOUND, 0, b"status"),
+            (CHANNEL_CLIENT, OUTBOUND, 2, b"lista"),
+            (CHANNEL_DEVICE, OUTBOUND, 1, b"comando"),
+        ])
+        self.assertEqual(capture.records, 4)
+
+    def test_records_after_close_are_ignored(self):
+        capture = CaptureLog(self.path)
+        capture.close()
+        capture.record(CHANNEL_UDP, INBOUND, None, b"tarde demais")
+        capture.flush()
+        self.assertEqual(list(read_capture(self.path)), [])
+
+    def test_incomplete_last_record_is_ignored(self):
+        capture = CaptureLog(self.path)
+        capture.record(CHANNEL_UDP, INBOUND, None, b"completo")
+        capture.record(CHANNEL_UDP, INBOUND, None, b"cortado")
+        capture.close()
+        with open(self.path, "r+b") as capture_file:
+            capture_file.truncate(os.path.getsize(self.path) - 3)
+        self.assertEqual([record[4] for record in read_capture(self.path)], [b"completo"])
+
+    def test_other_files_are_rejected(self):
+        with open(self.path, "wb") as other_file:
+            other_file.write(FILE_MAGIC[:4])
+        with self.assertRaises(ValueError):
+            list(read_capture(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
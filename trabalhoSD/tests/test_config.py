@@ -0,0 +1,76 @@
+# tests/test_config.py
+import unittest
+from generated import smart_city_pb2
+from src.common import config
+
+
+def lamp_schema():
+    schema = smart_city_pb2.ConfigSchema()
+    config.add_field(schema, "is_on", smart_city_pb2.CONFIG_BOOL)
+    config.add_field(schema, "brightness", smart_city_pb2.CONFIG_INT, min_value=0, max_value=100)
+    config.add_field(schema, "gain", smart_city_pb2.CONFIG_FLOAT, min_value=0.5)
+    config.add_field(schema, "mode", smart_city_pb2.CONFIG_STRING, allowed_values=("auto", "manual"))
+    return schema
+
+
+def update(**values):
+    config_update = smart_city_pb2.ConfigUpdate()
+    for key, value in values.items():
+        config.set_value(config_update.values[key], value)
+    return config_update
+
+
+class ValueConversionTest(unittest.TestCase):
+    def test_round_trip_keeps_python_types(self):
+        values = {"is_on": True, "brightness": 40, "gain": 1.5, "mode": "auto"}
+        self.assertEqual(config.to_dict(update(**values)), values)
+        self.assertIsInstance(config.to_dict(update(is_on=False))["is_on"], bool)
+
+    def test_unset_value_is_none(self):
+        self.assertIsNone(config.get_value(smart_city_pb2.ConfigValue()))
+
+
+class ValidateUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = lamp_schema()
+
+    def test_valid_update_has_no_errors(self):
+        self.assertEqual(config.validate_update(self.schema, update(is_on=True, brightness=100, mode="manual")), [])
+
+    def test_integer_is_accepted_for_float(self):
+        self.assertEqual(config.validate_update(self.schema, update(gain=2)), [])
+
+    def test_empty_update_is_rejected(self):
+        self.assertEqual(config.validate_update(self.schema, smart_city_pb2.ConfigUpdate()),
+                         ["Nenhuma configuração informada."])
+
+    def test_each_invalid_key_is_reported(self):
+        errors = config.validate_update(self.schema, update(brightness=140, gain=0.1, mode="turbo", color="azul",
+                                                            is_on=1))
+        self.assertEqual(len(errors), 5)
+        self.assertIn("Configuração desconhecida: color", errors)
+        self.assertIn("brightness: 140 acima do máximo 100.", errors)
+        self.assertIn("gain: 0.1 abaixo do mínimo 0.5.", errors)
+        self.assertIn("is_on: tipo inválido (esperado CONFIG_BOOL).", errors)
+
+
+class LegacyConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = lamp_schema()
+
+    def test_values_are_converted_to_the_declared_type(self):
+        self.assertEqual(config.to_dict(config.parse_legacy_config(self.schema, "brightness: 70")), {"brightness": 70})
+        self.assertEqual(config.to_dict(config.parse_legacy_config(self.schema, "is_on:sim")), {"is_on": True})
+
+    def test_unknown_key_is_kept_for_validation(self):
+        parsed = config.parse_legacy_config(self.schema, "color:azul")
+        self.assertEqual(config.validate_update(self.schema, parsed), ["Configuração desconhecida: color"])
+
+    def test_malformed_text_raises(self):
+        for text in ("brightness", "brightness:alto", "a:b:c"):
+            with self.assertRaises(ValueError):
+                config.parse_legacy_config(self.schema, text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+# tests/test_edge.py
+import contextlib
+import io
+import socket
+import threading
+import unittest
+from unittest import mock
+from generated import smart_city_pb2
+from src.common.framing import recv_message, send_message
+from src.gateway import edge
+from src.gateway.edge import URGENT_DELAY_SECONDS, EdgeUplink
+
+
+class FakeTimers:
+    """Guarda os agendamentos em vez de executá-los."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, delay, callback):
+        self.scheduled.append((delay, callback))
+
+
+class BlockingConn:
+    """Conexão cujo envio fica parado até 'release' ser sinalizado."""
+
+    def __init__(self):
+        self.sending = threading.Event()
+        self.release = threading.Event()
+        self.sent = []
+
+    def sendall(self, data):
+        self.sending.set()
+        self.release.wait(5)
+        self.sent.append(data)
+
+
+def temperature(device_id, value):
+    return smart_city_pb2.StatusUpdate(device_id=device_id, temperature=value)
+
+
+def air_quality(device_id, ppm):
+    status = smart_city_pb2.StatusUpdate(device_id=device_id, state_info=f"PPM: {ppm}")
+    status.metrics["ppm"] = ppm
+    return status
+
+
+def lamp_state(device_id, is_on):
+    status = smart_city_pb2.StatusUpdate(device_id=device_id)
+    status.lamp_state.is_on = is_on
+    return status
+
+
+class EdgeUplinkTest(unittest.TestCase):
+    def setUp(self):
+        self.timers = FakeTimers()
+        self.uplink = EdgeUplink(("127.0.0.1", 0), "borda_teste", 5.0, self.timers, lambda wrapper_msg: None)
+        self.central, self.uplink.conn = socket.socketpair()
+        self.addCleanup(self.central.close)
+        self.addCleanup(self.uplink.conn.close)
+
+    def batch(self):
+        wrapper_msg = recv_message(self.central)
+        self.assertTrue(wrapper_msg.HasField("telemetry_batch"))
+        return wrapper_msg.telemetry_batch
+
+    def test_periodic_readings_wait_for_the_interval(self):
+        for value in (20.0, 21.0):
+            self.uplink.add_status(temperature("temp_1", value))
+        for ppm in (80, 90):
+            self.uplink.add_status(air_quality("airq_1", ppm))
+        self.assertEqual(self.timers.scheduled, [])
+        self.uplink.send_pending()
+        batch = self.batch()
+        self.assertEqual(batch.received, 4)
+        latest = {status.device_id: status for status in batch.statuses}
+        self.assertEqual(latest["temp_1"].temperature, 21.0)
+        self.assertEqual(latest["airq_1"].metrics["ppm"], 90)
+        self.assertEqual(self.uplink.stats(), (4, 2))
+
+    def test_state_changes_share_one_urgent_batch(self):
+        self.uplink.add_status(temperature("temp_1", 20.0))
+        self.uplink.add_status(lamp_state("lamp_1", True))
+        self.uplink.add_status(lamp_state("lamp_2", False))
+        ((delay, callback),) = self.timers.scheduled
+        self.assertEqual(delay, URGENT_DELAY_SECONDS)
+        callback()
+        batch = self.batch()
+        self.assertEqual([status.device_id for status in batch.statuses], ["lamp_1", "lamp_2"])
+        # A leitura periódica continua esperando o intervalo.
+        self.uplink.send_pending()
+        self.assertEqual([status.device_id for status in self.batch().statuses], ["temp_1"])
+
+    def test_readings_are_accepted_while_a_batch_is_being_sent(self):
+        conn = BlockingConn()
+        self.uplink.conn = conn
+        self.uplink.add_status(temperature("temp_1", 20.0))
+        sender = threading.Thread(target=self.uplink.send_pending)
+        sender.start()
+        self.assertTrue(conn.sending.wait(5))
+        # O envio está parado na rede, mas a borda continua recebendo leituras.
+        self.uplink.add_status(temperature("temp_2", 21.0))
+        self.assertEqual(self.uplink.stats(), (2, 1))
+        conn.release.set()
+        sender.join(5)
+        self.assertEqual(len(conn.sent), 1)
+
+    def test_failed_send_drops_the_connection(self):
+        self.central.close()
+        self.uplink.add_status(temperature("temp_1", 20.0))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.uplink.send_pending()
+        self.assertIsNone(self.uplink.conn)
+        # Sem conexão, nada é enviado nem acumulado como urgente.
+        self.uplink.add_status(lamp_state("lamp_1", True))
+        self.timers.scheduled[0][1]()
+        self.assertEqual(self.uplink.urgent, [])
+
+
+
+class StopLoop(BaseException):
+    """Interrompe o laço de reconexão de EdgeUplink.run durante o teste."""
+
+
+class EdgeUplinkRunTest(unittest.TestCase):
+    def test_failure_handling_a_message_reconnects(self):
+        central, conn = socket.socketpair()
+        self.addCleanup(central.close)
+
+        def on_message(wrapper_msg):
+            raise ValueError("mensagem inesperada")
+
+        uplink = EdgeUplink(("127.0.0.1", 0), "borda_teste", 5.0, FakeTimers(), on_message)
+        send_message(central, smart_city_pb2.WrapperMessage())
+        with mock.patch.object(edge, "connect_secure", return_value=conn), \
+                mock.patch.object(edge.time, "sleep", side_effect=StopLoop), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            with self.assertRaises(StopLoop):
+                uplink.run()
+        # O erro não encerra a thread: a conexão é fechada e o laço parte para a reconexão.
+        self.assertIn("mensagem inesperada", output.getvalue())
+        self.assertIsNone(uplink.conn)
+        self.assertEqual(conn.fileno(), -1)
+
+if __name__ == "__main__":
+    unittest.main()
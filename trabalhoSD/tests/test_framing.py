@@ -0,0 +1,38 @@
+# tests/test_framing.py
+import socket
+import unittest
+from generated import smart_city_pb2
+from src.common.framing import HEADER, MAX_MESSAGE_SIZE, recv_message, send_message
+
+
+class FramingTest(unittest.TestCase):
+    def setUp(self):
+        self.left, self.right = socket.socketpair()
+        self.addCleanup(self.left.close)
+        self.addCleanup(self.right.close)
+
+    def test_messages_keep_their_boundaries(self):
+        for device_id in ("lamp_1", "lamp_2"):
+            wrapper_msg = smart_city_pb2.WrapperMessage()
+            wrapper_msg.status_update.device_id = device_id
+            send_message(self.left, wrapper_msg)
+        self.assertEqual(recv_message(self.right).status_update.device_id, "lamp_1")
+        self.assertEqual(recv_message(self.right).status_update.device_id, "lamp_2")
+
+    def test_closed_connection_returns_none(self):
+        self.left.close()
+        self.assertIsNone(recv_message(self.right))
+
+    def test_truncated_message_returns_none(self):
+        self.left.sendall(HEADER.pack(10) + b"abc")
+        self.left.close()
+        self.assertIsNone(recv_message(self.right))
+
+    def test_oversized_message_is_rejected(self):
+        self.left.sendall(HEADER.pack(MAX_MESSAGE_SIZE + 1))
+        with self.assertRaises(ValueError):
+            recv_message(self.right)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,291 @@
+# tests/test_gateway.py
+import contextlib
+import io
+import math
+import socket
+import threading
+import unittest
+from unittest import mock
+from generated import smart_city_pb2
+from src.common import config
+from src.common.framing import recv_message, send_message
+from src.gateway import gateway
+from src.gateway.registry import DeviceRecord
+from src.gateway.rules import RuleAction
+
+# Testes dos caminhos de erro do Gateway: conexões de dispositivos que caem,
+# leituras inválidas e falhas nas threads de trabalho. Os prints do Gateway
+# são descartados durante os testes.
+
+
+def register_lamp(device_id, conn, group="centro"):
+    """Registra diretamente no Gateway um poste com a conexão 'conn'."""
+    info = smart_city_pb2.DeviceInfo()
+    info.id = device_id
+    info.type = smart_city_pb2.LAMP_POST
+    info.group = group
+    config.add_field(info.config_schema, "brightness", smart_city_pb2.CONFIG_INT, min_value=0, max_value=100)
+    record = DeviceRecord(info, conn, "127.0.0.1")
+    with gateway.lock:
+        gateway.devices[device_id] = record
+    return record
+
+
+def brightness_command(device_id, brightness):
+    command_msg = smart_city_pb2.WrapperMessage()
+    command_msg.command.device_id = device_id
+    command_msg.command.config_update.values["brightness"].int_value = brightness
+    return command_msg
+
+
+class GatewayTestCase(unittest.TestCase):
+    def setUp(self):
+        gateway.devices.clear()
+        self.addCleanup(gateway.devices.clear)
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+
+    def socket_pair(self):
+        pair = socket.socketpair()
+        for sock in pair:
+            self.addCleanup(sock.close)
+        return pair
+
+    def tcp_pair(self):
+        """Par de sockets TCP no loopback (o Gateway usa o IP de origem da conexão)."""
+        with socket.create_server(("127.0.0.1", 0)) as server:
+            client = socket.create_connection(server.getsockname())
+            conn, _ = server.accept()
+        for sock in (client, conn):
+            self.addCleanup(sock.close)
+        return client, conn
+
+
+class ForwardToDeviceTest(GatewayTestCase):
+    def test_command_reaches_connected_device(self):
+        device_side, gateway_side = self.socket_pair()
+        register_lamp("lamp_1", gateway_side)
+        response = gateway.handle_client_request(brightness_command("lamp_1", 40))
+        self.assertTrue(response.command_result.accepted)
+        received = recv_message(device_side)
+        self.assertEqual(received.command.config_update.values["brightness"].int_value, 40)
+
+    def test_dead_connection_returns_error_and_drops_device(self):
+        device_side, gateway_side = self.socket_pair()
+        register_lamp("lamp_2", gateway_side)
+        device_side.close()
+        response = gateway.handle_client_request(brightness_command("lamp_2", 40))
+        self.assertFalse(response.command_result.accepted)
+        self.assertIn("não está conectado", response.command_result.errors[0])
+        self.assertNotIn("lamp_2", gateway.devices)
+
+    def test_new_registration_is_kept_when_old_connection_fails(self):
+        device_side, old_conn = self.socket_pair()
+        old_record = register_lamp("lamp_3", old_conn)
+        _, new_conn = self.socket_pair()
+        new_record = register_lamp("lamp_3", new_conn)
+        device_side.close()
+        gateway.drop_device(old_record, OSError("conexão antiga"))
+        self.assertIs(gateway.devices["lamp_3"], new_record)
+
+
+class ClientRequestTest(GatewayTestCase):
+    def test_empty_responses_keep_their_kind(self):
+        listing = smart_city_pb2.WrapperMessage()
+        listing.list_request.SetInParent()
+        query = smart_city_pb2.WrapperMessage()
+        query.aggregate_query.metric = "nenhuma"
+        for request, kind in ((listing, "list_response"), (query, "aggregate_response")):
+            response = gateway.handle_client_request(request)
+            # Mesmo sem dispositivos nem resultados, a resposta serializada diz de que tipo ela é.
+            parsed = smart_city_pb2.WrapperMessage.FromString(response.SerializeToString())
+            self.assertEqual(parsed.WhichOneof("msg"), kind)
+
+
+class RegistrationTest(GatewayTestCase):
+    def test_registration_is_acknowledged(self):
+        device_side, gateway_side = self.tcp_pair()
+        register_msg = smart_city_pb2.WrapperMessage()
+        register_msg.device_info.id = "cam_1"
+        register_msg.device_info.type = smart_city_pb2.CAMERA
+        send_message(device_side, register_msg)
+        gateway.handle_device_connection(gateway_side)
+        self.assertIn("cam_1", gateway.devices)
+        self.assertEqual(recv_message(device_side).registration_ack.device_id, "cam_1")
+
+    def test_device_that_stops_reading_is_dropped(self):
+        device_side, gateway_side = self.tcp_pair()
+        register_msg = smart_city_pb2.WrapperMessage()
+        register_msg.device_info.id = "lamp_travado"
+        register_msg.device_info.type = smart_city_pb2.LAMP_POST
+        send_message(device_side, register_msg)
+        with mock.patch.object(gateway, "DEVICE_SEND_TIMEOUT", 0.2):
+            gateway.handle_device_connection(gateway_side)
+        # O dispositivo nunca lê: os buffers enchem e o envio esgota o timeout em vez de travar.
+        large_msg = smart_city_pb2.WrapperMessage()
+        large_msg.status_update.state_info = "x" * (1 << 20)
+        for _ in range(64):
+            if not gateway.forward_to_device("lamp_travado", large_msg):
+                break
+        self.assertNotIn("lamp_travado", gateway.devices)
+
+    def test_sensor_that_already_closed_stays_registered(self):
+        device_side, gateway_side = self.tcp_pair()
+        register_msg = smart_city_pb2.WrapperMessage()
+        register_msg.device_info.id = "temp_1"
+        register_msg.device_info.type = smart_city_pb2.TEMP_SENSOR
+        send_message(device_side, register_msg)
+        device_side.close()
+        gateway.handle_device_connection(gateway_side)
+        self.assertIn("temp_1", gateway.devices)
+
+
+def edge_registration(edge_id, *device_ids):
+    """Mensagem de registro de uma borda com postes 'device_ids'."""
+    wrapper_msg = smart_city_pb2.WrapperMessage()
+    wrapper_msg.edge_registration.edge_id = edge_id
+    for device_id in device_ids:
+        info = wrapper_msg.edge_registration.devices.add()
+        info.id = device_id
+        info.type = smart_city_pb2.LAMP_POST
+        info.ip_address = "10.0.0.2"
+    return wrapper_msg
+
+
+class EdgeRegistrationTest(GatewayTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(gateway, "twin_store"))
+        self.enterContext(mock.patch.object(gateway, "lamp_scheduler"))
+        self.addCleanup(gateway.edges.clear)
+
+    def test_ids_outside_the_edge_certificate_are_refused(self):
+        _, edge_conn = self.socket_pair()
+        owns = lambda conn, device_id: device_id.startswith("borda_a_")
+        with mock.patch.object(gateway, "peer_owns_id", owns):
+            registration = edge_registration("borda_a", "borda_a_lamp", "lamp_alheio")
+            gateway.register_edge_devices("borda_a", edge_conn, threading.Lock(), registration.edge_registration)
+        self.assertEqual(sorted(gateway.devices), ["borda_a_lamp"])
+
+    def test_device_held_by_another_connection_is_not_taken(self):
+        _, device_conn = self.socket_pair()
+        record = register_lamp("lamp_1", device_conn)
+        _, edge_conn = self.socket_pair()
+        registration = edge_registration("borda_a", "lamp_1")
+        gateway.register_edge_devices("borda_a", edge_conn, threading.Lock(), registration.edge_registration)
+        self.assertIs(gateway.devices["lamp_1"], record)
+        # Depois que a conexão antiga é fechada, a borda pode assumir o dispositivo.
+        device_conn.close()
+        gateway.register_edge_devices("borda_a", edge_conn, threading.Lock(), registration.edge_registration)
+        self.assertIs(gateway.devices["lamp_1"].conn, edge_conn)
+
+    def test_edge_disconnect_removes_its_devices(self):
+        edge_side, gateway_side = self.socket_pair()
+        _, device_conn = self.socket_pair()
+        register_lamp("lamp_direto", device_conn)
+        edge_side.close()
+        gateway.handle_edge_connection(gateway_side, edge_registration("borda_a", "lamp_1", "lamp_2"))
+        self.assertEqual(sorted(gateway.devices), ["lamp_direto"])
+        self.assertNotIn("borda_a", gateway.edges)
+
+    def test_failed_send_does_not_close_the_edge_connection(self):
+        _, edge_conn = self.socket_pair()
+        send_lock = threading.Lock()
+        gateway.edges["borda_a"] = (edge_conn, send_lock)
+        registration = edge_registration("borda_a", "lamp_1", "lamp_2")
+        gateway.register_edge_devices("borda_a", edge_conn, send_lock, registration.edge_registration)
+        gateway.drop_device(gateway.devices["lamp_1"], OSError("envio falhou"))
+        self.assertNotIn("lamp_1", gateway.devices)
+        # A conexão é da borda inteira: o outro poste continua alcançável por ela.
+        self.assertNotEqual(edge_conn.fileno(), -1)
+        self.assertIn("lamp_2", gateway.devices)
+
+
+class IngestTest(GatewayTestCase):
+    def test_non_finite_reading_is_not_aggregated(self):
+        register_lamp("lamp_inf", None, group="grupo_inf")
+        status = smart_city_pb2.StatusUpdate()
+        status.device_id = "lamp_inf"
+        status.temperature = math.inf
+        status.metrics["ppm"] = math.nan
+        gateway.process_status(status)
+        self.assertEqual(gateway.aggregator.query("group:grupo_inf"), [])
+
+    def test_ingest_thread_survives_a_failing_reading(self):
+        processed = threading.Event()
+        calls = []
+
+        def process_status(status):
+            calls.append(status.device_id)
+            if len(calls) == 1:
+                raise RuntimeError("leitura quebrada")
+            processed.set()
+
+        with mock.patch.object(gateway, "process_status", process_status):
+            thread = threading.Thread(target=gateway.process_ingest_queue, daemon=True)
+            thread.start()
+            for device_id in ("quebrado", "normal"):
+                status = smart_city_pb2.StatusUpdate()
+                status.device_id = device_id
+                gateway.ingest_queue.put(status)
+            self.assertTrue(processed.wait(5))
+        self.assertEqual(calls, ["quebrado", "normal"])
+        self.assertTrue(thread.is_alive())
+
+
+class RuleActionsTest(GatewayTestCase):
+    def test_rules_thread_survives_a_failing_command(self):
+        for device_id in ("lamp_a", "lamp_b"):
+            register_lamp(device_id, None, group="grupo_regra")
+        calls = []
+        done = threading.Event()
+
+        def send_command_to_device(device_id, toggle=False, values=None, record=True):
+            calls.append(device_id)
+            if len(calls) == 4:
+                done.set()
+            if device_id == "lamp_a":
+                raise BrokenPipeError("conexão perdida")
+            return []
+
+        rule = mock.Mock(rule_id="ar_poluido")
+        action = RuleAction({"command": {"device_type": "LAMP_POST", "group": "$group", "config": {"is_on": True}}})
+        with mock.patch.object(gateway, "send_command_to_device", send_command_to_device):
+            thread = threading.Thread(target=gateway.execute_rule_actions, daemon=True)
+            thread.start()
+            for _ in range(2):
+                gateway.rule_actions.put((rule, action, "airq_1", "grupo_regra", 130.0))
+            self.assertTrue(done.wait(5))
+        # O erro no primeiro poste não impede o segundo nem a ação seguinte.
+        self.assertEqual(sorted(calls), ["lamp_a", "lamp_a", "lamp_b", "lamp_b"])
+        self.assertTrue(thread.is_alive())
+
+
+
+class PeriodicTasksTest(GatewayTestCase):
+    def test_failed_reconcile_round_is_rescheduled(self):
+        timers = self.enterContext(mock.patch.object(gateway, "timers"))
+        twin_store = self.enterContext(mock.patch.object(gateway, "twin_store"))
+        twin_store.pick_batch.side_effect = RuntimeError("rodada quebrada")
+        with self.assertRaises(RuntimeError):
+            gateway.reconcile_twins_periodically()
+        timers.schedule.assert_called_once_with(gateway.TWIN_RECONCILE_SECONDS, gateway.reconcile_twins_periodically)
+
+    def test_reconcile_round_is_sent_off_the_timer_thread(self):
+        self.enterContext(mock.patch.object(gateway, "timers"))
+        twin_store = self.enterContext(mock.patch.object(gateway, "twin_store"))
+        self.enterContext(mock.patch.object(gateway, "twin_batches", gateway.queue.Queue(1)))
+        twin_store.pick_batch.return_value = [("lamp_1", {"brightness": 80})]
+        gateway.reconcile_twins_periodically()
+        # O temporizador só escolhe o lote; enquanto ele espera o envio, nenhuma rodada nova é escolhida.
+        twin_store.send_batch.assert_not_called()
+        gateway.reconcile_twins_periodically()
+        twin_store.pick_batch.assert_called_once()
+        sent = threading.Event()
+        twin_store.send_batch.side_effect = lambda batch: sent.set()
+        threading.Thread(target=gateway.send_twin_batches, daemon=True).start()
+        self.assertTrue(sent.wait(5))
+        twin_store.send_batch.assert_called_once_with([("lamp_1", {"brightness": 80})])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+# tests/test_history.py
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from src.gateway import history
+from src.gateway.history import HOUR_US, HistoryFile, HistoryWriter, partition_path, summarize
+
+# Um instante fixo (segundos) no meio de uma hora, para as leituras caírem na mesma partição.
+BASE = 1760860800 + 1800
+
+
+class HistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+
+    def writer(self):
+        return HistoryWriter(self.directory, 60)
+
+
+class HistoryWriterTest(HistoryTestCase):
+    def test_rows_round_trip_through_flush(self):
+        writer = self.writer()
+        writer.add(BASE, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 20.0)])
+        writer.add(BASE + 1, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 22.0)])
+        writer.add(BASE + 1, "airq_1", "AIR_SENSOR", "norte", [("ppm", 80.0)])
+        writer.flush()
+        writer.add(BASE + 2, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 24.0)])
+        writer.close()
+        self.assertEqual(writer.rows, 4)
+        self.assertEqual(summarize(self.directory, metric="temperature"), {"total": [3, 66.0, 20.0, 24.0]})
+        by_group = summarize(self.directory, by="group")
+        self.assertEqual(sorted(by_group), ["centro", "norte"])
+        # O intervalo [início, fim) corta a série pelos instantes.
+        start_us = (BASE + 1) * 1000000
+        self.assertEqual(summarize(self.directory, start_us, start_us + 1000000, metric="temperature")["total"][0], 1)
+
+    def test_rows_past_the_limit_are_dropped(self):
+        writer = self.writer()
+        with mock.patch.object(history, "MAX_PENDING_ROWS", 2):
+            writer.add(BASE, "airq_1", "AIR_SENSOR", "centro", [("ppm", 80.0), ("pm25", 10.0)])
+            writer.add(BASE, "airq_2", "AIR_SENSOR", "centro", [("ppm", 90.0)])
+        self.assertEqual((len(writer.pending), writer.dropped), (2, 1))
+
+    def test_thread_survives_a_failing_flush(self):
+        writer = self.writer()
+        writer.flush_seconds = 0
+        flushed = threading.Event()
+        calls = []
+
+        def flush():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ValueError("lote quebrado")
+            writer.closed = True
+            flushed.set()
+
+        writer.flush = flush
+        thread = threading.Thread(target=writer._run, daemon=True)
+        thread.start()
+        self.assertTrue(flushed.wait(5))
+        thread.join(5)
+        self.assertEqual(len(calls), 2)
+
+    def test_failed_write_does_not_corrupt_the_partition(self):
+        writer = self.writer()
+        writer.add(BASE, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 20.0)])
+        writer.flush()
+        writer.add(BASE, "temp_2", "TEMP_SENSOR", "centro", [("temperature", 30.0)])
+        with mock.patch.object(history, "encode_block", side_effect=OSError("disco cheio")):
+            with self.assertRaises(OSError):
+                writer.flush()
+        self.assertEqual(writer.partitions, {})
+        # A série nova do lote perdido não pode deixar ids órfãos no arquivo reaberto.
+        writer.add(BASE, "temp_3", "TEMP_SENSOR", "centro", [("temperature", 40.0)])
+        writer.close()
+        self.assertEqual(summarize(self.directory, by="device"),
+                         {"temp_1": [1, 20.0, 20.0, 20.0], "temp_3": [1, 40.0, 40.0, 40.0]})
+
+
+class HistoryFileTest(HistoryTestCase):
+    def test_incomplete_block_is_ignored_and_truncated(self):
+        writer = self.writer()
+        writer.add(BASE, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 20.0)])
+        writer.flush()
+        writer._forget_partition(BASE * 1000000 // HOUR_US)
+        path = partition_path(self.directory, BASE * 1000000 // HOUR_US)
+        valid_size = os.path.getsize(path)
+        with open(path, "ab") as history_file:
+            history_file.write(history.BLOCK_MAGIC + b"\x05\x00")
+        with HistoryFile(path) as history_file:
+            self.assertEqual((history_file.rows, history_file.valid_size), (1, valid_size))
+        writer.add(BASE, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 22.0)])
+        writer.flush()
+        with HistoryFile(path) as history_file:
+            self.assertEqual(history_file.rows, 2)
+            self.assertEqual(history_file.valid_size, os.path.getsize(path))
+
+    def test_other_files_are_rejected(self):
+        path = os.path.join(self.directory, "outro.col")
+        with open(path, "wb") as other_file:
+            other_file.write(b"nao e historico")
+        with self.assertRaises(ValueError):
+            HistoryFile(path)
+
+
+    def test_empty_and_foreign_partitions_are_skipped(self):
+        writer = self.writer()
+        writer.add(BASE, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 20.0)])
+        writer.close()
+        hour = BASE * 1000000 // HOUR_US
+        for offset, content in ((1, b""), (2, b"SCH")):
+            path = partition_path(self.directory, hour + offset)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as other_file:
+                other_file.write(content)
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            self.assertEqual(summarize(self.directory), {"total": [1, 20.0, 20.0, 20.0]})
+        self.assertEqual(errors.getvalue().count("Partição ignorada"), 2)
+
+    def test_signature_is_written_with_the_first_block(self):
+        writer = self.writer()
+        writer.add(BASE, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 20.0)])
+        with mock.patch.object(history, "encode_block", side_effect=OSError("disco cheio")):
+            with self.assertRaises(OSError):
+                writer.flush()
+        path = partition_path(self.directory, BASE * 1000000 // HOUR_US)
+        # A falha não deixa um arquivo só com a assinatura; o vazio é recriado na próxima gravação.
+        self.assertEqual(os.path.getsize(path), 0)
+        writer.add(BASE, "temp_1", "TEMP_SENSOR", "centro", [("temperature", 22.0)])
+        writer.close()
+        self.assertEqual(summarize(self.directory), {"total": [1, 22.0, 22.0, 22.0]})
+
+if __name__ == "__main__":
+    unittest.main()
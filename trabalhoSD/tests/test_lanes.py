@@ -0,0 +1,81 @@
+# tests/test_lanes.py
+import threading
+import time
+import unittest
+from generated import smart_city_pb2
+from src.gateway.lanes import ControlLane, message_priority
+
+
+class MessagePriorityTest(unittest.TestCase):
+    def test_priority_comes_from_the_message_type(self):
+        command = smart_city_pb2.WrapperMessage()
+        command.command.device_id = "lamp_1"
+        self.assertEqual(message_priority(command), smart_city_pb2.PRIORITY_CONTROL)
+        query = smart_city_pb2.WrapperMessage()
+        query.aggregate_query.metric = "ppm"
+        self.assertEqual(message_priority(query), smart_city_pb2.PRIORITY_BULK)
+
+    def test_priority_is_not_carried_by_the_message(self):
+        self.assertNotIn("priority", smart_city_pb2.WrapperMessage.DESCRIPTOR.fields_by_name)
+        listing = smart_city_pb2.WrapperMessage()
+        listing.list_request.SetInParent()
+        self.assertEqual(message_priority(listing), smart_city_pb2.PRIORITY_CONTROL)
+
+
+class ControlLaneTest(unittest.TestCase):
+    def test_run_returns_the_result_on_the_calling_thread(self):
+        lane = ControlLane(enabled=True, max_pause=0.05)
+        result = lane.run(lambda value: (value * 2, threading.get_ident(), lane.pending), 21)
+        self.assertEqual(result, (42, threading.get_ident(), 1))
+        self.assertEqual(lane.pending, 0)
+        self.assertEqual(lane.summary()[0], 1)
+
+    def test_run_reraises_the_error(self):
+        lane = ControlLane(enabled=True, max_pause=0.05)
+
+        def failing():
+            raise ValueError("pedido inválido")
+
+        with self.assertRaises(ValueError):
+            lane.run(failing)
+        # O pedido que falhou não deixa a telemetria pausada.
+        self.assertEqual(lane.pending, 0)
+        self.assertEqual(lane.run(lambda: "ok"), "ok")
+
+    def test_slow_request_does_not_delay_another_client(self):
+        lane = ControlLane(enabled=True, max_pause=0.05)
+        release = threading.Event()
+        slow = threading.Thread(target=lane.run, args=(release.wait, 5))
+        slow.start()
+        self.addCleanup(slow.join, 5)
+        self.addCleanup(release.set)
+        started = time.perf_counter()
+        self.assertEqual(lane.run(lambda: "ok"), "ok")
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_disabled_lane_does_not_pause_telemetry(self):
+        lane = ControlLane(enabled=False, max_pause=0.05)
+        self.assertEqual(lane.run(lambda: lane.pending), 0)
+        self.assertIsNone(lane.summary())
+
+    def test_telemetry_pause_is_bounded(self):
+        lane = ControlLane(enabled=True, max_pause=0.05)
+        lane.pending = 1  # Um pedido de controle que não termina.
+        started = time.perf_counter()
+        lane.wait_for_control()
+        self.assertGreaterEqual(time.perf_counter() - started, 0.04)
+        # Logo depois da pausa, a telemetria só cede o GIL, sem esperar.
+        started = time.perf_counter()
+        for _ in range(100):
+            lane.wait_for_control()
+        self.assertLess(time.perf_counter() - started, 0.04)
+        self.assertEqual(lane.pauses, 1)
+
+    def test_no_pause_without_pending_requests(self):
+        lane = ControlLane(enabled=True, max_pause=0.05)
+        lane.wait_for_control()
+        self.assertEqual(lane.pauses, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# tests/test_lighting.py
+import calendar
+import contextlib
+import io
+import time
+import unittest
+from generated import smart_city_pb2
+from src.common.lighting import scheduled_level, sun_times, validate_schedule
+from src.gateway.lamp_scheduler import REANNOUNCE_SECONDS, LampScheduler
+
+EQUINOX_NOON = calendar.timegm((2026, 3, 21, 12, 0, 0))
+EQUINOX_MIDNIGHT = calendar.timegm((2026, 3, 21, 0, 0, 0))
+
+
+def lamp_schedule(group="centro", **fields):
+    schedule = smart_city_pb2.LampSchedule(group=group, night_level=80, late_night_level=30)
+    for name, value in fields.items():
+        setattr(schedule, name, value)
+    return schedule
+
+
+class SunTimesTest(unittest.TestCase):
+    def test_equator_at_equinox(self):
+        sunrise, sunset = sun_times(80, 0.0, 0.0)
+        self.assertAlmostEqual(sunrise, 6.0, delta=0.25)
+        self.assertAlmostEqual(sunset, 18.0, delta=0.25)
+
+    def test_polar_night_and_midnight_sun(self):
+        self.assertEqual(sun_times(355, 80.0, 0.0), (None, None))
+        self.assertEqual(sun_times(172, 80.0, 0.0), (0.0, 24.0))
+
+
+class ScheduledLevelTest(unittest.TestCase):
+    def test_off_by_day_and_on_by_night(self):
+        self.assertEqual(scheduled_level(lamp_schedule(), EQUINOX_NOON), 0)
+        self.assertEqual(scheduled_level(lamp_schedule(), EQUINOX_MIDNIGHT), 80)
+
+    def test_late_night_reduction_uses_local_time(self):
+        local = time.localtime(EQUINOX_MIDNIGHT)
+        minute = local.tm_hour * 60 + local.tm_min
+        schedule = lamp_schedule(late_night_start_minute=minute, late_night_end_minute=(minute + 1) % 1440)
+        self.assertEqual(scheduled_level(schedule, EQUINOX_MIDNIGHT), 30)
+
+    def test_polar_night_keeps_lamps_on(self):
+        december = calendar.timegm((2026, 12, 21, 12, 0, 0))
+        self.assertEqual(scheduled_level(lamp_schedule(latitude=80.0), december), 80)
+
+    def test_invalid_fields_are_reported(self):
+        self.assertEqual(validate_schedule(lamp_schedule()), [])
+        errors = validate_schedule(lamp_schedule(group="", latitude=91.0, longitude=-181.0, sunset_offset_minutes=200,
+                                                 night_level=101, late_night_end_minute=1440))
+        self.assertEqual(len(errors), 6)
+
+
+class FakeTimers:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, delay, callback):
+        self.scheduled.append((delay, callback))
+
+
+class LampSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self.timers = FakeTimers()
+        self.multicast = []
+        self.direct = []
+        self.scheduler = LampScheduler(self.timers, self.multicast.append,
+                                       lambda device_id, wrapper_msg: self.direct.append((device_id, wrapper_msg)))
+
+    def test_versions_increase_and_invalid_schedules_are_not_sent(self):
+        self.assertEqual(self.scheduler.set_schedule(lamp_schedule()), (1, []))
+        self.assertEqual(self.scheduler.set_schedule(lamp_schedule("norte")), (2, []))
+        version, errors = self.scheduler.set_schedule(lamp_schedule(night_level=150))
+        self.assertEqual((version, len(errors)), (0, 1))
+        self.assertEqual([msg.lamp_schedule.version for msg in self.multicast], [1, 2])
+
+    def test_adopted_schedule_keeps_its_version(self):
+        wrapper_msg = smart_city_pb2.WrapperMessage()
+        wrapper_msg.lamp_schedule.CopyFrom(lamp_schedule(version=7))
+        self.scheduler.adopt(wrapper_msg)
+        self.scheduler.adopt(wrapper_msg)  # A mesma versão não é reenviada.
+        self.assertEqual(len(self.multicast), 1)
+        self.assertEqual(self.scheduler.set_schedule(lamp_schedule())[0], 8)
+
+    def test_registered_and_outdated_lamps_get_the_schedule(self):
+        self.scheduler.set_schedule(lamp_schedule())
+        self.scheduler.on_register("lamp_1", "centro")
+        self.scheduler.on_register("lamp_2", "sem_programacao")
+        self.scheduler.on_state_report("lamp_1", "centro", 1)
+        self.scheduler.on_state_report("lamp_3", "centro", 0)
+        self.assertEqual([device_id for device_id, _ in self.direct], ["lamp_1", "lamp_3"])
+
+    def test_reannounce_is_rescheduled_when_multicast_fails(self):
+        def fail(wrapper_msg):
+            raise OSError("rede indisponível")
+
+        self.scheduler.set_schedule(lamp_schedule())
+        self.scheduler.send_multicast = fail
+        with self.assertRaises(OSError):
+            self.scheduler.reannounce()
+        self.assertEqual(self.timers.scheduled, [(REANNOUNCE_SECONDS, self.scheduler.reannounce)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_profiling.py
+import contextlib
+import io
+import unittest
+from unittest import mock
+from generated import smart_city_pb2
+from src.common import security
+from src.gateway import gateway
+from src.gateway.profiling import HISTOGRAM_BUCKETS, Profiler, StageStats
+
+
+class StageStatsTest(unittest.TestCase):
+    def test_percentile_is_bucket_limit_capped_by_max(self):
+        stats = StageStats()
+        stats.count, stats.max = 4, 0.003
+        stats.buckets[3] = 3    # Até 8 µs.
+        stats.buckets[12] = 1   # Até 4096 µs.
+        self.assertEqual(stats.percentile(0.5), 8e-6)
+        self.assertEqual(stats.percentile(0.99), 0.003)
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_inactive_profiler_records_nothing(self):
+        profiler = Profiler()
+        started = profiler.clock()
+        self.assertIsNone(started)
+        profiler.record("etapa", started)
+        self.assertEqual(profiler.report()[3], [])
+
+    def test_active_profiler_fills_histograms(self):
+        profiler = Profiler()
+        profiler.active = True
+        for _ in range(3):
+            profiler.record("etapa", profiler.clock())
+        profiler.stop()
+        active, _, _, stages, _ = profiler.report()
+        ((stage, count, total, _, _, maximum, buckets),) = stages
+        self.assertFalse(active)
+        self.assertEqual((stage, count, sum(buckets), len(buckets)), ("etapa", 3, 3, HISTOGRAM_BUCKETS))
+        self.assertLessEqual(maximum, total)
+
+    def test_folded_stacks_are_sorted_and_capped(self):
+        profiler = Profiler()
+        profiler.stacks = {"main;a": 1, "main;b": 5}
+        self.assertEqual(profiler.report()[4], "main;b 5\nmain;a 1")
+        with mock.patch("src.gateway.profiling.MAX_FOLDED_BYTES", 10):
+            self.assertEqual(profiler.report()[4], "main;b 5")
+
+
+class ProfilingAccessTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self.profiler = self.enterContext(mock.patch.object(gateway, "profiler", Profiler()))
+
+    def request(self, action=smart_city_pb2.PROFILING_STATUS):
+        request_msg = smart_city_pb2.WrapperMessage()
+        request_msg.profiling_request.action = action
+        return request_msg
+
+    def test_non_admin_certificate_is_rejected(self):
+        with mock.patch.object(security, "_enabled", True):
+            for role in (security.ROLE_CLIENT, None):
+                report = gateway.handle_client_request(self.request(smart_city_pb2.PROFILING_START), role).profiling_report
+                self.assertIn("administrador", report.errors[0])
+        self.assertFalse(self.profiler.active)
+
+    def test_admin_certificate_is_served(self):
+        with mock.patch.object(security, "_enabled", True):
+            report = gateway.handle_client_request(self.request(), security.ROLE_ADMIN).profiling_report
+        self.assertEqual(list(report.errors), [])
+
+    def test_anyone_is_served_without_certificates(self):
+        with mock.patch.object(security, "_enabled", False):
+            report = gateway.handle_client_request(self.request()).profiling_report
+        self.assertEqual(list(report.errors), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# tests/test_registry.py
+import unittest
+from generated import smart_city_pb2
+from src.common import config
+from src.gateway.registry import DeviceRecord, intern_schema
+
+
+def lamp_info(device_id, group=""):
+    info = smart_city_pb2.DeviceInfo(id=device_id, type=smart_city_pb2.LAMP_POST, group=group)
+    config.add_field(info.config_schema, "brightness", smart_city_pb2.CONFIG_INT, min_value=0, max_value=100)
+    return info
+
+
+class InternSchemaTest(unittest.TestCase):
+    def test_equal_schemas_share_one_instance(self):
+        first, second = lamp_info("lamp_1"), lamp_info("lamp_2")
+        self.assertIs(intern_schema(first.config_schema), intern_schema(second.config_schema))
+        other = smart_city_pb2.ConfigSchema()
+        config.add_field(other, "resolution", smart_city_pb2.CONFIG_STRING)
+        self.assertIsNot(intern_schema(other), intern_schema(first.config_schema))
+
+
+class DeviceRecordTest(unittest.TestCase):
+    def test_fill_device_info_rebuilds_the_registration(self):
+        record = DeviceRecord(lamp_info("lamp_1"), None, "10.0.0.5")
+        self.assertEqual((record.group, record.type_name), ("default", "LAMP_POST"))
+        device_info = smart_city_pb2.DeviceInfo()
+        record.fill_device_info(device_info)
+        expected = lamp_info("lamp_1", "default")
+        expected.ip_address = "10.0.0.5"
+        self.assertEqual(device_info, expected)
+
+    def test_edge_devices_share_the_send_lock(self):
+        first = DeviceRecord(lamp_info("lamp_1"), None, "10.0.0.5")
+        second = DeviceRecord(lamp_info("lamp_2"), None, "10.0.0.5", send_lock=first.send_lock)
+        self.assertIs(first.send_lock, second.send_lock)
+        self.assertIsNot(first.send_lock, DeviceRecord(lamp_info("lamp_3"), None, "10.0.0.6").send_lock)
+
+
+if __name__ == "__main__":
+    unittest.main()
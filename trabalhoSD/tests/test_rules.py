@@ -0,0 +1,82 @@
+# tests/test_rules.py
+import json
+import os
+import tempfile
+import unittest
+from src.gateway.rules import Rule, RuleAction, RulesEngine
+
+
+def air_rule(**changes):
+    spec = {
+        "id": "ar_poluido",
+        "device_type": "AIR_SENSOR",
+        "field": "ppm",
+        "op": ">",
+        "threshold": 120,
+        "hysteresis": 15,
+        "on_trigger": {"command": {"device_type": "LAMP_POST", "group": "$group", "config": {"is_on": True}}},
+        "on_clear": {"notify": "normalizado"},
+    }
+    spec.update(changes)
+    return Rule(spec)
+
+
+class RuleSpecTest(unittest.TestCase):
+    def test_unknown_comparison_is_rejected(self):
+        with self.assertRaises(ValueError):
+            air_rule(op="~")
+
+    def test_command_needs_toggle_or_config(self):
+        with self.assertRaises(ValueError):
+            RuleAction({"command": {"device_type": "LAMP_POST"}})
+
+    def test_action_fields(self):
+        action = air_rule().on_trigger
+        self.assertTrue(action.has_command)
+        self.assertEqual((action.device_type, action.group, action.config), ("LAMP_POST", "$group", {"is_on": True}))
+        self.assertFalse(RuleAction({"notify": "oi"}).has_command)
+
+
+class RulesEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = RulesEngine()
+        self.engine.add_rule(air_rule())
+
+    def evaluate(self, value, device_id="airq_1", device_type="AIR_SENSOR", group="centro"):
+        return [(rule.rule_id, action) for rule, action, _ in
+                self.engine.evaluate(device_id, device_type, group, [("ppm", value)])]
+
+    def test_triggers_once_and_clears_after_hysteresis(self):
+        rule = self.engine.index[("AIR_SENSOR", "ppm")][0]
+        self.assertEqual(self.evaluate(100), [])
+        self.assertEqual(self.evaluate(130), [("ar_poluido", rule.on_trigger)])
+        self.assertEqual(self.evaluate(140), [])
+        # Abaixo do limiar, mas dentro da histerese: a regra continua ativa.
+        self.assertEqual(self.evaluate(110), [])
+        self.assertEqual(self.evaluate(100), [("ar_poluido", rule.on_clear)])
+        self.assertEqual(self.evaluate(130), [("ar_poluido", rule.on_trigger)])
+
+    def test_state_is_kept_per_device(self):
+        self.assertEqual(len(self.evaluate(130, device_id="airq_1")), 1)
+        self.assertEqual(len(self.evaluate(130, device_id="airq_2")), 1)
+
+    def test_other_types_and_groups_are_ignored(self):
+        self.engine.add_rule(air_rule(id="so_norte", device_type=None, group="norte"))
+        self.assertEqual(self.evaluate(130, device_type="TEMP_SENSOR", group="sul"), [])
+        fired = self.evaluate(130, device_type="TEMP_SENSOR", group="norte")
+        self.assertEqual([rule_id for rule_id, _ in fired], ["so_norte"])
+
+    def test_load_file(self):
+        specs = [{"id": "calor", "device_type": "TEMP_SENSOR", "field": "temperature", "op": ">=", "threshold": 35}]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rules.json")
+            with open(path, "w", encoding="utf-8") as rules_file:
+                json.dump(specs, rules_file)
+            engine = RulesEngine()
+            self.assertEqual(engine.load_file(path), 1)
+        fired = engine.evaluate("temp_1", "TEMP_SENSOR", "centro", [("temperature", 35.0)])
+        self.assertEqual([rule.rule_id for rule, _, _ in fired], ["calor"])
+
+
+if __name__ == "__main__":
+    unittest.main()
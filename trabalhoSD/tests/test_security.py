@@ -0,0 +1,102 @@
+# tests/test_security.py
+import hashlib
+import hmac
+import unittest
+from unittest import mock
+from src.common import security
+
+
+class FakeTLSSocket:
+    """Socket com um certificado já decodificado, no formato de SSLSocket.getpeercert()."""
+
+    def __init__(self, common_name, dns_names=(), role=None):
+        self.certificate = {
+            "subject": ((("organizationName", "CidadeInteligente"),), (("organizationalUnitName", role),),
+                        (("commonName", common_name),)),
+            "subjectAltName": tuple(("DNS", name) for name in dns_names),
+        }
+
+    def getpeercert(self):
+        return self.certificate
+
+
+class DeviceIdentityTest(unittest.TestCase):
+    def test_peer_names_include_common_name_and_dns_names(self):
+        sock = FakeTLSSocket("device", ("lamp_*", "cam_*"))
+        self.assertEqual(security.peer_names(sock), ["device", "lamp_*", "cam_*"])
+
+    def test_wildcards_and_exact_names(self):
+        names = ["lamp_a1b2c3", "temp_*"]
+        self.assertTrue(security.name_matches(names, "lamp_a1b2c3"))
+        self.assertTrue(security.name_matches(names, "temp_000001"))
+        self.assertFalse(security.name_matches(names, "lamp_ffffff"))
+        self.assertFalse(security.name_matches(names, "TEMP_000001"))
+
+    def test_peer_owns_id_with_certificates(self):
+        sock = FakeTLSSocket("device", security.TEST_DEVICE_NAMES)
+        with mock.patch.object(security, "_enabled", True):
+            self.assertTrue(security.peer_owns_id(sock, "cam_12ab34"))
+            self.assertTrue(security.peer_owns_id(sock, "borda_centro"))
+            self.assertFalse(security.peer_owns_id(sock, "intruso"))
+            self.assertFalse(security.peer_owns_id(sock, ""))
+
+    def test_any_id_without_certificates(self):
+        with mock.patch.object(security, "_enabled", False):
+            self.assertTrue(security.peer_owns_id(None, "intruso"))
+
+
+class DatagramTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(security, "_enabled", True))
+        self.enterContext(mock.patch.object(security, "_udp_mac", hmac.new(bytes(32), digestmod=hashlib.sha256)))
+        self.enterContext(mock.patch.object(security, "_replay", {}))
+
+    def test_sealed_datagram_opens_once(self):
+        sealed = security.seal_datagram(b"leitura")
+        self.assertEqual(security.open_datagram(sealed), b"leitura")
+        self.assertIsNone(security.open_datagram(sealed))
+
+    def test_tampered_and_unsigned_datagrams_are_rejected(self):
+        sealed = bytearray(security.seal_datagram(b"leitura"))
+        sealed[0] ^= 1
+        self.assertIsNone(security.open_datagram(bytes(sealed)))
+        self.assertIsNone(security.open_datagram(b"leitura"))
+
+    def test_old_datagram_is_rejected(self):
+        sealed = security.seal_datagram(b"leitura")
+        with mock.patch.object(security.time, "time", return_value=security.time.time() + 60):
+            self.assertIsNone(security.open_datagram(sealed))
+
+    def test_out_of_order_within_window(self):
+        first, second, third = (security.seal_datagram(b"%d" % index) for index in range(3))
+        self.assertEqual(security.open_datagram(third), b"2")
+        self.assertEqual(security.open_datagram(first), b"0")
+        self.assertEqual(security.open_datagram(second), b"1")
+        self.assertIsNone(security.open_datagram(first))
+
+    def test_counter_behind_the_window_is_rejected(self):
+        late = security.seal_datagram(b"atrasado")
+        for _ in range(security.UDP_REPLAY_WINDOW):
+            security.seal_datagram(b"descartado")
+        self.assertIsNotNone(security.open_datagram(security.seal_datagram(b"recente")))
+        self.assertIsNone(security.open_datagram(late))
+
+    def test_each_process_counts_separately(self):
+        sealed = security.seal_datagram(b"pai")
+        self.assertIsNotNone(security.open_datagram(sealed))
+        sender, counter = security._sender_id, security._counter
+        self.addCleanup(setattr, security, "_sender_id", sender)
+        self.addCleanup(setattr, security, "_counter", counter)
+        # Um processo filho (fork) sorteia outro remetente e recomeça o contador.
+        security._new_sender()
+        self.assertEqual(security.open_datagram(security.seal_datagram(b"filho")), b"filho")
+
+    def test_idle_senders_are_forgotten(self):
+        security.open_datagram(security.seal_datagram(b"leitura"))
+        later = security.time.time() + 3 * security.UDP_MAX_AGE_SECONDS
+        self.assertTrue(security._accept_counter(b"outro...", 1, later))
+        self.assertEqual(list(security._replay), [b"outro..."])
+
+
+if __name__ == "__main__":
+    unittest.main()
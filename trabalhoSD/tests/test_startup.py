@@ -0,0 +1,60 @@
+# tests/test_startup.py
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+from src.common import startup
+from src.common.discovery import configured_gateway, gateway_announcements
+from src.common.startup import LazyModule
+
+
+class LazyModuleTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(startup, "_phases", []))
+        self.enterContext(mock.patch.object(startup, "_reported", False))
+
+    def test_module_is_imported_on_first_attribute(self):
+        lazy = LazyModule("colorsys")
+        self.assertNotIn("rgb_to_hsv", lazy.__dict__)
+        self.assertEqual(lazy.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIs(lazy.rgb_to_hsv, sys.modules["colorsys"].rgb_to_hsv)
+        self.assertEqual([phase for phase, _ in startup._phases], ["colorsys"])
+        lazy.load()  # Carregar de novo não tem efeito.
+        self.assertEqual(len(startup._phases), 1)
+
+    def test_missing_attribute_raises_attribute_error(self):
+        lazy = LazyModule("colorsys")
+        with self.assertRaises(AttributeError):
+            lazy.nao_existe
+
+    def test_missing_module_raises_on_first_use(self):
+        lazy = LazyModule("modulo_que_nao_existe")
+        with self.assertRaises(ImportError):
+            lazy.qualquer
+
+    def test_report_lists_the_phases(self):
+        startup.mark("portas")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            startup.report("Gateway")
+        self.assertIn("Gateway pronto em", output.getvalue())
+        self.assertIn("portas", output.getvalue())
+
+
+class ConfiguredGatewayTest(unittest.TestCase):
+    def test_without_gateway_ip_discovery_is_used(self):
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertIsNone(configured_gateway())
+
+    def test_ports_come_from_the_environment(self):
+        environment = {"GATEWAY_IP": "10.0.0.1", "GATEWAY_CLIENT_PORT": "21003"}
+        with mock.patch.dict(os.environ, environment, clear=True), mock.patch.object(startup, "_phases", []):
+            info = next(gateway_announcements())
+        self.assertEqual((info.ip_address, info.device_tcp_port, info.client_tcp_port, info.stream_tcp_port),
+                         ("10.0.0.1", 10000, 21003, 10004))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# tests/test_stream_relay.py
+import contextlib
+import io
+import socket
+import threading
+import unittest
+from unittest import mock
+from generated import smart_city_pb2
+from src.common import security
+from src.common.framing import send_message
+from src.common.streaming import FrameReceiver, send_frame
+from src.gateway.stream_relay import StreamRelay, hello_allowed
+from tests.test_security import FakeTLSSocket
+
+
+def stream_hello(device_id, role):
+    hello = smart_city_pb2.StreamHello()
+    hello.device_id = device_id
+    hello.role = role
+    return hello
+
+
+class HelloAllowedTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(security, "_enabled", True))
+
+    def test_camera_publishes_with_its_own_id(self):
+        camera = FakeTLSSocket("device", security.TEST_DEVICE_NAMES, role=security.ROLE_DEVICE)
+        self.assertTrue(hello_allowed(camera, stream_hello("cam_12ab34", smart_city_pb2.PUBLISHER)))
+        self.assertFalse(hello_allowed(camera, stream_hello("outra_camera", smart_city_pb2.PUBLISHER)))
+
+    def test_client_cannot_publish(self):
+        client = FakeTLSSocket("client", role=security.ROLE_CLIENT)
+        self.assertFalse(hello_allowed(client, stream_hello("cam_12ab34", smart_city_pb2.PUBLISHER)))
+        self.assertTrue(hello_allowed(client, stream_hello("cam_12ab34", smart_city_pb2.SUBSCRIBER)))
+
+    def test_device_cannot_subscribe(self):
+        camera = FakeTLSSocket("device", security.TEST_DEVICE_NAMES, role=security.ROLE_DEVICE)
+        self.assertFalse(hello_allowed(camera, stream_hello("cam_12ab34", smart_city_pb2.SUBSCRIBER)))
+
+    def test_anything_goes_without_certificates(self):
+        with mock.patch.object(security, "_enabled", False):
+            self.assertTrue(hello_allowed(None, stream_hello("cam_12ab34", smart_city_pb2.PUBLISHER)))
+
+
+
+class StreamRelayTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self.enterContext(mock.patch.object(security, "_enabled", False))
+        self.relay = StreamRelay(lambda device_id: device_id == "cam_1")
+
+    def socket_pair(self):
+        pair = socket.socketpair()
+        for sock in pair:
+            self.addCleanup(sock.close)
+        return pair
+
+    def publish(self, frames):
+        """Roda o repasse da câmera em uma thread e envia os quadros; retorna a thread."""
+        camera_side, gateway_side = self.socket_pair()
+        thread = threading.Thread(target=self.relay.relay_from_publisher, args=("cam_1", gateway_side), daemon=True)
+        thread.start()
+        for frame_id, frame in enumerate(frames):
+            send_frame(camera_side, frame_id, frame, 0)
+        camera_side.close()
+        return thread
+
+    def test_subscriber_receives_frames_until_the_camera_leaves(self):
+        client_side, gateway_side = self.socket_pair()
+        self.relay.add_subscriber("cam_1", gateway_side)
+        thread = self.publish([b"primeiro", b"segundo"])
+        receiver = FrameReceiver(client_side)
+        self.assertEqual(bytes(receiver.read_frame()[2]), b"primeiro")
+        self.assertEqual(bytes(receiver.read_frame()[2]), b"segundo")
+        self.assertIsNone(receiver.read_frame())
+        thread.join(5)
+        self.assertEqual(self.relay.frames_relayed, 2)
+
+    def test_dead_subscriber_is_removed(self):
+        client_side, gateway_side = self.socket_pair()
+        self.relay.add_subscriber("cam_1", gateway_side)
+        client_side.close()
+        self.publish([b"quadro"]).join(5)
+        self.assertEqual((self.relay.subscribers, self.relay.pending), ({}, {}))
+
+    def test_unregistered_camera_is_refused(self):
+        client_side, gateway_side = self.socket_pair()
+        hello_msg = smart_city_pb2.WrapperMessage()
+        hello_msg.stream_hello.CopyFrom(stream_hello("cam_2", smart_city_pb2.SUBSCRIBER))
+        send_message(client_side, hello_msg)
+        self.relay.handle_connection(gateway_side)
+        self.assertEqual(client_side.recv(1), b"")
+        self.assertEqual(self.relay.pending, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_streaming.py
+import socket
+import threading
+import unittest
+from src.common.streaming import CHUNK_HEADER, CHUNK_SIZE, ChunkReader, FrameReceiver, send_chunk, send_frame
+
+
+class StreamingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+        self.addCleanup(self.sender.close)
+        self.addCleanup(self.receiver.close)
+
+    def send_in_background(self, function, *args):
+        """Envia em outra thread, para que quadros maiores que o buffer do socket não travem o teste."""
+        thread = threading.Thread(target=function, args=args, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+
+
+class FrameTest(StreamingTestCase):
+    def test_frames_are_split_and_reassembled(self):
+        first = bytes(range(256)) * (CHUNK_SIZE // 128 + 3)   # Três blocos, o último incompleto.
+        second = b"quadro pequeno"
+
+        def send():
+            send_frame(self.sender, 1, first, 1000)
+            send_frame(self.sender, 2, second, 2000)
+
+        self.send_in_background(send)
+        receiver = FrameReceiver(self.receiver)
+        frame_id, timestamp_us, frame = receiver.read_frame()
+        self.assertEqual((frame_id, timestamp_us, bytes(frame)), (1, 1000, first))
+        frame_id, timestamp_us, frame = receiver.read_frame()
+        self.assertEqual((frame_id, timestamp_us, bytes(frame)), (2, 2000, second))
+
+    def test_chunk_reader_returns_each_chunk(self):
+        frame = b"x" * (CHUNK_SIZE + 10)
+        self.send_in_background(send_frame, self.sender, 7, frame, 0)
+        reader = ChunkReader(self.receiver)
+        chunks = [reader.read() for _ in range(2)]
+        self.assertEqual([(chunk[2], chunk[3], len(chunk[4])) for chunk in chunks], [(0, 2, CHUNK_SIZE), (1, 2, 10)])
+
+    def test_closed_connection_returns_none(self):
+        self.sender.sendall(CHUNK_HEADER.pack(1, 0, 0, 1, 100) + b"pela metade")
+        self.sender.close()
+        self.assertIsNone(ChunkReader(self.receiver).read())
+
+    def test_oversized_chunk_is_rejected(self):
+        send_chunk(self.sender, CHUNK_HEADER.pack(1, 0, 0, 1, CHUNK_SIZE + 1), b"")
+        with self.assertRaises(ValueError):
+            ChunkReader(self.receiver).read()
+
+    def test_out_of_order_chunk_is_rejected(self):
+        send_chunk(self.sender, CHUNK_HEADER.pack(1, 0, 1, 2, 3), b"abc")
+        with self.assertRaises(ValueError):
+            FrameReceiver(self.receiver).read_frame()
+
+
+    def test_invalid_frame_headers_are_rejected(self):
+        headers = [
+            CHUNK_HEADER.pack(1, 0, 0, 1, CHUNK_SIZE + 1),  # Bloco maior que o limite.
+            CHUNK_HEADER.pack(1, 0, 0, 0, 3),               # Quadro sem blocos.
+        ]
+        for header in headers:
+            sender, receiver = socket.socketpair()
+            self.addCleanup(sender.close)
+            self.addCleanup(receiver.close)
+            send_chunk(sender, header, b"abc")
+            with self.assertRaises(ValueError):
+                FrameReceiver(receiver).read_frame()
+
+    def test_chunk_count_cannot_change_within_a_frame(self):
+        send_chunk(self.sender, CHUNK_HEADER.pack(1, 0, 0, 2, 3), b"abc")
+        send_chunk(self.sender, CHUNK_HEADER.pack(1, 0, 1, 1000, 3), b"def")
+        receiver = FrameReceiver(self.receiver)
+        with self.assertRaises(ValueError):
+            receiver.read_frame()
+        # O buffer não cresceu para os 1000 blocos anunciados.
+        self.assertEqual(len(receiver.frame), 2 * CHUNK_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# tests/test_timers.py
+import contextlib
+import io
+import threading
+import unittest
+from src.gateway.timers import TimerService
+
+
+class TimerServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self.fired = []
+        self.done = threading.Event()
+
+    def fire(self, name):
+        self.fired.append(name)
+        if name == "fim":
+            self.done.set()
+
+    def test_callbacks_run_in_due_order(self):
+        timers = TimerService().start()
+        timers.schedule(0.05, self.fire, "fim")
+        timers.schedule(0.02, self.fire, "segundo")
+        timers.schedule(0.0, self.fire, "primeiro")
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.fired, ["primeiro", "segundo", "fim"])
+        self.assertEqual(timers.pending(), 0)
+
+    def test_cancelled_timer_does_not_fire(self):
+        timers = TimerService()
+        timer_id = timers.schedule(0.0, self.fire, "cancelado")
+        timers.cancel(timer_id)
+        timers.cancel(timer_id)  # Cancelar de novo não tem efeito.
+        self.assertEqual(timers.pending(), 0)
+        timers.schedule(0.01, self.fire, "fim")
+        timers.start()
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.fired, ["fim"])
+
+    def test_failing_callback_does_not_stop_the_service(self):
+        def fail():
+            raise RuntimeError("temporizador quebrado")
+
+        timers = TimerService().start()
+        timers.schedule(0.0, fail)
+        timers.schedule(0.01, self.fire, "fim")
+        self.assertTrue(self.done.wait(5))
+        self.assertTrue(timers.thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# tests/test_traffic.py
+import contextlib
+import io
+import unittest
+from generated import smart_city_pb2
+from src.common.traffic import green_wave_offsets, phase_at
+from src.gateway.timers import TimerService
+from src.gateway.traffic_scheduler import MAX_RESYNC_FAILURES, REPORT_GRACE_SECONDS, TrafficScheduler
+
+
+class PhaseTest(unittest.TestCase):
+    def test_cycle_starts_green_at_anchor_plus_offset(self):
+        self.assertEqual(phase_at(100.0, 100.0, 0, 30, 5, 25), (smart_city_pb2.GREEN, 30))
+        self.assertEqual(phase_at(132.0, 100.0, 0, 30, 5, 25), (smart_city_pb2.YELLOW, 3))
+        self.assertEqual(phase_at(150.0, 100.0, 0, 30, 5, 25), (smart_city_pb2.RED, 10))
+        self.assertEqual(phase_at(165.0, 100.0, 5, 30, 5, 25), (smart_city_pb2.GREEN, 30))
+
+    def test_green_wave_offsets_follow_travel_time(self):
+        # A 36 km/h (10 m/s), 150 m levam 15 s; 700 m levam 70 s, 10 s depois do ciclo de 60 s.
+        self.assertEqual(green_wave_offsets([0, 150, 700], 36, 60), [0.0, 15.0, 10.0])
+
+
+class TrafficSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        # O serviço não é iniciado: os testes só conferem o que foi agendado.
+        self.timers = TimerService()
+        self.sent = []
+        self.failing = set()
+        self.scheduler = TrafficScheduler(self.timers, self.send_config)
+
+    def send_config(self, device_id, values):
+        self.sent.append((device_id, values))
+        return ["não está conectado"] if device_id in self.failing else []
+
+    def apply(self, device_ids=("sema_1", "sema_2")):
+        return self.scheduler.apply_green_wave("avenida", list(device_ids), [0, 150][:len(device_ids)], 36, 30, 5, 25)
+
+    def scheduled_callbacks(self):
+        return [entry[2].__name__ for entry in self.timers.heap if entry[1] in self.timers.live]
+
+    def test_invalid_plans_are_rejected(self):
+        self.assertEqual(self.scheduler.apply_green_wave("avenida", ["sema_1"], [], 36, 30, 5, 25)[2],
+                         ["É preciso informar uma distância para cada semáforo."])
+        self.assertEqual(self.scheduler.apply_green_wave("avenida", ["sema_1"], [0], 0, 30, 5, 25)[2],
+                         ["A velocidade deve ser positiva."])
+        self.assertEqual(self.sent, [])
+
+    def test_plan_is_sent_and_supervised(self):
+        anchor, offsets, errors = self.apply()
+        self.assertEqual((offsets, errors), ([0.0, 15.0], []))
+        self.assertEqual([values["cycle_offset"] for _, values in self.sent], [0.0, 15.0])
+        self.assertEqual({values["cycle_anchor"] for _, values in self.sent}, {anchor})
+        self.assertEqual(self.scheduled_callbacks(), ["on_missed_change", "on_missed_change"])
+
+    def test_failed_send_is_reported_and_not_supervised(self):
+        self.failing.add("sema_2")
+        errors = self.apply()[2]
+        self.assertEqual(errors, ["sema_2: não está conectado"])
+        self.assertEqual(self.timers.pending(), 1)
+        self.assertEqual(list(self.scheduler.plans), ["sema_1"])
+
+    def test_unexpected_phase_triggers_resync(self):
+        anchor = self.apply(["sema_1"])[0]
+        self.scheduler.on_phase_report("sema_1", smart_city_pb2.RED, anchor + 10)
+        self.assertIn("resync", self.scheduled_callbacks())
+
+    def test_expected_phase_rearms_the_watchdog(self):
+        anchor = self.apply(["sema_1"])[0]
+        self.scheduler.on_phase_report("sema_1", smart_city_pb2.YELLOW, anchor + 30 + REPORT_GRACE_SECONDS / 2)
+        self.assertEqual(self.scheduled_callbacks(), ["on_missed_change"])
+
+    def test_light_turned_off_suspends_supervision(self):
+        anchor = self.apply(["sema_1"])[0]
+        self.scheduler.on_phase_report("sema_1", smart_city_pb2.PHASE_OFF, anchor + 10)
+        self.assertEqual(self.timers.pending(), 0)
+
+    def test_missed_change_of_a_replaced_plan_is_ignored(self):
+        self.apply(["sema_1"])
+        old_plan = self.scheduler.plans["sema_1"]
+        self.apply(["sema_1"])
+        self.sent.clear()
+        self.scheduler.on_missed_change("sema_1", old_plan)
+        self.assertEqual(self.sent, [])
+        self.scheduler.on_missed_change("sema_1", self.scheduler.plans["sema_1"])
+        self.assertEqual([device_id for device_id, _ in self.sent], ["sema_1"])
+
+
+    def test_light_that_stops_receiving_the_plan_is_dropped(self):
+        self.apply(["sema_1"])
+        plan = self.scheduler.plans["sema_1"]
+        self.failing.add("sema_1")
+        for _ in range(MAX_RESYNC_FAILURES - 1):
+            self.scheduler.resync("sema_1", plan)
+        self.assertEqual(self.scheduled_callbacks(), ["on_missed_change"])
+        self.scheduler.resync("sema_1", plan)
+        # Depois de MAX_RESYNC_FAILURES falhas seguidas, o semáforo sai da supervisão.
+        self.assertEqual(self.scheduler.plans, {})
+        self.assertEqual(self.timers.pending(), 0)
+
+    def test_successful_resync_resets_the_failures(self):
+        self.apply(["sema_1"])
+        plan = self.scheduler.plans["sema_1"]
+        self.failing.add("sema_1")
+        for _ in range(MAX_RESYNC_FAILURES - 1):
+            self.scheduler.resync("sema_1", plan)
+        self.failing.clear()
+        self.scheduler.resync("sema_1", plan)
+        self.assertEqual(plan.failures, 0)
+        self.assertIn("sema_1", self.scheduler.plans)
+
+
+if __name__ == "__main__":
+    unittest.main()
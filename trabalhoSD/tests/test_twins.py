@@ -0,0 +1,92 @@
+# tests/test_twins.py
+import contextlib
+import io
+import unittest
+from src.gateway.twins import DeviceTwin, TwinStore
+
+
+class DeviceTwinTest(unittest.TestCase):
+    def test_delta_and_settle(self):
+        twin = DeviceTwin()
+        twin.reported = {"brightness": 50, "is_on": True}
+        twin.desired = {"brightness": 80, "is_on": True}
+        self.assertEqual(twin.delta(), {"brightness": 80})
+        self.assertFalse(twin.settle())
+        self.assertEqual(twin.desired, {"brightness": 80})
+        twin.reported["brightness"] = 80
+        self.assertTrue(twin.settle())
+        self.assertEqual((twin.desired, twin.sent_at, twin.attempts), ({}, None, 0))
+
+
+class TwinStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self.sent = []
+        self.failing = set()
+
+    def send(self, device_id, values):
+        self.sent.append((device_id, values))
+        if device_id in self.failing:
+            raise BrokenPipeError("conexão perdida")
+        return []
+
+    def store(self, rate=1000, burst=1000, batch_size=100, retry_seconds=5, max_attempts=3):
+        return TwinStore(self.send, rate, burst, batch_size, retry_seconds, max_attempts)
+
+    def test_only_out_of_sync_devices_are_commanded(self):
+        store = self.store()
+        store.report("lamp_1", {"brightness": 80}, registered=True)
+        store.report("lamp_2", {"brightness": 50}, registered=True)
+        self.assertFalse(store.desire("lamp_1", {"brightness": 80}, 100.0))
+        self.assertTrue(store.desire("lamp_2", {"brightness": 80}, 100.0))
+        self.assertEqual(store.reconcile(100.0), 1)
+        self.assertEqual(self.sent, [("lamp_2", {"brightness": 80})])
+        store.report("lamp_2", {"brightness": 80})
+        self.assertEqual(store.summary(), (0, 1, 0))
+
+    def test_repeated_requests_become_one_command(self):
+        store = self.store()
+        store.report("lamp_1", {"brightness": 50, "is_on": False}, registered=True)
+        store.desire("lamp_1", {"brightness": 80}, 100.0)
+        store.desire("lamp_1", {"is_on": True}, 100.0)
+        store.reconcile(100.0)
+        self.assertEqual(self.sent, [("lamp_1", {"brightness": 80, "is_on": True})])
+
+    def test_sent_command_waits_for_retry_and_is_abandoned(self):
+        store = self.store(max_attempts=2)
+        store.desire("lamp_1", {"brightness": 80}, 100.0, sent=True)
+        self.assertEqual(store.reconcile(101.0), 0)
+        self.assertEqual(store.reconcile(106.0), 1)
+        self.assertEqual(store.reconcile(112.0), 0)
+        self.assertEqual(store.summary(), (0, 1, 1))
+
+    def test_batch_size_and_rate_limit_the_round(self):
+        store = self.store(rate=1, burst=2, batch_size=3)
+        for index in range(5):
+            store.desire(f"lamp_{index}", {"brightness": 80}, 100.0)
+        self.assertEqual(store.reconcile(100.0), 2)
+        self.assertEqual(store.reconcile(101.0), 1)
+        self.assertEqual([device_id for device_id, _ in self.sent], ["lamp_0", "lamp_1", "lamp_2"])
+
+    def test_broken_connection_does_not_abort_the_batch(self):
+        store = self.store()
+        for device_id in ("lamp_1", "lamp_2", "lamp_3"):
+            store.desire(device_id, {"brightness": 80}, 100.0)
+        self.failing.add("lamp_2")
+        self.assertEqual(store.reconcile(100.0), 3)
+        self.assertEqual([device_id for device_id, _ in self.sent], ["lamp_1", "lamp_2", "lamp_3"])
+        # O dispositivo que falhou continua fora do estado e é tentado de novo depois do intervalo.
+        self.failing.clear()
+        self.sent.clear()
+        store.reconcile(106.0)
+        self.assertIn(("lamp_2", {"brightness": 80}), self.sent)
+
+    def test_registration_resends_pending_values(self):
+        store = self.store()
+        store.desire("lamp_1", {"brightness": 80}, 100.0, sent=True)
+        store.report("lamp_1", {"brightness": 50}, registered=True)
+        self.assertEqual(store.reconcile(100.5), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()